@@ -1,587 +1,425 @@
-/* script.js - full JS for CloudVista frontend */
-
-/* Global state */
-var vms = [];
-var tasks = [];
-var completedTasks = [];
-var currentTime = 0;
-var isSimulating = false;
-var simulationInterval = null;
-var utilizationChart = null;
-var timelineChart = null;
-var costChart = null;
-var taskQueue = [];
-var timeQuantum = 2;
-
-/* UI helpers */
-function toggleQuantum() {
-    var scheduler = document.getElementById('scheduler').value;
-    var quantumGroup = document.getElementById('quantumGroup');
-    quantumGroup.style.display = scheduler === 'roundrobin' ? 'block' : 'none';
-}
-
-/* Charts initialization */
-function initCharts() {
-    var ctxUtil = document.getElementById('utilizationChart').getContext('2d');
-    utilizationChart = new Chart(ctxUtil, {
-        type: 'line',
-        data: {
-            labels: [],
-            datasets: [{
-                label: 'CPU Utilization (%)',
-                data: [],
-                borderColor: '#5a9fd4',
-                backgroundColor: 'rgba(90, 159, 212, 0.1)',
-                tension: 0.4,
-                borderWidth: 2,
-                fill: true
-            }, {
-                label: 'RAM Utilization (%)',
-                data: [],
-                borderColor: '#7db9e8',
-                backgroundColor: 'rgba(125, 185, 232, 0.1)',
-                tension: 0.4,
-                borderWidth: 2,
-                fill: true
-            }]
-        },
-        options: {
-            responsive: true,
-            maintainAspectRatio: false,
-            plugins: { legend: { labels: { color: '#b8d8ff' } } },
-            scales: {
-                y: { beginAtZero: true, max: 100, ticks: { color: '#7db9e8' }, grid: { color: 'rgba(90, 159, 212, 0.1)' } },
-                x: { ticks: { color: '#7db9e8' }, grid: { color: 'rgba(90, 159, 212, 0.1)' } }
-            }
-        }
-    });
-
-    var ctxTimeline = document.getElementById('timelineChart').getContext('2d');
-    timelineChart = new Chart(ctxTimeline, {
-        type: 'bar',
-        data: {
-            labels: [],
-            datasets: [{
-                label: 'Wait Time',
-                data: [],
-                backgroundColor: '#4a8fc7'
-            }, {
-                label: 'Execution Time',
-                data: [],
-                backgroundColor: '#5a9fd4'
-            }]
-        },
-        options: {
-            responsive: true,
-            maintainAspectRatio: false,
-            plugins: { legend: { labels: { color: '#b8d8ff' } } },
-            scales: {
-                x: { stacked: true, ticks: { color: '#7db9e8' }, grid: { color: 'rgba(90, 159, 212, 0.1)' } },
-                y: { stacked: true, beginAtZero: true, ticks: { color: '#7db9e8' }, grid: { color: 'rgba(90, 159, 212, 0.1)' } }
-            }
-        }
-    });
-
-    var ctxCost = document.getElementById('costChart').getContext('2d');
-    costChart = new Chart(ctxCost, {
-        type: 'bar',
-        data: {
-            labels: [],
-            datasets: [{
-                label: 'Task Cost (₹)',
-                data: [],
-                backgroundColor: '#5a9fd4'
-            }]
-        },
-        options: {
-            responsive: true,
-            maintainAspectRatio: false,
-            plugins: { legend: { labels: { color: '#b8d8ff' } } },
-            scales: {
-                x: { ticks: { color: '#7db9e8' }, grid: { color: 'rgba(90, 159, 212, 0.1)' } },
-                y: { beginAtZero: true, ticks: { color: '#7db9e8' }, grid: { color: 'rgba(90, 159, 212, 0.1)' } }
-            }
-        }
-    });
-}
-
-/* VM initialization */
-function initializeVMs() {
-    var count = parseInt(document.getElementById('vmCount').value);
-    var cores = parseInt(document.getElementById('vmCores').value);
-    var ram = parseInt(document.getElementById('vmRam').value);
-    var storage = parseInt(document.getElementById('vmStorage').value);
-
-    vms = [];
-    for (var i = 0; i < count; i++) {
-        vms.push({
-            id: i + 1,
-            totalCores: cores,
-            availableCores: cores,
-            totalRam: ram,
-            availableRam: ram,
-            storage: storage,
-            currentTask: null
-        });
-    }
-    alert('Initialized ' + count + ' VMs with ' + cores + ' cores and ' + ram + 'GB RAM each');
-    updateStats();
-}
-
-/* cost calculation (based on CPU & RAM hourly rates) */
-function calculateTaskCost(task) {
-    var cpuCost = parseFloat(document.getElementById('cpuCost').value) || 0;
-    var ramCost = parseFloat(document.getElementById('ramCost').value) || 0;
-    var hours = (task.executionTime || 0) / 3600.0;
-    var cost = (task.cpuRequired * cpuCost * hours) + (task.ramRequired * ramCost * hours);
-    return cost;
-}
-
-/* submit a task from UI */
-function submitTask() {
-    var name = document.getElementById('taskName').value || 'Task-' + (tasks.length + completedTasks.length + 1);
-    var cpu = parseInt(document.getElementById('taskCpu').value) || 1;
-    var ram = parseInt(document.getElementById('taskRam').value) || 1;
-    var time = parseInt(document.getElementById('taskTime').value) || 1;
-    var priority = parseInt(document.getElementById('taskPriority').value) || 5;
-
-    var task = {
-        id: tasks.length + completedTasks.length + 1,
-        name: name,
-        cpuRequired: cpu,
-        ramRequired: ram,
-        executionTime: time,
-        remainingTime: time,
-        priority: priority,
-        arrivalTime: currentTime,
-        startTime: null,
-        endTime: null,
-        status: 'pending',
-        quantumUsed: 0,
-        cost: 0
-    };
-
-    tasks.push(task);
-    updateTaskList();
-    updateStats();
-    document.getElementById('taskName').value = '';
-}
-
-/* render task list */
-function updateTaskList() {
-    var listDiv = document.getElementById('taskList');
-    if ((tasks.length === 0) && (completedTasks.length === 0)) {
-        listDiv.innerHTML = '<p style="color: #7db9e8;">No tasks submitted yet</p>';
-        return;
-    }
-
-    var html = '';
-    for (var i = 0; i < tasks.length; i++) {
-        var task = tasks[i];
-        var statusClass = task.status === 'completed' ? 'status-completed' :
-                          task.status === 'running' ? 'status-running' : 'status-pending';
-        html += '<div class="task-item">' +
-            '<div class="task-info">' +
-            '<strong>' + task.name + '</strong> - CPU: ' + task.cpuRequired + ' cores, RAM: ' + task.ramRequired + 'GB, Time: ' + task.executionTime + 's, Priority: ' + task.priority +
-            '</div>' +
-            '<span class="task-status ' + statusClass + '">' + task.status + '</span>' +
-            '</div>';
-    }
-    listDiv.innerHTML = html;
-}
-
-/* simulation control */
-function startSimulation() {
-    if (vms.length === 0) {
-        alert('Please initialize VMs first!');
-        return;
-    }
-    var pendingCount = tasks.filter(function(t) { return t.status === 'pending'; }).length;
-    if (pendingCount === 0) {
-        alert('No pending tasks to simulate!');
-        return;
-    }
-
-    isSimulating = true;
-    document.getElementById('simStatus').textContent = 'Running';
-
-    var scheduler = document.getElementById('scheduler').value;
-    timeQuantum = scheduler === 'roundrobin' ? parseFloat(document.getElementById('timeQuantum').value) || 2 : 0;
-
-    var pendingTasks = tasks.filter(function(t) { return t.status === 'pending'; });
-
-    if (scheduler === 'fcfs') {
-        pendingTasks.sort(function(a, b) { return a.arrivalTime - b.arrivalTime; });
-    } else if (scheduler === 'priority') {
-        pendingTasks.sort(function(a, b) { return b.priority - a.priority; });
-    } else if (scheduler === 'roundrobin') {
-        taskQueue = pendingTasks.slice();
-    }
-
-    simulationInterval = setInterval(function() {
-        if (scheduler === 'roundrobin') {
-            simulateRoundRobin();
-        } else {
-            simulateStep(pendingTasks);
-        }
-    }, 100);
-}
-
-/* FCFS & Priority step simulation */
-function simulateStep(pendingTasks) {
-    currentTime += 0.1;
-
-    // finish tasks
-    for (var i = 0; i < vms.length; i++) {
-        var vm = vms[i];
-        if (vm.currentTask) {
-            var t = vm.currentTask;
-            if (currentTime >= t.endTime) {
-                t.status = 'completed';
-                t.cost = calculateTaskCost(t);
-                completedTasks.push(t);
-                vm.availableCores += t.cpuRequired;
-                vm.availableRam += t.ramRequired;
-                vm.currentTask = null;
-            }
-        }
-    }
-
-    // schedule pending tasks onto available VMs
-    for (var j = 0; j < pendingTasks.length; j++) {
-        var task = pendingTasks[j];
-        if (task.status === 'pending') {
-            var availableVM = null;
-            for (var k = 0; k < vms.length; k++) {
-                var vm2 = vms[k];
-                if (vm2.currentTask === null &&
-                    vm2.availableCores >= task.cpuRequired &&
-                    vm2.availableRam >= task.ramRequired) {
-                    availableVM = vm2;
-                    break;
-                }
-            }
-
-            if (availableVM) {
-                task.status = 'running';
-                task.startTime = task.startTime || currentTime;
-                task.endTime = currentTime + task.executionTime;
-                availableVM.currentTask = task;
-                availableVM.availableCores -= task.cpuRequired;
-                availableVM.availableRam -= task.ramRequired;
-            }
-        }
-    }
-
-    updateTaskList();
-    updateStats();
-    updateCharts();
-
-    var allCompleted = tasks.every(function(x) { return x.status === 'completed'; });
-    if (allCompleted) {
-        stopSimulation();
-    }
-}
-
-/* Round robin simulation */
-function simulateRoundRobin() {
-    currentTime += 0.1;
-
-    for (var i = 0; i < vms.length; i++) {
-        var vm = vms[i];
-        if (vm.currentTask) {
-            var t = vm.currentTask;
-            t.quantumUsed += 0.1;
-            t.remainingTime -= 0.1;
-
-            if (t.remainingTime <= 0.01) {
-                t.status = 'completed';
-                t.endTime = currentTime;
-                t.remainingTime = 0;
-                t.cost = calculateTaskCost(t);
-                completedTasks.push(t);
-                vm.availableCores += t.cpuRequired;
-                vm.availableRam += t.ramRequired;
-                vm.currentTask = null;
-            } else if (t.quantumUsed >= timeQuantum) {
-                t.status = 'pending';
-                t.quantumUsed = 0;
-                vm.availableCores += t.cpuRequired;
-                vm.availableRam += t.ramRequired;
-                vm.currentTask = null;
-                taskQueue.push(t);
-            }
-        }
-    }
-
-    while (taskQueue.length > 0) {
-        var qtask = taskQueue[0];
-        if (qtask.status === 'completed') {
-            taskQueue.shift();
-            continue;
-        }
-
-        var avail = null;
-        for (var j = 0; j < vms.length; j++) {
-            var v = vms[j];
-            if (v.currentTask === null &&
-                v.availableCores >= qtask.cpuRequired &&
-                v.availableRam >= qtask.ramRequired) {
-                avail = v;
-                break;
-            }
-        }
-
-        if (avail) {
-            taskQueue.shift();
-            qtask.status = 'running';
-            qtask.startTime = qtask.startTime || currentTime;
-            qtask.quantumUsed = 0;
-            avail.currentTask = qtask;
-            avail.availableCores -= qtask.cpuRequired;
-            avail.availableRam -= qtask.ramRequired;
-        } else {
-            break;
-        }
-    }
-
-    updateTaskList();
-    updateStats();
-    updateCharts();
-
-    var allCompleted = tasks.every(function(x) { return x.status === 'completed'; });
-    if (allCompleted && taskQueue.length === 0) {
-        stopSimulation();
-    }
-}
-
-/* stop simulation */
-function stopSimulation() {
-    isSimulating = false;
-    clearInterval(simulationInterval);
-    document.getElementById('simStatus').textContent = 'Completed';
-    // ensure final stats & charts updated
-    updateStats();
-    updateCharts();
-}
-
-/* reset everything */
-function resetSimulation() {
-    stopSimulation();
-    tasks = [];
-    completedTasks = [];
-    currentTime = 0;
-    taskQueue = [];
-    for (var i = 0; i < vms.length; i++) {
-        vms[i].availableCores = vms[i].totalCores;
-        vms[i].availableRam = vms[i].totalRam;
-        vms[i].currentTask = null;
-    }
-    document.getElementById('simStatus').textContent = 'Idle';
-    updateTaskList();
-    updateStats();
-
-    if (utilizationChart) {
-        utilizationChart.data.labels = [];
-        utilizationChart.data.datasets[0].data = [];
-        utilizationChart.data.datasets[1].data = [];
-        utilizationChart.update();
-    }
-    if (timelineChart) {
-        timelineChart.data.labels = [];
-        timelineChart.data.datasets[0].data = [];
-        timelineChart.data.datasets[1].data = [];
-        timelineChart.update();
-    }
-    if (costChart) {
-        costChart.data.labels = [];
-        costChart.data.datasets[0].data = [];
-        costChart.update();
-    }
-}
-
-/* update stats shown in UI */
-function updateStats() {
-    // total tasks includes pending + completed
-    var totalTasks = tasks.length;
-    var completed = completedTasks.length;
-
-    var avgWait = 0;
-    var avgTurnaround = 0;
-    var totalCost = 0;
-
-    if (completedTasks.length > 0) {
-        avgWait = completedTasks.reduce(function(acc, t) {
-            return acc + ((t.startTime || 0) - (t.arrivalTime || 0));
-        }, 0) / completedTasks.length;
-
-        avgTurnaround = completedTasks.reduce(function(acc, t) {
-            return acc + ((t.endTime || t.startTime || 0) - (t.arrivalTime || 0));
-        }, 0) / completedTasks.length;
-
-        totalCost = completedTasks.reduce(function(acc, t) {
-            return acc + (t.cost || 0);
-        }, 0);
-    }
-
-    // CPU & RAM utilization
-    var cpuUtil = 0;
-    var ramUtil = 0;
-    if (vms.length > 0) {
-        var totalCpu = vms.reduce(function(acc, vm) { return acc + vm.totalCores; }, 0);
-        var usedCpu = vms.reduce(function(acc, vm) { return acc + (vm.totalCores - vm.availableCores); }, 0);
-        var totalRam = vms.reduce(function(acc, vm) { return acc + vm.totalRam; }, 0);
-        var usedRam = vms.reduce(function(acc, vm) { return acc + (vm.totalRam - vm.availableRam); }, 0);
-
-        cpuUtil = totalCpu > 0 ? (usedCpu / totalCpu) * 100 : 0;
-        ramUtil = totalRam > 0 ? (usedRam / totalRam) * 100 : 0;
-    }
-
-    document.getElementById('totalTasks').textContent = totalTasks;
-    document.getElementById('completedTasks').textContent = completed;
-    document.getElementById('avgWaitTime').textContent = (avgWait).toFixed(1) + 's';
-    document.getElementById('avgTurnaround').textContent = (avgTurnaround).toFixed(1) + 's';
-    document.getElementById('cpuUtilization').textContent = cpuUtil.toFixed(1) + '%';
-    document.getElementById('ramUtilization').textContent = ramUtil.toFixed(1) + '%';
-    document.getElementById('totalCost').textContent = '₹' + totalCost.toFixed(2);
-    document.getElementById('avgCostPerTask').textContent = completed > 0 ? '₹' + (totalCost / completed).toFixed(2) : '₹0.00';
-}
-
-/* update charts (utilization, timeline, cost) */
-function updateCharts() {
-    // add a utilization sample
-    if (utilizationChart) {
-        var label = (currentTime).toFixed(1) + 's';
-        var totalCpu = vms.reduce(function(acc, vm) { return acc + vm.totalCores; }, 0);
-        var usedCpu = vms.reduce(function(acc, vm) { return acc + (vm.totalCores - vm.availableCores); }, 0);
-        var totalRam = vms.reduce(function(acc, vm) { return acc + vm.totalRam; }, 0);
-        var usedRam = vms.reduce(function(acc, vm) { return acc + (vm.totalRam - vm.availableRam); }, 0);
-
-        var cpuPct = totalCpu > 0 ? (usedCpu / totalCpu) * 100 : 0;
-        var ramPct = totalRam > 0 ? (usedRam / totalRam) * 100 : 0;
-
-        // push samples (keep last 60)
-        utilizationChart.data.labels.push(label);
-        utilizationChart.data.datasets[0].data.push(cpuPct.toFixed(2));
-        utilizationChart.data.datasets[1].data.push(ramPct.toFixed(2));
-        if (utilizationChart.data.labels.length > 60) {
-            utilizationChart.data.labels.shift();
-            utilizationChart.data.datasets[0].data.shift();
-            utilizationChart.data.datasets[1].data.shift();
-        }
-        utilizationChart.update();
-    }
-
-    // timeline: for completed tasks, show wait vs exec
-    if (timelineChart) {
-        var names = completedTasks.map(function(t) { return t.name; });
-        var waits = completedTasks.map(function(t) { return ((t.startTime || 0) - (t.arrivalTime || 0)).toFixed(2); });
-        var execs = completedTasks.map(function(t) { return (t.executionTime || 0).toFixed(2); });
-
-        timelineChart.data.labels = names;
-        timelineChart.data.datasets[0].data = waits;
-        timelineChart.data.datasets[1].data = execs;
-        timelineChart.update();
-    }
-
-    // cost chart
-    if (costChart) {
-        var labels = completedTasks.map(function(t) { return t.name; });
-        var costs = completedTasks.map(function(t) { return (t.cost || 0).toFixed(2); });
-
-        costChart.data.labels = labels;
-        costChart.data.datasets[0].data = costs;
-        costChart.update();
-    }
-}
-
-/* client-side PDF generation using html2canvas + jsPDF
-   NOTE: index.html must include:
-   <script src="https://cdnjs.cloudflare.com/ajax/libs/html2canvas/1.4.1/html2canvas.min.js"></script>
-   <script src="https://cdnjs.cloudflare.com/ajax/libs/jspdf/2.5.1/jspdf.umd.min.js"></script>
-*/
-function generatePDF() {
-    if (completedTasks.length === 0) {
-        alert('No completed tasks to report.');
-        return;
-    }
-
-    var reportArea = document.querySelector('.container');
-    if (!reportArea) {
-        alert('Report area not found.');
-        return;
-    }
-
-    // show a quick status
-    document.getElementById('simStatus').textContent = 'Generating PDF...';
-
-    html2canvas(reportArea, { scale: 2 }).then(function(canvas) {
-        var imgData = canvas.toDataURL('image/png');
-        var pdf = new jspdf.jsPDF('p', 'mm', 'a4');
-        var imgProps = pdf.getImageProperties(imgData);
-        var pdfWidth = pdf.internal.pageSize.getWidth();
-        var pdfHeight = (imgProps.height * pdfWidth) / imgProps.width;
-        pdf.addImage(imgData, 'PNG', 0, 0, pdfWidth, pdfHeight);
-        var filename = 'cloudvista_report_' + (new Date()).toISOString().replace(/[:.]/g, '-') + '.pdf';
-        pdf.save(filename);
-        document.getElementById('simStatus').textContent = 'Completed';
-    }).catch(function(err) {
-        console.error(err);
-        alert('Failed to generate PDF: ' + err);
-        document.getElementById('simStatus').textContent = 'Completed';
-    });
-}
-
-/* save simulation to backend (POST to /api/simulation/save)
-   Backend expects completed tasks & scheduler info; minimal payload below.
-*/
-function saveSimulation() {
-    if (completedTasks.length === 0) {
-        alert('No completed tasks to save.');
-        return;
-    }
-
-    var scheduler = document.getElementById('scheduler').value || 'unknown';
-
-    // build payload
-    var payload = {
-        scheduler: scheduler,
-        completedTasks: completedTasks.map(function(t) {
-            return {
-                id: t.id,
-                name: t.name,
-                cpu_required: t.cpuRequired,
-                ram_required: t.ramRequired,
-                execution_time: t.executionTime,
-                priority: t.priority,
-                start_time: t.startTime,
-                end_time: t.endTime,
-                cost: t.cost
-            };
-        })
-    };
-
-    fetch('/api/simulation/save', {
-        method: 'POST',
-        headers: { 'Content-Type': 'application/json' },
-        body: JSON.stringify(payload)
-    }).then(function(res) {
-        return res.json();
-    }).then(function(js) {
-        if (js.success) {
-            alert('Simulation saved, id: ' + (js.simulation_id || 'unknown'));
-        } else {
-            alert('Save failed: ' + (js.message || JSON.stringify(js)));
-        }
-    }).catch(function(err) {
-        console.error('Save error:', err);
-        alert('Failed to save simulation. Is backend running?');
-    });
-}
-
-/* initialize charts & basic UI on load */
-window.addEventListener('load', function() {
-    initCharts();
-    updateTaskList();
-    updateStats();
-});
+"""CloudVista Flask backend.
+
+Serves the single-page UI and exposes the simulation engine over a JSON
+API.  Every scheduling run happens here, headless, so the browser only
+replays the returned event log and batch clients can post whole workloads.
+"""
+
+import os
+from datetime import datetime
+
+from flask import Flask, Response, jsonify, request, send_file, send_from_directory
+from flask_cors import CORS
+
+from cloudvista.cache import ResultCache
+from cloudvista.instrument import REGISTRY
+from cloudvista.reports import DONE, PDF, ReportError, ReportJobs, ReportSource
+from cloudvista.service import SimulationService, WorkloadError
+from cloudvista.storage import SimulationStore, StorageError, read_ndjson, task_row
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+app = Flask(__name__, static_folder=None)
+CORS(app)
+
+service = SimulationService(
+    instrument=os.environ.get('CLOUDVISTA_INSTRUMENT', '') not in ('', '0'),
+    profile_dir=os.path.join(BASE_DIR, 'profiles'),
+    checkpoint_dir=os.path.join(BASE_DIR, 'checkpoints'),
+    checkpoint_interval=float(os.environ.get('CLOUDVISTA_CHECKPOINT_INTERVAL', 60)),
+    cache=ResultCache(os.environ.get('CLOUDVISTA_CACHE', os.path.join(BASE_DIR, 'cache.db')),
+                      int(float(os.environ.get('CLOUDVISTA_CACHE_MB', 256)) * (1 << 20))),
+)
+store = SimulationStore(os.environ.get('CLOUDVISTA_DB', os.path.join(BASE_DIR, 'cloudvista.db')))
+reports = ReportJobs(os.path.join(BASE_DIR, 'reports'))
+
+
+def _error(message, status=400):
+    return jsonify({'success': False, 'message': message}), status
+
+
+def _json_body():
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        raise WorkloadError('request body must be a JSON object')
+    return data
+
+
+def _query_number(name, cast=float):
+    value = request.args.get(name)
+    if value in (None, ''):
+        return None
+    try:
+        return cast(value)
+    except ValueError:
+        raise WorkloadError('%s must be a number' % name)
+
+
+def _query_time(name):
+    """Epoch seconds, or an ISO date/datetime such as ``2024-05-01``."""
+    value = request.args.get(name)
+    if value in (None, ''):
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    try:
+        return datetime.fromisoformat(value).timestamp()
+    except ValueError:
+        raise WorkloadError('%s must be epoch seconds or an ISO date' % name)
+
+
+@app.errorhandler(WorkloadError)
+@app.errorhandler(StorageError)
+@app.errorhandler(ReportError)
+def handle_workload_error(exc):
+    return _error(str(exc))
+
+
+# -- frontend ------------------------------------------------------------
+
+@app.route('/')
+def index():
+    return send_from_directory(BASE_DIR, 'cloudvista_simulator.html')
+
+
+@app.route('/<path:filename>')
+def static_files(filename):
+    if not filename.endswith(('.js', '.css', '.html')):
+        return _error('not found', 404)
+    return send_from_directory(BASE_DIR, filename)
+
+
+# -- VM management -------------------------------------------------------
+
+@app.route('/api/vms/initialize', methods=['POST'])
+def initialize_vms():
+    data = _json_body()
+    vms = service.initialize_vms(data.get('vms', data))
+    return jsonify({'success': True, 'vms': [vm.to_dict() for vm in vms]})
+
+
+@app.route('/api/vms', methods=['GET'])
+def get_vms():
+    return jsonify({'success': True, 'vms': [vm.to_dict() for vm in service.vms]})
+
+
+# -- task management -----------------------------------------------------
+
+@app.route('/api/tasks/submit', methods=['POST'])
+def submit_tasks():
+    """Accept one task object or ``{"tasks": [...]}`` with many."""
+    data = _json_body()
+    items = data['tasks'] if 'tasks' in data else [data]
+    tasks = service.submit_tasks(items)
+    return jsonify({'success': True, 'tasks': [t.to_dict() for t in tasks]})
+
+
+@app.route('/api/tasks', methods=['GET'])
+def get_tasks():
+    return jsonify({'success': True, 'tasks': [t.to_dict() for t in service.tasks]})
+
+
+# -- simulation control --------------------------------------------------
+
+@app.route('/api/simulation/start', methods=['POST'])
+def start_simulation():
+    """Run a workload to completion and return its tasks and statistics.
+
+    The body may contain ``vms`` (spec object or list), ``tasks``,
+    ``scheduler``, ``time_quantum``, ``cpu_cost``, ``ram_cost`` and
+    ``record_events``.  Missing ``vms``/``tasks`` fall back to the ones
+    registered through the VM and task endpoints.  ``instrument`` adds
+    per-phase timings to the response; ``profile`` also writes cProfile
+    and Chrome trace dumps under ``profiles/``.
+    """
+    result = service.run(_json_body())
+    body = result.to_dict()
+    body['success'] = True
+    return jsonify(body)
+
+
+@app.route('/api/simulation/live', methods=['POST'])
+def start_live_simulation():
+    """Start a run in the background and stream its progress.
+
+    Takes the same body as ``/api/simulation/start`` plus ``fps``,
+    ``max_points``, ``checkpoint_interval`` (wall-clock seconds) and
+    ``checkpoint_every`` (simulated seconds).  Progress is read as
+    Server-Sent Events from ``/api/simulation/live/<run>/events``; the
+    finished run becomes the last result, as with a synchronous start.
+    """
+    return _live_response(service.start_live(_json_body()))
+
+
+def _live_response(run):
+    body = run.to_dict()
+    body['events_url'] = '/api/simulation/live/%s/events' % run.id
+    return jsonify({'success': True, 'run': body}), 202
+
+
+@app.route('/api/simulation/resume', methods=['POST'])
+def resume_simulation():
+    """Resume a checkpoint as a live run, optionally as a what-if fork.
+
+    ``checkpoint`` names a checkpoint from ``/api/checkpoints``; ``run_id``
+    takes the newest checkpoint of that live run instead (or the run
+    itself, if it is still going).  ``scheduler``, ``time_quantum``,
+    ``scheduler_options``, ``placement``, ``cpu_cost``, ``ram_cost``,
+    ``batch_packing``, ``context_switch`` and ``record_events`` change
+    that option from the checkpoint on.  Responds like
+    ``/api/simulation/live``.
+    """
+    return _live_response(service.resume(_json_body()))
+
+
+@app.route('/api/simulation/live/<run_id>/checkpoint', methods=['POST'])
+def checkpoint_live_simulation(run_id):
+    """Checkpoint a live run now (within a few steps); it appears in
+    ``/api/checkpoints`` shortly after."""
+    run = service.request_checkpoint(run_id)
+    return jsonify({'success': True, 'run': run.to_dict()}), 202
+
+
+@app.route('/api/checkpoints', methods=['GET'])
+def list_checkpoints():
+    """Saved checkpoints, oldest first; ``run_id`` limits them to one run."""
+    return jsonify({'success': True,
+                    'checkpoints': service.checkpoints(request.args.get('run_id') or None)})
+
+
+@app.route('/api/simulation/live/<run_id>/events', methods=['GET'])
+def live_simulation_events(run_id):
+    run = service.live_run(run_id)
+    if run is None:
+        return _error('live run not found', 404)
+    try:
+        after = int(request.headers.get('Last-Event-ID') or request.args.get('after') or 0)
+    except ValueError:
+        raise WorkloadError('Last-Event-ID must be an integer')
+    return Response(run.stream(after), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+
+@app.route('/api/simulation/stop', methods=['POST'])
+def stop_simulation():
+    # Runs complete within the start request; there is nothing to interrupt.
+    return jsonify({'success': True, **service.snapshot()})
+
+
+@app.route('/api/simulation/reset', methods=['POST'])
+def reset_simulation():
+    service.reset()
+    return jsonify({'success': True, **service.snapshot()})
+
+
+@app.route('/api/simulation/status', methods=['GET'])
+def simulation_status():
+    return jsonify({'success': True, **service.snapshot()})
+
+
+@app.route('/api/simulation/price', methods=['POST'])
+def price_simulation():
+    """Re-price the last run under ``{"models": [{"model": "spot", ...}, ...]}``."""
+    bills = service.price(_json_body().get('models'))
+    return jsonify({'success': True, 'bills': [bill.to_dict() for bill in bills]})
+
+
+@app.route('/api/simulation/montecarlo', methods=['POST'])
+def monte_carlo_simulation():
+    """Replicate a workload with sampled task durations and arrivals.
+
+    Takes the same body as ``/api/simulation/start`` plus ``replications``,
+    ``durations`` and ``arrivals`` (e.g. ``{"kind": "lognormal", "sigma":
+    0.5}``), ``seed`` and ``confidence``; returns the mean and confidence
+    interval of each metric and the per-replication rows.
+    """
+    report = service.monte_carlo(_json_body())
+    return jsonify({'success': True, **report})
+
+
+@app.route('/api/simulation/regions', methods=['POST'])
+def multi_region_simulation():
+    """Route a workload over several regions, each with its own fleet,
+    latency and prices, and simulate them in worker processes.
+
+    Takes ``regions`` (``[{"name": "eu", "vms": {...}, "latency": 0.1,
+    "cpu_cost": 3.5, "scheduler": "sjf"}, ...]``), ``tasks`` (or the
+    registered ones), ``dispatcher``, ``window`` and ``workers``.
+    """
+    report = service.run_regions(_json_body())
+    return jsonify({'success': True, **report})
+
+
+@app.route('/api/cache', methods=['GET'])
+def cache_statistics():
+    return jsonify({'success': True, **service.cache.statistics()})
+
+
+@app.route('/api/cache', methods=['DELETE'])
+def clear_cache():
+    service.cache.clear()
+    return jsonify({'success': True, **service.cache.statistics()})
+
+
+@app.route('/api/simulation/save', methods=['POST'])
+def save_simulation():
+    """Persist a finished run to ``cloudvista.db``.
+
+    Accepts an ``application/x-ndjson`` body (a header line with
+    ``scheduler``, ``placement``, ``time_quantum`` and ``vm_count``, then one
+    completed task per line), which is streamed into the database and may
+    be sent chunked; the JSON ``{"scheduler": ..., "completedTasks": [...]}``
+    body posted by older clients; or ``{"last_run": true}`` to save the
+    server's last result without uploading it again.
+    """
+    metadata_keys = ('placement', 'time_quantum', 'vm_count')
+    if request.mimetype in ('application/x-ndjson', 'application/ndjson'):
+        header, rows = read_ndjson(request.stream)
+        simulation_id = store.save(rows, scheduler=str(header.get('scheduler') or 'unknown'),
+                                   **{k: header.get(k) for k in metadata_keys})
+        return jsonify({'success': True, 'simulation_id': simulation_id})
+
+    data = _json_body()
+    if data.get('last_run'):
+        result = service.last_result
+        if result is None:
+            raise WorkloadError('no finished simulation to save')
+        simulation_id = store.save_result(result, **service.last_options)
+        return jsonify({'success': True, 'simulation_id': simulation_id})
+
+    items = data.get('completedTasks', data.get('completed_tasks'))
+    if not isinstance(items, list):
+        raise WorkloadError('completedTasks must be a list')
+    rows = (task_row(item, i) for i, item in enumerate(items))
+    simulation_id = store.save(rows, scheduler=str(data.get('scheduler') or 'unknown'),
+                               **{k: data.get(k) for k in metadata_keys})
+    return jsonify({'success': True, 'simulation_id': simulation_id})
+
+
+# -- history -------------------------------------------------------------
+
+@app.route('/api/simulations', methods=['GET'])
+def list_simulations():
+    """Saved runs, newest first, from the precomputed summaries.
+
+    Filters: ``scheduler``, ``since``/``until`` (epoch or ISO date),
+    ``min_cost``/``max_cost``.  Pages hold ``limit`` runs (default 50); pass
+    the returned ``next_before`` as ``before`` for the next page.
+    """
+    limit = _query_number('limit', int) or 50
+    rows = store.list_simulations(
+        scheduler=request.args.get('scheduler') or None,
+        since=_query_time('since'),
+        until=_query_time('until'),
+        min_cost=_query_number('min_cost'),
+        max_cost=_query_number('max_cost'),
+        limit=limit,
+        before=_query_number('before', int),
+    )
+    next_before = rows[-1]['id'] if len(rows) == limit else None
+    return jsonify({'success': True, 'simulations': rows, 'next_before': next_before})
+
+
+@app.route('/api/simulations/compare', methods=['GET'])
+def compare_simulations():
+    """Side-by-side summaries for ``?ids=1,2,3`` and the best run per metric."""
+    try:
+        ids = [int(i) for i in request.args.get('ids', '').split(',') if i.strip()]
+    except ValueError:
+        raise WorkloadError('ids must be a comma-separated list of simulation ids')
+    if not ids:
+        raise WorkloadError('ids is required')
+    return jsonify({'success': True, **store.compare(ids)})
+
+
+@app.route('/api/simulations/<int:simulation_id>', methods=['GET'])
+def get_simulation(simulation_id):
+    summary = store.get_simulation(simulation_id)
+    if summary is None:
+        return _error('simulation %d not found' % simulation_id, 404)
+    return jsonify({'success': True, 'simulation': summary})
+
+
+@app.route('/api/simulations/<int:simulation_id>/tasks', methods=['GET'])
+def get_simulation_tasks(simulation_id):
+    """Task rows of a saved run, ``limit`` at a time after row ``after``."""
+    limit = _query_number('limit', int) or 100
+    tasks = store.simulation_tasks(simulation_id, limit=limit,
+                                   after=_query_number('after', int) or 0)
+    next_after = tasks[-1]['row'] if len(tasks) == limit else None
+    return jsonify({'success': True, 'tasks': tasks, 'next_after': next_after})
+
+
+# -- reports -------------------------------------------------------------
+
+@app.route('/api/report/generate', methods=['POST'])
+def generate_report():
+    """Start a report job for a saved run (``simulation_id``) or the last run.
+
+    ``format`` is ``pdf`` (default), ``csv`` or ``parquet``.  The job runs in
+    the background; poll ``/api/report/status/<job>`` and fetch the file
+    from ``/api/report/download/<job>``.  With ``"wait": true`` the file is
+    returned directly once it is ready.
+    """
+    data = _json_body()
+    if data.get('simulation_id') is not None:
+        try:
+            simulation_id = int(data['simulation_id'])
+        except (TypeError, ValueError):
+            raise WorkloadError('simulation_id must be an integer')
+        source = ReportSource.from_store(store, simulation_id)
+    else:
+        result = service.last_result
+        if result is None:
+            raise WorkloadError('no finished simulation to report on')
+        source = ReportSource.from_result(result, **service.last_options)
+    job = reports.submit(source, str(data.get('format') or PDF))
+    if data.get('wait'):
+        job = reports.wait(job['id'])
+        if job['status'] != DONE:
+            return _error('report failed: %s' % job['error'], 500)
+        return send_file(job['path'], as_attachment=True)
+    return jsonify({'success': True, 'job': _job_view(job)}), 202
+
+
+def _job_view(job):
+    view = {k: v for k, v in job.items() if k != 'path'}
+    view['filename'] = os.path.basename(job['path'])
+    return view
+
+
+@app.route('/api/report/status/<job_id>', methods=['GET'])
+def report_status(job_id):
+    job = reports.status(job_id)
+    if job is None:
+        return _error('report job not found', 404)
+    return jsonify({'success': True, 'job': _job_view(job)})
+
+
+@app.route('/api/report/download/<job_id>', methods=['GET'])
+def download_report(job_id):
+    job = reports.status(job_id)
+    if job is None:
+        return _error('report job not found', 404)
+    if job['status'] != DONE:
+        return _error('report is %s' % job['status'], 409)
+    return send_file(job['path'], as_attachment=True)
+
+
+@app.route('/api/statistics', methods=['GET'])
+def statistics():
+    return jsonify({'success': True, 'statistics': service.statistics()})
+
+
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    """Prometheus metrics: run counts and durations for every run, plus
+    per-phase timings, event counts, queue depths and placement attempts
+    from instrumented runs."""
+    return Response(REGISTRY.render(), mimetype='text/plain; version=0.0.4')
+
+
+if __name__ == '__main__':
+    app.run(host='0.0.0.0', port=int(os.environ.get('PORT', 5000)), threaded=True)
@@ -0,0 +1,21 @@
+"""CloudVista simulation core."""
+
+from .dag import DependencyError, TaskGraph
+from .engine import (AGING, EDF, FCFS, HEFT, MLFQ, PRIORITY, ROUND_ROBIN, SCHEDULERS, SJF,
+                     SRTF, Simulation, SimulationResult, simulate, task_cost)
+from .models import VM, Task, make_vms
+from .placement import BEST_FIT, FIRST_FIT, POLICIES, WORST_FIT, make_index
+from .schedulers import Scheduler, make_scheduler
+from .taskstore import TaskTable
+from .traces import TraceError, read_trace
+
+__all__ = [
+    'FCFS', 'PRIORITY', 'ROUND_ROBIN', 'SJF', 'SRTF', 'EDF', 'AGING', 'MLFQ', 'HEFT',
+    'SCHEDULERS',
+    'Scheduler', 'make_scheduler',
+    'Simulation', 'SimulationResult', 'simulate', 'task_cost',
+    'Task', 'VM', 'make_vms',
+    'FIRST_FIT', 'BEST_FIT', 'WORST_FIT', 'POLICIES', 'make_index',
+    'TaskTable', 'read_trace', 'TraceError',
+    'TaskGraph', 'DependencyError',
+]
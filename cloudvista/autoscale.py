@@ -0,0 +1,427 @@
+"""Autoscaling fleets.
+
+``initializeVMs`` built a fixed list of identical VMs once, capped at 10
+by the UI, so the only way to trade cost against waiting was to guess a
+fleet size and re-run.  An ``Autoscaler`` attached to a ``Simulation``
+grows and shrinks the fleet while the workload runs::
+
+    scaler = make_autoscaler({'policy': 'queue', 'min_vms': 2, 'max_vms': 200,
+                              'types': [{'name': 'small', 'cores': 4, 'ram': 16},
+                                        {'name': 'large', 'cores': 16, 'ram': 64,
+                                         'provisioning_delay': 120}]})
+    stats = Simulation(make_vms(2, 4, 16), table, autoscaler=scaler).run().stats
+    print(stats['fleet_cost'], stats['p95_wait_time'])
+
+Every ``interval`` simulated seconds, after that instant's dispatch, the
+policy looks at the fleet and asks for more or fewer VMs:
+
+* ``queue`` - scale out by ``step`` while more than ``scale_out_at``
+  tasks wait per VM, scale in while at most ``scale_in_at`` do;
+* ``utilization`` - scale out while the busier of CPU and RAM averaged
+  at least ``scale_out_at`` of the ready capacity over the last interval,
+  scale in while it stayed at or below ``scale_in_at`` and nothing waits.
+
+The fleet is kept within ``min_vms`` and ``max_vms`` (VMs still
+provisioning count), and after any change the autoscaler holds off
+``scale_out_cooldown`` seconds before growing again and
+``scale_in_cooldown`` before shrinking.  A new VM is of the first
+``InstanceType`` large enough for the biggest task next in line (the
+first type if nothing waits, the last if none is big enough) and joins
+the placement index after the type's ``provisioning_delay``.  Without
+``types`` the autoscaler launches the shapes of the initial fleet,
+smallest first.  Scaling in
+cancels VMs still provisioning first and then terminates idle VMs,
+newest first; a VM that is running tasks is never stopped.
+
+Each VM is billed for its uptime, launch to termination or the end of
+the run, at its type's ``hourly_price`` or else at the simulation's CPU
+and RAM rates plus ``storage_cost`` per GB-month.  The statistics gain
+``fleet_cost`` next to the per-task ``total_cost``.
+
+An evaluation costs O(levels or task classes) plus, when scaling in, a
+walk over the live VMs, so a day-long trace with thousands of scale
+events adds little to the run.  Evaluations stop once the workload has
+drained, so the run still ends with its last task.
+"""
+
+from __future__ import annotations
+
+import math
+from abc import ABC, abstractmethod
+from dataclasses import asdict, dataclass
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Sequence, Tuple
+
+from .models import VM
+from .pricing import DEFAULT_STORAGE_COST, HOURS_PER_MONTH
+
+if TYPE_CHECKING:
+    from .engine import Simulation
+
+QUEUE = 'queue'
+UTILIZATION = 'utilization'
+
+
+@dataclass(frozen=True)
+class InstanceType:
+    """A VM shape the autoscaler can launch."""
+
+    name: str
+    cores: int
+    ram: int
+    storage: int = 100
+    provisioning_delay: float = 60.0
+    # overrides the price derived from the CPU, RAM and storage rates
+    hourly_price: Optional[float] = None
+
+    def __post_init__(self) -> None:
+        if self.cores < 1 or self.ram < 1 or self.storage < 0:
+            raise ValueError('instance type %s needs positive cores and ram' % self.name)
+        if self.provisioning_delay < 0:
+            raise ValueError('provisioning_delay must be non-negative')
+        if self.hourly_price is not None and self.hourly_price < 0:
+            raise ValueError('hourly_price must be non-negative')
+
+    def fits(self, cpu: int, ram: int) -> bool:
+        return self.cores >= cpu and self.ram >= ram
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'InstanceType':
+        try:
+            price = data.get('hourly_price')
+            return cls(name=str(data['name']), cores=int(data['cores']),
+                       ram=int(data['ram']), storage=int(data.get('storage', 100)),
+                       provisioning_delay=float(data.get('provisioning_delay', 60.0)),
+                       hourly_price=None if price is None else float(price))
+        except (AttributeError, KeyError, TypeError) as exc:
+            raise ValueError('invalid instance type: %s' % exc)
+
+
+def fleet_types(vms: Sequence[VM]) -> List[InstanceType]:
+    """One instance type per (cores, RAM) shape in ``vms``, smallest first."""
+    shapes: Dict[Tuple[int, int], int] = {}
+    for vm in vms:
+        shapes.setdefault((vm.total_cores, vm.total_ram), vm.storage)
+    return [InstanceType('%dc-%dg' % shape, cores=shape[0], ram=shape[1], storage=storage)
+            for shape, storage in sorted(shapes.items())]
+
+
+class ScalingPolicy(ABC):
+    """Base policy: decides a signed change in the number of VMs."""
+
+    name = ''
+
+    def __init__(self, scale_out_at: float, scale_in_at: float, step: int = 1) -> None:
+        if step < 1:
+            raise ValueError('step must be at least 1')
+        if scale_in_at > scale_out_at:
+            raise ValueError('scale_in_at must not exceed scale_out_at')
+        self.scale_out_at = float(scale_out_at)
+        self.scale_in_at = float(scale_in_at)
+        self.step = int(step)
+
+    @abstractmethod
+    def decide(self, vms: int, pending: int, cpu_utilization: float,
+               ram_utilization: float) -> int:
+        """VMs to add (positive) or remove (negative).
+
+        ``vms`` counts VMs ready or provisioning; the utilizations are
+        fractions of the ready capacity, averaged over the last interval.
+        """
+
+    def options(self) -> Dict[str, Any]:
+        return {'scale_out_at': self.scale_out_at, 'scale_in_at': self.scale_in_at,
+                'step': self.step}
+
+
+class QueueDepthPolicy(ScalingPolicy):
+    name = QUEUE
+
+    def __init__(self, scale_out_at: float = 1.0, scale_in_at: float = 0.0,
+                 step: int = 1) -> None:
+        if scale_in_at < 0:
+            raise ValueError('scale_in_at must be non-negative')
+        super().__init__(scale_out_at, scale_in_at, step)
+
+    def decide(self, vms: int, pending: int, cpu_utilization: float,
+               ram_utilization: float) -> int:
+        if pending > self.scale_out_at * vms:
+            return self.step
+        if pending <= self.scale_in_at * vms:
+            return -self.step
+        return 0
+
+
+class UtilizationPolicy(ScalingPolicy):
+    name = UTILIZATION
+
+    def __init__(self, scale_out_at: float = 0.8, scale_in_at: float = 0.3,
+                 step: int = 1) -> None:
+        if not 0 <= scale_in_at <= 1 or not 0 < scale_out_at <= 1:
+            raise ValueError('utilization thresholds must be fractions in [0, 1]')
+        super().__init__(scale_out_at, scale_in_at, step)
+
+    def decide(self, vms: int, pending: int, cpu_utilization: float,
+               ram_utilization: float) -> int:
+        busy = max(cpu_utilization, ram_utilization)
+        if busy >= self.scale_out_at or (pending and not vms):
+            return self.step
+        if busy <= self.scale_in_at and not pending:
+            return -self.step
+        return 0
+
+
+POLICIES: Dict[str, type] = {
+    QUEUE: QueueDepthPolicy,
+    UTILIZATION: UtilizationPolicy,
+}
+
+# counters and evaluation state carried by checkpoints
+_STATE = ('due', 'last_change', 'scale_outs', 'scale_ins', 'launched', 'terminated',
+          'peak_vms', 'window')
+
+
+class Autoscaler:
+    """Grows and shrinks one simulation's fleet; see the module docstring."""
+
+    def __init__(self, policy: ScalingPolicy,
+                 types: Optional[Sequence[InstanceType]] = None,
+                 min_vms: int = 1, max_vms: int = 100, interval: float = 30.0,
+                 scale_out_cooldown: float = 60.0, scale_in_cooldown: float = 300.0,
+                 storage_cost: float = DEFAULT_STORAGE_COST) -> None:
+        if types is not None:
+            self._check_types(types)
+        if min_vms < 0 or max_vms < max(1, min_vms):
+            raise ValueError('need 0 <= min_vms <= max_vms and max_vms >= 1')
+        if interval <= 0:
+            raise ValueError('interval must be positive')
+        if scale_out_cooldown < 0 or scale_in_cooldown < 0:
+            raise ValueError('cooldowns must be non-negative')
+        if storage_cost < 0:
+            raise ValueError('storage_cost must be non-negative')
+        self.policy = policy
+        self.types = None if types is None else list(types)
+        self.min_vms = int(min_vms)
+        self.max_vms = int(max_vms)
+        self.interval = float(interval)
+        self.scale_out_cooldown = float(scale_out_cooldown)
+        self.scale_in_cooldown = float(scale_in_cooldown)
+        self.storage_cost = float(storage_cost)
+        self._types = {t.name: t for t in self.types or ()}
+
+        self.simulation: Optional['Simulation'] = None
+        self.due = False
+        self.last_change = -math.inf
+        self.scale_outs = 0
+        self.scale_ins = 0
+        self.launched = 0
+        self.terminated = 0
+        self.peak_vms = 0
+        # (core-seconds, GB-seconds, core capacity, RAM capacity) at the
+        # last evaluation, for interval-average utilization
+        self.window: List[float] = [0.0, 0.0, 0.0, 0.0]
+        # non-terminated VMs in launch order
+        self._live: Dict[int, VM] = {}
+        self._next_id = 1
+
+    # -- wiring --------------------------------------------------------
+
+    def attach(self, simulation: 'Simulation') -> None:
+        """Take charge of ``simulation``'s fleet, evaluating from now on."""
+        self.bind(simulation)
+        self.peak_vms = max(self.peak_vms, len(self._live))
+        simulation.schedule_scaling(simulation.now)
+
+    def bind(self, simulation: 'Simulation') -> None:
+        """Attach without queueing an evaluation (a restored run already
+        has its next one queued)."""
+        if self.simulation is not None:
+            raise ValueError('an Autoscaler can only be attached to one simulation')
+        if self.types is None:
+            self.types = fleet_types(simulation.vms)
+            self._check_types(self.types)
+            self._types = {t.name: t for t in self.types}
+        self.simulation = simulation
+        simulation.autoscaler = self
+        self._live = {vm.id: vm for vm in simulation.vms if vm.terminated_at is None}
+        self._next_id = max((vm.id for vm in simulation.vms), default=0) + 1
+
+    @staticmethod
+    def _check_types(types: Sequence[InstanceType]) -> None:
+        if not types:
+            raise ValueError('an autoscaler needs instance types or an initial fleet')
+        if len({t.name for t in types}) != len(types):
+            raise ValueError('instance type names must be unique')
+
+    def spec(self) -> Dict[str, Any]:
+        """The ``make_autoscaler`` spec that rebuilds this autoscaler."""
+        return {
+            'policy': self.policy.name,
+            **self.policy.options(),
+            'types': None if self.types is None else [asdict(t) for t in self.types],
+            'min_vms': self.min_vms,
+            'max_vms': self.max_vms,
+            'interval': self.interval,
+            'scale_out_cooldown': self.scale_out_cooldown,
+            'scale_in_cooldown': self.scale_in_cooldown,
+            'storage_cost': self.storage_cost,
+        }
+
+    def state(self) -> Dict[str, Any]:
+        return {name: getattr(self, name) for name in _STATE}
+
+    def restore(self, state: Dict[str, Any]) -> None:
+        for name in _STATE:
+            setattr(self, name, state[name])
+
+    # -- scaling -------------------------------------------------------
+
+    def after_step(self) -> None:
+        """Called by the engine after every dispatch."""
+        if self.due:
+            self.evaluate()
+            return
+        sim = self.simulation
+        # once the workload has drained only fleet events are left; drop
+        # them so the run ends with its last task
+        if (sim.queue_length() and not sim.open and not sim.stats.used_cores
+                and not sim.pending_count()):
+            sim.drop_fleet_events()
+
+    def evaluate(self) -> None:
+        sim = self.simulation
+        now = sim.now
+        self.due = False
+        size = len(self._live)
+        pending = sim.pending_count()
+        change = self._bounded(self.policy.decide(size, pending, *self._utilization()), size)
+
+        held = False
+        if change > 0:
+            if now >= self.last_change + self.scale_out_cooldown or size < self.min_vms:
+                self._scale_out(change)
+            else:
+                held = True
+        elif change < 0:
+            if now >= self.last_change + self.scale_in_cooldown or size > self.max_vms:
+                self._scale_in(-change)
+
+        if sim.queue_length() or sim.open:
+            sim.schedule_scaling(now + self.interval)
+        elif held and pending:
+            # nothing else will happen until the cooldown lets the fleet grow
+            sim.schedule_scaling(self.last_change + self.scale_out_cooldown)
+
+    def _bounded(self, change: int, size: int) -> int:
+        if size < self.min_vms:
+            return self.min_vms - size
+        if size > self.max_vms:
+            return self.max_vms - size
+        return max(self.min_vms - size, min(self.max_vms - size, change))
+
+    def _utilization(self) -> Tuple[float, float]:
+        stats = self.simulation.stats
+        core_capacity, ram_capacity = stats.capacity_seconds()
+        current = [stats.core_seconds, stats.ram_seconds, core_capacity, ram_capacity]
+        used_cores, used_ram, cores, ram = (a - b for a, b in zip(current, self.window))
+        self.window = current
+        return (used_cores / cores if cores > 0 else 0.0,
+                used_ram / ram if ram > 0 else 0.0)
+
+    def instance_type(self) -> InstanceType:
+        """The type the next scale-out launches."""
+        cpu, ram = self.simulation.waiting_demand()
+        for kind in self.types:
+            if kind.fits(cpu, ram):
+                return kind
+        return self.types[-1]
+
+    def _scale_out(self, count: int) -> None:
+        sim = self.simulation
+        kind = self.instance_type()
+        for _ in range(count):
+            vm = VM(id=self._next_id, total_cores=kind.cores, total_ram=kind.ram,
+                    storage=kind.storage, instance_type=kind.name)
+            self._next_id += 1
+            sim.launch_vm(vm, kind.provisioning_delay)
+            self._live[vm.id] = vm
+        self.launched += count
+        self.scale_outs += 1
+        self.last_change = sim.now
+        self.peak_vms = max(self.peak_vms, len(self._live))
+
+    def _scale_in(self, count: int) -> None:
+        # provisioning VMs first, then idle ones, newest first in each group
+        newest = list(reversed(self._live.values()))
+        victims = [vm for vm in newest if vm.ready_at is None][:count]
+        if len(victims) < count:
+            victims += [vm for vm in newest
+                        if vm.ready_at is not None and not vm.running][:count - len(victims)]
+        if not victims:
+            return
+        sim = self.simulation
+        for vm in victims:
+            sim.retire_vm(vm)
+            del self._live[vm.id]
+        self.terminated += len(victims)
+        self.scale_ins += 1
+        self.last_change = sim.now
+
+    # -- billing -------------------------------------------------------
+
+    def hourly_price(self, vm: VM) -> float:
+        kind = self._types.get(vm.instance_type) if vm.instance_type else None
+        if kind is not None and kind.hourly_price is not None:
+            return kind.hourly_price
+        sim = self.simulation
+        return (vm.total_cores * sim.cpu_cost + vm.total_ram * sim.ram_cost
+                + vm.storage * self.storage_cost / HOURS_PER_MONTH)
+
+    def statistics(self) -> Dict[str, Any]:
+        now = self.simulation.now
+        hours = [(vm.uptime(now) / 3600.0, vm) for vm in self.simulation.vms]
+        return {
+            'fleet_cost': sum(h * self.hourly_price(vm) for h, vm in hours),
+            'vm_hours': sum(h for h, _ in hours),
+            'active_vms': sum(1 for vm in self._live.values() if vm.ready_at is not None),
+            'provisioning_vms': sum(1 for vm in self._live.values() if vm.ready_at is None),
+            'peak_vms': self.peak_vms,
+            'vms_launched': self.launched,
+            'vms_terminated': self.terminated,
+            'scale_outs': self.scale_outs,
+            'scale_ins': self.scale_ins,
+        }
+
+
+_AUTOSCALER_OPTIONS = ('min_vms', 'max_vms', 'interval', 'scale_out_cooldown',
+                       'scale_in_cooldown', 'storage_cost')
+
+
+def make_autoscaler(spec: Dict[str, Any]) -> Autoscaler:
+    """Build an autoscaler from ``{"policy": "queue", "max_vms": 50, ...}``.
+
+    ``types`` is a list of ``InstanceType`` dicts (by default, the shapes
+    of the initial fleet); the remaining keys not
+    taken by ``Autoscaler`` (``scale_out_at``, ``scale_in_at``, ``step``)
+    go to the policy.
+    """
+    if not isinstance(spec, dict):
+        raise ValueError('autoscale must be an object')
+    options = dict(spec)
+    kind = options.pop('policy', QUEUE)
+    cls = POLICIES.get(kind)
+    if cls is None:
+        raise ValueError('unknown scaling policy %r (expected one of %s)'
+                         % (kind, ', '.join(POLICIES)))
+    types = options.pop('types', None)
+    if isinstance(types, list):
+        types = [t if isinstance(t, InstanceType) else InstanceType.from_dict(t) for t in types]
+    elif types is not None:
+        raise ValueError('types must be a list of instance types')
+    scaler_options = {name: options.pop(name) for name in _AUTOSCALER_OPTIONS
+                      if name in options}
+    try:
+        policy = cls(**options)
+        return Autoscaler(policy, types, **scaler_options)
+    except TypeError as exc:
+        raise ValueError('invalid options for %s autoscaling: %s' % (kind, exc))
+
@@ -0,0 +1,277 @@
+"""Reproducible benchmarks for the simulation engine.
+
+Nothing measured how fast the simulator is, so engine regressions only
+showed up as slow capacity-planning jobs.  This module generates seeded
+synthetic workloads, runs every scheduler over them and records
+throughput, time to completion and peak memory as JSON::
+
+    python -m cloudvista.bench --suite standard --output bench.json
+    python -m cloudvista.bench --suite standard --baseline bench.json
+
+Workloads (``make_workload``) are built straight into a ``TaskTable``:
+
+* ``uniform`` - uniform CPU/RAM demands and durations, Poisson arrivals;
+* ``pareto`` - the same arrivals with heavy-tailed (Pareto) durations;
+* ``bursty`` - Poisson arrivals in bursts ten times the mean rate,
+  separated by long gaps.
+
+Arrival rates are scaled to the fleet so that every size runs at the
+same offered ``load``; a fleet of 10 and one of 10,000 VMs are both kept
+busy rather than idle or hopelessly backlogged.
+
+Each case runs in a fresh process, so peak RSS is the case's own.  The
+engine counts no events itself; ``events`` is derived from the stats as
+arrivals + completions + preemptions, which is exactly one per event the
+engine processes.
+"""
+
+from __future__ import annotations
+
+import argparse
+import itertools
+import json
+import multiprocessing
+import os
+import platform
+import resource
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+
+from .engine import PREEMPTIVE, SCHEDULERS, Simulation
+from .models import make_vms
+from .placement import FIRST_FIT, POLICIES
+from .taskstore import TaskTable
+
+UNIFORM = 'uniform'
+PARETO = 'pareto'
+BURSTY = 'bursty'
+WORKLOADS = (UNIFORM, PARETO, BURSTY)
+
+# name -> (task counts, VM counts)
+SUITES: Dict[str, Any] = {
+    'quick': ((1000,), (10, 100)),
+    'standard': ((1000, 100000), (10, 100, 1000)),
+    'full': ((1000, 100000, 1000000), (10, 1000, 10000)),
+}
+
+KEY = ('workload', 'tasks', 'vms', 'scheduler', 'placement')
+FORMAT_VERSION = 1
+
+
+def make_workload(kind: str, tasks: int, vms: int, cores: int = 8, ram: int = 32,
+                  load: float = 0.9, seed: int = 0) -> TaskTable:
+    """A seeded synthetic workload sized to a fleet of ``vms`` VMs.
+
+    Demands are 1..min(cores, 4) cores and 1..min(ram, 16) GB.  The mean
+    arrival rate is chosen so that, on average, ``load`` of the fleet's
+    cores are requested.  Deadlines leave each task 2-10x its duration
+    after arrival.
+    """
+    if kind not in WORKLOADS:
+        raise ValueError('unknown workload %r (expected one of %s)'
+                         % (kind, ', '.join(WORKLOADS)))
+    rng = np.random.default_rng(seed)
+    cpu = rng.integers(1, min(cores, 4) + 1, tasks)
+    mem = rng.integers(1, min(ram, 16) + 1, tasks)
+    priority = rng.integers(1, 11, tasks)
+    if kind == PARETO:
+        # shape 1.5, scale 2: mean 6s, but a few tasks run for hours
+        duration = (rng.pareto(1.5, tasks) + 1.0) * 2.0
+    else:
+        duration = rng.uniform(1.0, 20.0, tasks)
+
+    rate = load * vms * cores / (cpu.mean() * duration.mean())
+    if kind == BURSTY:
+        # bursts of ~200 arrivals at 10x the mean rate; the gap before each
+        # burst makes up the difference so the mean rate is unchanged
+        gaps = rng.exponential(0.1 / rate, tasks)
+        sizes = rng.geometric(1 / 200.0, tasks)
+        starts = np.cumsum(sizes)
+        starts = starts[starts < tasks]
+        gaps[starts] = rng.exponential(0.9 * sizes[1:len(starts) + 1] / rate)
+    else:
+        gaps = rng.exponential(1.0 / rate, tasks)
+    gaps[0] = 0.0
+    arrival = np.round(np.cumsum(gaps), 3)
+    duration = np.round(duration, 3)
+    deadline = np.round(arrival + duration * rng.uniform(2.0, 10.0, tasks), 3)
+    return TaskTable.from_columns(cpu, mem, duration, priority=priority,
+                                  arrival_time=arrival, deadline=deadline)
+
+
+def cases(suite: str = 'quick', workloads: Sequence[str] = WORKLOADS,
+          schedulers: Sequence[str] = SCHEDULERS, placement: str = FIRST_FIT,
+          tasks: Optional[Sequence[int]] = None,
+          vms: Optional[Sequence[int]] = None) -> List[Dict[str, Any]]:
+    """The case matrix for a suite, optionally overriding its sizes."""
+    if suite not in SUITES:
+        raise ValueError('unknown suite %r (expected one of %s)' % (suite, ', '.join(SUITES)))
+    default_tasks, default_vms = SUITES[suite]
+    return [{'workload': w, 'tasks': n, 'vms': v, 'scheduler': s, 'placement': placement}
+            for w, n, v, s in itertools.product(workloads, tasks or default_tasks,
+                                                vms or default_vms, schedulers)]
+
+
+def _peak_rss_mb() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return peak / (1024.0 * 1024.0 if sys.platform == 'darwin' else 1024.0)
+
+
+def run_case(case: Dict[str, Any], cores: int = 8, ram: int = 32, load: float = 0.9,
+             seed: int = 0, quantum: float = 2.0, repeat: int = 1) -> Dict[str, Any]:
+    """Run one case ``repeat`` times and report the fastest run."""
+    started = time.perf_counter()
+    table = make_workload(case['workload'], case['tasks'], case['vms'],
+                          cores=cores, ram=ram, load=load, seed=seed)
+    setup = time.perf_counter() - started
+    rss_before = _peak_rss_mb()
+
+    best = None
+    for _ in range(max(1, repeat)):
+        simulation = Simulation(make_vms(case['vms'], cores, ram), table.copy(),
+                                scheduler=case['scheduler'], time_quantum=quantum,
+                                placement=case['placement'])
+        started = time.perf_counter()
+        stats = simulation.run().stats
+        elapsed = time.perf_counter() - started
+        if best is None or elapsed < best[0]:
+            best = (elapsed, stats)
+        del simulation
+    elapsed, stats = best
+
+    events = stats['total_tasks'] + stats['completed_tasks'] + stats['preemptions']
+    row = dict(case)
+    row.update({
+        'seed': seed,
+        'load': load,
+        'time_quantum': quantum if case['scheduler'] in PREEMPTIVE else None,
+        'setup_seconds': round(setup, 4),
+        'seconds': round(elapsed, 4),
+        'events': events,
+        'events_per_sec': round(events / elapsed, 1) if elapsed > 0 else None,
+        'completed_tasks': stats['completed_tasks'],
+        'makespan': stats['makespan'],
+        'avg_wait_time': stats['avg_wait_time'],
+        'deadline_misses': stats['deadline_misses'],
+        'peak_rss_mb': round(_peak_rss_mb(), 1),
+        'run_rss_mb': round(_peak_rss_mb() - rss_before, 1),
+    })
+    return row
+
+
+def run_suite(case_list: Sequence[Dict[str, Any]], isolate: bool = True,
+              **options: Any) -> List[Dict[str, Any]]:
+    """Run cases one after another, each in a fresh process if ``isolate``.
+
+    Cases never run concurrently, so they do not compete for CPU or memory
+    bandwidth.
+    """
+    results = []
+    for case in case_list:
+        if isolate:
+            context = multiprocessing.get_context('spawn')
+            with ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+                row = pool.submit(run_case, case, **options).result()
+        else:
+            row = run_case(case, **options)
+        results.append(row)
+        sys.stderr.write('%-8s %8d tasks %6d vms %-10s %8.3fs %12.0f events/s %8.1f MB\n'
+                         % (row['workload'], row['tasks'], row['vms'], row['scheduler'],
+                            row['seconds'], row['events_per_sec'] or 0, row['peak_rss_mb']))
+    return results
+
+
+def environment() -> Dict[str, Any]:
+    return {
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'platform': platform.platform(),
+        'machine': platform.machine(),
+        'processor': platform.processor(),
+        'cpu_count': os.cpu_count(),
+    }
+
+
+def compare(results: Sequence[Dict[str, Any]], baseline: Sequence[Dict[str, Any]],
+            tolerance: float = 0.2) -> List[Dict[str, Any]]:
+    """Cases whose events/sec fell more than ``tolerance`` below the baseline."""
+    before = {tuple(row[k] for k in KEY): row for row in baseline}
+    regressions = []
+    for row in results:
+        old = before.get(tuple(row[k] for k in KEY))
+        if not old or not old.get('events_per_sec') or not row.get('events_per_sec'):
+            continue
+        ratio = row['events_per_sec'] / old['events_per_sec']
+        if ratio < 1.0 - tolerance:
+            regressions.append({**{k: row[k] for k in KEY},
+                                'baseline_events_per_sec': old['events_per_sec'],
+                                'events_per_sec': row['events_per_sec'],
+                                'ratio': round(ratio, 3)})
+    return regressions
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description='Benchmark the simulation engine.')
+    parser.add_argument('--suite', choices=sorted(SUITES), default='quick')
+    parser.add_argument('--workload', nargs='+', choices=WORKLOADS, default=list(WORKLOADS))
+    parser.add_argument('--scheduler', nargs='+', choices=SCHEDULERS, default=list(SCHEDULERS))
+    parser.add_argument('--placement', choices=POLICIES, default=FIRST_FIT)
+    parser.add_argument('--tasks', nargs='+', type=int, help='override the suite task counts')
+    parser.add_argument('--vms', nargs='+', type=int, help='override the suite VM counts')
+    parser.add_argument('--cores', type=int, default=8)
+    parser.add_argument('--ram', type=int, default=32)
+    parser.add_argument('--load', type=float, default=0.9)
+    parser.add_argument('--quantum', type=float, default=2.0)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--repeat', type=int, default=1, help='runs per case; the fastest counts')
+    parser.add_argument('--no-isolate', action='store_true',
+                        help='run cases in this process (peak memory is then cumulative)')
+    parser.add_argument('--output', help='JSON file (default: stdout)')
+    parser.add_argument('--baseline', help='earlier JSON results to check for regressions')
+    parser.add_argument('--tolerance', type=float, default=0.2,
+                        help='allowed events/sec drop against the baseline (default 0.2)')
+    args = parser.parse_args(argv)
+
+    case_list = cases(args.suite, args.workload, args.scheduler, args.placement,
+                      args.tasks, args.vms)
+    started = time.time()
+    results = run_suite(case_list, isolate=not args.no_isolate, cores=args.cores,
+                        ram=args.ram, load=args.load, seed=args.seed,
+                        quantum=args.quantum, repeat=args.repeat)
+    report: Dict[str, Any] = {
+        'version': FORMAT_VERSION,
+        'suite': args.suite,
+        'created_at': started,
+        'environment': environment(),
+        'results': results,
+    }
+
+    status = 0
+    if args.baseline:
+        with open(args.baseline) as fh:
+            regressions = compare(results, json.load(fh)['results'], args.tolerance)
+        report['regressions'] = regressions
+        for row in regressions:
+            sys.stderr.write('REGRESSION %s: %.0f -> %.0f events/s (x%.2f)\n'
+                             % (' '.join(str(row[k]) for k in KEY),
+                                row['baseline_events_per_sec'], row['events_per_sec'],
+                                row['ratio']))
+        status = 1 if regressions else 0
+
+    if args.output:
+        with open(args.output, 'w') as out:
+            json.dump(report, out, indent=2)
+            out.write('\n')
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        sys.stdout.write('\n')
+    return status
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,301 @@
+"""Content-addressed cache of simulation results.
+
+Re-running the same fleet, task list and scheduler from the page, or a
+sweep revisiting the same point, used to repeat the whole simulation.
+The engine draws no random numbers, so a run is a pure function of its
+inputs, and a result can be stored under a hash of them:
+
+* ``workload_digest`` hashes the pending tasks in the order the engine
+  takes them (by arrival, ties in submission order) - every column the
+  engine reads, the task names and any dependencies - from the task
+  table's columns rather than task by task;
+* ``cache_key`` combines that digest with the fleet's shapes and the
+  engine options, with defaults filled in and the time quantum dropped
+  for schedulers that never slice, so equivalent requests share a key.
+
+``ResultCache`` keeps encoded results in one SQLite file, bounded to
+``max_bytes`` of (zlib-compressed) values: a hit refreshes the entry's
+access time and a store evicts the least recently used entries until
+the cache fits again.  A hit costs one indexed read, so a repeated
+request comes back in milliseconds however long the run took.
+``encode_result`` / ``decode_result`` turn a ``SimulationResult`` and its
+fleet into JSON bytes; nothing is pickled.
+
+Bump ``CACHE_VERSION`` whenever the engine's output for a given input
+changes, so stale results are never served.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import sqlite3
+import time
+import zlib
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from .dag import TaskGraph
+from .engine import DEFAULT_CPU_COST, DEFAULT_RAM_COST, FCFS, SimulationResult
+from .models import VM, Task
+from .placement import FIRST_FIT
+from .schedulers import PREEMPTIVE
+from .taskstore import TaskTable
+
+CACHE_VERSION = 1
+DEFAULT_MAX_BYTES = 256 << 20
+
+# what a stored value holds, so different uses of one key never collide
+RESULT = 'result'
+STATS = 'stats'
+
+# the engine options a key covers, with ``Simulation``'s defaults
+OPTION_DEFAULTS: Dict[str, Any] = {
+    'scheduler': FCFS,
+    'time_quantum': 2.0,
+    'scheduler_options': None,
+    'placement': FIRST_FIT,
+    'cpu_cost': DEFAULT_CPU_COST,
+    'ram_cost': DEFAULT_RAM_COST,
+    'batch_packing': False,
+    'context_switch': 0.0,
+    'record_events': False,
+    'autoscale': None,
+}
+
+_HASHED_COLUMNS = ('id', 'cpu', 'ram', 'priority', 'execution_time', 'arrival_time',
+                   'deadline')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS results (
+    key TEXT PRIMARY KEY,
+    value BLOB NOT NULL,
+    size INTEGER NOT NULL,
+    created_at REAL NOT NULL,
+    accessed_at REAL NOT NULL,
+    hits INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS idx_results_accessed ON results(accessed_at);
+"""
+
+
+# -- keys --------------------------------------------------------------------
+
+def workload_digest(tasks: Union[TaskTable, Sequence[Task]],
+                    graph: Optional[TaskGraph] = None) -> str:
+    """Hash of the pending tasks as the engine will see them.
+
+    A task list's ``dependencies`` are hashed unless ``graph`` is given;
+    a table's dependencies can only come from ``graph``.
+    """
+    if isinstance(tasks, TaskTable):
+        table = tasks
+        order = table.pending_order()
+    else:
+        ordered = sorted(tasks, key=lambda t: t.arrival_time)
+        table = TaskTable.from_tasks(ordered)
+        order = np.arange(len(ordered))
+        if graph is None and any(task.dependencies for task in ordered):
+            graph = TaskGraph.from_tasks(ordered)
+    data = table.data[order]
+    digest = hashlib.sha256(b'workload')
+    for name in _HASHED_COLUMNS:
+        digest.update(np.ascontiguousarray(data[name]).tobytes())
+    digest.update(np.ascontiguousarray(data['name']).tobytes())
+    digest.update('\0'.join(table.names.names).encode('utf-8'))
+    if graph is not None:
+        digest.update(b'graph')
+        digest.update(np.asarray(graph.ids, dtype=np.int64).tobytes())
+        digest.update(np.asarray(graph.ids, dtype=np.int64)[graph.edges].tobytes())
+    return digest.hexdigest()
+
+
+def canonical_options(options: Dict[str, Any]) -> Dict[str, Any]:
+    """``options`` with defaults filled in; the quantum only where it matters."""
+    unknown = sorted(set(options) - set(OPTION_DEFAULTS))
+    if unknown:
+        raise ValueError('options not covered by the cache key: %s' % ', '.join(unknown))
+    merged = dict(OPTION_DEFAULTS, **{k: v for k, v in options.items() if v is not None})
+    merged['time_quantum'] = float(merged['time_quantum'])
+    merged['cpu_cost'] = float(merged['cpu_cost'])
+    merged['ram_cost'] = float(merged['ram_cost'])
+    merged['context_switch'] = float(merged['context_switch'])
+    merged['batch_packing'] = bool(merged['batch_packing'])
+    merged['record_events'] = bool(merged['record_events'])
+    if merged['scheduler'] not in PREEMPTIVE:
+        del merged['time_quantum']
+    return merged
+
+
+def cache_key(workload: str, vms: Sequence[VM], options: Dict[str, Any],
+              kind: str = RESULT) -> str:
+    """Key for a run of the workload with digest ``workload`` on ``vms``."""
+    body = {
+        'version': CACHE_VERSION,
+        'kind': kind,
+        'workload': workload,
+        'fleet': [[vm.id, vm.total_cores, vm.total_ram, vm.storage] for vm in vms],
+        'options': canonical_options(options),
+    }
+    text = json.dumps(body, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+# -- values ------------------------------------------------------------------
+
+def encode_json(value: Any) -> bytes:
+    return zlib.compress(json.dumps(value, separators=(',', ':')).encode('utf-8'))
+
+
+def decode_json(data: bytes) -> Any:
+    return json.loads(zlib.decompress(data))
+
+
+def _task_state(task: Task) -> Dict[str, Any]:
+    state = task.to_dict()
+    state['remaining_time'] = task.remaining_time
+    return state
+
+
+def _task_from_state(state: Dict[str, Any]) -> Task:
+    task = Task.from_dict(state)
+    task.remaining_time = state['remaining_time']
+    task.start_time = state['start_time']
+    task.end_time = state['end_time']
+    task.status = state['status']
+    task.cost = state['cost']
+    task.vm_id = state['vm_id']
+    return task
+
+
+def encode_result(result: SimulationResult, vms: Sequence[VM]) -> bytes:
+    """A finished run and its fleet as compressed JSON."""
+    table = result.table
+    completed = (table.iter_rows(np.flatnonzero(table.completed_mask()))
+                 if table is not None else result.completed)
+    body = {
+        'scheduler': result.scheduler,
+        'completed': [_task_state(task) for task in completed],
+        'unscheduled': [_task_state(task) for task in result.unscheduled],
+        'stats': result.stats,
+        'events': result.events,
+        'vms': [vm.to_dict() for vm in vms],
+    }
+    return encode_json(body)
+
+
+def decode_result(data: bytes) -> Tuple[SimulationResult, List[VM]]:
+    body = decode_json(data)
+    result = SimulationResult(
+        scheduler=body['scheduler'],
+        completed=[_task_from_state(state) for state in body['completed']],
+        unscheduled=[_task_from_state(state) for state in body['unscheduled']],
+        stats=body['stats'],
+        events=[tuple(event) for event in body['events']],
+    )
+    vms = [VM(id=vm['id'], total_cores=vm['total_cores'], total_ram=vm['total_ram'],
+              storage=vm['storage'], instance_type=vm['instance_type'],
+              launched_at=vm['launched_at'], ready_at=vm['ready_at'],
+              terminated_at=vm['terminated_at'])
+           for vm in body['vms']]
+    return result, vms
+
+
+# -- store -------------------------------------------------------------------
+
+class ResultCache:
+    """Size-bounded LRU of encoded results in one SQLite file.
+
+    A connection is opened per operation, so one cache can be shared by
+    request threads and by sweep worker processes.
+    """
+
+    def __init__(self, path: str = 'cache.db', max_bytes: int = DEFAULT_MAX_BYTES) -> None:
+        if max_bytes <= 0:
+            raise ValueError('max_bytes must be positive')
+        self.path = path
+        self.max_bytes = int(max_bytes)
+        self.hits = 0
+        self.misses = 0
+        conn = self._connect()
+        try:
+            conn.executescript(SCHEMA)
+        finally:
+            conn.close()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=30.0)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        return conn
+
+    def get(self, key: str) -> Optional[bytes]:
+        """The value stored under ``key``, marking it recently used."""
+        conn = self._connect()
+        try:
+            row = conn.execute('SELECT value FROM results WHERE key = ?', (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            with conn:
+                conn.execute('UPDATE results SET accessed_at = ?, hits = hits + 1 '
+                             'WHERE key = ?', (time.time(), key))
+        finally:
+            conn.close()
+        self.hits += 1
+        return row[0]
+
+    def put(self, key: str, value: bytes) -> bool:
+        """Store ``value`` and evict least recently used entries beyond
+        ``max_bytes``.  Returns False for a value too big to keep."""
+        size = len(value)
+        if size > self.max_bytes:
+            return False
+        now = time.time()
+        conn = self._connect()
+        try:
+            with conn:
+                conn.execute('INSERT OR REPLACE INTO results (key, value, size, created_at, '
+                             'accessed_at) VALUES (?, ?, ?, ?, ?)',
+                             (key, sqlite3.Binary(value), size, now, now))
+                total = conn.execute('SELECT COALESCE(SUM(size), 0) FROM results').fetchone()[0]
+                if total > self.max_bytes:
+                    self._evict(conn, total - self.max_bytes, key)
+        finally:
+            conn.close()
+        return True
+
+    @staticmethod
+    def _evict(conn: sqlite3.Connection, excess: int, keep: str) -> None:
+        victims = []
+        for key, size in conn.execute('SELECT key, size FROM results WHERE key != ? '
+                                      'ORDER BY accessed_at', (keep,)):
+            victims.append((key,))
+            excess -= size
+            if excess <= 0:
+                break
+        conn.executemany('DELETE FROM results WHERE key = ?', victims)
+
+    def clear(self) -> None:
+        conn = self._connect()
+        try:
+            with conn:
+                conn.execute('DELETE FROM results')
+        finally:
+            conn.close()
+
+    def statistics(self) -> Dict[str, Any]:
+        conn = self._connect()
+        try:
+            entries, size = conn.execute(
+                'SELECT COUNT(*), COALESCE(SUM(size), 0) FROM results').fetchone()
+        finally:
+            conn.close()
+        return {
+            'entries': entries,
+            'bytes': size,
+            'max_bytes': self.max_bytes,
+            'hits': self.hits,
+            'misses': self.misses,
+        }
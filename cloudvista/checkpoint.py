@@ -0,0 +1,614 @@
+"""Checkpoints of a running simulation.
+
+A run's whole state used to live in the page's globals (``vms``,
+``tasks``, ``completedTasks``, ``taskQueue``, ``currentTime``): reloading
+the page or restarting the server lost hours of progress, and
+``resetSimulation`` was the only thing to be done with a run.  ``save``
+writes the engine's state between two steps to a compact binary file, and
+``load`` rebuilds a ``Simulation`` that carries on exactly as the original
+would have:
+
+* the event queue, tie-breaking sequence numbers included;
+* VM occupancy and the tasks running on each VM (the placement index is
+  rebuilt from them), and each VM's launch, ready and termination times;
+* the waiting tasks in scheduler order, the exact remaining work and
+  slice ends of sliced policies, and policy state such as MLFQ levels;
+* the accumulated statistics (quantile sketch included) and event log;
+* the autoscaler's settings and counters, if the fleet is autoscaled;
+* the dependency graph, each task's count of unfinished parents and the
+  arrived tasks held back by them;
+* the tasks still to arrive and, unless they were written back into a
+  ``TaskTable``, the tasks already completed.
+
+The engine draws no random numbers, so there is no RNG state to carry.
+
+A checkpoint is a compressed ``.npz`` archive.  Task lists are
+``TaskTable`` rows, the event queue and VMs are columns, and everything
+else is a small JSON header.  Nothing is pickled, so loading a checkpoint
+cannot run code.
+
+``load`` accepts overrides (scheduler, placement, prices, autoscaler
+settings, ...) to fork a
+what-if branch from a mid-run checkpoint without simulating the prefix
+again; ``fork`` does the same straight from a ``Simulation``.  A workload
+streamed from an iterator is not stored: resuming needs the same stream
+(``tasks=``), and the tasks it had already delivered are skipped.
+
+``Checkpointer`` saves a run every ``every`` simulated seconds and/or
+``interval`` wall-clock seconds, keeping the newest ``keep`` files.
+"""
+
+from __future__ import annotations
+
+import io
+import itertools
+import json
+import math
+import os
+import time
+from fractions import Fraction
+from typing import Any, BinaryIO, Callable, Dict, Iterable, List, Optional, Tuple, Union
+
+import numpy as np
+
+from .autoscale import make_autoscaler
+from .dag import TaskGraph
+from .engine import ARRIVE, FINISH, PREEMPT, READY, SCALE, START, Simulation
+from .models import VM, Task
+from .schedulers import POLICIES
+from .stats import QuantileSketch, StatsAccumulator
+from .taskstore import TaskTable
+
+FORMAT = 'cloudvista-checkpoint'
+FORMAT_VERSION = 1
+SUFFIX = '.ckpt'
+
+# where the tasks still to arrive come from
+TASKS = 'tasks'
+TABLE = 'table'
+STREAM = 'stream'
+
+_KINDS = (ARRIVE, START, FINISH, PREEMPT, SCALE, READY)
+_KIND_CODES = {kind: code for code, kind in enumerate(_KINDS)}
+
+# Simulation options a checkpoint records; all of them can be overridden
+# on load
+CONFIG = ('scheduler', 'time_quantum', 'scheduler_options', 'placement', 'cpu_cost',
+          'ram_cost', 'batch_packing', 'context_switch', 'record_events', 'autoscale')
+_POLICY_CONFIG = ('scheduler', 'time_quantum', 'scheduler_options')
+
+_STATS_FIELDS = ('total_cores', 'total_ram', 'total_tasks', 'used_cores', 'used_ram',
+                 'core_seconds', 'ram_seconds', 'now', 'total_cost', 'preemptions',
+                 'switch_time', 'deadline_misses', 'core_capacity_seconds',
+                 'ram_capacity_seconds', 'capacity_since')
+_RUNNING_STAT_FIELDS = ('count', 'mean', 'm2', 'min', 'max')
+
+
+class CheckpointError(ValueError):
+    """Raised when a checkpoint cannot be written, read or resumed."""
+
+
+# -- encoding ----------------------------------------------------------------
+
+def _parse_exact(text: str) -> Union[int, Fraction]:
+    value = Fraction(text)
+    return value.numerator if value.denominator == 1 else value
+
+
+def _table_arrays(prefix: str, table: TaskTable, arrays: Dict[str, np.ndarray],
+                  names: Dict[str, List[str]]) -> None:
+    arrays[prefix] = table.data
+    names[prefix] = table.names.names
+
+
+def _read_table(archive: Any, prefix: str, names: Dict[str, List[str]]) -> TaskTable:
+    return TaskTable.from_data(archive[prefix], names[prefix])
+
+
+def _stats_state(stats: StatsAccumulator) -> Dict[str, Any]:
+    sketch = stats.wait_sketch
+    state: Dict[str, Any] = {name: getattr(stats, name) for name in _STATS_FIELDS}
+    state['wait'] = [getattr(stats.wait, name) for name in _RUNNING_STAT_FIELDS]
+    state['turnaround'] = [getattr(stats.turnaround, name) for name in _RUNNING_STAT_FIELDS]
+    state['sketch'] = {
+        'relative_accuracy': sketch.relative_accuracy,
+        'min_value': sketch.min_value,
+        'zero_count': sketch.zero_count,
+        'count': sketch.count,
+        'buckets': sorted(sketch.buckets.items()),
+    }
+    return state
+
+
+def _restore_stats(stats: StatsAccumulator, state: Dict[str, Any]) -> None:
+    for name in _STATS_FIELDS:
+        setattr(stats, name, state.get(name, getattr(stats, name)))
+    for name, value in zip(_RUNNING_STAT_FIELDS, state['wait']):
+        setattr(stats.wait, name, value)
+    for name, value in zip(_RUNNING_STAT_FIELDS, state['turnaround']):
+        setattr(stats.turnaround, name, value)
+    saved = state['sketch']
+    sketch = stats.wait_sketch = QuantileSketch(saved['relative_accuracy'], saved['min_value'])
+    sketch.zero_count = saved['zero_count']
+    sketch.count = saved['count']
+    sketch.buckets = {key: n for key, n in saved['buckets']}
+
+
+def dumps(simulation: Simulation) -> bytes:
+    """The state of ``simulation`` between two steps, as checkpoint bytes."""
+    sim = simulation
+    policy = sim.policy
+    if POLICIES.get(policy.name) is not type(policy):
+        raise CheckpointError('scheduler %r is not a registered policy and cannot be '
+                              'checkpointed' % policy.name)
+    if sim._arrivals:
+        raise CheckpointError('cannot checkpoint in the middle of a step')
+
+    # every task that is queued, waiting or running, numbered in the order
+    # first seen; the queue and VMs refer to tasks by that number
+    tasks: List[Task] = []
+    positions: Dict[int, int] = {}
+
+    def position(task: Task) -> int:
+        pos = positions.get(id(task))
+        if pos is None:
+            pos = positions[id(task)] = len(tasks)
+            tasks.append(task)
+        return pos
+
+    vm_pos = sim._vm_index
+    queue = sim._queue
+    queue_task = [-1 if entry[5] is None else position(entry[5]) for entry in queue]
+
+    if sim._levels is not None:
+        level_sizes = [len(level) for level in sim._levels]
+        waiting = [position(task) for level in sim._levels for task in level]
+        pending_keys: List[float] = []
+        pending_seqs: List[int] = []
+        class_sizes: List[int] = []
+    else:
+        level_sizes = []
+        entries = [entry for heap in sim._pending.values() for entry in heap]
+        class_sizes = [len(heap) for heap in sim._pending.values()]
+        waiting = [position(entry[2]) for entry in entries]
+        pending_keys = [entry[0] for entry in entries]
+        pending_seqs = [entry[1] for entry in entries]
+
+    running_vm: List[int] = []
+    running_task: List[int] = []
+    for i, vm in enumerate(sim.vms):
+        for task in vm.running.values():
+            running_vm.append(i)
+            running_task.append(position(task))
+    held_node = list(sim._held)
+    held_task = [position(task) for task in sim._held.values()]
+
+    # peek at the sequence counter without moving it
+    seq = next(sim._seq)
+    sim._seq = itertools.count(seq)
+
+    arrays: Dict[str, np.ndarray] = {
+        'queue_time': np.array([e[0] for e in queue], dtype=np.float64),
+        'queue_rank': np.array([e[1] for e in queue], dtype=np.int8),
+        'queue_key': np.array([e[2] for e in queue], dtype=np.int64),
+        'queue_seq': np.array([e[3] for e in queue], dtype=np.int64),
+        'queue_kind': np.array([_KIND_CODES[e[4]] for e in queue], dtype=np.int8),
+        'queue_task': np.array(queue_task, dtype=np.int64),
+        'queue_vm': np.array([-1 if e[6] is None else vm_pos[e[6].id] for e in queue],
+                             dtype=np.int64),
+        'waiting': np.array(waiting, dtype=np.int64),
+        'pending_key': np.array(pending_keys, dtype=np.float64),
+        'pending_seq': np.array(pending_seqs, dtype=np.int64),
+        'pending_sizes': np.array(class_sizes, dtype=np.int64),
+        'level_sizes': np.array(level_sizes, dtype=np.int64),
+        'running_vm': np.array(running_vm, dtype=np.int64),
+        'running_task': np.array(running_task, dtype=np.int64),
+        'vms': np.array([(vm.id, vm.total_cores, vm.total_ram, vm.storage,
+                          vm.available_cores, vm.available_ram) for vm in sim.vms],
+                        dtype=np.int64).reshape(-1, 6),
+        'vm_times': np.array([(vm.launched_at, math.nan if vm.ready_at is None else vm.ready_at,
+                               math.nan if vm.terminated_at is None else vm.terminated_at)
+                              for vm in sim.vms], dtype=np.float64).reshape(-1, 3),
+        'remaining': np.array([t.remaining_time for t in tasks], dtype=np.float64),
+        'rows': np.array([-1 if t.row is None else t.row for t in tasks], dtype=np.int64),
+    }
+    graph = sim.graph
+    if graph is not None:
+        arrays['graph_ids'] = np.array(graph.ids, dtype=np.int64)
+        arrays['graph_edges'] = graph.edges
+        arrays['graph_durations'] = np.array(graph.durations, dtype=np.float64)
+        arrays['graph_unfinished'] = np.array(sim._unfinished, dtype=np.int64)
+        arrays['held_node'] = np.array(held_node, dtype=np.int64)
+        arrays['held_task'] = np.array(held_task, dtype=np.int64)
+    names: Dict[str, List[str]] = {}
+    _table_arrays('inflight', TaskTable.from_tasks(tasks, outcomes=True), arrays, names)
+
+    if sim.record_events:
+        events = sim.events
+        arrays['event_time'] = np.array([e[0] for e in events], dtype=np.float64)
+        arrays['event_kind'] = np.array([_KIND_CODES[e[1]] for e in events], dtype=np.int8)
+        arrays['event_task'] = np.array([e[2] for e in events], dtype=np.int64)
+        arrays['event_vm'] = np.array([-1 if e[3] is None else e[3] for e in events],
+                                      dtype=np.int64)
+
+    total: Optional[int] = None
+    arrived = sim.stats.total_tasks + sum(1 for e in queue if e[4] == ARRIVE)
+    if sim.table is not None:
+        source = TABLE
+        _table_arrays('table', sim.table, arrays, names)
+        arrays['backlog_rows'] = np.asarray(sim._backlog[sim._fed:], dtype=np.int64)
+        total = arrived + len(arrays['backlog_rows'])
+    elif sim._backlog is not None:
+        source = TASKS
+        backlog = sim._backlog[sim._fed:]
+        _table_arrays('backlog', TaskTable.from_tasks(backlog), arrays, names)
+        total = arrived + len(backlog)
+    else:
+        source = STREAM
+    if sim.table is None:
+        _table_arrays('completed', TaskTable.from_tasks(sim.completed, outcomes=True),
+                      arrays, names)
+
+    meta = {
+        'format': FORMAT,
+        'version': FORMAT_VERSION,
+        'created_at': time.time(),
+        'now': sim.now,
+        'clock': None if sim._clock is None else str(sim._clock),
+        'seq': seq,
+        'source': source,
+        'fed': sim._fed,
+        'total_tasks': total,
+        'completed_tasks': sim.stats.completed,
+        'pending_tasks': len(waiting),
+        'config': {
+            'scheduler': sim.scheduler,
+            'time_quantum': sim.time_quantum,
+            'scheduler_options': policy.options(),
+            'placement': sim.placement,
+            'cpu_cost': sim.cpu_cost,
+            'ram_cost': sim.ram_cost,
+            'batch_packing': sim.batch_packing,
+            'context_switch': sim.context_switch,
+            'record_events': sim.record_events,
+            'autoscale': sim.autoscaler.spec() if sim.autoscaler else None,
+        },
+        'autoscaler': sim.autoscaler.state() if sim.autoscaler else None,
+        'vm_types': [vm.instance_type for vm in sim.vms],
+        'policy': policy.state(positions),
+        'work': [[positions[key], str(work)] for key, work in sim._work.items()],
+        'exact_at': [[at, str(value)] for at, value in sim._exact_at.items()],
+        'full_pass': sim._full_pass,
+        'touched': sorted(sim._touched),
+        'released': [vm_pos[vm.id] for vm in sim._released],
+        'stats': _stats_state(sim.stats),
+        'names': names,
+    }
+    arrays['meta'] = np.frombuffer(json.dumps(meta).encode('utf-8'), dtype=np.uint8)
+    buffer = io.BytesIO()
+    np.savez_compressed(buffer, **arrays)
+    return buffer.getvalue()
+
+
+# -- decoding ----------------------------------------------------------------
+
+def _open(source: Union[str, BinaryIO]) -> Tuple[Any, Dict[str, Any]]:
+    """The lazily read archive at ``source`` and its JSON header."""
+    try:
+        archive = np.load(source, allow_pickle=False)
+    except (OSError, ValueError) as exc:
+        raise CheckpointError('not a checkpoint: %s' % exc)
+    try:
+        meta = json.loads(archive['meta'].tobytes().decode('utf-8'))
+    except (KeyError, ValueError) as exc:
+        archive.close()
+        raise CheckpointError('not a checkpoint: %s' % exc)
+    if not isinstance(meta, dict) or meta.get('format') != FORMAT:
+        archive.close()
+        raise CheckpointError('not a checkpoint')
+    if meta.get('version') != FORMAT_VERSION:
+        archive.close()
+        raise CheckpointError('unsupported checkpoint version %r' % meta.get('version'))
+    return archive, meta
+
+
+def loads(data: bytes, **options: Any) -> Simulation:
+    """Rebuild the simulation saved in checkpoint bytes (see ``load``)."""
+    return _restore(io.BytesIO(data), **options)
+
+
+def load(path: str, **options: Any) -> Simulation:
+    """Resume the checkpoint at ``path``.
+
+    ``overrides`` replace any of the saved options in ``CONFIG``; a new
+    ``scheduler`` (or ``time_quantum`` / ``scheduler_options``) takes over
+    the waiting tasks as ``Simulation.set_scheduler`` describes.  ``tasks``
+    is required for, and only accepted by, checkpoints of streamed
+    workloads.  ``on_complete`` and ``instrument`` are as for
+    ``Simulation``.  An ``autoscale`` spec replaces the autoscaler's
+    settings (its counters carry over), or autoscales a fixed fleet from
+    the checkpoint on.
+    """
+    return _restore(path, **options)
+
+
+def _restore(source: Union[str, BinaryIO], tasks: Optional[Iterable[Task]] = None,
+             on_complete: Optional[Callable[[Task], None]] = None,
+             instrument: Any = None, **overrides: Any) -> Simulation:
+    archive, meta = _open(source)
+    try:
+        return _rebuild(archive, meta, tasks, on_complete, instrument, overrides)
+    finally:
+        archive.close()
+
+
+def _rebuild(archive: Any, meta: Dict[str, Any], tasks: Optional[Iterable[Task]],
+             on_complete: Optional[Callable[[Task], None]], instrument: Any,
+             overrides: Dict[str, Any]) -> Simulation:
+    unknown = sorted(set(overrides) - set(CONFIG))
+    if unknown:
+        raise CheckpointError('unknown override(s): %s' % ', '.join(unknown))
+    config = dict(meta['config'])
+    policy_change = {key: overrides.pop(key) for key in _POLICY_CONFIG if key in overrides}
+    config.update(overrides)
+    names = meta['names']
+
+    shapes = archive['vms'].tolist()
+    # checkpoints written before autoscaling have a fixed fleet
+    times = (archive['vm_times'].tolist() if 'vm_times' in archive
+             else [(0.0, 0.0, math.nan)] * len(shapes))
+    vms = [VM(id=vm_id, total_cores=cores, total_ram=ram, storage=storage,
+              available_cores=free_cores, available_ram=free_ram, instance_type=kind,
+              launched_at=launched, ready_at=None if math.isnan(ready) else ready,
+              terminated_at=None if math.isnan(terminated) else terminated)
+           for (vm_id, cores, ram, storage, free_cores, free_ram), (launched, ready, terminated),
+           kind in zip(shapes, times, meta.get('vm_types') or [None] * len(shapes))]
+    inflight = _read_table(archive, 'inflight', names)
+    live = list(inflight.iter_rows(np.arange(len(inflight))))
+    for task, remaining, row in zip(live, archive['remaining'].tolist(),
+                                    archive['rows'].tolist()):
+        task.remaining_time = remaining
+        task.row = None if row < 0 else row
+    for vm_at, task_at in zip(archive['running_vm'].tolist(), archive['running_task'].tolist()):
+        task = live[task_at]
+        vms[vm_at].running[id(task)] = task
+
+    graph = None
+    if 'graph_ids' in archive:
+        ids = archive['graph_ids']
+        # edges are saved as node pairs
+        parents, children = ids[archive['graph_edges']]
+        graph = TaskGraph(ids, parents, children, archive['graph_durations'])
+    try:
+        sim = Simulation(vms, [], scheduler=config['scheduler'],
+                         time_quantum=config['time_quantum'],
+                         scheduler_options=config['scheduler_options'],
+                         placement=config['placement'], cpu_cost=config['cpu_cost'],
+                         ram_cost=config['ram_cost'], batch_packing=config['batch_packing'],
+                         context_switch=config['context_switch'],
+                         record_events=config['record_events'], on_complete=on_complete,
+                         graph=graph)
+    except (TypeError, ValueError) as exc:
+        raise CheckpointError(str(exc))
+
+    source = meta['source']
+    if source == STREAM:
+        if tasks is None:
+            raise CheckpointError('this checkpoint is of a streamed workload; pass the '
+                                  'same tasks to resume it')
+        stream = iter(tasks)
+        # skip what the original run had already taken from the stream
+        next(itertools.islice(stream, meta['fed'], meta['fed']), None)
+        sim._source = stream
+        sim._backlog = None
+        sim._fed = meta['fed']
+    elif tasks is not None:
+        raise CheckpointError('this checkpoint holds its own tasks')
+    elif source == TABLE:
+        sim.table = _read_table(archive, 'table', names)
+        sim._backlog = archive['backlog_rows']
+        sim._source = sim.table.iter_rows(sim._backlog)
+    else:
+        backlog = _read_table(archive, 'backlog', names)
+        sim._backlog = list(backlog.iter_rows(np.arange(len(backlog))))
+        for task in sim._backlog:
+            task.row = None
+        sim._source = iter(sim._backlog)
+    if sim.table is None:
+        completed = _read_table(archive, 'completed', names)
+        sim.completed = list(completed.iter_rows(np.arange(len(completed))))
+        for task in sim.completed:
+            task.remaining_time = 0.0
+            task.row = None
+
+    sim.now = meta['now']
+    sim._clock = None if meta['clock'] is None else _parse_exact(meta['clock'])
+    sim._seq = itertools.count(meta['seq'])
+    sim._queue = [
+        (at, rank, key, seq, _KINDS[kind], None if task_at < 0 else live[task_at],
+         None if vm_at < 0 else vms[vm_at])
+        for at, rank, key, seq, kind, task_at, vm_at in zip(
+            archive['queue_time'].tolist(), archive['queue_rank'].tolist(),
+            archive['queue_key'].tolist(), archive['queue_seq'].tolist(),
+            archive['queue_kind'].tolist(), archive['queue_task'].tolist(),
+            archive['queue_vm'].tolist())
+    ]
+
+    waiting = [live[i] for i in archive['waiting'].tolist()]
+    if sim._levels is not None:
+        start = 0
+        for level, size in zip(sim._levels, archive['level_sizes'].tolist()):
+            level.extend(waiting[start:start + size])
+            start += size
+    else:
+        entries = list(zip(archive['pending_key'].tolist(), archive['pending_seq'].tolist(),
+                           waiting))
+        start = 0
+        for size in archive['pending_sizes'].tolist():
+            # heaps are stored as lists, so they come back in heap order
+            heap = entries[start:start + size]
+            task = heap[0][2]
+            sim._pending[(task.cpu_required, task.ram_required)] = heap
+            start += size
+
+    sim._work = {id(live[pos]): _parse_exact(work) for pos, work in meta['work']}
+    sim._exact_at = {at: _parse_exact(value) for at, value in meta['exact_at']}
+    sim._full_pass = meta['full_pass']
+    sim._touched = {tuple(cls) for cls in meta['touched']}
+    sim._released = [vms[i] for i in meta['released']]
+    _restore_stats(sim.stats, meta['stats'])
+    sim.policy.restore(meta['policy'], live)
+    if graph is not None:
+        sim._unfinished = archive['graph_unfinished'].tolist()
+        sim._held = {node: live[pos] for node, pos in zip(archive['held_node'].tolist(),
+                                                           archive['held_task'].tolist())}
+
+    if config['record_events'] and 'event_time' in archive:
+        sim.events = [
+            (at, _KINDS[kind], task_id, None if vm_id < 0 else vm_id)
+            for at, kind, task_id, vm_id in zip(
+                archive['event_time'].tolist(), archive['event_kind'].tolist(),
+                archive['event_task'].tolist(), archive['event_vm'].tolist())
+        ]
+
+    if config.get('autoscale') is not None:
+        try:
+            scaler = make_autoscaler(config['autoscale'])
+        except ValueError as exc:
+            raise CheckpointError(str(exc))
+        if meta.get('autoscaler') is None:
+            scaler.attach(sim)
+        else:
+            scaler.bind(sim)
+            scaler.restore(meta['autoscaler'])
+    if policy_change:
+        try:
+            sim.set_scheduler(policy_change.get('scheduler', sim.scheduler),
+                              policy_change.get('time_quantum'),
+                              policy_change.get('scheduler_options'))
+        except (TypeError, ValueError) as exc:
+            raise CheckpointError(str(exc))
+    if instrument is not None:
+        sim.instrument = instrument
+        instrument.attach(sim)
+    return sim
+
+
+def save(simulation: Simulation, path: str) -> str:
+    """Write a checkpoint of ``simulation`` to ``path``, atomically."""
+    data = dumps(simulation)
+    partial = path + '.partial'
+    with open(partial, 'wb') as fh:
+        fh.write(data)
+    os.replace(partial, path)
+    return path
+
+
+def fork(simulation: Simulation, **options: Any) -> Simulation:
+    """An independent copy of ``simulation`` as it stands, with overrides.
+
+    The original is left untouched and can keep running.
+    """
+    return loads(dumps(simulation), **options)
+
+
+def checkpoint_id(path: str) -> str:
+    """The name a checkpoint file is known by (its file name sans suffix)."""
+    name = os.path.basename(path)
+    return name[:-len(SUFFIX)] if name.endswith(SUFFIX) else name
+
+
+def info(path: str) -> Dict[str, Any]:
+    """What a checkpoint file holds, without restoring it."""
+    archive, meta = _open(path)
+    archive.close()
+    return {
+        'id': checkpoint_id(path),
+        'time': meta['now'],
+        'created_at': meta['created_at'],
+        'size': os.path.getsize(path),
+        'total_tasks': meta['total_tasks'],
+        'completed_tasks': meta['completed_tasks'],
+        'pending_tasks': meta['pending_tasks'],
+        'streamed': meta['source'] == STREAM,
+        **meta['config'],
+    }
+
+
+def list_checkpoints(directory: str, prefix: str = '') -> List[Dict[str, Any]]:
+    """``info`` for the checkpoints in ``directory`` whose names start with
+    ``prefix``, oldest first."""
+    if not os.path.isdir(directory):
+        return []
+    found = []
+    for name in sorted(os.listdir(directory)):
+        if name.startswith(prefix) and name.endswith(SUFFIX):
+            try:
+                found.append(info(os.path.join(directory, name)))
+            except (CheckpointError, OSError):
+                continue
+    found.sort(key=lambda item: item['created_at'])
+    return found
+
+
+# -- periodic checkpoints ----------------------------------------------------
+
+class Checkpointer:
+    """Saves a running simulation on a schedule.
+
+    Checkpoints are written every ``every`` simulated seconds and/or every
+    ``interval`` wall-clock seconds, and whenever ``request`` was called,
+    to ``<directory>/<prefix>-<n>.ckpt``.  Only the newest ``keep`` files
+    are kept (0 keeps them all).  ``Simulation.run`` and ``LiveRun`` call
+    ``due`` and ``save`` between steps.
+    """
+
+    def __init__(self, directory: str, prefix: str = 'checkpoint',
+                 every: Optional[float] = None, interval: Optional[float] = None,
+                 keep: int = 3) -> None:
+        if every is not None and every <= 0:
+            raise ValueError('every must be positive')
+        if interval is not None and interval <= 0:
+            raise ValueError('interval must be positive')
+        if keep < 0:
+            raise ValueError('keep must be non-negative')
+        self.directory = directory
+        self.prefix = prefix
+        self.every = every
+        self.interval = interval
+        self.keep = keep
+        self.paths: List[str] = []
+        self._count = 0
+        self._next_time = every if every else math.inf
+        self._next_wall = time.monotonic() + interval if interval else math.inf
+        self._requested = False
+
+    def request(self) -> None:
+        """Save at the next step boundary (safe to call from any thread)."""
+        self._requested = True
+
+    def due(self, simulation: Simulation) -> bool:
+        return (self._requested or simulation.now >= self._next_time
+                or time.monotonic() >= self._next_wall)
+
+    def save(self, simulation: Simulation) -> str:
+        self._requested = False
+        if self.every:
+            self._next_time = (math.floor(simulation.now / self.every) + 1) * self.every
+        if self.interval:
+            self._next_wall = time.monotonic() + self.interval
+        os.makedirs(self.directory, exist_ok=True)
+        self._count += 1
+        path = save(simulation, os.path.join(self.directory, '%s-%06d%s'
+                                             % (self.prefix, self._count, SUFFIX)))
+        self.paths.append(path)
+        while self.keep and len(self.paths) > self.keep:
+            try:
+                os.remove(self.paths.pop(0))
+            except FileNotFoundError:
+                pass
+        return path
+
+    @property
+    def latest(self) -> Optional[str]:
+        return self.paths[-1] if self.paths else None
@@ -0,0 +1,157 @@
+"""Task dependency graphs.
+
+Tasks submitted through ``submitTask`` were independent: each could start
+as soon as it arrived.  Pipelines are not - a task can only start once
+the tasks it depends on have finished.  A ``TaskGraph`` records those
+dependencies by task id, and the engine holds back every arrived task
+with unfinished parents.  Each task keeps a count of its unfinished
+parents; a completion decrements the counts of its children, and a child
+whose count reaches zero joins the scheduler's queue (so an arrived task
+is released at the instant its last parent finishes).  Wait and
+turnaround are still measured from arrival, so they include the time
+spent waiting for parents.
+
+Building a graph is linear in tasks plus edges, bar one sort of the edge
+array by parent: ids are mapped to nodes in one pass, Kahn's algorithm
+orders the nodes (and rejects cycles), and ``upward_rank`` walks that
+order backwards.  The
+upward rank of a task is its own duration plus the largest upward rank
+among its children - the length of the longest chain of work from the
+task to the end of the graph.  The ``heft`` scheduler (see
+``schedulers``) runs the highest rank first, which is the list-scheduling
+phase of HEFT; VMs here all run at the same speed and there are no
+transfer costs, so rank is plain duration.  The largest rank, the
+``critical_path``, is a lower bound on the makespan of the graph.
+
+``Task.dependencies`` lists the ids a task depends on; ``Simulation``
+builds the graph from them when given a list of tasks.  For a
+``TaskTable`` or a streamed trace, build one from id columns and pass it
+as ``graph``::
+
+    graph = TaskGraph(table.column('id'), parent_ids, child_ids,
+                      table.column('execution_time'))
+    Simulation(vms, table, scheduler='heft', graph=graph).run()
+"""
+
+from __future__ import annotations
+
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+from .models import Task
+
+
+class DependencyError(ValueError):
+    """Raised for a dependency on an unknown task, or a cycle."""
+
+
+class TaskGraph:
+    """Dependencies between tasks, by task id.
+
+    ``ids`` and ``durations`` are per task; edge ``i`` runs from task
+    ``parents[i]`` to task ``children[i]``.  Duplicate edges count once
+    per occurrence.  Nodes are positions in ``ids``; a node's children are
+    kept as one flat array sliced by ``child_ptr`` (CSR), so a graph of a
+    million tasks is a handful of arrays rather than a million lists.
+    """
+
+    def __init__(self, ids: Sequence[int], parents: Sequence[int], children: Sequence[int],
+                 durations: Sequence[float]) -> None:
+        self.ids: List[int] = np.asarray(ids, dtype=np.int64).ravel().tolist()
+        self.durations: List[float] = np.asarray(durations, dtype=np.float64).ravel().tolist()
+        count = len(self.ids)
+        if len(self.durations) != count:
+            raise ValueError('need one duration per task')
+        if len(parents) != len(children):
+            raise ValueError('parents and children must be the same length')
+        self.index: Dict[int, int] = dict(zip(self.ids, range(count)))
+        if len(self.index) != count:
+            seen, dupes = np.unique(self.ids, return_counts=True)
+            raise DependencyError('task id %d appears more than once' % seen[dupes > 1][0])
+
+        source = self._nodes(parents)
+        target = self._nodes(children)
+        self.edges = np.array([source, target], dtype=np.int64).reshape(2, -1)
+        self.indegree: List[int] = np.bincount(self.edges[1], minlength=count).tolist()
+        ptr = np.zeros(count + 1, dtype=np.int64)
+        np.cumsum(np.bincount(self.edges[0], minlength=count), out=ptr[1:])
+        self.child_ptr: List[int] = ptr.tolist()
+        self.child_nodes: List[int] = self.edges[1][np.argsort(self.edges[0],
+                                                               kind='stable')].tolist()
+        self.order = self._topological_order()
+        self._rank: Optional[List[float]] = None
+
+    def _nodes(self, ids: Sequence[int]) -> List[int]:
+        try:
+            return list(map(self.index.__getitem__,
+                            np.asarray(ids, dtype=np.int64).ravel().tolist()))
+        except KeyError as exc:
+            raise DependencyError('dependency on unknown task %d' % exc.args[0])
+
+    @classmethod
+    def from_tasks(cls, tasks: Sequence[Task]) -> 'TaskGraph':
+        """The graph of ``Task.dependencies`` over ``tasks``."""
+        parents = [parent for task in tasks for parent in task.dependencies]
+        children = [task.id for task in tasks for _ in task.dependencies]
+        return cls([task.id for task in tasks], parents, children,
+                   [task.execution_time for task in tasks])
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    @property
+    def edge_count(self) -> int:
+        return self.edges.shape[1]
+
+    def children(self, node: int) -> List[int]:
+        """Nodes that depend on ``node``."""
+        return self.child_nodes[self.child_ptr[node]:self.child_ptr[node + 1]]
+
+    def _topological_order(self) -> List[int]:
+        """Kahn's algorithm; raises ``DependencyError`` on a cycle."""
+        remaining = list(self.indegree)
+        order = [node for node, count in enumerate(remaining) if not count]
+        ptr, kids = self.child_ptr, self.child_nodes
+        for node in order:   # ``order`` grows while it is walked
+            for child in kids[ptr[node]:ptr[node + 1]]:
+                remaining[child] -= 1
+                if not remaining[child]:
+                    order.append(child)
+        if len(order) < len(self.ids):
+            stuck = [self.ids[node] for node, count in enumerate(remaining) if count][:5]
+            raise DependencyError('dependency cycle among tasks %s'
+                                  % ', '.join(str(task_id) for task_id in stuck))
+        return order
+
+    def upward_rank(self) -> List[float]:
+        """Per node: its duration plus the largest rank among its children."""
+        if self._rank is None:
+            rank = list(self.durations)
+            ptr, kids = self.child_ptr, self.child_nodes
+            lookup = rank.__getitem__
+            for node in reversed(self.order):
+                start, end = ptr[node], ptr[node + 1]
+                if start != end:
+                    rank[node] += max(map(lookup, kids[start:end]))
+            self._rank = rank
+        return self._rank
+
+    @property
+    def critical_path(self) -> float:
+        """Longest chain of work through the graph; no schedule beats it."""
+        return max(self.upward_rank(), default=0.0)
+
+    def statistics(self) -> Dict[str, float]:
+        return {
+            'dag_tasks': len(self.ids),
+            'dag_edges': self.edge_count,
+            'critical_path': self.critical_path,
+        }
+
+
+def graph_of(tasks: Sequence[Task]) -> Optional[TaskGraph]:
+    """The dependency graph of ``tasks``, or None if none has dependencies."""
+    if not any(task.dependencies for task in tasks):
+        return None
+    return TaskGraph.from_tasks(tasks)
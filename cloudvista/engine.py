@@ -0,0 +1,704 @@
+"""Headless discrete-event simulation engine.
+
+The browser used to advance ``currentTime += 0.1`` every 100 ms and rescan
+every VM and pending task on each tick.  This engine keeps a priority queue
+of arrival, completion and quantum-expiry events and jumps straight to the
+next event time, so a 10,000 second workload is simulated in a few thousand
+steps instead of 100,000 ticks.
+
+Scheduling decisions follow ``simulateStep`` (FCFS / Priority) and
+``simulateRoundRobin`` (Round Robin) from ``script.js``:
+
+* at any instant, releases (completions and quantum expiries) are handled
+  first, in VM order, then arrivals, then one dispatch pass;
+* FCFS and Priority walk the pending tasks in order and start every task
+  that fits somewhere, skipping the ones that do not;
+* Round Robin dispatches strictly from the head of its FIFO queue and stops
+  at the first task that cannot be placed.
+
+The order and slicing rules live in scheduler policies (see
+``schedulers``), which add SJF, SRTF, EDF, aging priority, a multilevel
+feedback queue and critical-path-first (HEFT) to the three above.
+
+Unlike the tick loop, a VM is not limited to one task: it runs as many as
+its free cores and RAM allow.  Which VM a task lands on is decided by a
+placement index (see ``placement``).  With ``batch_packing`` enabled, tasks
+arriving at the same instant are placed together by the vectorized packer
+in ``packing`` after the backlog has had its turn.
+
+Arrivals are fed into the event queue lazily, one at a time, so only
+in-flight tasks exist as ``Task`` objects.  A task collection is sorted by
+arrival first; an iterator (such as ``traces.read_trace``) is assumed to be
+in arrival order already and is consumed as the clock reaches it.  When the
+workload is a ``TaskTable``, completed tasks are written back into the table
+rather than kept in ``completed``; with ``on_complete`` they are handed to
+the callback instead, so a streamed trace runs in constant memory.
+
+Sliced policies keep each task's remaining work as an exact ``Fraction`` of
+the decimal inputs, so a 0.3 s task with a 0.1 s quantum takes exactly
+three slices; the tick loop's per-tick float subtraction needed a
+``<= 0.01`` fudge.  Each dispatch can be charged a ``context_switch``
+overhead that occupies the VM before the slice runs.
+
+Times are exact rather than rounded up to the next 0.1 s tick.  The
+optional event log is what the browser replays to animate a run.  Pass an
+``instrument.Instrumentation`` to time the phases of each step.  Between
+steps the whole state can be saved and resumed or forked (see
+``checkpoint``).
+
+The fleet is fixed unless an ``autoscale.Autoscaler`` is attached; it
+launches VMs (which join the placement index once provisioned) and
+retires idle ones, driven by its own evaluation events.
+
+With a ``dag.TaskGraph`` (built from ``Task.dependencies`` or passed as
+``graph``), an arrived task with unfinished parents is held back and
+only queued once the last of them finishes.
+
+Tasks can also be ``submit``-ted from outside the source while the run
+is paused; ``regions`` drives one engine per region that way.
+"""
+
+from __future__ import annotations
+
+import heapq
+import itertools
+from collections import deque
+from fractions import Fraction
+from dataclasses import dataclass, field
+from typing import (TYPE_CHECKING, Any, Callable, Dict, Iterable, Iterator, List, Optional,
+                    Tuple, Union)
+
+import numpy as np
+
+from .dag import TaskGraph, graph_of
+from .models import COMPLETED, PENDING, RUNNING, Task, VM
+from .packing import pack_tasks
+from .placement import FIRST_FIT, make_index
+from .schedulers import (AGING, EDF, FCFS, HEFT, MLFQ, PREEMPTIVE, PRIORITY, ROUND_ROBIN,
+                         SCHEDULERS, SJF, SRTF, Scheduler, exact, make_scheduler)
+from .stats import StatsAccumulator
+from .taskstore import TaskTable
+
+if TYPE_CHECKING:
+    from .autoscale import Autoscaler
+    from .checkpoint import Checkpointer
+    from .instrument import Instrumentation
+
+# Event kinds, as they appear in the event log.
+ARRIVE = 'arrive'
+START = 'start'
+FINISH = 'finish'
+PREEMPT = 'preempt'
+# Fleet events; these are not logged.
+SCALE = 'scale'
+READY = 'ready'
+
+# Ordering of simultaneous events: releases before arrivals, then fleet
+# changes.
+_RELEASE_RANK = 0
+_ARRIVAL_RANK = 1
+_FLEET_RANK = 2
+
+DEFAULT_CPU_COST = 4.0   # INR per core-hour
+DEFAULT_RAM_COST = 0.8   # INR per GB-hour
+
+
+def task_cost(task: Task, cpu_cost: float = DEFAULT_CPU_COST,
+              ram_cost: float = DEFAULT_RAM_COST) -> float:
+    """Cost of a task at flat hourly rates, as ``calculateTaskCost`` does."""
+    hours = (task.execution_time or 0) / 3600.0
+    return task.cpu_required * cpu_cost * hours + task.ram_required * ram_cost * hours
+
+
+@dataclass
+class SimulationResult:
+    """Outcome of a headless run."""
+
+    scheduler: str
+    completed: List[Task]
+    unscheduled: List[Task]
+    stats: Dict[str, Any]
+    events: List[Tuple[float, str, int, Optional[int]]] = field(default_factory=list)
+    table: Optional[TaskTable] = None
+    instrumentation: Optional[Dict[str, Any]] = None
+    # served from a ``cache.ResultCache`` rather than simulated
+    cached: bool = False
+
+    def completed_dicts(self) -> List[Dict[str, Any]]:
+        if self.table is not None:
+            return list(self.table.to_dicts(np.flatnonzero(self.table.completed_mask()).tolist()))
+        return [t.to_dict() for t in self.completed]
+
+    def to_dict(self) -> Dict[str, Any]:
+        body = {
+            'scheduler': self.scheduler,
+            'completed_tasks': self.completed_dicts(),
+            'unscheduled_tasks': [t.to_dict() for t in self.unscheduled],
+            'statistics': self.stats,
+            'events': [list(e) for e in self.events],
+            'cached': self.cached,
+        }
+        if self.instrumentation is not None:
+            body['instrumentation'] = self.instrumentation
+        return body
+
+
+class Simulation:
+    """Event-driven replacement for the ``setInterval`` tick loop."""
+
+    def __init__(self, vms: Iterable[VM], tasks: Union[Iterable[Task], TaskTable],
+                 scheduler: Union[str, Scheduler] = FCFS, time_quantum: float = 2.0,
+                 placement: str = FIRST_FIT,
+                 cpu_cost: float = DEFAULT_CPU_COST,
+                 ram_cost: float = DEFAULT_RAM_COST,
+                 batch_packing: bool = False,
+                 context_switch: float = 0.0,
+                 record_events: bool = False,
+                 on_complete: Optional[Callable[[Task], None]] = None,
+                 instrument: Optional['Instrumentation'] = None,
+                 scheduler_options: Optional[Dict[str, Any]] = None,
+                 autoscaler: Optional['Autoscaler'] = None,
+                 graph: Optional[TaskGraph] = None) -> None:
+        if isinstance(scheduler, Scheduler):
+            self.policy = scheduler
+        else:
+            self.policy = make_scheduler(scheduler, time_quantum, scheduler_options)
+        if context_switch < 0:
+            raise ValueError('context_switch must be non-negative')
+
+        self.vms = list(vms)
+        self.scheduler = self.policy.name
+        self.time_quantum = self.policy.time_quantum
+        self.context_switch = float(context_switch)
+        self.cpu_cost = cpu_cost
+        self.ram_cost = ram_cost
+        self.placement = placement
+        self.batch_packing = batch_packing
+        self.record_events = record_events
+        self.on_complete = on_complete
+        self.instrument = instrument
+        self.autoscaler: Optional['Autoscaler'] = None
+        # more arrivals may still be ``submit``-ted, so an empty queue is
+        # only a lull, not the end of the run
+        self.open = False
+
+        self.now = 0.0
+        self.completed: List[Task] = []
+        self.events: List[Tuple[float, str, int, Optional[int]]] = []
+
+        self._queue: list = []
+        self._seq = itertools.count()
+        self._vm_index = {vm.id: i for i, vm in enumerate(self.vms)}
+        self._index = make_index(placement, self.vms)
+        for vm in self.vms:
+            if not vm.in_service:
+                self._index.remove(vm)
+        # keyed policies: a heap of (key, seq, task) per (cpu, ram) class.
+        # FIFO policies (RR, MLFQ): one FIFO per level, highest first.
+        self._pending: Dict[Tuple[int, int], list] = {}
+        self._levels: Optional[List[deque]] = (
+            [deque() for _ in range(self.policy.levels)] if self.policy.levels else None)
+        self._sliced = self.policy.preemptive
+        # sliced policies: exact remaining work of dispatched-but-unfinished
+        # tasks (as of the end of their current slice), and the exact
+        # instants behind the float times of pending slice ends
+        self._work: Dict[int, Union[int, Fraction]] = {}
+        self._exact_at: Dict[float, Union[int, Fraction]] = {}
+        self._clock: Optional[Union[int, Fraction]] = 0
+        self._switch = exact(self.context_switch)
+        self._arrivals: List[Task] = []
+        self._full_pass = True
+        self._released: List[VM] = []
+        self._touched: set = set()
+
+        self.stats = StatsAccumulator(
+            total_cores=sum(vm.total_cores for vm in self.vms if vm.in_service),
+            total_ram=sum(vm.total_ram for vm in self.vms if vm.in_service),
+        )
+        self.stats.allocate(sum(vm.total_cores - vm.available_cores for vm in self.vms),
+                            sum(vm.total_ram - vm.available_ram for vm in self.vms))
+
+        # the arrival-ordered source and, unless it is a stream, the
+        # sequence (tasks or table rows) behind it; ``_fed`` counts what has
+        # been taken from it, so a checkpoint knows where the source stands
+        self._backlog: Optional[Union[List[Task], np.ndarray]] = None
+        self._fed = 0
+        if isinstance(tasks, TaskTable):
+            self.table: Optional[TaskTable] = tasks
+            self._backlog = tasks.pending_order()
+            self._source = tasks.iter_rows(self._backlog)
+        elif isinstance(tasks, Iterator):
+            self.table = None
+            self._source = tasks
+        else:
+            self.table = None
+            self._backlog = sorted(tasks, key=lambda t: t.arrival_time)
+            self._source = iter(self._backlog)
+            if graph is None:
+                graph = graph_of(self._backlog)
+        # per graph node, the parents still to finish; arrived tasks held
+        # back by them, by node
+        self.graph = graph
+        self._unfinished: List[int] = list(graph.indegree) if graph is not None else []
+        self._held: Dict[int, Task] = {}
+        self.policy.bind_graph(graph)
+        self._feed()
+        if autoscaler is not None:
+            autoscaler.attach(self)
+        if instrument is not None:
+            instrument.attach(self)
+
+    # -- event queue ---------------------------------------------------
+
+    def _push(self, time: float, rank: int, key: int, kind: str,
+              task: Optional[Task], vm: Optional[VM]) -> None:
+        heapq.heappush(self._queue, (time, rank, key, next(self._seq), kind, task, vm))
+
+    def _feed(self) -> None:
+        """Queue the next arrival from the (arrival-ordered) task source."""
+        task = next(self._source, None)
+        if task is None:
+            return
+        self._fed += 1
+        if task.arrival_time < self.now:
+            raise ValueError('task %d arrives at %s, before the current time %s; '
+                             'tasks must be ordered by arrival_time'
+                             % (task.id, task.arrival_time, self.now))
+        self._push(task.arrival_time, _ARRIVAL_RANK, 0, ARRIVE, task, None)
+
+    def submit(self, tasks: Iterable[Task]) -> None:
+        """Queue arrivals from outside the task source, such as tasks a
+        ``regions`` dispatcher routes here between windows.
+
+        They need not be in order, but none may arrive before ``now``.  In
+        a table-backed run each task must have a row in ``table`` (see
+        ``TaskTable.append_rows``).  Set ``open`` while more may follow.
+        """
+        for task in tasks:
+            if task.arrival_time < self.now:
+                raise ValueError('task %d arrives at %s, before the current time %s'
+                                 % (task.id, task.arrival_time, self.now))
+            self._push(task.arrival_time, _ARRIVAL_RANK, 0, ARRIVE, task, None)
+
+    def _log(self, kind: str, task: Task, vm: Optional[VM]) -> None:
+        if self.record_events:
+            self.events.append((self.now, kind, task.id, vm.id if vm else None))
+
+    def _advance(self, time: float) -> None:
+        self.stats.advance(time)
+        self.now = time
+        self._clock = self._exact_at.pop(time, None)
+
+    # -- allocation ----------------------------------------------------
+
+    def _find_vm(self, task: Task) -> Optional[VM]:
+        return self._index.find(task.cpu_required, task.ram_required)
+
+    def _start(self, task: Task, vm: VM) -> None:
+        vm.allocate(task)
+        self._index.update(vm)
+        self.stats.allocate(task.cpu_required, task.ram_required)
+        task.status = RUNNING
+        if task.start_time is None:
+            task.start_time = self.now
+        rank_key = self._vm_index[vm.id]
+        if self._sliced:
+            self._start_slice(task, vm, rank_key)
+        else:
+            task.end_time = self.now + task.remaining_time
+            self._push(task.end_time, _RELEASE_RANK, rank_key, FINISH, task, vm)
+        self._log(START, task, vm)
+
+    def _start_slice(self, task: Task, vm: VM, rank_key: int) -> None:
+        """Schedule the end of a time slice from exact times."""
+        work = self._work.get(id(task))
+        if work is None:
+            work = self._work[id(task)] = exact(task.remaining_time)
+        if self._clock is None:
+            self._clock = exact(self.now)
+        end = self._clock
+        if self.context_switch:
+            end += self._switch
+            self.stats.context_switch(self.context_switch)
+        quantum = self.policy.quantum(task)
+        if work <= quantum:
+            end += work
+            kind = FINISH
+        else:
+            end += quantum
+            kind = PREEMPT
+            # what is left once this slice ends
+            self._work[id(task)] = work - quantum
+        time = float(end)
+        self._exact_at.setdefault(time, end)
+        self._push(time, _RELEASE_RANK, rank_key, kind, task, vm)
+
+    def _release(self, task: Task, vm: VM) -> None:
+        vm.release(task)
+        self._index.update(vm)
+        self._released.append(vm)
+        self.stats.release(task.cpu_required, task.ram_required)
+
+    # -- event handlers ------------------------------------------------
+
+    def _on_arrive(self, task: Task) -> None:
+        self._feed()
+        self.stats.total_tasks += 1
+        task.status = PENDING
+        if self.graph is not None:
+            node = self.graph.index.get(task.id)
+            if node is not None and self._unfinished[node]:
+                self._held[node] = task
+                self._log(ARRIVE, task, None)
+                return
+        if self.batch_packing:
+            self._arrivals.append(task)
+        else:
+            self._enqueue(task)
+        self._log(ARRIVE, task, None)
+
+    def _on_finish(self, task: Task, vm: VM) -> None:
+        self._release(task, vm)
+        task.status = COMPLETED
+        task.end_time = self.now
+        task.remaining_time = 0.0
+        if self._work:
+            self._work.pop(id(task), None)
+        if self._sliced:
+            self.policy.finished(task)
+        task.cost = task_cost(task, self.cpu_cost, self.ram_cost)
+        if self.table is not None:
+            self.table.record(task)
+        elif self.on_complete is not None:
+            self.on_complete(task)
+        else:
+            self.completed.append(task)
+        self.stats.complete(task)
+        self._log(FINISH, task, vm)
+        if self.graph is not None:
+            self._release_children(task)
+
+    def _release_children(self, task: Task) -> None:
+        """Queue the held children whose last unfinished parent was ``task``."""
+        node = self.graph.index.get(task.id)
+        if node is None:
+            return
+        unfinished = self._unfinished
+        for child in self.graph.children(node):
+            unfinished[child] -= 1
+            if not unfinished[child]:
+                held = self._held.pop(child, None)
+                if held is not None:
+                    self._enqueue(held)
+
+    def _on_preempt(self, task: Task, vm: VM) -> None:
+        self._release(task, vm)
+        task.status = PENDING
+        work = self._work[id(task)]
+        task.remaining_time = float(work)
+        self.stats.preemptions += 1
+        self.policy.preempted(task)
+        self._enqueue(task)
+        self._log(PREEMPT, task, vm)
+
+    def _enqueue(self, task: Task) -> None:
+        if self._levels is not None:
+            self._levels[self.policy.level(task)].append(task)
+            return
+        key = self.policy.key(task, self.now)
+        cls = (task.cpu_required, task.ram_required)
+        self._touched.add(cls)
+        heapq.heappush(self._pending.setdefault(cls, []), (key, next(self._seq), task))
+
+    # -- dispatch ------------------------------------------------------
+
+    def _dispatch(self) -> None:
+        if self._levels is not None:
+            self._dispatch_fifo()
+            return
+
+        # Walk the pending tasks in scheduler order by merging the class
+        # heads.  Capacity only shrinks during a pass, so once a class fails
+        # to fit, it and every class at least as large are skipped for the
+        # rest of the pass.  A pass ends with nothing placeable, so the next
+        # one only needs the classes that gained tasks plus those that fit
+        # the VMs released in between.
+        pending = self._pending
+        if self._full_pass:
+            classes = set(pending)
+        else:
+            classes = {cls for cls in self._touched if cls in pending}
+            if self._released:
+                max_cores = max(vm.available_cores for vm in self._released)
+                max_ram = max(vm.available_ram for vm in self._released)
+                classes.update(cls for cls in pending
+                               if cls[0] <= max_cores and cls[1] <= max_ram)
+        self._full_pass = False
+        self._released.clear()
+        self._touched.clear()
+        heads = [(pending[cls][0][0], pending[cls][0][1], cls) for cls in classes]
+        heapq.heapify(heads)
+        failed: List[Tuple[int, int]] = []
+        while heads:
+            cls = heapq.heappop(heads)[2]
+            cpu, ram = cls
+            vm = None
+            for c, r in failed:
+                if c <= cpu and r <= ram:
+                    break
+            else:
+                vm = self._index.find(cpu, ram)
+                if vm is None:
+                    failed.append(cls)
+            if vm is None:
+                continue
+            queue = pending[cls]
+            task = heapq.heappop(queue)[2]
+            self._start(task, vm)
+            if queue:
+                heapq.heappush(heads, (queue[0][0], queue[0][1], cls))
+            else:
+                del pending[cls]
+
+    def _dispatch_fifo(self) -> None:
+        levels = self._levels
+        # FIFO dispatch never looks at which VMs were released
+        self._released.clear()
+        if self.policy.boost_due(self.now):
+            top = levels[0]
+            for level in levels[1:]:
+                top.extend(level)
+                level.clear()
+        for level in levels:
+            while level:
+                task = level[0]
+                vm = self._find_vm(task)
+                if vm is None:
+                    return
+                level.popleft()
+                self._start(task, vm)
+
+    def _pack_arrivals(self) -> None:
+        batch, self._arrivals = self._arrivals, []
+        if self._levels is not None and any(self._levels):
+            # the FIFOs still have waiting tasks; newcomers queue behind them
+            for task in batch:
+                self._enqueue(task)
+            return
+        vms = self.vms if self.autoscaler is None else [vm for vm in self.vms if vm.in_service]
+        for task, vm in zip(batch, pack_tasks(vms, batch, self.placement)):
+            if vm is None:
+                self._enqueue(task)
+            else:
+                self._start(task, vm)
+
+    # -- driver --------------------------------------------------------
+
+    def _handle_events(self, time: float) -> None:
+        while self._queue and self._queue[0][0] == time:
+            _, _, _, _, kind, task, vm = heapq.heappop(self._queue)
+            if kind == ARRIVE:
+                self._on_arrive(task)
+            elif kind == FINISH:
+                self._on_finish(task, vm)
+            elif kind == PREEMPT:
+                self._on_preempt(task, vm)
+            elif kind == READY:
+                self._on_ready(vm)
+            else:
+                self.autoscaler.due = True
+
+    def _place(self) -> None:
+        self._dispatch()
+        if self._arrivals:
+            self._pack_arrivals()
+        if self.autoscaler is not None:
+            self.autoscaler.after_step()
+
+    # -- fleet changes (driven by ``autoscale``) -------------------------
+
+    def launch_vm(self, vm: VM, delay: float) -> None:
+        """Add ``vm`` to the fleet now; it takes tasks after ``delay`` seconds."""
+        if vm.id in self._vm_index:
+            raise ValueError('VM %d is already in the fleet' % vm.id)
+        vm.launched_at = self.now
+        vm.ready_at = None
+        vm.terminated_at = None
+        self._vm_index[vm.id] = len(self.vms)
+        self.vms.append(vm)
+        self._push(self.now + delay, _FLEET_RANK, 0, READY, None, vm)
+
+    def _on_ready(self, vm: VM) -> None:
+        if vm.terminated_at is not None:
+            return  # cancelled while provisioning
+        vm.ready_at = self.now
+        self._index.add(vm)
+        self._released.append(vm)
+        self.stats.resize(vm.total_cores, vm.total_ram)
+
+    def retire_vm(self, vm: VM) -> None:
+        """Terminate an idle or still-provisioning VM.
+
+        It stays in ``vms`` (with ``terminated_at`` set) so that its uptime
+        can be billed.
+        """
+        if vm.running:
+            raise ValueError('VM %d is still running tasks' % vm.id)
+        if vm.terminated_at is not None:
+            return
+        if vm.in_service:
+            self._index.remove(vm)
+            self.stats.resize(-vm.total_cores, -vm.total_ram)
+        vm.terminated_at = self.now
+
+    def schedule_scaling(self, time: float) -> None:
+        """Queue an autoscaler evaluation at ``time``."""
+        self._push(time, _FLEET_RANK, 0, SCALE, None, None)
+
+    def step(self) -> bool:
+        """Process every event at the next event time, then dispatch.
+
+        Returns False once the event queue is exhausted.  (An attached
+        ``Instrumentation`` replaces this with a timed copy.)
+        """
+        if not self._queue:
+            return False
+        time = self._queue[0][0]
+        self._advance(time)
+        self._handle_events(time)
+        self._place()
+        return True
+
+    def run(self, until: Optional[float] = None,
+            checkpointer: Optional['Checkpointer'] = None) -> SimulationResult:
+        """Run to completion, or until the next event lies beyond ``until``.
+
+        A ``checkpoint.Checkpointer`` is offered the state after every step
+        and saves it whenever one is due.
+        """
+        self._run(until, checkpointer)
+        return self.result()
+
+    def run_until(self, until: float) -> None:
+        """``run(until)`` without building a result, for callers that
+        advance a run in many short windows."""
+        self._run(until, None)
+
+    def _run(self, until: Optional[float], checkpointer: Optional['Checkpointer']) -> None:
+        instrument = self.instrument
+        if instrument is not None:
+            instrument.begin(self)
+        try:
+            while self._queue:
+                if until is not None and self._queue[0][0] > until:
+                    self._advance(until)
+                    break
+                self.step()
+                if checkpointer is not None and checkpointer.due(self):
+                    checkpointer.save(self)
+        finally:
+            if instrument is not None:
+                instrument.end(self)
+
+    def set_scheduler(self, scheduler: Union[str, Scheduler], time_quantum: Optional[float] = None,
+                      scheduler_options: Optional[Dict[str, Any]] = None) -> None:
+        """Switch policy mid-run, e.g. for a what-if fork of a checkpoint.
+
+        Waiting tasks are re-queued under the new policy in their current
+        order, as if they had all arrived now.  Running tasks finish the
+        run or slice they were dispatched for; a preempted task keeps the
+        work it has done.
+        """
+        if isinstance(scheduler, Scheduler):
+            policy = scheduler
+        else:
+            quantum = self.time_quantum if time_quantum is None else time_quantum
+            policy = make_scheduler(scheduler, quantum, scheduler_options)
+        waiting = self.unscheduled()
+        self.policy = policy
+        self.scheduler = policy.name
+        self.time_quantum = policy.time_quantum
+        self._pending = {}
+        self._levels = [deque() for _ in range(policy.levels)] if policy.levels else None
+        self._sliced = policy.preemptive
+        self._touched.clear()
+        self._full_pass = True
+        policy.bind_graph(self.graph)
+        for task in waiting:
+            self._enqueue(task)
+
+    def unscheduled(self) -> List[Task]:
+        if self._levels is not None:
+            return [task for level in self._levels for task in level]
+        entries = sorted(entry for queue in self._pending.values() for entry in queue)
+        return [entry[2] for entry in entries]
+
+    def pending_count(self) -> int:
+        """Number of tasks waiting for a VM."""
+        if self._levels is not None:
+            return sum(len(level) for level in self._levels)
+        return sum(len(queue) for queue in self._pending.values())
+
+    def queue_length(self) -> int:
+        """Number of queued events: arrivals, slice ends and fleet changes."""
+        return len(self._queue)
+
+    def drop_fleet_events(self) -> bool:
+        """Clear the event queue if no queued event carries a task.
+
+        Returns True when the queue is empty afterwards.  Fleet events on
+        their own never finish a task, so once the workload has drained
+        they would only stretch the run.
+        """
+        if any(entry[5] is not None for entry in self._queue):
+            return False
+        self._queue.clear()
+        return True
+
+    def waiting_demand(self) -> Tuple[int, int]:
+        """Most cores and most RAM asked for by a task next in line.
+
+        Keyed policies can start any waiting task, so every (cpu, ram)
+        class counts; FIFO policies only the head of each level.
+        """
+        if self._levels is not None:
+            classes = [(level[0].cpu_required, level[0].ram_required)
+                       for level in self._levels if level]
+        else:
+            classes = list(self._pending)
+        return (max((cpu for cpu, _ in classes), default=0),
+                max((ram for _, ram in classes), default=0))
+
+    def statistics(self) -> Dict[str, Any]:
+        """Aggregate stats as shown by ``updateStats``.
+
+        ``cpu_utilization`` and ``ram_utilization`` are averaged over the
+        elapsed simulated time, so they stay meaningful for a finished run;
+        the ``current_*`` variants are the instantaneous values.  An
+        autoscaled run adds its fleet's uptime cost and scaling counts, and
+        a run with dependencies the graph's size and ``critical_path``.
+        """
+        stats = self.stats.snapshot()
+        if self.autoscaler is not None:
+            stats.update(self.autoscaler.statistics())
+        if self.graph is not None:
+            stats.update(self.graph.statistics())
+            stats['held_tasks'] = len(self._held)
+        return stats
+
+    def result(self) -> SimulationResult:
+        return SimulationResult(
+            scheduler=self.scheduler,
+            completed=list(self.completed),
+            unscheduled=self.unscheduled() + list(self._held.values()),
+            stats=self.statistics(),
+            events=list(self.events),
+            table=self.table,
+            instrumentation=self.instrument.summary() if self.instrument else None,
+        )
+
+
+def simulate(vms: Iterable[VM], tasks: Iterable[Task], scheduler: str = FCFS,
+             **options: Any) -> SimulationResult:
+    """Run a workload to completion and return its result."""
+    return Simulation(vms, tasks, scheduler=scheduler, **options).run()
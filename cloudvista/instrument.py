@@ -0,0 +1,380 @@
+"""Opt-in instrumentation of the simulation loop.
+
+There was no way to tell which part of a run dominates at scale.  An
+``Instrumentation`` attached to a ``Simulation`` times each phase of every
+step:
+
+* ``advance`` - moving the clock and integrating utilization;
+* ``events`` - handling the completions, quantum expiries and arrivals
+  due at that instant;
+* ``dispatch`` - placing pending tasks on VMs;
+
+and records event counts, event-queue and pending-task depths, and
+placement attempts (index lookups, and how many found no VM).  Optionally
+the whole run is profiled with cProfile, and the first ``trace_limit``
+steps are written as a Chrome trace (open in ``chrome://tracing`` or
+Perfetto).
+
+Without an instrument the engine's step is untouched, so the cost when
+disabled is one ``is None`` check per run.  With one, samples go into
+plain local counters and are merged into the process-wide ``REGISTRY``
+once the run ends; ``REGISTRY.render()`` is what ``/metrics`` serves in
+the Prometheus text format.
+"""
+
+from __future__ import annotations
+
+import bisect
+import cProfile
+import json
+import threading
+import time
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+PHASES = ('advance', 'events', 'dispatch')
+
+# seconds, 1us .. ~4s
+TIME_BUCKETS = tuple(1e-6 * 4 ** i for i in range(12))
+DEPTH_BUCKETS = (0, 1, 10, 100, 1000, 10000, 100000, 1000000)
+RUN_BUCKETS = (0.01, 0.1, 0.5, 1, 5, 10, 30, 60, 300, 900)
+
+
+def _label_text(names: Sequence[str], values: Tuple[str, ...],
+                extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = list(zip(names, values))
+    if extra is not None:
+        pairs.append(extra)
+    if not pairs:
+        return ''
+    return '{%s}' % ','.join('%s="%s"' % (k, str(v).replace('\\', '\\\\').replace('"', '\\"'))
+                             for k, v in pairs)
+
+
+def _number(value: float) -> str:
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    """Monotonic counter, one value per label combination."""
+
+    kind = 'counter'
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = ()) -> None:
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self._lock = threading.Lock()
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1, **labels: str) -> None:
+        key = tuple(str(labels[name]) for name in self.labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels: str) -> float:
+        return self._values.get(tuple(str(labels[name]) for name in self.labels), 0)
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return ['%s%s %s' % (self.name, _label_text(self.labels, key), _number(value))
+                for key, value in items]
+
+
+class Histogram:
+    """Cumulative-bucket histogram, one series per label combination."""
+
+    kind = 'histogram'
+
+    def __init__(self, name: str, help: str, buckets: Sequence[float],
+                 labels: Sequence[str] = ()) -> None:
+        self.name = name
+        self.help = help
+        self.buckets = tuple(buckets)
+        self.labels = tuple(labels)
+        self._lock = threading.Lock()
+        # label values -> [per-bucket counts (+Inf last), sum]
+        self._series: Dict[Tuple[str, ...], list] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        counts = [0] * (len(self.buckets) + 1)
+        counts[bisect.bisect_left(self.buckets, value)] = 1
+        self.merge(counts, value, **labels)
+
+    def merge(self, counts: Sequence[int], total: float, **labels: str) -> None:
+        """Add pre-bucketed observations (``counts`` as from ``LocalHistogram``)."""
+        key = tuple(str(labels[name]) for name in self.labels)
+        with self._lock:
+            series = self._series.setdefault(key, [[0] * (len(self.buckets) + 1), 0.0])
+            for i, count in enumerate(counts):
+                series[0][i] += count
+            series[1] += total
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = sorted((key, (list(s[0]), s[1])) for key, s in self._series.items())
+        lines = []
+        for key, (counts, total) in items:
+            running = 0
+            for bound, count in zip(self.buckets + (float('inf'),), counts):
+                running += count
+                lines.append('%s_bucket%s %d' % (self.name, _label_text(
+                    self.labels, key, ('le', _number(float(bound)))), running))
+            lines.append('%s_sum%s %s' % (self.name, _label_text(self.labels, key), _number(total)))
+            lines.append('%s_count%s %d' % (self.name, _label_text(self.labels, key), running))
+        return lines
+
+
+class Registry:
+    """The metrics served by ``/metrics``."""
+
+    def __init__(self) -> None:
+        self._metrics: Dict[str, Any] = {}
+        self._lock = threading.Lock()
+
+    def _add(self, metric: Any) -> Any:
+        with self._lock:
+            return self._metrics.setdefault(metric.name, metric)
+
+    def counter(self, name: str, help: str, labels: Sequence[str] = ()) -> Counter:
+        return self._add(Counter(name, help, labels))
+
+    def histogram(self, name: str, help: str, buckets: Sequence[float],
+                  labels: Sequence[str] = ()) -> Histogram:
+        return self._add(Histogram(name, help, buckets, labels))
+
+    def render(self) -> str:
+        """Prometheus text exposition format (version 0.0.4)."""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.append('# HELP %s %s' % (metric.name, metric.help))
+            lines.append('# TYPE %s %s' % (metric.name, metric.kind))
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = Registry()
+RUNS = REGISTRY.counter('cloudvista_simulations_total', 'Finished simulation runs.',
+                        ['scheduler'])
+RUN_SECONDS = REGISTRY.histogram('cloudvista_simulation_seconds',
+                                 'Wall-clock time of a simulation run.', RUN_BUCKETS,
+                                 ['scheduler'])
+TASKS = REGISTRY.counter('cloudvista_tasks_completed_total', 'Tasks completed by runs.',
+                         ['scheduler'])
+STEPS = REGISTRY.counter('cloudvista_steps_total', 'Engine steps (distinct event times) '
+                         'in instrumented runs.', ['scheduler'])
+EVENTS = REGISTRY.counter('cloudvista_events_total', 'Events handled in instrumented runs.',
+                          ['scheduler', 'kind'])
+PHASE_SECONDS = REGISTRY.histogram('cloudvista_phase_seconds',
+                                   'Time spent per step in each phase of the loop.',
+                                   TIME_BUCKETS, ['scheduler', 'phase'])
+EVENT_QUEUE = REGISTRY.histogram('cloudvista_event_queue_depth',
+                                 'Event-queue length after each step.', DEPTH_BUCKETS,
+                                 ['scheduler'])
+PENDING = REGISTRY.histogram('cloudvista_pending_tasks',
+                             'Tasks waiting for a VM after each step.', DEPTH_BUCKETS,
+                             ['scheduler'])
+PLACEMENTS = REGISTRY.counter('cloudvista_placement_attempts_total',
+                              'Placement-index lookups, by outcome.', ['scheduler', 'result'])
+CACHE_LOOKUPS = REGISTRY.counter('cloudvista_result_cache_lookups_total',
+                                 'Result-cache lookups, by outcome.', ['result'])
+
+
+def record_run(scheduler: str, seconds: float, stats: Dict[str, Any]) -> None:
+    """Per-run metrics; cheap enough to record for every run."""
+    RUNS.inc(scheduler=scheduler)
+    RUN_SECONDS.observe(seconds, scheduler=scheduler)
+    TASKS.inc(stats.get('completed_tasks', 0), scheduler=scheduler)
+
+
+class LocalHistogram:
+    """Unlocked bucket counts for one run, merged into a ``Histogram`` at the end."""
+
+    __slots__ = ('buckets', 'counts', 'total', 'peak')
+
+    def __init__(self, buckets: Sequence[float]) -> None:
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.total = 0.0
+        self.peak = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.total += value
+        if value > self.peak:
+            self.peak = value
+
+    @property
+    def count(self) -> int:
+        return sum(self.counts)
+
+
+class CountingIndex:
+    """Wraps a placement index and counts ``find`` calls and misses."""
+
+    def __init__(self, index: Any) -> None:
+        self._inner = index
+        self.attempts = 0
+        self.misses = 0
+
+    def find(self, cpu: int, ram: int) -> Any:
+        self.attempts += 1
+        vm = self._inner.find(cpu, ram)
+        if vm is None:
+            self.misses += 1
+        return vm
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._inner, name)
+
+
+class Instrumentation:
+    """Per-phase timings and counters for one simulation run."""
+
+    def __init__(self, metrics: bool = True,
+                 profile_path: Optional[str] = None, trace_path: Optional[str] = None,
+                 trace_limit: int = 100000) -> None:
+        self.metrics = metrics
+        self.profile_path = profile_path
+        self.trace_path = trace_path
+        self.trace_limit = trace_limit
+        self.phases = {name: LocalHistogram(TIME_BUCKETS) for name in PHASES}
+        self.event_queue = LocalHistogram(DEPTH_BUCKETS)
+        self.pending = LocalHistogram(DEPTH_BUCKETS)
+        self.steps = 0
+        self.wall_seconds = 0.0
+        self._simulation: Any = None
+        self._index: Optional[CountingIndex] = None
+        self._profiler: Optional[cProfile.Profile] = None
+        self._trace: List[Tuple[float, float, float, float]] = []
+        self._started: Optional[float] = None
+        self._baseline: Optional[Tuple[int, int, int]] = None
+        self._published = False
+
+    def attach(self, simulation: Any) -> None:
+        """Swap in a timed ``step`` and a counting placement index."""
+        if self._simulation is not None:
+            raise ValueError('an Instrumentation can only be attached to one simulation')
+        self._simulation = simulation
+        self._index = CountingIndex(simulation._index)
+        simulation._index = self._index
+        simulation.step = self._step
+
+    def _step(self) -> bool:
+        simulation = self._simulation
+        queue = simulation._queue
+        if not queue:
+            return False
+        clock = time.perf_counter
+        t0 = clock()
+        now = queue[0][0]
+        simulation._advance(now)
+        t1 = clock()
+        simulation._handle_events(now)
+        t2 = clock()
+        simulation._place()
+        t3 = clock()
+
+        advance, events, dispatch = self.phases.values()
+        advance.observe(t1 - t0)
+        events.observe(t2 - t1)
+        dispatch.observe(t3 - t2)
+        self.event_queue.observe(len(queue))
+        self.pending.observe(simulation.pending_count())
+        self.steps += 1
+        if self.trace_path and len(self._trace) < self.trace_limit:
+            self._trace.append((t0, t1, t2, t3))
+        return True
+
+    # -- run boundaries (called by Simulation.run) ---------------------
+
+    def begin(self, simulation: Any) -> None:
+        if self._baseline is None:
+            stats = simulation.stats
+            self._baseline = (stats.total_tasks, stats.completed, stats.preemptions)
+        if self.profile_path and self._profiler is None:
+            self._profiler = cProfile.Profile()
+        if self._profiler is not None:
+            self._profiler.enable()
+        self._started = time.perf_counter()
+
+    def end(self, simulation: Any) -> None:
+        if self._started is not None:
+            self.wall_seconds += time.perf_counter() - self._started
+            self._started = None
+        if self._profiler is not None:
+            self._profiler.disable()
+            self._profiler.dump_stats(self.profile_path)
+        if simulation.queue_length():
+            return  # paused by run(until); the run continues later
+        if self.trace_path:
+            self.write_trace(self.trace_path)
+        if not self._published:
+            self.publish(simulation)
+
+    def event_counts(self, simulation: Any) -> Dict[str, int]:
+        # every event kind moves exactly one stats counter
+        stats = simulation.stats
+        arrived, finished, preempted = self._baseline or (0, 0, 0)
+        return {
+            'arrive': stats.total_tasks - arrived,
+            'finish': stats.completed - finished,
+            'preempt': stats.preemptions - preempted,
+        }
+
+    def publish(self, simulation: Any) -> None:
+        """Merge this run's samples into ``REGISTRY`` (once, when it ends)."""
+        if not self.metrics:
+            return
+        scheduler = simulation.scheduler
+        STEPS.inc(self.steps, scheduler=scheduler)
+        for kind, count in self.event_counts(simulation).items():
+            EVENTS.inc(count, scheduler=scheduler, kind=kind)
+        for name, local in self.phases.items():
+            PHASE_SECONDS.merge(local.counts, local.total, scheduler=scheduler, phase=name)
+        EVENT_QUEUE.merge(self.event_queue.counts, self.event_queue.total, scheduler=scheduler)
+        PENDING.merge(self.pending.counts, self.pending.total, scheduler=scheduler)
+        if self._index is not None:
+            PLACEMENTS.inc(self._index.attempts - self._index.misses,
+                           scheduler=scheduler, result='placed')
+            PLACEMENTS.inc(self._index.misses, scheduler=scheduler, result='no_fit')
+        self._published = True
+
+    def summary(self) -> Dict[str, Any]:
+        """Totals for the run so far, as returned with the result."""
+        phases = {}
+        for name, local in self.phases.items():
+            count = local.count
+            phases[name] = {
+                'seconds': local.total,
+                'mean_us': local.total / count * 1e6 if count else 0.0,
+                'max_us': local.peak * 1e6,
+            }
+        return {
+            'wall_seconds': self.wall_seconds,
+            'phases': phases,
+            'max_event_queue': int(self.event_queue.peak),
+            'max_pending': int(self.pending.peak),
+            'placement_attempts': self._index.attempts if self._index else 0,
+            'placement_misses': self._index.misses if self._index else 0,
+            'profile': self.profile_path,
+            'trace': self.trace_path,
+        }
+
+    def write_trace(self, path: str) -> None:
+        """The recorded steps as Chrome trace events."""
+        if not self._trace:
+            return
+        origin = self._trace[0][0]
+        events = []
+        for t0, t1, t2, t3 in self._trace:
+            for name, start, stop in (('advance', t0, t1), ('events', t1, t2),
+                                      ('dispatch', t2, t3)):
+                events.append({'name': name, 'ph': 'X', 'pid': 1, 'tid': 1,
+                               'ts': (start - origin) * 1e6, 'dur': (stop - start) * 1e6})
+        with open(path, 'w') as out:
+            json.dump({'traceEvents': events, 'displayTimeUnit': 'ms'}, out)
@@ -0,0 +1,188 @@
+"""Task and VM records shared by the simulation engine and the Flask backend."""
+
+from __future__ import annotations
+
+import math
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+PENDING = 'pending'
+RUNNING = 'running'
+COMPLETED = 'completed'
+
+
+@dataclass
+class Task:
+    """A unit of work, mirroring the task objects built by ``submitTask``."""
+
+    id: int
+    name: str
+    cpu_required: int
+    ram_required: int
+    execution_time: float
+    priority: int = 5
+    arrival_time: float = 0.0
+    remaining_time: Optional[float] = None
+    start_time: Optional[float] = None
+    end_time: Optional[float] = None
+    status: str = PENDING
+    cost: float = 0.0
+    vm_id: Optional[int] = None
+    # absolute time the task should finish by (used by EDF)
+    deadline: Optional[float] = None
+    # ids of tasks that must finish before this one starts (see ``dag``)
+    dependencies: List[int] = field(default_factory=list)
+    # row in the backing TaskTable, when the task came from one
+    row: Optional[int] = field(default=None, repr=False, compare=False)
+
+    def __post_init__(self) -> None:
+        if self.remaining_time is None:
+            self.remaining_time = self.execution_time
+
+    @property
+    def wait_time(self) -> float:
+        return (self.start_time or 0.0) - self.arrival_time
+
+    @property
+    def turnaround_time(self) -> float:
+        return (self.end_time or self.start_time or 0.0) - self.arrival_time
+
+    @property
+    def missed_deadline(self) -> bool:
+        return (self.deadline is not None and self.end_time is not None
+                and self.end_time > self.deadline)
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any], default_id: int = 0) -> 'Task':
+        task_id = int(data['id']) if 'id' in data else default_id
+        return cls(
+            id=task_id,
+            name=str(data.get('name') or 'Task-%d' % task_id),
+            cpu_required=_at_least_one(data, 'cpu_required'),
+            ram_required=_at_least_one(data, 'ram_required'),
+            execution_time=_time(data, 'execution_time', 1),
+            priority=int(data.get('priority', 5)),
+            arrival_time=_time(data, 'arrival_time', 0.0),
+            deadline=(_finite(data, 'deadline')
+                      if data.get('deadline') not in (None, '') else None),
+            dependencies=[int(parent) for parent in data.get('dependencies') or ()],
+        )
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'id': self.id,
+            'name': self.name,
+            'cpu_required': self.cpu_required,
+            'ram_required': self.ram_required,
+            'execution_time': self.execution_time,
+            'priority': self.priority,
+            'arrival_time': self.arrival_time,
+            'deadline': self.deadline,
+            'dependencies': list(self.dependencies),
+            'start_time': self.start_time,
+            'end_time': self.end_time,
+            'wait_time': self.wait_time,
+            'turnaround_time': self.turnaround_time,
+            'status': self.status,
+            'cost': self.cost,
+            'vm_id': self.vm_id,
+        }
+
+
+def _finite(data: Dict[str, Any], key: str) -> float:
+    value = float(data[key])
+    # NaN never equals an event time, so the engine would spin on it
+    if not math.isfinite(value):
+        raise ValueError('%s must be a finite number' % key)
+    return value
+
+
+def _time(data: Dict[str, Any], key: str, default: float) -> float:
+    value = _finite(data, key) if key in data else float(default)
+    if value < 0:
+        raise ValueError('%s must not be negative' % key)
+    return value
+
+
+def _at_least_one(data: Dict[str, Any], key: str) -> int:
+    value = int(data.get(key, 1))
+    if value < 1:
+        raise ValueError('%s must be at least 1' % key)
+    return value
+
+
+@dataclass
+class VM:
+    """A virtual machine, mirroring the objects built by ``initializeVMs``.
+
+    A VM runs any number of tasks at once, as long as their combined cores
+    and RAM stay within its totals.  ``running`` is keyed by ``id(task)``
+    rather than ``task.id``, since a replayed trace may repeat job ids.  In
+    an autoscaled fleet (see ``autoscale``) it is launched, takes tasks once
+    ready and is terminated during the run; a VM still provisioning has no
+    ``ready_at``.
+    """
+
+    id: int
+    total_cores: int
+    total_ram: int
+    storage: int = 100
+    available_cores: Optional[int] = None
+    available_ram: Optional[int] = None
+    running: Dict[int, Task] = field(default_factory=dict)
+    instance_type: Optional[str] = None
+    launched_at: float = 0.0
+    ready_at: Optional[float] = 0.0
+    terminated_at: Optional[float] = None
+
+    def __post_init__(self) -> None:
+        if self.available_cores is None:
+            self.available_cores = self.total_cores
+        if self.available_ram is None:
+            self.available_ram = self.total_ram
+
+    @property
+    def in_service(self) -> bool:
+        """Ready for tasks and not yet terminated."""
+        return self.ready_at is not None and self.terminated_at is None
+
+    def uptime(self, now: float) -> float:
+        """Seconds from launch to termination, or to ``now`` if still up."""
+        end = now if self.terminated_at is None else self.terminated_at
+        return max(0.0, end - self.launched_at)
+
+    def fits(self, task: Task) -> bool:
+        return (self.available_cores >= task.cpu_required and
+                self.available_ram >= task.ram_required)
+
+    def allocate(self, task: Task) -> None:
+        self.running[id(task)] = task
+        self.available_cores -= task.cpu_required
+        self.available_ram -= task.ram_required
+        task.vm_id = self.id
+
+    def release(self, task: Task) -> None:
+        del self.running[id(task)]
+        self.available_cores += task.cpu_required
+        self.available_ram += task.ram_required
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'id': self.id,
+            'total_cores': self.total_cores,
+            'available_cores': self.available_cores,
+            'total_ram': self.total_ram,
+            'available_ram': self.available_ram,
+            'storage': self.storage,
+            'running_tasks': [task.id for task in self.running.values()],
+            'instance_type': self.instance_type,
+            'launched_at': self.launched_at,
+            'ready_at': self.ready_at,
+            'terminated_at': self.terminated_at,
+        }
+
+
+def make_vms(count: int, cores: int, ram: int, storage: int = 100) -> List[VM]:
+    """Build ``count`` identical VMs, as ``initializeVMs`` does."""
+    return [VM(id=i + 1, total_cores=cores, total_ram=ram, storage=storage)
+            for i in range(count)]
@@ -0,0 +1,441 @@
+"""Monte Carlo replications of a workload.
+
+Every task has a fixed ``executionTime``, so a run is one deterministic
+sample of what the fleet would see.  ``replicate`` re-runs a workload N
+times with durations and arrivals drawn from distributions and
+``summarize`` reports the mean and a confidence interval of each metric::
+
+    report = run_monte_carlo(table, make_vms(10, 8, 32), replications=200,
+                             durations={'kind': 'lognormal', 'sigma': 0.5},
+                             arrivals='exponential', workers=8)
+    report['metrics']['p95_wait_time']   # {'mean': ..., 'ci_low': ..., ...}
+
+Distributions (``make_distribution``):
+
+* ``fixed`` - the workload's own values (the default);
+* ``lognormal`` - the value times a lognormal factor with shape
+  ``sigma`` and mean 1, so the offered load is unchanged;
+* ``exponential`` - exponential with the value as its mean;
+* ``empirical`` - drawn with replacement from ``values`` (e.g. the
+  durations of a real trace), or from the workload's own values.
+
+Durations are drawn per task around its ``execution_time``.  Arrivals
+are redrawn as a renewal process: each gap between consecutive arrivals
+comes from the distribution around the workload's mean gap (so
+``exponential`` gives Poisson arrivals at the observed rate) or, for
+``empirical``, from the observed gaps.  Deadlines keep their slack after
+arrival.  Sampled times are rounded to milliseconds, as trace times are.
+
+Dependencies carry over: a task list's ``dependencies`` (or, for a
+table, a ``graph``) become each replication's ``TaskGraph``, rebuilt
+over the sampled durations so that HEFT ranks and the critical path
+follow the replication rather than the nominal workload.
+
+Each replication draws from its own ``SeedSequence`` child of ``seed``,
+so results do not depend on how replications are spread over workers.
+All of a replication's samples are drawn as whole columns.  With more
+than one worker, the workload is written once into a shared-memory block
+that every worker process maps, rather than being pickled to each of
+them; a replication then only sends its index and seed, and gets back
+one row of metrics.
+
+Run ``python -m cloudvista.montecarlo TRACE --replications 100
+--durations lognormal ...`` to replicate a trace file.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import math
+import os
+import sys
+from abc import ABC, abstractmethod
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from multiprocessing import shared_memory
+from statistics import NormalDist
+from typing import Any, Dict, Iterable, Iterator, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from .autoscale import make_autoscaler
+from .dag import TaskGraph, graph_of
+from .engine import Simulation
+from .models import VM, Task, make_vms
+from .stats import RunningStat
+from .taskstore import TASK_DTYPE, TaskTable
+
+FIXED = 'fixed'
+LOGNORMAL = 'lognormal'
+EXPONENTIAL = 'exponential'
+EMPIRICAL = 'empirical'
+DISTRIBUTIONS = (FIXED, LOGNORMAL, EXPONENTIAL, EMPIRICAL)
+
+METRICS = ('avg_wait_time', 'p95_wait_time', 'avg_turnaround_time', 'cpu_utilization',
+           'ram_utilization', 'total_cost', 'fleet_cost', 'makespan')
+
+# smallest sampled duration, so no task takes zero time
+_MIN_DURATION = 0.001
+
+
+class Distribution(ABC):
+    """Base class: draws a column of values around ``nominal``."""
+
+    kind = ''
+    #: draws from observed values rather than around a central value
+    resamples = False
+
+    @abstractmethod
+    def sample(self, rng: np.random.Generator, nominal: np.ndarray) -> np.ndarray:
+        """One value per entry of ``nominal``."""
+
+    def spec(self) -> Dict[str, Any]:
+        return {'kind': self.kind}
+
+
+class Fixed(Distribution):
+    kind = FIXED
+
+    def sample(self, rng: np.random.Generator, nominal: np.ndarray) -> np.ndarray:
+        return np.array(nominal, dtype=np.float64)
+
+
+class LogNormal(Distribution):
+    kind = LOGNORMAL
+
+    def __init__(self, sigma: float = 0.5) -> None:
+        if sigma < 0:
+            raise ValueError('sigma must be non-negative')
+        self.sigma = float(sigma)
+
+    def sample(self, rng: np.random.Generator, nominal: np.ndarray) -> np.ndarray:
+        # mu = -sigma^2 / 2 gives the factor a mean of 1
+        return nominal * rng.lognormal(-self.sigma ** 2 / 2, self.sigma, len(nominal))
+
+    def spec(self) -> Dict[str, Any]:
+        return {'kind': self.kind, 'sigma': self.sigma}
+
+
+class Exponential(Distribution):
+    kind = EXPONENTIAL
+
+    def sample(self, rng: np.random.Generator, nominal: np.ndarray) -> np.ndarray:
+        return nominal * rng.exponential(1.0, len(nominal))
+
+
+class Empirical(Distribution):
+    kind = EMPIRICAL
+    resamples = True
+
+    def __init__(self, values: Optional[Sequence[float]] = None) -> None:
+        if values is None:
+            self.values: Optional[np.ndarray] = None
+            return
+        self.values = np.asarray(values, dtype=np.float64)
+        if not len(self.values) or np.any(self.values < 0) or not np.all(np.isfinite(self.values)):
+            raise ValueError('empirical values must be a non-empty list of non-negative numbers')
+
+    def sample(self, rng: np.random.Generator, nominal: np.ndarray) -> np.ndarray:
+        values = nominal if self.values is None else self.values
+        if not len(values):
+            return np.array(nominal, dtype=np.float64)
+        return rng.choice(values, len(nominal))
+
+    def spec(self) -> Dict[str, Any]:
+        if self.values is None:
+            return {'kind': self.kind}
+        return {'kind': self.kind, 'values': len(self.values)}
+
+
+_DISTRIBUTIONS = {
+    FIXED: Fixed,
+    LOGNORMAL: LogNormal,
+    EXPONENTIAL: Exponential,
+    EMPIRICAL: Empirical,
+}
+
+
+def make_distribution(spec: Union[None, str, Dict[str, Any], Distribution]) -> Distribution:
+    """Build a distribution from a kind name or ``{"kind": "lognormal", "sigma": 0.5}``."""
+    if isinstance(spec, Distribution):
+        return spec
+    if spec is None:
+        return Fixed()
+    options = {'kind': spec} if isinstance(spec, str) else dict(spec)
+    kind = options.pop('kind', FIXED)
+    try:
+        cls = _DISTRIBUTIONS[kind]
+    except (KeyError, TypeError):
+        raise ValueError('unknown distribution %r (expected one of %s)'
+                         % (kind, ', '.join(DISTRIBUTIONS)))
+    try:
+        return cls(**options)
+    except TypeError as exc:
+        raise ValueError('invalid options for %s distribution: %s' % (kind, exc))
+
+
+# -- sampling ----------------------------------------------------------------
+
+def sample_workload(base: np.ndarray, rng: np.random.Generator,
+                    durations: Distribution, arrivals: Distribution) -> TaskTable:
+    """A fresh table of ``base``'s rows with redrawn durations and arrivals.
+
+    ``base`` must be pending rows in arrival order.
+    """
+    table = TaskTable.from_data(base)
+    data = table.data
+    if not isinstance(durations, Fixed):
+        drawn = durations.sample(rng, base['execution_time'])
+        data['execution_time'] = np.maximum(np.round(drawn, 3), _MIN_DURATION)
+    if not isinstance(arrivals, Fixed) and len(base) > 1:
+        times = base['arrival_time']
+        gaps = np.diff(times)
+        nominal = gaps if arrivals.resamples else np.full(len(gaps), gaps.mean())
+        drawn = np.maximum(arrivals.sample(rng, nominal), 0.0)
+        arrival = np.round(times[0] + np.concatenate([[0.0], np.cumsum(drawn)]), 3)
+        data['deadline'] = base['deadline'] - times + arrival
+        data['arrival_time'] = arrival
+    return table
+
+
+def run_replication(base: np.ndarray, index: int, seed: np.random.SeedSequence,
+                    fleet: Sequence[Tuple[int, int, int, int]], options: Dict[str, Any],
+                    durations: Distribution, arrivals: Distribution,
+                    links: Optional[Tuple[np.ndarray, np.ndarray]] = None) -> Dict[str, Any]:
+    """Sample and simulate one replication; return its metrics row.
+
+    ``links`` are the (parent ids, child ids) of the workload's
+    dependencies, if it has any.
+    """
+    table = sample_workload(base, np.random.default_rng(seed), durations, arrivals)
+    graph = None
+    if links is not None:
+        graph = TaskGraph(base['id'], links[0], links[1], table.data['execution_time'])
+    options = dict(options)
+    spec = options.pop('autoscale', None)
+    simulation = Simulation(
+        [VM(id=vm_id, total_cores=cores, total_ram=ram, storage=storage)
+         for vm_id, cores, ram, storage in fleet],
+        table, autoscaler=make_autoscaler(spec) if spec else None, graph=graph, **options)
+    stats = simulation.run().stats
+    row: Dict[str, Any] = {'replication': index}
+    row.update({name: stats[name] for name in METRICS if name in stats})
+    row['completed_tasks'] = stats['completed_tasks']
+    return row
+
+
+_shared: Optional[shared_memory.SharedMemory] = None
+_worker: Optional[Tuple[Any, ...]] = None
+
+
+def _init_worker(name: str, count: int, *args: Any) -> None:
+    """Map the parent's workload block; it stays read-only here."""
+    global _shared, _worker
+    _shared = shared_memory.SharedMemory(name=name)
+    base = np.ndarray(count, dtype=TASK_DTYPE, buffer=_shared.buf)
+    _worker = (base,) + args
+
+
+def _run_in_worker(index: int, seed: np.random.SeedSequence) -> Dict[str, Any]:
+    assert _worker is not None, 'worker was not initialised with a workload'
+    base, fleet, options, durations, arrivals, links = _worker
+    return run_replication(base, index, seed, fleet, options, durations, arrivals, links)
+
+
+def replicate(tasks: Union[TaskTable, Iterable[Task]], vms: Sequence[VM],
+              replications: int = 30,
+              durations: Union[None, str, Dict[str, Any], Distribution] = None,
+              arrivals: Union[None, str, Dict[str, Any], Distribution] = None,
+              seed: int = 0, workers: Optional[int] = None,
+              graph: Optional[TaskGraph] = None,
+              **options: Any) -> Iterator[Dict[str, Any]]:
+    """Yield one metrics row per replication, in completion order.
+
+    ``options`` go to ``Simulation`` (``scheduler``, ``time_quantum``,
+    ``placement``, prices, ...), plus ``autoscale`` as an autoscaler spec.
+    A task list's dependencies are kept; a table's come from ``graph``.
+    ``workers=1`` runs in-process; otherwise a process pool of
+    ``workers`` (default: CPU count) shares the workload.
+    """
+    if replications < 1:
+        raise ValueError('replications must be at least 1')
+    durations = make_distribution(durations)
+    arrivals = make_distribution(arrivals)
+    if isinstance(tasks, TaskTable):
+        table = tasks
+    else:
+        tasks = list(tasks)
+        table = TaskTable.from_tasks(tasks)
+        if graph is None:
+            graph = graph_of(tasks)
+    base = table.data[table.pending_order()]
+    if not len(base):
+        raise ValueError('no pending tasks to replicate')
+    links = None
+    if graph is not None:
+        parents, children = np.asarray(graph.ids, dtype=np.int64)[graph.edges]
+        links = (parents, children)
+    fleet = [(vm.id, vm.total_cores, vm.total_ram, vm.storage) for vm in vms]
+    seeds = np.random.SeedSequence(seed).spawn(replications)
+
+    workers = min(workers or os.cpu_count() or 1, replications)
+    if workers == 1:
+        for index, child in enumerate(seeds):
+            yield run_replication(base, index, child, fleet, options, durations, arrivals,
+                                  links)
+        return
+
+    block = shared_memory.SharedMemory(create=True, size=max(1, base.nbytes))
+    try:
+        view = np.ndarray(len(base), dtype=TASK_DTYPE, buffer=block.buf)
+        view[:] = base
+        del view   # the block cannot be closed while a view is alive
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(block.name, len(base), fleet, options,
+                                           durations, arrivals, links)) as pool:
+            futures = [pool.submit(_run_in_worker, index, child)
+                       for index, child in enumerate(seeds)]
+            for future in as_completed(futures):
+                yield future.result()
+    finally:
+        block.close()
+        block.unlink()
+
+
+# -- summary -----------------------------------------------------------------
+
+def t_quantile(p: float, df: int) -> float:
+    """Quantile ``p`` of Student's t with ``df`` degrees of freedom.
+
+    Exact for one and two degrees of freedom; otherwise the Cornish-Fisher
+    expansion, within 0.01 of the true value from three degrees of freedom.
+    """
+    if df < 1:
+        raise ValueError('df must be at least 1')
+    if df == 1:
+        return math.tan(math.pi * (p - 0.5))
+    if df == 2:
+        a = 2 * p - 1
+        return a * math.sqrt(2 / (1 - a * a))
+    z = NormalDist().inv_cdf(p)
+    z2 = z * z
+    return (z
+            + z * (z2 + 1) / (4 * df)
+            + z * ((5 * z2 + 16) * z2 + 3) / (96 * df ** 2)
+            + z * (((3 * z2 + 19) * z2 + 17) * z2 - 15) / (384 * df ** 3)
+            + z * ((((79 * z2 + 776) * z2 + 1482) * z2 - 1920) * z2 - 945) / (92160 * df ** 4))
+
+
+def summarize(rows: Iterable[Dict[str, Any]],
+              confidence: float = 0.95) -> Dict[str, Dict[str, Optional[float]]]:
+    """Mean, standard deviation and a t confidence interval per metric."""
+    if not 0 < confidence < 1:
+        raise ValueError('confidence must be in (0, 1)')
+    stats: Dict[str, RunningStat] = {}
+    for row in rows:
+        for name in METRICS:
+            if row.get(name) is not None:
+                stats.setdefault(name, RunningStat()).add(row[name])
+    summary: Dict[str, Dict[str, Optional[float]]] = {}
+    for name in METRICS:
+        stat = stats.get(name)
+        if stat is None:
+            continue
+        half: Optional[float] = None
+        if stat.count > 1:
+            half = t_quantile((1 + confidence) / 2, stat.count - 1) * stat.stddev / math.sqrt(stat.count)
+        summary[name] = {
+            'mean': stat.mean,
+            'stddev': stat.stddev,
+            'half_width': half,
+            'ci_low': None if half is None else stat.mean - half,
+            'ci_high': None if half is None else stat.mean + half,
+            'min': stat.min,
+            'max': stat.max,
+        }
+    return summary
+
+
+def run_monte_carlo(tasks: Union[TaskTable, Iterable[Task]], vms: Sequence[VM],
+                    replications: int = 30,
+                    durations: Union[None, str, Dict[str, Any], Distribution] = None,
+                    arrivals: Union[None, str, Dict[str, Any], Distribution] = None,
+                    seed: int = 0, confidence: float = 0.95,
+                    workers: Optional[int] = None, **options: Any) -> Dict[str, Any]:
+    """Run every replication and return the summary with the per-run rows."""
+    if not 0 < confidence < 1:
+        raise ValueError('confidence must be in (0, 1)')
+    durations = make_distribution(durations)
+    arrivals = make_distribution(arrivals)
+    runs = sorted(replicate(tasks, vms, replications, durations, arrivals, seed, workers,
+                            **options), key=lambda row: row['replication'])
+    return {
+        'replications': replications,
+        'seed': seed,
+        'confidence': confidence,
+        'durations': durations.spec(),
+        'arrivals': arrivals.spec(),
+        'metrics': summarize(runs, confidence),
+        'runs': runs,
+    }
+
+
+def _distribution_arg(value: str) -> Union[str, Dict[str, Any]]:
+    return json.loads(value) if value.lstrip().startswith('{') else value
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    from .placement import FIRST_FIT, POLICIES
+    from .schedulers import SCHEDULERS
+    from .traces import read_trace
+
+    parser = argparse.ArgumentParser(description='Monte Carlo replications of a trace.')
+    parser.add_argument('trace')
+    parser.add_argument('--replications', type=int, default=30)
+    parser.add_argument('--durations', type=_distribution_arg, default=FIXED,
+                        help='distribution kind or JSON spec, e.g. \'{"kind": "lognormal", '
+                             '"sigma": 0.8}\'')
+    parser.add_argument('--arrivals', type=_distribution_arg, default=FIXED)
+    parser.add_argument('--duration-trace', help='draw durations from this trace\'s durations')
+    parser.add_argument('--arrival-trace', help='draw arrival gaps from this trace\'s gaps')
+    parser.add_argument('--scheduler', choices=SCHEDULERS, default='fcfs')
+    parser.add_argument('--quantum', type=float, default=2.0)
+    parser.add_argument('--placement', choices=POLICIES, default=FIRST_FIT)
+    parser.add_argument('--vms', type=int, default=3)
+    parser.add_argument('--cores', type=int, default=4)
+    parser.add_argument('--ram', type=int, default=8)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--confidence', type=float, default=0.95)
+    parser.add_argument('--workers', type=int)
+    parser.add_argument('--rebase', action='store_true')
+    parser.add_argument('--output', help='JSON file (default: stdout)')
+    args = parser.parse_args(argv)
+
+    table = TaskTable()
+    table.extend(read_trace(args.trace, rebase=args.rebase))
+    durations, arrivals = args.durations, args.arrivals
+    if args.duration_trace:
+        durations = Empirical([t.execution_time for t in read_trace(args.duration_trace)])
+    if args.arrival_trace:
+        times = np.array([t.arrival_time for t in read_trace(args.arrival_trace)])
+        arrivals = Empirical(np.diff(times))
+    try:
+        report = run_monte_carlo(table, make_vms(args.vms, args.cores, args.ram),
+                                 args.replications, durations, arrivals, seed=args.seed,
+                                 confidence=args.confidence, workers=args.workers,
+                                 scheduler=args.scheduler, time_quantum=args.quantum,
+                                 placement=args.placement)
+    except ValueError as exc:
+        parser.error(str(exc))
+    if args.output:
+        with open(args.output, 'w') as out:
+            json.dump(report, out, indent=2)
+            out.write('\n')
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        sys.stdout.write('\n')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
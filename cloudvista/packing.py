@@ -0,0 +1,112 @@
+"""Vectorized bin-packing of a batch of tasks onto VM free capacity.
+
+Placing a large batch one task at a time costs one index lookup and one
+index update per task.  ``pack_batch`` instead groups the batch into
+(cpu, ram) classes and places each class in one shot with NumPy:
+
+* a VM can take ``min(free_cores // cpu, free_ram // ram)`` tasks of a class;
+* classes are packed largest first (first-fit decreasing), so big tasks are
+  not crowded out by small ones that arrived alongside them;
+* ``firstfit`` and ``bestfit`` fill VMs in VM order / in order of least free
+  capacity, ``worstfit`` water-fills so each class spreads across the VMs
+  with the most room.
+"""
+
+from __future__ import annotations
+
+from typing import List, Optional, Sequence
+
+import numpy as np
+
+from .models import VM, Task
+from .placement import BEST_FIT, FIRST_FIT, POLICIES, WORST_FIT
+
+
+def _slot_order(free_cores: np.ndarray, free_ram: np.ndarray, policy: str) -> np.ndarray:
+    positions = np.arange(len(free_cores))
+    if policy == FIRST_FIT:
+        return positions
+    if policy == BEST_FIT:
+        return np.lexsort((positions, free_ram, free_cores))
+    return np.lexsort((positions, -free_ram, -free_cores))
+
+
+def _fill(slots: np.ndarray, count: int) -> np.ndarray:
+    """Take ``count`` slots, exhausting each VM in turn."""
+    before = np.cumsum(slots) - slots
+    return np.clip(count - before, 0, slots)
+
+
+def _water_fill(slots: np.ndarray, count: int) -> np.ndarray:
+    """Take ``count`` slots so that the VMs left with the most room are evened out."""
+    if slots.sum() <= count:
+        return slots.copy()
+    # smallest level such that taking everything above it is no more than count
+    lo, hi = 0, int(slots.max())
+    while lo < hi:
+        mid = (lo + hi) // 2
+        if np.maximum(slots - mid, 0).sum() <= count:
+            hi = mid
+        else:
+            lo = mid + 1
+    take = np.maximum(slots - lo, 0)
+    extra = count - int(take.sum())
+    if extra:
+        # one more from the first VMs still holding ``lo`` free slots
+        take[np.flatnonzero(slots >= lo)[:extra]] += 1
+    return take
+
+
+def pack_batch(free_cores: np.ndarray, free_ram: np.ndarray,
+               cpu: np.ndarray, ram: np.ndarray,
+               policy: str = FIRST_FIT) -> np.ndarray:
+    """Assign each task of a batch to a VM position, or -1 if it does not fit.
+
+    ``free_cores`` and ``free_ram`` are decremented in place by the
+    capacity the placed tasks consume.
+    """
+    if policy not in POLICIES:
+        raise ValueError('unknown placement policy %r (expected one of %s)'
+                         % (policy, ', '.join(POLICIES)))
+    cpu = np.asarray(cpu, dtype=np.int64)
+    ram = np.asarray(ram, dtype=np.int64)
+    assignment = np.full(len(cpu), -1, dtype=np.int64)
+    if not len(cpu) or not len(free_cores):
+        return assignment
+
+    classes, inverse = np.unique(np.stack([cpu, ram], axis=1), axis=0,
+                                 return_inverse=True)
+    inverse = inverse.reshape(-1)
+    members_by_class = np.split(np.argsort(inverse, kind='stable'),
+                                np.cumsum(np.bincount(inverse))[:-1])
+    # np.unique sorts ascending; walk classes largest first
+    for k in range(len(classes) - 1, -1, -1):
+        members = members_by_class[k]
+        c, r = int(classes[k, 0]), int(classes[k, 1])
+        by_cores = free_cores // c if c > 0 else np.full_like(free_cores, len(members))
+        by_ram = free_ram // r if r > 0 else np.full_like(free_ram, len(members))
+        slots = np.maximum(np.minimum(by_cores, by_ram), 0)
+        order = _slot_order(free_cores, free_ram, policy)
+        ordered = slots[order]
+        if policy == WORST_FIT:
+            take = _water_fill(ordered, len(members))
+        else:
+            take = _fill(ordered, len(members))
+        placed = np.repeat(order, take)
+        assignment[members[:len(placed)]] = placed
+        used = np.bincount(placed, minlength=len(free_cores))
+        free_cores -= used * c
+        free_ram -= used * r
+    return assignment
+
+
+def pack_tasks(vms: Sequence[VM], tasks: Sequence[Task],
+               policy: str = FIRST_FIT) -> List[Optional[VM]]:
+    """Choose a VM (or None) for every task, without allocating anything."""
+    count = len(vms)
+    free_cores = np.fromiter((vm.available_cores for vm in vms), dtype=np.int64, count=count)
+    free_ram = np.fromiter((vm.available_ram for vm in vms), dtype=np.int64, count=count)
+    cpu = np.fromiter((t.cpu_required for t in tasks), dtype=np.int64, count=len(tasks))
+    ram = np.fromiter((t.ram_required for t in tasks), dtype=np.int64, count=len(tasks))
+    assignment = pack_batch(free_cores, free_ram, cpu, ram, policy)
+    return [vms[pos] if pos >= 0 else None for pos in assignment.tolist()]
@@ -0,0 +1,232 @@
+"""Indexed VM placement.
+
+The tick loop found a VM by scanning ``vms`` linearly for every pending task
+on every tick.  These indexes keep the free VMs organised by free cores and
+RAM so that "which VM should run a (cpu, ram) task" is answered without
+touching every VM:
+
+* ``firstfit`` - lowest-numbered VM that fits, via a segment tree holding
+  the max free cores and max free RAM of each subtree;
+* ``bestfit`` - VM with the least free cores (then least free RAM) that
+  fits, via buckets keyed by free cores, each sorted by free RAM;
+* ``worstfit`` - VM with the most free cores (then most free RAM), using
+  the same buckets walked from the top.
+
+Free-core counts are small integers, so the buckets give O(C log n) lookups
+for C distinct core counts.  The segment tree descends only into subtrees
+whose maxima fit both dimensions, which is O(log n) unless cores and RAM
+disagree about which subtree is promising.
+
+The engine calls ``update`` after any change to a VM's free capacity,
+``remove`` to take a VM out of consideration entirely and ``add`` when a
+VM joins the fleet mid-run.  Added VMs rank after every existing one.
+"""
+
+from __future__ import annotations
+
+import bisect
+from abc import ABC, abstractmethod
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from .models import VM
+
+FIRST_FIT = 'firstfit'
+BEST_FIT = 'bestfit'
+WORST_FIT = 'worstfit'
+POLICIES = (FIRST_FIT, BEST_FIT, WORST_FIT)
+
+_ABSENT = -1
+
+
+class PlacementIndex(ABC):
+    """Base class: maps VMs to positions and defines the index protocol."""
+
+    policy = ''
+
+    def __init__(self, vms: Sequence[VM]) -> None:
+        self.vms = list(vms)
+        self._pos = {vm.id: i for i, vm in enumerate(self.vms)}
+
+    @abstractmethod
+    def update(self, vm: VM) -> None:
+        """Re-index ``vm`` at its current free cores and RAM."""
+
+    @abstractmethod
+    def remove(self, vm: VM) -> None:
+        """Stop offering ``vm`` until the next ``update``."""
+
+    @abstractmethod
+    def add(self, vm: VM) -> None:
+        """Index a VM that was not in the fleet the index was built for."""
+
+    @abstractmethod
+    def find(self, cpu: int, ram: int) -> Optional[VM]:
+        """Return the VM chosen by this policy for a (cpu, ram) request."""
+
+
+class FirstFitIndex(PlacementIndex):
+    """Segment tree over VM positions with per-subtree max free cores/RAM."""
+
+    policy = FIRST_FIT
+
+    def __init__(self, vms: Sequence[VM]) -> None:
+        super().__init__(vms)
+        size = 1
+        while size < max(1, len(self.vms)):
+            size *= 2
+        self._size = size
+        self._cores = [_ABSENT] * (2 * size)
+        self._ram = [_ABSENT] * (2 * size)
+        for i, vm in enumerate(self.vms):
+            self._cores[size + i] = vm.available_cores
+            self._ram[size + i] = vm.available_ram
+        for node in range(size - 1, 0, -1):
+            self._pull(node)
+
+    def _pull(self, node: int) -> None:
+        left, right = 2 * node, 2 * node + 1
+        self._cores[node] = max(self._cores[left], self._cores[right])
+        self._ram[node] = max(self._ram[left], self._ram[right])
+
+    def _set(self, pos: int, cores: int, ram: int) -> None:
+        tree_cores, tree_ram = self._cores, self._ram
+        node = self._size + pos
+        tree_cores[node] = cores
+        tree_ram[node] = ram
+        node //= 2
+        while node:
+            left = 2 * node
+            best_cores = tree_cores[left]
+            if tree_cores[left + 1] > best_cores:
+                best_cores = tree_cores[left + 1]
+            best_ram = tree_ram[left]
+            if tree_ram[left + 1] > best_ram:
+                best_ram = tree_ram[left + 1]
+            if tree_cores[node] == best_cores and tree_ram[node] == best_ram:
+                break
+            tree_cores[node] = best_cores
+            tree_ram[node] = best_ram
+            node //= 2
+
+    def update(self, vm: VM) -> None:
+        self._set(self._pos[vm.id], vm.available_cores, vm.available_ram)
+
+    def remove(self, vm: VM) -> None:
+        self._set(self._pos[vm.id], _ABSENT, _ABSENT)
+
+    def add(self, vm: VM) -> None:
+        pos = len(self.vms)
+        self.vms.append(vm)
+        self._pos[vm.id] = pos
+        if pos >= self._size:
+            # double the tree; leaves keep their positions
+            old = self._size
+            size = self._size = 2 * old
+            cores = [_ABSENT] * (2 * size)
+            ram = [_ABSENT] * (2 * size)
+            cores[size:size + old] = self._cores[old:]
+            ram[size:size + old] = self._ram[old:]
+            self._cores, self._ram = cores, ram
+            for node in range(size - 1, 0, -1):
+                self._pull(node)
+        self._set(pos, vm.available_cores, vm.available_ram)
+
+    def find(self, cpu: int, ram: int) -> Optional[VM]:
+        cores, mem, size = self._cores, self._ram, self._size
+        stack = [1]
+        while stack:
+            node = stack.pop()
+            if cores[node] < cpu or mem[node] < ram:
+                continue
+            if node >= size:
+                return self.vms[node - size]
+            stack.append(2 * node + 1)
+            stack.append(2 * node)
+        return None
+
+
+class _BucketIndex(PlacementIndex):
+    """Buckets keyed by free cores, each a sorted list of (free_ram, pos)."""
+
+    def __init__(self, vms: Sequence[VM]) -> None:
+        super().__init__(vms)
+        self._buckets: Dict[int, List[Tuple[int, int]]] = {}
+        self._core_keys: List[int] = []
+        self._keys: List[Optional[Tuple[int, int]]] = [None] * len(self.vms)
+        for vm in self.vms:
+            self.update(vm)
+
+    def update(self, vm: VM) -> None:
+        self.remove(vm)
+        pos = self._pos[vm.id]
+        cores, ram = vm.available_cores, vm.available_ram
+        bucket = self._buckets.get(cores)
+        if bucket is None:
+            bucket = self._buckets[cores] = []
+            bisect.insort(self._core_keys, cores)
+        bisect.insort(bucket, (ram, pos))
+        self._keys[pos] = (cores, ram)
+
+    def remove(self, vm: VM) -> None:
+        pos = self._pos[vm.id]
+        key = self._keys[pos]
+        if key is None:
+            return
+        cores, ram = key
+        bucket = self._buckets[cores]
+        del bucket[bisect.bisect_left(bucket, (ram, pos))]
+        if not bucket:
+            del self._buckets[cores]
+            del self._core_keys[bisect.bisect_left(self._core_keys, cores)]
+        self._keys[pos] = None
+
+    def add(self, vm: VM) -> None:
+        self._pos[vm.id] = len(self.vms)
+        self.vms.append(vm)
+        self._keys.append(None)
+        self.update(vm)
+
+
+class BestFitIndex(_BucketIndex):
+    policy = BEST_FIT
+
+    def find(self, cpu: int, ram: int) -> Optional[VM]:
+        keys = self._core_keys
+        for i in range(bisect.bisect_left(keys, cpu), len(keys)):
+            bucket = self._buckets[keys[i]]
+            j = bisect.bisect_left(bucket, (ram, -1))
+            if j < len(bucket):
+                return self.vms[bucket[j][1]]
+        return None
+
+
+class WorstFitIndex(_BucketIndex):
+    policy = WORST_FIT
+
+    def find(self, cpu: int, ram: int) -> Optional[VM]:
+        keys = self._core_keys
+        lowest = bisect.bisect_left(keys, cpu)
+        for i in range(len(keys) - 1, lowest - 1, -1):
+            bucket = self._buckets[keys[i]]
+            most = bucket[-1][0]
+            if most >= ram:
+                # lowest-numbered VM among those with the most free RAM
+                return self.vms[bucket[bisect.bisect_left(bucket, (most, -1))][1]]
+        return None
+
+
+_INDEXES = {
+    FIRST_FIT: FirstFitIndex,
+    BEST_FIT: BestFitIndex,
+    WORST_FIT: WorstFitIndex,
+}
+
+
+def make_index(policy: str, vms: Sequence[VM]) -> PlacementIndex:
+    """Build the placement index for ``policy`` over ``vms``."""
+    try:
+        cls = _INDEXES[policy]
+    except KeyError:
+        raise ValueError('unknown placement policy %r (expected one of %s)'
+                         % (policy, ', '.join(POLICIES)))
+    return cls(vms)
@@ -0,0 +1,372 @@
+"""Vectorized pricing of finished simulations.
+
+``calculateTaskCost`` prices one task at a time at flat hourly rates and
+ignores storage.  Here a finished run is turned into column arrays once
+(``Usage``) and each ``PricingModel`` prices every task and VM in a few
+NumPy operations, so a run can be re-priced under many models without
+re-running the schedule::
+
+    usage = Usage.from_result(result, vms)
+    bills = reprice(usage, [FlatPricing(), SpotPricing(discount=0.6)])
+
+Models:
+
+* ``flat`` - fixed per core-hour and GB-hour rates;
+* ``tiered`` - volume tiers on cumulative core-hours and GB-hours, with
+  usage accrued in completion order;
+* ``spot`` - a discount off the flat rates, or a spot price trace
+  averaged over each task's run window;
+* ``reserved`` - the first N VMs are committed for the whole run at a
+  reserved rate, the rest are billed on demand.
+
+Every model applies per-second billing (``increment_seconds``) with a
+minimum billed duration (``minimum_seconds``) and charges VM storage at a
+GB-month rate prorated over each VM's uptime, which is the whole run
+unless the fleet was autoscaled.
+"""
+
+from __future__ import annotations
+
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from .engine import DEFAULT_CPU_COST, DEFAULT_RAM_COST
+from .models import VM
+from .taskstore import TaskTable
+
+DEFAULT_STORAGE_COST = 8.0   # INR per GB-month
+HOURS_PER_MONTH = 730.0
+
+FLAT = 'flat'
+TIERED = 'tiered'
+SPOT = 'spot'
+RESERVED = 'reserved'
+MODELS = (FLAT, TIERED, SPOT, RESERVED)
+
+
+@dataclass
+class Usage:
+    """Column view of the completed tasks and the fleet of one run."""
+
+    cpu: np.ndarray
+    ram: np.ndarray
+    execution_time: np.ndarray
+    start: np.ndarray
+    end: np.ndarray
+    vm: np.ndarray           # position into the vm_* arrays
+    vm_ids: np.ndarray
+    vm_cores: np.ndarray
+    vm_ram: np.ndarray
+    vm_storage: np.ndarray
+    period: float            # billed wall-clock window, in seconds
+    vm_uptime: Optional[np.ndarray] = None   # per VM; the whole period if None
+
+    @classmethod
+    def from_columns(cls, cpu: Any, ram: Any, execution_time: Any, start: Any,
+                     end: Any, vm_ids: Any, vms: Sequence[VM],
+                     period: Optional[float] = None) -> 'Usage':
+        fleet = np.array([vm.id for vm in vms], dtype=np.int64)
+        task_vms = np.asarray(vm_ids, dtype=np.int64)
+        pos = np.full(len(task_vms), -1, dtype=np.int64)
+        if len(fleet):
+            order = np.argsort(fleet, kind='stable')
+            found = np.clip(np.searchsorted(fleet, task_vms, sorter=order), 0, len(fleet) - 1)
+            hit = fleet[order[found]] == task_vms
+            pos[hit] = order[found[hit]]
+        end = np.asarray(end, dtype=np.float64)
+        if period is None:
+            period = float(end.max()) if len(end) else 0.0
+        return cls(
+            cpu=np.asarray(cpu, dtype=np.float64),
+            ram=np.asarray(ram, dtype=np.float64),
+            execution_time=np.asarray(execution_time, dtype=np.float64),
+            start=np.asarray(start, dtype=np.float64),
+            end=end,
+            vm=pos,
+            vm_ids=fleet,
+            vm_cores=np.array([vm.total_cores for vm in vms], dtype=np.float64),
+            vm_ram=np.array([vm.total_ram for vm in vms], dtype=np.float64),
+            vm_storage=np.array([vm.storage for vm in vms], dtype=np.float64),
+            period=float(period),
+            vm_uptime=np.array([vm.uptime(period) for vm in vms], dtype=np.float64),
+        )
+
+    @classmethod
+    def from_table(cls, table: TaskTable, vms: Sequence[VM],
+                   period: Optional[float] = None) -> 'Usage':
+        data = table.data[table.completed_mask()]
+        return cls.from_columns(data['cpu'], data['ram'], data['execution_time'],
+                                data['start_time'], data['end_time'], data['vm'],
+                                vms, period)
+
+    @classmethod
+    def from_result(cls, result: Any, vms: Sequence[VM]) -> 'Usage':
+        """Build from a ``SimulationResult`` (list- or table-backed)."""
+        period = result.stats.get('makespan')
+        if result.table is not None:
+            return cls.from_table(result.table, vms, period)
+        done = result.completed
+        return cls.from_columns(
+            [t.cpu_required for t in done], [t.ram_required for t in done],
+            [t.execution_time for t in done], [t.start_time for t in done],
+            [t.end_time for t in done],
+            [-1 if t.vm_id is None else t.vm_id for t in done], vms, period)
+
+    def __len__(self) -> int:
+        return len(self.cpu)
+
+
+@dataclass
+class Bill:
+    """Per-task and per-VM costs of one run under one pricing model."""
+
+    model: str
+    task_costs: np.ndarray
+    compute_costs: np.ndarray   # per VM
+    storage_costs: np.ndarray   # per VM
+    vm_ids: np.ndarray
+
+    @property
+    def vm_costs(self) -> np.ndarray:
+        return self.compute_costs + self.storage_costs
+
+    @property
+    def total(self) -> float:
+        return float(self.vm_costs.sum())
+
+    def to_dict(self) -> Dict[str, Any]:
+        count = len(self.task_costs)
+        task_total = float(self.task_costs.sum())
+        return {
+            'model': self.model,
+            'total_cost': self.total,
+            'compute_cost': float(self.compute_costs.sum()),
+            'storage_cost': float(self.storage_costs.sum()),
+            'task_cost': task_total,
+            'avg_cost_per_task': task_total / count if count else 0.0,
+            'vm_costs': {int(vm_id): float(cost)
+                         for vm_id, cost in zip(self.vm_ids, self.vm_costs)},
+        }
+
+
+class PricingModel(ABC):
+    """Base class: billing granularity, storage, and the per-VM roll-up."""
+
+    kind = ''
+
+    def __init__(self, name: Optional[str] = None,
+                 storage_rate: float = DEFAULT_STORAGE_COST,
+                 increment_seconds: float = 1.0,
+                 minimum_seconds: float = 0.0) -> None:
+        if increment_seconds < 0 or minimum_seconds < 0:
+            raise ValueError('billing increment and minimum must be non-negative')
+        self.name = name or self.kind
+        self.storage_rate = storage_rate
+        self.increment_seconds = increment_seconds
+        self.minimum_seconds = minimum_seconds
+
+    def billed_hours(self, usage: Usage) -> np.ndarray:
+        seconds = usage.execution_time
+        step = self.increment_seconds
+        if step > 0:
+            # tolerate float noise such as 3.0000000001 s
+            seconds = np.ceil(seconds / step - 1e-9) * step
+        return np.maximum(seconds, self.minimum_seconds) / 3600.0
+
+    @abstractmethod
+    def task_costs(self, usage: Usage) -> np.ndarray:
+        """Cost of each task's CPU and RAM over its billed hours."""
+
+    def compute_costs(self, usage: Usage, task_costs: np.ndarray) -> np.ndarray:
+        placed = usage.vm >= 0
+        return np.bincount(usage.vm[placed], weights=task_costs[placed],
+                           minlength=len(usage.vm_ids))
+
+    def storage_costs(self, usage: Usage) -> np.ndarray:
+        uptime = usage.period if usage.vm_uptime is None else usage.vm_uptime
+        months = uptime / 3600.0 / HOURS_PER_MONTH
+        return usage.vm_storage * self.storage_rate * months
+
+    def bill(self, usage: Usage) -> Bill:
+        tasks = self.task_costs(usage)
+        return Bill(model=self.name, task_costs=tasks,
+                    compute_costs=self.compute_costs(usage, tasks),
+                    storage_costs=self.storage_costs(usage),
+                    vm_ids=usage.vm_ids)
+
+
+class FlatPricing(PricingModel):
+    kind = FLAT
+
+    def __init__(self, cpu_rate: float = DEFAULT_CPU_COST,
+                 ram_rate: float = DEFAULT_RAM_COST, **options: Any) -> None:
+        super().__init__(**options)
+        self.cpu_rate = cpu_rate
+        self.ram_rate = ram_rate
+
+    def task_costs(self, usage: Usage) -> np.ndarray:
+        return (usage.cpu * self.cpu_rate + usage.ram * self.ram_rate) * self.billed_hours(usage)
+
+
+def _check_tiers(tiers: Sequence[Tuple[float, float]]) -> Tuple[np.ndarray, np.ndarray]:
+    thresholds = np.array([float(t) for t, _ in tiers])
+    rates = np.array([float(r) for _, r in tiers])
+    if not len(thresholds) or thresholds[0] != 0 or np.any(np.diff(thresholds) <= 0):
+        raise ValueError('tiers must start at 0 and have increasing thresholds')
+    return thresholds, rates
+
+
+def _tiered_cost(units: np.ndarray, order: np.ndarray, thresholds: np.ndarray,
+                 rates: np.ndarray) -> np.ndarray:
+    """Price ``units`` accrued in ``order`` against a marginal tier schedule."""
+    ordered = units[order]
+    after = np.cumsum(ordered)
+    before = after - ordered
+    top = max(float(after[-1]) if len(after) else 0.0, float(thresholds[-1])) + 1.0
+    xs = np.append(thresholds, top)
+    # cumulative cost at each breakpoint; piecewise linear in between
+    fx = np.concatenate([[0.0], np.cumsum(np.diff(xs) * rates)])
+    cost = np.empty_like(units)
+    cost[order] = np.interp(after, xs, fx) - np.interp(before, xs, fx)
+    return cost
+
+
+class TieredPricing(PricingModel):
+    """Volume tiers: ``[(from_unit_hours, rate), ...]`` for CPU and RAM."""
+
+    kind = TIERED
+
+    def __init__(self, cpu_tiers: Sequence[Tuple[float, float]] = ((0, DEFAULT_CPU_COST),),
+                 ram_tiers: Sequence[Tuple[float, float]] = ((0, DEFAULT_RAM_COST),),
+                 **options: Any) -> None:
+        super().__init__(**options)
+        self.cpu_tiers = _check_tiers(cpu_tiers)
+        self.ram_tiers = _check_tiers(ram_tiers)
+
+    def task_costs(self, usage: Usage) -> np.ndarray:
+        hours = self.billed_hours(usage)
+        order = np.argsort(usage.end, kind='stable')
+        return (_tiered_cost(usage.cpu * hours, order, *self.cpu_tiers)
+                + _tiered_cost(usage.ram * hours, order, *self.ram_tiers))
+
+
+class SpotPricing(FlatPricing):
+    """Flat rates scaled by a spot multiplier.
+
+    Without a trace the multiplier is ``1 - discount``.  With ``price_times``
+    and ``multipliers`` (a step function of simulated time, as a fraction of
+    the on-demand rate) each task pays the average multiplier over its
+    start-to-end window.
+    """
+
+    kind = SPOT
+
+    def __init__(self, cpu_rate: float = DEFAULT_CPU_COST,
+                 ram_rate: float = DEFAULT_RAM_COST, discount: float = 0.7,
+                 price_times: Optional[Sequence[float]] = None,
+                 multipliers: Optional[Sequence[float]] = None,
+                 **options: Any) -> None:
+        super().__init__(cpu_rate, ram_rate, **options)
+        if not 0 <= discount < 1:
+            raise ValueError('discount must be in [0, 1)')
+        self.discount = discount
+        if (price_times is None) != (multipliers is None):
+            raise ValueError('price_times and multipliers go together')
+        if price_times is not None:
+            times = np.asarray(price_times, dtype=np.float64)
+            if len(times) != len(multipliers) or not len(times) or np.any(np.diff(times) <= 0):
+                raise ValueError('price trace needs matching, increasing times')
+            self._trace: Optional[Tuple[np.ndarray, np.ndarray]] = (
+                times, np.asarray(multipliers, dtype=np.float64))
+        else:
+            self._trace = None
+
+    def multipliers(self, usage: Usage) -> np.ndarray:
+        if self._trace is None:
+            return np.full(len(usage), 1.0 - self.discount)
+        times, values = self._trace
+        # integral of the step function, exact at breakpoints and linear between
+        top = max(float(usage.end.max()) if len(usage) else 0.0, float(times[-1])) + 1.0
+        xs = np.concatenate([[min(0.0, float(times[0]))], times, [top]])
+        steps = np.concatenate([[values[0]], values])
+        area = np.concatenate([[0.0], np.cumsum(np.diff(xs) * steps)])
+        span = usage.end - usage.start
+        at_start = values[np.clip(np.searchsorted(times, usage.start, side='right') - 1,
+                                  0, len(values) - 1)]
+        with np.errstate(invalid='ignore', divide='ignore'):
+            mean = (np.interp(usage.end, xs, area) - np.interp(usage.start, xs, area)) / span
+        return np.where(span > 0, mean, at_start)
+
+    def task_costs(self, usage: Usage) -> np.ndarray:
+        return super().task_costs(usage) * self.multipliers(usage)
+
+
+class ReservedPricing(FlatPricing):
+    """Reserved capacity for the first ``reserved_vms`` VMs, on demand for the rest.
+
+    A reserved VM costs its full capacity at the reserved rates for its
+    whole uptime, busy or not; its tasks are charged their share of that
+    commitment, so the difference is the idle reservation.
+    """
+
+    kind = RESERVED
+
+    def __init__(self, reserved_vms: int = 0,
+                 reserved_cpu_rate: float = DEFAULT_CPU_COST * 0.6,
+                 reserved_ram_rate: float = DEFAULT_RAM_COST * 0.6,
+                 cpu_rate: float = DEFAULT_CPU_COST,
+                 ram_rate: float = DEFAULT_RAM_COST, **options: Any) -> None:
+        super().__init__(cpu_rate, ram_rate, **options)
+        if reserved_vms < 0:
+            raise ValueError('reserved_vms must be non-negative')
+        self.reserved_vms = reserved_vms
+        self.reserved_cpu_rate = reserved_cpu_rate
+        self.reserved_ram_rate = reserved_ram_rate
+
+    def _reserved(self, usage: Usage) -> np.ndarray:
+        return np.arange(len(usage.vm_ids)) < self.reserved_vms
+
+    def task_costs(self, usage: Usage) -> np.ndarray:
+        hours = self.billed_hours(usage)
+        on_reserved = self._reserved(usage)[np.maximum(usage.vm, 0)] & (usage.vm >= 0)
+        reserved = (usage.cpu * self.reserved_cpu_rate + usage.ram * self.reserved_ram_rate) * hours
+        return np.where(on_reserved, reserved, super().task_costs(usage))
+
+    def compute_costs(self, usage: Usage, task_costs: np.ndarray) -> np.ndarray:
+        costs = super().compute_costs(usage, task_costs)
+        uptime = usage.period if usage.vm_uptime is None else usage.vm_uptime
+        commitment = ((usage.vm_cores * self.reserved_cpu_rate
+                       + usage.vm_ram * self.reserved_ram_rate) * uptime / 3600.0)
+        return np.where(self._reserved(usage), commitment, costs)
+
+
+_MODELS = {
+    FLAT: FlatPricing,
+    TIERED: TieredPricing,
+    SPOT: SpotPricing,
+    RESERVED: ReservedPricing,
+}
+
+
+def make_pricing(spec: Dict[str, Any]) -> PricingModel:
+    """Build a model from ``{"model": "spot", "discount": 0.6, ...}``."""
+    options = dict(spec)
+    kind = options.pop('model', FLAT)
+    try:
+        cls = _MODELS[kind]
+    except KeyError:
+        raise ValueError('unknown pricing model %r (expected one of %s)'
+                         % (kind, ', '.join(MODELS)))
+    try:
+        return cls(**options)
+    except TypeError as exc:
+        raise ValueError('invalid options for %s pricing: %s' % (kind, exc))
+
+
+def reprice(usage: Usage, models: Iterable[Union[PricingModel, Dict[str, Any]]]) -> List[Bill]:
+    """Bill one run under each model, in order."""
+    return [(m if isinstance(m, PricingModel) else make_pricing(m)).bill(usage)
+            for m in models]
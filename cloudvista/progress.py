@@ -0,0 +1,305 @@
+"""Live progress for long simulations.
+
+The UI used to wait for ``/api/simulation/start`` to return, then replay
+the whole event log on a 100 ms timer and append every completed task to
+its charts.  A million-task run meant millions of events in one response
+and charts with a million points, which froze the tab.
+
+``LiveRun`` steps a simulation on a background thread and publishes a
+*frame* at most ``fps`` times per second of wall-clock time, however fast
+the engine runs.  A frame is a delta: the stats snapshot, the utilization
+samples and the task completions since the previous frame, both reduced
+with LTTB (Largest-Triangle-Three-Buckets) to at most ``max_points``
+points so a frame stays a few KB.  Clients read frames as Server-Sent
+Events (see ``format_event``) and resume with ``Last-Event-ID``; a client
+that connects late, or falls behind the retained backlog, first gets a
+``snapshot`` with the downsampled utilization history.
+
+With a ``checkpoint.Checkpointer`` the run is also checkpointed as it
+goes, so it can be resumed after the server restarts.
+"""
+
+from __future__ import annotations
+
+import json
+import threading
+import time
+import uuid
+from array import array
+from collections import deque
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence
+
+import numpy as np
+
+from .checkpoint import Checkpointer, checkpoint_id
+from .engine import Simulation, SimulationResult
+
+SNAPSHOT = 'snapshot'
+FRAME = 'frame'
+
+
+def lttb(x: Sequence[float], y: Sequence[float], threshold: int) -> np.ndarray:
+    """Indices of at most ``threshold`` points that keep the shape of y(x).
+
+    Largest-Triangle-Three-Buckets: the first and last points are kept and
+    every bucket in between contributes the point forming the largest
+    triangle with the previous pick and the mean of the next bucket.
+    """
+    n = len(x)
+    if n <= threshold:
+        return np.arange(n)
+    if threshold < 3:
+        return np.array([0, n - 1][:max(threshold, 0)], dtype=np.int64)
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    every = (n - 2) / (threshold - 2)
+    edges = np.empty(threshold, dtype=np.int64)
+    edges[:-1] = (np.arange(threshold - 1) * every).astype(np.int64) + 1
+    edges[-2] = n - 1
+    edges[-1] = n
+    picked = np.empty(threshold, dtype=np.int64)
+    picked[0] = 0
+    picked[-1] = n - 1
+    a = 0
+    for i in range(threshold - 2):
+        start, end, after = edges[i], edges[i + 1], edges[i + 2]
+        avg_x = x[end:after].mean()
+        avg_y = y[end:after].mean()
+        area = np.abs((x[a] - avg_x) * (y[start:end] - y[a])
+                      - (x[a] - x[start:end]) * (avg_y - y[a]))
+        a = start + int(area.argmax())
+        picked[i + 1] = a
+    return picked
+
+
+def format_event(payload: Dict[str, Any], event: Optional[str] = None,
+                 event_id: Optional[int] = None) -> str:
+    """One Server-Sent Events message."""
+    lines = []
+    if event_id is not None:
+        lines.append('id: %d' % event_id)
+    if event is not None:
+        lines.append('event: %s' % event)
+    lines.append('data: %s' % json.dumps(payload, separators=(',', ':')))
+    return '\n'.join(lines) + '\n\n'
+
+
+class LiveRun:
+    """Runs a simulation in the background and publishes throttled frames."""
+
+    def __init__(self, simulation: Simulation, total: Optional[int] = None,
+                 fps: float = 10.0, max_points: int = 100, history_points: int = 500,
+                 backlog: int = 600,
+                 on_done: Optional[Callable[['LiveRun'], None]] = None,
+                 checkpointer: Optional[Checkpointer] = None) -> None:
+        if fps <= 0:
+            raise ValueError('fps must be positive')
+        self.id = uuid.uuid4().hex
+        self.simulation = simulation
+        self.total = total
+        self.interval = 1.0 / fps
+        self.max_points = max_points
+        self.history_points = history_points
+        self.on_done = on_done
+        self.checkpointer = checkpointer
+        self.checkpoint_error: Optional[str] = None
+        self.result: Optional[SimulationResult] = None
+        self.error: Optional[str] = None
+        self.done = False
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+
+        self._cond = threading.Condition()
+        self._frames: deque = deque(maxlen=backlog)
+        self._seq = 0
+        self._seen = 0
+        # time, used cores, used ram after each step since the last frame
+        # (flat, so millions of samples are not millions of tracked
+        # objects), and the [time, cpu %, ram %] points sent so far
+        self._samples = array('d')
+        self._history: List[List[float]] = []
+
+    def start(self) -> 'LiveRun':
+        self.started_at = time.time()
+        threading.Thread(target=self._run, name='live-%s' % self.id[:8], daemon=True).start()
+        return self
+
+    # -- producer ------------------------------------------------------
+
+    def _run(self) -> None:
+        simulation = self.simulation
+        stats = simulation.stats
+        step = simulation.step
+        interval = self.interval
+        clock = time.perf_counter
+        instrument = simulation.instrument
+        checkpointer = self.checkpointer
+        try:
+            if instrument is not None:
+                instrument.begin(simulation)
+            sample = self._samples.extend
+            sample((simulation.now, stats.used_cores, stats.used_ram))
+            next_frame = clock() + interval
+            steps = 0
+            while step():
+                sample((simulation.now, stats.used_cores, stats.used_ram))
+                steps += 1
+                # reading the clock costs about as much as a small step
+                if steps & 63 == 0:
+                    if clock() >= next_frame:
+                        self._publish(self._frame())
+                        sample = self._samples.extend
+                        next_frame = clock() + interval
+                    if checkpointer is not None and checkpointer.due(simulation):
+                        self._checkpoint(checkpointer)
+            if instrument is not None:
+                instrument.end(simulation)
+            self.result = simulation.result()
+        except Exception as exc:
+            self.error = str(exc)
+        frame = self._frame()
+        frame['done'] = True
+        frame['error'] = self.error
+        if self.result is not None:
+            frame['unscheduled'] = [t.id for t in self.result.unscheduled]
+        self.finished_at = time.time()
+        if self.on_done is not None:
+            self.on_done(self)
+        self._publish(frame, done=True)
+
+    def _checkpoint(self, checkpointer: Checkpointer) -> None:
+        # a failed checkpoint (disk full, say) must not fail the run itself
+        try:
+            checkpointer.save(self.simulation)
+            self.checkpoint_error = None
+        except (OSError, ValueError) as exc:
+            self.checkpoint_error = str(exc)
+
+    def _frame(self) -> Dict[str, Any]:
+        simulation = self.simulation
+        samples = self._samples
+        self._samples = array('d')
+        if samples:
+            stats = simulation.stats
+            points = np.frombuffer(samples, dtype=float).reshape(-1, 3).copy()
+            points[:, 1] *= 100.0 / stats.total_cores if stats.total_cores else 0.0
+            points[:, 2] *= 100.0 / stats.total_ram if stats.total_ram else 0.0
+            keep = lttb(points[:, 0], points[:, 1], self.max_points)
+            utilization = np.round(points[keep], 3).tolist()
+        else:
+            utilization = []
+        with self._cond:
+            self._history.extend(utilization)
+            if len(self._history) > 10 * self.history_points:
+                self._history = self._downsample(self._history, 2 * self.history_points)
+
+        # completions only exist as Task objects when the engine keeps them
+        # in ``completed``; table-backed runs report counts through stats
+        fresh = simulation.completed[self._seen:]
+        self._seen += len(fresh)
+        completions = []
+        if fresh:
+            ends = [t.end_time for t in fresh]
+            waits = [t.wait_time for t in fresh]
+            for i in lttb(ends, waits, self.max_points).tolist():
+                t = fresh[i]
+                completions.append([t.id, t.name, round(waits[i], 3),
+                                    round(t.execution_time, 3), round(t.cost, 4)])
+
+        stats = simulation.statistics()
+        stats['total_tasks'] = self.total or stats['total_tasks']
+        self._seq += 1
+        return {
+            'seq': self._seq,
+            'time': simulation.now,
+            'stats': stats,
+            'new_completions': len(fresh),
+            'utilization': utilization,
+            'completions': completions,
+            'done': False,
+        }
+
+    @staticmethod
+    def _downsample(points: List[List[float]], threshold: int) -> List[List[float]]:
+        if len(points) <= threshold:
+            return list(points)
+        array = np.asarray(points)
+        return array[lttb(array[:, 0], array[:, 1], threshold)].tolist()
+
+    def _publish(self, frame: Dict[str, Any], done: bool = False) -> None:
+        with self._cond:
+            self._frames.append(frame)
+            if done:
+                self.done = True
+            self._cond.notify_all()
+
+    # -- consumers -----------------------------------------------------
+
+    def snapshot(self) -> Dict[str, Any]:
+        """The state so far, for clients that missed earlier frames."""
+        with self._cond:
+            history = self._downsample(self._history, self.history_points)
+            last = self._frames[-1] if self._frames else None
+        return {
+            'id': self.id,
+            'seq': last['seq'] if last else 0,
+            'time': last['time'] if last else 0.0,
+            'stats': last['stats'] if last else None,
+            'utilization': history,
+            'done': self.done,
+        }
+
+    def frames(self, after: int = 0, keepalive: float = 15.0) -> Iterator[Optional[Dict[str, Any]]]:
+        """Yield frames with ``seq > after`` as they are published.
+
+        Yields None after ``keepalive`` seconds without a frame, and stops
+        after the final frame.  A ``snapshot`` is sent first when frames
+        after ``after`` are no longer retained.
+        """
+        with self._cond:
+            oldest = self._frames[0]['seq'] if self._frames else 1
+        if after < oldest - 1:
+            snapshot = self.snapshot()
+            yield {'event': SNAPSHOT, **snapshot}
+            after = snapshot['seq']
+        while True:
+            with self._cond:
+                pending = [f for f in self._frames if f['seq'] > after]
+                if not pending and not self.done:
+                    self._cond.wait(keepalive)
+                    pending = [f for f in self._frames if f['seq'] > after]
+                finished = self.done
+            if not pending:
+                if finished:
+                    return
+                yield None
+                continue
+            for frame in pending:
+                yield frame
+                after = frame['seq']
+                if frame['done']:
+                    return
+
+    def stream(self, after: int = 0, keepalive: float = 15.0) -> Iterator[str]:
+        """``frames`` encoded as Server-Sent Events."""
+        yield 'retry: 2000\n\n'
+        for frame in self.frames(after, keepalive):
+            if frame is None:
+                yield ': keepalive\n\n'
+            elif frame.pop('event', None) == SNAPSHOT:
+                yield format_event(frame, SNAPSHOT, frame['seq'])
+            else:
+                yield format_event(frame, FRAME, frame['seq'])
+
+    def to_dict(self) -> Dict[str, Any]:
+        latest = self.checkpointer.latest if self.checkpointer else None
+        return {
+            'id': self.id,
+            'done': self.done,
+            'error': self.error,
+            'total_tasks': self.total,
+            'started_at': self.started_at,
+            'finished_at': self.finished_at,
+            'checkpoint': checkpoint_id(latest) if latest else None,
+            'checkpoint_error': self.checkpoint_error,
+        }
@@ -0,0 +1,611 @@
+"""Multi-region simulation.
+
+A ``Simulation`` models one flat fleet on one clock.  ``run_regions``
+splits a scenario into regions - datacenters or clusters - each with its
+own fleet, engine options, prices and network ``latency`` from a global
+dispatcher, and runs the regions' engines in worker processes::
+
+    regions = [make_region({'name': 'mumbai', 'vms': {'count': 20, 'cores': 8, 'ram': 32}}),
+               make_region({'name': 'frankfurt', 'vms': {'count': 40, 'cores': 16, 'ram': 64},
+                            'latency': 0.12, 'cpu_cost': 3.1, 'scheduler': 'sjf'})]
+    result = run_regions(table, regions, dispatcher='least_loaded', workers=2)
+    result.stats['p95_wait_time'], result.regions[1].stats['total_cost']
+
+The dispatcher routes every task, as it is submitted, to one region
+(``make_dispatcher``):
+
+* ``least_loaded`` (the default) - the region with the smallest latency
+  plus outstanding work per core, counting the work routed to it that it
+  had not done as of the last window;
+* ``cheapest`` - the lowest price for the task's cores and RAM, ties to
+  the nearest region;
+* ``nearest`` - the lowest latency;
+* ``roundrobin`` - each region in turn.
+
+Only regions with a VM shape (or autoscaler instance type) the task fits
+are considered; a task that fits nowhere is ``unroutable``.  A routed
+task arrives in its region ``latency`` seconds after it was submitted.
+Wait and turnaround are measured from that arrival, as the region's
+engine sees it; ``avg_transfer_time`` gives the latency on top.
+
+Regions are synchronised conservatively, in windows of ``window``
+seconds.  Before a window the dispatcher routes every task submitted by
+its end, then each worker runs its regions up to the end of the window
+and reports how much work each has done.  A task never arrives before
+it is submitted, so no region can be sent a task in its past and
+nothing is ever rolled back; within a window the regions run in
+parallel, and the workers only meet at window boundaries.  The window
+bounds how stale the load ``least_loaded`` routes on can be - it changes
+routing, never causality - and stretches with no submissions are
+skipped in one step.  Tasks are routed in NumPy slices and shipped as
+task-table rows, so a window costs one message per worker however many
+tasks it carries.  With one region and no latency the schedule is that
+of one ``Simulation`` over the whole workload; the statistics agree up
+to floating-point rounding, since stopping at window boundaries (and
+merging accumulators) splits the utilization integrals differently.
+
+Each region keeps its own statistics and task table.  The global
+statistics merge the regions' accumulators (``StatsAccumulator.merge``),
+so percentiles and utilization are over every task and every fleet
+rather than averages of averages.  Dependencies between tasks are not
+supported across regions.
+
+Run ``python -m cloudvista.regions TRACE --regions regions.json`` to
+simulate a trace over the regions listed in a JSON file.
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import multiprocessing
+import os
+import sys
+from abc import ABC, abstractmethod
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from .autoscale import make_autoscaler
+from .engine import DEFAULT_CPU_COST, DEFAULT_RAM_COST, Simulation
+from .models import VM, Task, make_vms
+from .stats import StatsAccumulator
+from .taskstore import TASK_DTYPE, TaskTable
+
+LEAST_LOADED = 'least_loaded'
+CHEAPEST = 'cheapest'
+NEAREST = 'nearest'
+ROUND_ROBIN = 'roundrobin'
+DISPATCHERS = (LEAST_LOADED, CHEAPEST, NEAREST, ROUND_ROBIN)
+
+DEFAULT_WINDOW = 5.0
+
+# per-region ``Simulation`` options (``autoscale`` is a spec)
+REGION_OPTIONS = ('scheduler', 'time_quantum', 'scheduler_options', 'placement',
+                  'batch_packing', 'context_switch', 'autoscale')
+
+# autoscaler statistics that add up across regions
+_SUMMED = ('fleet_cost', 'vm_hours', 'active_vms', 'provisioning_vms', 'vms_launched',
+           'vms_terminated', 'scale_outs', 'scale_ins')
+
+
+# -- regions -----------------------------------------------------------------
+
+@dataclass
+class Region:
+    """A datacenter or cluster: its fleet, prices and engine options."""
+
+    name: str
+    vms: List[VM]
+    latency: float = 0.0
+    cpu_cost: float = DEFAULT_CPU_COST
+    ram_cost: float = DEFAULT_RAM_COST
+    options: Dict[str, Any] = field(default_factory=dict)
+
+    def __post_init__(self) -> None:
+        if not self.vms:
+            raise ValueError('region %s has no VMs' % self.name)
+        if self.latency < 0:
+            raise ValueError('region %s: latency must be non-negative' % self.name)
+        unknown = sorted(set(self.options) - set(REGION_OPTIONS))
+        if unknown:
+            raise ValueError('region %s: unknown options %s' % (self.name, ', '.join(unknown)))
+
+    @property
+    def total_cores(self) -> int:
+        return sum(vm.total_cores for vm in self.vms)
+
+    def shapes(self) -> List[Tuple[int, int]]:
+        """(cores, ram) of every VM shape the region can run a task on."""
+        shapes = {(vm.total_cores, vm.total_ram) for vm in self.vms}
+        spec = self.options.get('autoscale')
+        if spec:
+            shapes.update((kind.cores, kind.ram) for kind in make_autoscaler(spec).types or ())
+        return sorted(shapes)
+
+    def simulation(self, table: TaskTable) -> Simulation:
+        """A fresh engine for the region's fleet, reading ``table``."""
+        options = dict(self.options)
+        spec = options.pop('autoscale', None)
+        return Simulation(
+            [VM(id=vm.id, total_cores=vm.total_cores, total_ram=vm.total_ram,
+                storage=vm.storage) for vm in self.vms],
+            table, cpu_cost=self.cpu_cost, ram_cost=self.ram_cost,
+            autoscaler=make_autoscaler(spec) if spec else None, **options)
+
+
+def make_region(spec: Dict[str, Any]) -> Region:
+    """Build a region from ``{"name": "eu", "vms": {"count": 4, "cores": 8,
+    "ram": 32}, "latency": 0.08, "cpu_cost": 3.5, "scheduler": "sjf"}``.
+
+    ``vms`` may also be a list of VM dicts; keys other than ``name``,
+    ``vms``, ``latency``, ``cpu_cost`` and ``ram_cost`` are engine options
+    (see ``REGION_OPTIONS``).
+    """
+    if not isinstance(spec, dict):
+        raise ValueError('a region must be an object')
+    spec = dict(spec)
+    label = spec.get('name', '?')
+    try:
+        name = str(spec.pop('name'))
+        fleet = spec.pop('vms', {})
+        if isinstance(fleet, dict):
+            vms = make_vms(int(fleet.get('count', 3)), int(fleet.get('cores', 4)),
+                           int(fleet.get('ram', 8)), int(fleet.get('storage', 100)))
+        else:
+            vms = [VM(id=int(item.get('id', i + 1)), total_cores=int(item['total_cores']),
+                      total_ram=int(item['total_ram']), storage=int(item.get('storage', 100)))
+                   for i, item in enumerate(fleet)]
+        if any(vm.total_cores < 1 or vm.total_ram < 1 for vm in vms):
+            raise ValueError('VM cores and ram must be positive')
+        return Region(name, vms, latency=float(spec.pop('latency', 0.0)),
+                      cpu_cost=float(spec.pop('cpu_cost', DEFAULT_CPU_COST)),
+                      ram_cost=float(spec.pop('ram_cost', DEFAULT_RAM_COST)),
+                      options=spec)
+    except KeyError as exc:
+        raise ValueError('region %s is missing %s' % (label, exc))
+    except (AttributeError, TypeError) as exc:
+        raise ValueError('invalid region %s: %s' % (label, exc))
+
+
+# -- dispatchers -------------------------------------------------------------
+
+def _pick(score: np.ndarray, fits: np.ndarray) -> np.ndarray:
+    """Per row, the column of the lowest score ``fits`` allows, else -1."""
+    choice = np.argmin(np.where(fits, score, np.inf), axis=1)
+    choice[~fits.any(axis=1)] = -1
+    return choice
+
+
+class Dispatcher(ABC):
+    """Routes submitted tasks to regions, a window's worth at a time."""
+
+    name = ''
+
+    def bind(self, regions: Sequence[Region]) -> None:
+        self.regions = list(regions)
+        self.latency = np.array([region.latency for region in self.regions])
+        self._shapes = [region.shapes() for region in self.regions]
+
+    def fits(self, rows: np.ndarray) -> np.ndarray:
+        """(tasks, regions) mask of the regions each task row fits in."""
+        mask = np.zeros((len(rows), len(self.regions)), dtype=bool)
+        for column, shapes in enumerate(self._shapes):
+            for cores, ram in shapes:
+                mask[:, column] |= (rows['cpu'] <= cores) & (rows['ram'] <= ram)
+        return mask
+
+    def observe(self, done: Sequence[float], cores: Sequence[int]) -> None:
+        """Each region's core-seconds of work done, and cores in service,
+        as of the end of the last window."""
+
+    @abstractmethod
+    def route(self, rows: np.ndarray, fits: np.ndarray) -> np.ndarray:
+        """Region index per task row (-1 where ``fits`` allows none)."""
+
+
+class Nearest(Dispatcher):
+    name = NEAREST
+
+    def route(self, rows: np.ndarray, fits: np.ndarray) -> np.ndarray:
+        return _pick(np.broadcast_to(self.latency, fits.shape), fits)
+
+
+class Cheapest(Dispatcher):
+    name = CHEAPEST
+
+    def bind(self, regions: Sequence[Region]) -> None:
+        super().bind(regions)
+        # columns nearest-first, so price ties go to the nearest region
+        self._order = np.argsort(self.latency, kind='stable')
+        self._cpu_cost = np.array([self.regions[i].cpu_cost for i in self._order])
+        self._ram_cost = np.array([self.regions[i].ram_cost for i in self._order])
+
+    def route(self, rows: np.ndarray, fits: np.ndarray) -> np.ndarray:
+        price = (rows['cpu'][:, None] * self._cpu_cost + rows['ram'][:, None] * self._ram_cost)
+        choice = _pick(price, fits[:, self._order])
+        return np.where(choice >= 0, self._order[choice], -1)
+
+
+class RoundRobin(Dispatcher):
+    name = ROUND_ROBIN
+
+    def bind(self, regions: Sequence[Region]) -> None:
+        super().bind(regions)
+        self._next = 0
+
+    def route(self, rows: np.ndarray, fits: np.ndarray) -> np.ndarray:
+        count = len(self.regions)
+        choice = np.full(len(rows), -1, dtype=np.int64)
+        for i, allowed in enumerate(fits.tolist()):
+            for step in range(count):
+                region = (self._next + step) % count
+                if allowed[region]:
+                    choice[i] = region
+                    self._next = region + 1
+                    break
+        return choice
+
+
+class LeastLoaded(Dispatcher):
+    """Lowest ``latency + (routed - done) / cores``, in core-seconds."""
+
+    name = LEAST_LOADED
+
+    def bind(self, regions: Sequence[Region]) -> None:
+        super().bind(regions)
+        self._routed = [0.0] * len(self.regions)
+        self._done = [0.0] * len(self.regions)
+        self._cores = [region.total_cores for region in self.regions]
+
+    def observe(self, done: Sequence[float], cores: Sequence[int]) -> None:
+        self._done = list(done)
+        self._cores = [max(1, count) for count in cores]
+
+    def route(self, rows: np.ndarray, fits: np.ndarray) -> np.ndarray:
+        latency = self.latency.tolist()
+        cores = self._cores
+        routed = self._routed
+        backlog = [max(0.0, r - d) for r, d in zip(routed, self._done)]
+        choice = np.full(len(rows), -1, dtype=np.int64)
+        work = (rows['cpu'] * rows['execution_time']).tolist()
+        for i, (amount, allowed) in enumerate(zip(work, fits.tolist())):
+            best, best_at = -1, np.inf
+            for region, ok in enumerate(allowed):
+                if ok:
+                    at = latency[region] + backlog[region] / cores[region]
+                    if at < best_at:
+                        best, best_at = region, at
+            if best >= 0:
+                backlog[best] += amount
+                routed[best] += amount
+                choice[i] = best
+        return choice
+
+
+_DISPATCHERS = {
+    LEAST_LOADED: LeastLoaded,
+    CHEAPEST: Cheapest,
+    NEAREST: Nearest,
+    ROUND_ROBIN: RoundRobin,
+}
+
+
+def make_dispatcher(spec: Union[None, str, Dispatcher]) -> Dispatcher:
+    """A dispatcher by name (default ``least_loaded``), or ``spec`` itself."""
+    if isinstance(spec, Dispatcher):
+        return spec
+    cls = _DISPATCHERS.get(spec or LEAST_LOADED)
+    if cls is None:
+        raise ValueError('unknown dispatcher %r (expected one of %s)'
+                         % (spec, ', '.join(DISPATCHERS)))
+    return cls()
+
+
+# -- workers -----------------------------------------------------------------
+
+class _RegionGroup:
+    """The engines of some of the regions, advanced window by window."""
+
+    def __init__(self, regions: Dict[int, Region], names: Sequence[str]) -> None:
+        self.tables = {index: TaskTable.from_data(np.empty(0, dtype=TASK_DTYPE), names)
+                       for index in regions}
+        self.simulations = {index: region.simulation(self.tables[index])
+                            for index, region in regions.items()}
+        for simulation in self.simulations.values():
+            simulation.open = True
+
+    def handle(self, message: Tuple[Any, ...]) -> Dict[int, Tuple[Any, ...]]:
+        if message[0] == 'advance':
+            return self.advance(*message[1:])
+        return self.finish(*message[1:])
+
+    def advance(self, until: float,
+                batches: Dict[int, np.ndarray]) -> Dict[int, Tuple[float, int]]:
+        """Queue the routed rows, run to ``until``, report work done."""
+        self._submit(batches)
+        report = {}
+        for index, simulation in self.simulations.items():
+            simulation.run_until(until)
+            report[index] = (simulation.stats.core_seconds, simulation.stats.total_cores)
+        return report
+
+    def _submit(self, batches: Dict[int, np.ndarray]) -> None:
+        for index, rows in batches.items():
+            table = self.tables[index]
+            self.simulations[index].submit(table.iter_rows(table.append_rows(rows)))
+
+    def finish(self, batches: Dict[int, np.ndarray]) -> Dict[int, Tuple[Any, ...]]:
+        """Queue the last routed rows and run every region to completion."""
+        self._submit(batches)
+        outcome = {}
+        for index, simulation in self.simulations.items():
+            simulation.open = False
+            outcome[index] = (simulation.run().stats, simulation.stats,
+                              self.tables[index].data.copy(), simulation.vms)
+        return outcome
+
+
+def _serve(conn: Any, regions: Dict[int, Region], names: Sequence[str]) -> None:
+    """Worker process: answer the parent's messages until it sends None."""
+    try:
+        group = _RegionGroup(regions, names)
+    except Exception as exc:
+        conn.send(exc)
+        return
+    conn.send(None)
+    while True:
+        message = conn.recv()
+        if message is None:
+            break
+        try:
+            conn.send(group.handle(message))
+        except Exception as exc:
+            conn.send(exc)
+    conn.close()
+
+
+class _LocalGroup:
+    def __init__(self, regions: Dict[int, Region], names: Sequence[str]) -> None:
+        self.group = _RegionGroup(regions, names)
+        self._reply: Any = None
+
+    def send(self, message: Tuple[Any, ...]) -> None:
+        self._reply = self.group.handle(message)
+
+    def receive(self) -> Dict[int, Tuple[Any, ...]]:
+        return self._reply
+
+    def close(self) -> None:
+        pass
+
+
+class _RemoteGroup:
+    def __init__(self, regions: Dict[int, Region], names: Sequence[str]) -> None:
+        self.conn, child = multiprocessing.Pipe()
+        self.process = multiprocessing.Process(target=_serve, args=(child, regions, names),
+                                               daemon=True)
+        self.process.start()
+        child.close()
+        self.receive()
+
+    def send(self, message: Tuple[Any, ...]) -> None:
+        self.conn.send(message)
+
+    def receive(self) -> Any:
+        reply = self.conn.recv()
+        if isinstance(reply, BaseException):
+            raise reply
+        return reply
+
+    def close(self) -> None:
+        try:
+            self.conn.send(None)
+        except OSError:
+            pass
+        self.process.join(timeout=5)
+        if self.process.is_alive():
+            self.process.terminate()
+        self.conn.close()
+
+
+def _partition(regions: Sequence[Region], workers: int) -> List[Dict[int, Region]]:
+    """Regions spread over ``workers``, biggest fleets first (LPT)."""
+    parts: List[Dict[int, Region]] = [{} for _ in range(workers)]
+    cores = [0] * workers
+    for index in sorted(range(len(regions)), key=lambda i: -regions[i].total_cores):
+        worker = cores.index(min(cores))
+        parts[worker][index] = regions[index]
+        cores[worker] += regions[index].total_cores
+    return parts
+
+
+def _exchange(groups: Sequence[Any], messages: Sequence[Tuple[Any, ...]]
+              ) -> Dict[int, Tuple[Any, ...]]:
+    """Send every group its message, then gather the replies (a barrier)."""
+    for group, message in zip(groups, messages):
+        group.send(message)
+    replies: Dict[int, Tuple[Any, ...]] = {}
+    for group in groups:
+        replies.update(group.receive())
+    return replies
+
+
+# -- results -----------------------------------------------------------------
+
+@dataclass
+class RegionResult:
+    name: str
+    stats: Dict[str, Any]
+    table: TaskTable
+    vms: List[VM]
+    routed: int
+
+
+@dataclass
+class MultiRegionResult:
+    """Per-region results, the merged global statistics and the tasks no
+    region could run."""
+
+    regions: List[RegionResult]
+    stats: Dict[str, Any]
+    unroutable: TaskTable
+    windows: int
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'stats': self.stats,
+            'regions': [{'name': region.name, 'routed_tasks': region.routed,
+                         'vm_count': len(region.vms), 'stats': region.stats}
+                        for region in self.regions],
+            'unroutable': self.unroutable.column('id').tolist(),
+            'windows': self.windows,
+        }
+
+
+# -- driver ------------------------------------------------------------------
+
+def run_regions(tasks: Union[TaskTable, Iterable[Task]], regions: Sequence[Region],
+                dispatcher: Union[None, str, Dispatcher] = None,
+                window: float = DEFAULT_WINDOW,
+                workers: Optional[int] = None) -> MultiRegionResult:
+    """Route ``tasks`` over ``regions`` and simulate every region.
+
+    ``workers=1`` runs the regions in-process; otherwise they are spread
+    over up to ``workers`` (default: CPU count) worker processes.
+    """
+    regions = list(regions)
+    if not regions:
+        raise ValueError('no regions')
+    if len({region.name for region in regions}) != len(regions):
+        raise ValueError('region names must be unique')
+    if window <= 0:
+        raise ValueError('window must be positive')
+    dispatcher = make_dispatcher(dispatcher)
+    if isinstance(tasks, TaskTable):
+        table = tasks
+    else:
+        tasks = list(tasks)
+        if any(task.dependencies for task in tasks):
+            raise ValueError('task dependencies are not supported across regions')
+        table = TaskTable.from_tasks(tasks)
+    for region in regions:
+        region.simulation(TaskTable())   # reject bad options before any worker starts
+    base = table.data[table.pending_order()]
+    arrival = base['arrival_time']
+    dispatcher.bind(regions)
+    fits = dispatcher.fits(base)
+
+    workers = min(workers or os.cpu_count() or 1, len(regions))
+    parts = _partition(regions, workers)
+    names = table.names.names
+    groups: List[Any] = []
+    try:
+        for part in parts:
+            groups.append(_LocalGroup(part, names) if workers == 1
+                          else _RemoteGroup(part, names))
+
+        def send(kind: str, *args: Any, batches: Dict[int, np.ndarray]
+                 ) -> Dict[int, Tuple[Any, ...]]:
+            return _exchange(groups, [(kind,) + args + ({index: rows for index, rows
+                                                         in batches.items() if index in part},)
+                                      for part in parts])
+
+        def advance(until: float, batches: Dict[int, np.ndarray]) -> None:
+            report = send('advance', until, batches=batches)
+            dispatcher.observe([report[i][0] for i in range(len(regions))],
+                               [report[i][1] for i in range(len(regions))])
+
+        routed = [0] * len(regions)
+        unroutable = []
+        windows = 0
+        until, lo = 0.0, 0
+        batches: Dict[int, np.ndarray] = {}
+        while lo < len(base):
+            if arrival[lo] > until + window:
+                # nothing is submitted until then: catch up in one step
+                until = float(np.nextafter(arrival[lo], -np.inf))
+                advance(until, {})
+            until += window
+            hi = int(np.searchsorted(arrival, until, side='right'))
+            rows = base[lo:hi]
+            choice = dispatcher.route(rows, fits[lo:hi])
+            batches = {}
+            for index, region in enumerate(regions):
+                sent = rows[choice == index]
+                if len(sent):
+                    sent['arrival_time'] += region.latency
+                    batches[index] = sent
+                    routed[index] += len(sent)
+            unroutable.append(rows[choice < 0])
+            windows += 1
+            lo = hi
+            if lo < len(base):
+                advance(until, batches)
+        # nothing more will be submitted: the last window runs to the end
+        outcome = send('finish', batches=batches)
+    finally:
+        for group in groups:
+            group.close()
+
+    results = []
+    merged = StatsAccumulator()
+    for index, region in enumerate(regions):
+        stats, accumulator, data, vms = outcome[index]
+        stats['routed_tasks'] = routed[index]
+        stats['avg_transfer_time'] = region.latency
+        merged.merge(accumulator)
+        results.append(RegionResult(region.name, stats, TaskTable.from_data(data, names),
+                                    vms, routed[index]))
+    stats = merged.snapshot()
+    for name in _SUMMED:
+        values = [result.stats[name] for result in results if name in result.stats]
+        if values:
+            stats[name] = sum(values)
+    lost = np.concatenate(unroutable) if unroutable else base[:0]
+    total = sum(routed)
+    stats['routed_tasks'] = total
+    stats['unroutable_tasks'] = len(lost)
+    stats['avg_transfer_time'] = (sum(count * region.latency for count, region
+                                      in zip(routed, regions)) / total if total else 0.0)
+    return MultiRegionResult(results, stats, TaskTable.from_data(lost, names), windows)
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    from .traces import read_trace
+
+    parser = argparse.ArgumentParser(description='Simulate a trace over several regions.')
+    parser.add_argument('trace')
+    parser.add_argument('--regions', required=True,
+                        help='JSON file with a list of region specs')
+    parser.add_argument('--dispatcher', choices=DISPATCHERS, default=LEAST_LOADED)
+    parser.add_argument('--window', type=float, default=DEFAULT_WINDOW)
+    parser.add_argument('--workers', type=int)
+    parser.add_argument('--rebase', action='store_true')
+    parser.add_argument('--output', help='JSON file (default: stdout)')
+    args = parser.parse_args(argv)
+
+    table = TaskTable()
+    table.extend(read_trace(args.trace, rebase=args.rebase))
+    with open(args.regions) as f:
+        specs = json.load(f)
+    try:
+        result = run_regions(table, [make_region(spec) for spec in specs],
+                             dispatcher=args.dispatcher, window=args.window,
+                             workers=args.workers)
+    except ValueError as exc:
+        parser.error(str(exc))
+    report = result.to_dict()
+    if args.output:
+        with open(args.output, 'w') as out:
+            json.dump(report, out, indent=2)
+            out.write('\n')
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        sys.stdout.write('\n')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
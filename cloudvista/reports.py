@@ -0,0 +1,400 @@
+"""Server-side reports for finished simulations.
+
+``generatePDF`` rasterised the page with html2canvas into one PNG, which
+truncated long task lists and needed a browser.  Reports are now built
+from the simulation data itself, reading task rows as a stream:
+
+* ``pdf`` - ReportLab document with a summary table, vector charts and a
+  paginated per-task table.  Task pages are produced lazily while the
+  document is laid out, so memory does not grow with the number of
+  flowables;
+* ``csv`` - task rows written as they are read;
+* ``parquet`` - task rows in row groups (needs the optional ``pyarrow``).
+
+``ReportJobs`` runs generation in a small background pool and tracks
+each job's status for the API.
+"""
+
+from __future__ import annotations
+
+import csv
+import importlib.util
+import itertools
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence
+
+from reportlab.graphics.charts.barcharts import VerticalBarChart
+from reportlab.graphics.charts.lineplots import LinePlot
+from reportlab.graphics.shapes import Drawing, String
+from reportlab.lib import colors
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.styles import getSampleStyleSheet
+from reportlab.lib.units import mm
+from reportlab.platypus import (Flowable, PageBreak, Paragraph, SimpleDocTemplate,
+                                Spacer, Table, TableStyle)
+
+from .stats import QuantileSketch
+from .storage import TaskRow, result_rows
+
+PDF = 'pdf'
+CSV = 'csv'
+PARQUET = 'parquet'
+FORMATS = (PDF, CSV, PARQUET)
+
+TASK_COLUMNS = ('id', 'name', 'cpu_required', 'ram_required', 'priority', 'vm_id',
+                'execution_time', 'arrival_time', 'start_time', 'end_time', 'cost')
+
+QUEUED = 'queued'
+RUNNING = 'running'
+DONE = 'done'
+FAILED = 'failed'
+
+
+class ReportError(ValueError):
+    """Raised for unknown formats or missing optional dependencies."""
+
+
+class ReportSource:
+    """A run's summary plus a re-readable stream of its task rows."""
+
+    def __init__(self, summary: Dict[str, Any], rows: Callable[[], Iterator[TaskRow]]) -> None:
+        self.summary = summary
+        self._rows = rows
+
+    def rows(self) -> Iterator[TaskRow]:
+        """The task rows, with the default ``Task-<id>`` names (stored as
+        NULL) filled in as the UI shows them."""
+        for row in self._rows():
+            if row[1] is None:
+                row = (row[0], 'Task-%d' % row[0]) + tuple(row[2:])
+            yield row
+
+    @classmethod
+    def from_store(cls, store: Any, simulation_id: int) -> 'ReportSource':
+        summary = store.get_simulation(simulation_id)
+        if summary is None:
+            raise ReportError('simulation %d not found' % simulation_id)
+        return cls(summary, lambda: store.iter_task_rows(simulation_id))
+
+    @classmethod
+    def from_result(cls, result: Any, **options: Any) -> 'ReportSource':
+        stats = result.stats
+        summary = {
+            'id': None,
+            'created_at': time.time(),
+            'scheduler': result.scheduler,
+            'task_count': stats.get('completed_tasks', 0),
+            'avg_wait_time': stats.get('avg_wait_time'),
+            'p95_wait_time': stats.get('p95_wait_time'),
+            'avg_turnaround_time': stats.get('avg_turnaround_time'),
+            'cpu_utilization': stats.get('cpu_utilization'),
+            'ram_utilization': stats.get('ram_utilization'),
+            'total_cost': stats.get('total_cost', 0.0),
+            'avg_cost_per_task': stats.get('avg_cost_per_task', 0.0),
+            'makespan': stats.get('makespan'),
+        }
+        summary.update(options)
+        return cls(summary, lambda: result_rows(result))
+
+
+# -- tabular exports ---------------------------------------------------
+
+def write_csv(source: ReportSource, path: str) -> int:
+    count = 0
+    with open(path, 'w', newline='') as out:
+        writer = csv.writer(out)
+        writer.writerow(TASK_COLUMNS)
+        for row in source.rows():
+            writer.writerow(row)
+            count += 1
+    return count
+
+
+_PARQUET_MISSING = 'parquet export requires pyarrow (pip install pyarrow)'
+
+
+def write_parquet(source: ReportSource, path: str, row_group: int = 65536) -> int:
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise ReportError(_PARQUET_MISSING)
+    schema = pa.schema([
+        ('id', pa.int64()), ('name', pa.string()), ('cpu_required', pa.int32()),
+        ('ram_required', pa.int32()), ('priority', pa.int64()), ('vm_id', pa.int32()),
+        ('execution_time', pa.float64()), ('arrival_time', pa.float64()),
+        ('start_time', pa.float64()), ('end_time', pa.float64()), ('cost', pa.float64()),
+    ])
+    count = 0
+    rows = source.rows()
+    with pq.ParquetWriter(path, schema) as writer:
+        while True:
+            chunk = list(itertools.islice(rows, row_group))
+            if not chunk:
+                break
+            columns = list(zip(*chunk))
+            writer.write_table(pa.Table.from_arrays(
+                [pa.array(col, type=field.type) for col, field in zip(columns, schema)],
+                schema=schema))
+            count += len(chunk)
+    return count
+
+
+# -- PDF ---------------------------------------------------------------
+
+class _Aggregates:
+    """Chart data gathered in one pass over the task rows."""
+
+    def __init__(self, makespan: float, bins: int = 50) -> None:
+        self.wait = QuantileSketch()
+        self.bins = bins
+        self.width = (makespan or 1.0) / bins
+        self.completions = [0] * bins
+        self.vm_cost: Dict[Any, float] = {}
+        self.vm_tasks: Dict[Any, int] = {}
+
+    def add(self, row: TaskRow) -> None:
+        start, end, cost, vm = row[8], row[9], row[10], row[5]
+        if start is not None:
+            self.wait.add(start - row[7])
+        if end is not None:
+            self.completions[min(self.bins - 1, max(0, int(end / self.width)))] += 1
+        self.vm_cost[vm] = self.vm_cost.get(vm, 0.0) + (cost or 0.0)
+        self.vm_tasks[vm] = self.vm_tasks.get(vm, 0) + 1
+
+
+def _charts(agg: _Aggregates, width: float) -> List[Drawing]:
+    def titled(drawing: Any, title: str) -> Any:
+        drawing.add(String(0, drawing.height - 12, title, fontName='Helvetica-Bold', fontSize=10))
+        return drawing
+
+    charts = []
+    # completions over simulated time
+    drawing = Drawing(width, 170)
+    plot = LinePlot()
+    plot.x, plot.y, plot.width, plot.height = 40, 25, width - 60, 115
+    plot.data = [[((i + 0.5) * agg.width, n) for i, n in enumerate(agg.completions)]]
+    plot.lines[0].strokeColor = colors.HexColor('#4a90e2')
+    drawing.add(plot)
+    charts.append(titled(drawing, 'Task completions over time (s)'))
+
+    # wait-time distribution as a quantile curve
+    if agg.wait.count:
+        drawing = Drawing(width, 170)
+        plot = LinePlot()
+        plot.x, plot.y, plot.width, plot.height = 40, 25, width - 60, 115
+        plot.data = [[(q, agg.wait.quantile(q / 100.0) or 0.0) for q in range(0, 101, 5)]]
+        plot.lines[0].strokeColor = colors.HexColor('#7db9e8')
+        drawing.add(plot)
+        charts.append(titled(drawing, 'Wait time (s) by percentile'))
+
+    # cost per VM, the 30 most expensive
+    top = sorted(agg.vm_cost.items(), key=lambda kv: -kv[1])[:30]
+    if top:
+        drawing = Drawing(width, 170)
+        bars = VerticalBarChart()
+        bars.x, bars.y, bars.width, bars.height = 40, 25, width - 60, 115
+        bars.data = [[cost for _, cost in top]]
+        bars.categoryAxis.categoryNames = ['-' if vm is None else str(vm) for vm, _ in top]
+        bars.categoryAxis.labels.fontSize = 6
+        bars.bars[0].fillColor = colors.HexColor('#4a90e2')
+        drawing.add(bars)
+        charts.append(titled(drawing, 'Cost per VM (INR)'))
+    return charts
+
+
+def _fmt(value: Any) -> str:
+    if value is None:
+        return '-'
+    if isinstance(value, float):
+        return '%.2f' % value
+    return str(value)
+
+
+class TaskRows(Flowable):
+    """A block of task rows drawn straight onto the canvas.
+
+    Much cheaper than a platypus ``Table`` per row, and splittable at
+    any row boundary so each page is filled exactly.
+    """
+
+    row_height = 11.0
+    header = ('ID', 'Name', 'CPU', 'RAM', 'Prio', 'VM', 'Exec', 'Arrive',
+              'Start', 'End', 'Cost')
+    weights = (1.0, 2.4, 0.7, 0.7, 0.7, 0.7, 1.0, 1.1, 1.1, 1.1, 1.0)
+
+    def __init__(self, rows: Sequence[TaskRow]) -> None:
+        super().__init__()
+        self.rows = rows
+
+    def wrap(self, avail_width: float, avail_height: float) -> Any:
+        self.width = avail_width
+        self.height = self.row_height * (len(self.rows) + 1)
+        return self.width, self.height
+
+    def split(self, avail_width: float, avail_height: float) -> List[Any]:
+        fit = int(avail_height // self.row_height) - 1
+        if fit < 1 or fit >= len(self.rows):
+            return []
+        return [TaskRows(self.rows[:fit]), TaskRows(self.rows[fit:])]
+
+    def draw(self) -> None:
+        canv = self.canv
+        total = sum(self.weights)
+        xs = list(itertools.accumulate([0.0] + [w / total * self.width for w in self.weights]))
+        y = self.height - self.row_height + 3
+        canv.setFont('Helvetica-Bold', 7)
+        for x, label in zip(xs, self.header):
+            canv.drawString(x, y, label)
+        canv.setLineWidth(0.4)
+        canv.line(0, y - 2, self.width, y - 2)
+        canv.setFont('Helvetica', 7)
+        for row in self.rows:
+            y -= self.row_height
+            for x, value in zip(xs, row):
+                canv.drawString(x, y, _fmt(value)[:18])
+
+
+class _LazyStory(list):
+    """Flowable list that pulls more flowables from a generator on demand.
+
+    ``BaseDocTemplate.build`` consumes its list from the front and checks
+    ``len`` before each flowable, so refilling there keeps only a few
+    task blocks alive at a time.
+    """
+
+    def __init__(self, head: List[Any], more: Iterator[Any]) -> None:
+        super().__init__(head)
+        self._more = more
+
+    def __len__(self) -> int:
+        if list.__len__(self) < 2:
+            self.extend(itertools.islice(self._more, 4))
+        return list.__len__(self)
+
+
+def write_pdf(source: ReportSource, path: str, block_rows: int = 200) -> int:
+    summary = source.summary
+    agg = _Aggregates(summary.get('makespan') or 0.0)
+    count = 0
+    for row in source.rows():
+        agg.add(row)
+        count += 1
+
+    styles = getSampleStyleSheet()
+    doc = SimpleDocTemplate(path, pagesize=A4, leftMargin=15 * mm, rightMargin=15 * mm,
+                            topMargin=15 * mm, bottomMargin=15 * mm,
+                            title='CloudVista Simulation Report')
+    title = 'CloudVista Simulation Report'
+    if summary.get('id') is not None:
+        title += ' #%d' % summary['id']
+    created = time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(summary.get('created_at') or time.time()))
+    facts = [(key.replace('_', ' ').capitalize(), _fmt(summary[key]))
+             for key in ('scheduler', 'placement', 'time_quantum', 'vm_count', 'task_count',
+                         'avg_wait_time', 'max_wait_time', 'p95_wait_time',
+                         'avg_turnaround_time', 'cpu_utilization', 'ram_utilization',
+                         'total_cost', 'avg_cost_per_task', 'makespan')
+             if summary.get(key) is not None]
+    table = Table(facts, colWidths=[60 * mm, 60 * mm])
+    table.setStyle(TableStyle([
+        ('FONT', (0, 0), (0, -1), 'Helvetica-Bold', 9),
+        ('FONT', (1, 0), (1, -1), 'Helvetica', 9),
+        ('ROWBACKGROUNDS', (0, 0), (-1, -1), [colors.whitesmoke, colors.white]),
+        ('GRID', (0, 0), (-1, -1), 0.25, colors.lightgrey),
+    ]))
+    head = [Paragraph(title, styles['Title']),
+            Paragraph('Generated %s' % created, styles['Normal']),
+            Spacer(1, 6 * mm), table, Spacer(1, 6 * mm)]
+    head.extend(_charts(agg, doc.width))
+    head.append(PageBreak())
+    head.append(Paragraph('Tasks (%d)' % count, styles['Heading2']))
+
+    def blocks() -> Iterator[Any]:
+        rows = source.rows()
+        while True:
+            chunk = list(itertools.islice(rows, block_rows))
+            if not chunk:
+                return
+            yield TaskRows(chunk)
+
+    doc.build(_LazyStory(head, blocks()))
+    return count
+
+
+_WRITERS = {PDF: write_pdf, CSV: write_csv, PARQUET: write_parquet}
+
+
+def generate(source: ReportSource, fmt: str, path: str) -> int:
+    """Write ``source`` to ``path`` in ``fmt``; returns the number of task rows."""
+    try:
+        writer = _WRITERS[fmt]
+    except KeyError:
+        raise ReportError('unknown report format %r (expected one of %s)'
+                          % (fmt, ', '.join(FORMATS)))
+    return writer(source, path)
+
+
+# -- background jobs ---------------------------------------------------
+
+class ReportJobs:
+    """Generates reports on a small thread pool and tracks their status."""
+
+    def __init__(self, directory: str, workers: int = 2) -> None:
+        self.directory = directory
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='report')
+        self._lock = threading.Lock()
+        self._jobs: Dict[str, Dict[str, Any]] = {}
+
+    def submit(self, source: ReportSource, fmt: str) -> Dict[str, Any]:
+        if fmt not in FORMATS:
+            raise ReportError('unknown report format %r (expected one of %s)'
+                              % (fmt, ', '.join(FORMATS)))
+        # fail the request, not the job, when the optional writer is missing
+        if fmt == PARQUET and importlib.util.find_spec('pyarrow') is None:
+            raise ReportError(_PARQUET_MISSING)
+        os.makedirs(self.directory, exist_ok=True)
+        job_id = uuid.uuid4().hex
+        label = source.summary.get('id') or 'run'
+        path = os.path.join(self.directory, 'cloudvista_report_%s_%s.%s'
+                            % (label, job_id[:8], fmt))
+        job = {'id': job_id, 'status': QUEUED, 'format': fmt, 'path': path,
+               'rows': None, 'error': None, 'created_at': time.time(),
+               'finished_at': None}
+        with self._lock:
+            self._jobs[job_id] = job
+        self._pool.submit(self._run, job_id, source)
+        return self.status(job_id)
+
+    def _run(self, job_id: str, source: ReportSource) -> None:
+        self._update(job_id, status=RUNNING)
+        job = self.status(job_id)
+        try:
+            rows = generate(source, job['format'], job['path'])
+        except Exception as exc:
+            self._update(job_id, status=FAILED, error=str(exc), finished_at=time.time())
+        else:
+            self._update(job_id, status=DONE, rows=rows, finished_at=time.time())
+
+    def _update(self, job_id: str, **changes: Any) -> None:
+        with self._lock:
+            self._jobs[job_id].update(changes)
+
+    def status(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return dict(job) if job else None
+
+    def wait(self, job_id: str, timeout: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        """Poll until the job finishes (used by synchronous requests)."""
+        deadline = None if timeout is None else time.time() + timeout
+        while True:
+            job = self.status(job_id)
+            if job is None or job['status'] in (DONE, FAILED):
+                return job
+            if deadline is not None and time.time() >= deadline:
+                return job
+            time.sleep(0.05)
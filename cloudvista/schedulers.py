@@ -0,0 +1,338 @@
+"""Scheduling policies for the engine.
+
+``startSimulation`` sorted the pending tasks once (Priority) or kept them
+in arrival order (FCFS, Round Robin), and the engine hard-coded those
+three.  A policy now decides two things for the engine:
+
+* how waiting tasks are ordered.  *Keyed* policies give each task a sort
+  key when it is queued; the engine keeps one heap per (cpu, ram) class
+  and starts every task that fits, in key order.  *FIFO* policies keep
+  one or more FIFO levels and dispatch strictly from the head of the
+  highest non-empty level, stopping at the first task that cannot be
+  placed (as ``simulateRoundRobin`` did);
+* whether tasks run to completion or in quantum slices, going back to
+  the queue between slices.
+
+Enqueue and dequeue are O(log n) for keyed policies and O(1) for FIFO
+ones.  Keys are fixed once a task is queued, which is what keeps them in
+a heap; aging, for instance, is expressed as a key that does not change
+with time (see ``AgingPriority``).
+
+Built-in policies, by name:
+
+==========  =======  ======  ==============================================
+name        order    slices  runs first
+==========  =======  ======  ==============================================
+fcfs        keyed    no      earliest arrival
+priority    keyed    no      highest ``priority``
+sjf         keyed    no      shortest ``execution_time``
+edf         keyed    no      earliest ``deadline`` (tasks without one last)
+aging       keyed    no      highest priority plus ``aging_rate`` per
+                             second waited
+heft        keyed    no      highest upward rank: the longest chain of
+                             work from the task through its dependents
+roundrobin  FIFO     yes     the FIFO head
+srtf        keyed    yes     shortest remaining time, re-decided after
+                             every quantum
+mlfq        FIFO     yes     the head of the highest of ``levels`` queues;
+                             a task that uses its whole quantum drops a
+                             level, and lower levels get longer quanta
+==========  =======  ======  ==============================================
+
+SRTF preempts at quantum boundaries rather than at arbitrary arrivals:
+tasks share multi-core VMs, so there is no single running task for a
+newcomer to displace.  MLFQ moves every task back to the top level every
+``boost_interval`` seconds so long jobs are not starved.  HEFT ranks
+come from the run's dependency graph (see ``dag``); a task outside it
+ranks by its own ``execution_time``.
+
+A ``Scheduler`` instance holds per-run state; create one per simulation
+(``make_scheduler`` does).
+"""
+
+from __future__ import annotations
+
+import math
+from abc import ABC, abstractmethod
+from fractions import Fraction
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Sequence, Union
+
+from .models import Task
+
+if TYPE_CHECKING:
+    from .dag import TaskGraph
+
+FCFS = 'fcfs'
+PRIORITY = 'priority'
+ROUND_ROBIN = 'roundrobin'
+SJF = 'sjf'
+SRTF = 'srtf'
+EDF = 'edf'
+AGING = 'aging'
+MLFQ = 'mlfq'
+HEFT = 'heft'
+
+Exact = Union[int, Fraction]
+
+
+def exact(value: float) -> Exact:
+    """The decimal a float was written as, e.g. 0.1 -> 1/10.
+
+    Whole numbers stay ``int``, which keeps integer workloads off the
+    slower ``Fraction`` arithmetic.
+    """
+    value = float(value)
+    if value.is_integer():
+        return int(value)
+    return Fraction(repr(value))
+
+
+class Scheduler(ABC):
+    """Base policy: keyed order, tasks run to completion."""
+
+    name = ''
+    #: number of FIFO levels; 0 means keyed order
+    levels = 0
+    #: tasks run in quantum slices and are re-queued between them
+    preemptive = False
+
+    def __init__(self, time_quantum: float = 2.0) -> None:
+        self.time_quantum = float(time_quantum)
+        if self.preemptive and self.time_quantum <= 0:
+            raise ValueError('time_quantum must be positive for %s' % self.name)
+
+    @abstractmethod
+    def key(self, task: Task, now: float) -> float:
+        """Sort key for a keyed policy; smaller runs first."""
+
+    def level(self, task: Task) -> int:
+        """FIFO level a (re-)queued task joins."""
+        return 0
+
+    def quantum(self, task: Task) -> Exact:
+        """Exact slice length for the task's next dispatch; by default the
+        rest of its run."""
+        return exact(task.remaining_time)
+
+    def preempted(self, task: Task) -> None:
+        """Called when a task used up its slice without finishing."""
+
+    def finished(self, task: Task) -> None:
+        """Called when a task completes."""
+
+    def boost_due(self, now: float) -> bool:
+        """True when every queued task should move back to level 0."""
+        return False
+
+    def bind_graph(self, graph: Optional['TaskGraph']) -> None:
+        """Called with the run's dependency graph (or None) before any
+        task is queued."""
+
+    def options(self) -> Dict[str, Any]:
+        """Constructor options other than ``time_quantum``."""
+        return {}
+
+    def state(self, positions: Dict[int, int]) -> Dict[str, Any]:
+        """Per-run state as JSON-able data, for checkpoints.
+
+        ``positions`` maps ``id(task)`` of every queued or running task to
+        the position it is saved at; ``restore`` gets the tasks back in
+        that order.
+        """
+        return {}
+
+    def restore(self, state: Dict[str, Any], tasks: Sequence[Task]) -> None:
+        """Reload what ``state`` returned."""
+
+
+class FirstComeFirstServe(Scheduler):
+    name = FCFS
+
+    def key(self, task: Task, now: float) -> float:
+        return task.arrival_time
+
+
+class PriorityScheduler(Scheduler):
+    name = PRIORITY
+
+    def key(self, task: Task, now: float) -> float:
+        return -task.priority
+
+
+class ShortestJobFirst(Scheduler):
+    name = SJF
+
+    def key(self, task: Task, now: float) -> float:
+        return task.execution_time
+
+
+class EarliestDeadlineFirst(Scheduler):
+    name = EDF
+
+    def key(self, task: Task, now: float) -> float:
+        return math.inf if task.deadline is None else task.deadline
+
+
+class AgingPriority(Scheduler):
+    """Priority that grows by ``aging_rate`` for every second spent queued.
+
+    Effective priority at time t is ``priority + rate * (t - queued_at)``.
+    The ``rate * t`` term is shared by every waiting task, so ordering by
+    ``rate * queued_at - priority`` is the same ordering and never
+    changes while a task waits.
+    """
+
+    name = AGING
+
+    def __init__(self, time_quantum: float = 2.0, aging_rate: float = 0.1) -> None:
+        super().__init__(time_quantum)
+        if aging_rate < 0:
+            raise ValueError('aging_rate must be non-negative')
+        self.aging_rate = float(aging_rate)
+
+    def key(self, task: Task, now: float) -> float:
+        return self.aging_rate * now - task.priority
+
+    def options(self) -> Dict[str, Any]:
+        return {'aging_rate': self.aging_rate}
+
+
+class UpwardRank(Scheduler):
+    """Critical path first: the list-scheduling order of HEFT."""
+
+    name = HEFT
+
+    def __init__(self, time_quantum: float = 2.0) -> None:
+        super().__init__(time_quantum)
+        self._index: Dict[int, int] = {}
+        self._rank: List[float] = []
+
+    def bind_graph(self, graph: Optional['TaskGraph']) -> None:
+        if graph is None:
+            self._index, self._rank = {}, []
+        else:
+            self._index, self._rank = graph.index, graph.upward_rank()
+
+    def key(self, task: Task, now: float) -> float:
+        node = self._index.get(task.id)
+        return -(task.execution_time if node is None else self._rank[node])
+
+
+class RoundRobin(Scheduler):
+    name = ROUND_ROBIN
+    levels = 1
+    preemptive = True
+
+    def __init__(self, time_quantum: float = 2.0) -> None:
+        super().__init__(time_quantum)
+        self._quantum = exact(self.time_quantum)
+
+    def key(self, task: Task, now: float) -> float:
+        # a FIFO serves tasks in the order they were queued
+        return now
+
+    def quantum(self, task: Task) -> Exact:
+        return self._quantum
+
+
+class ShortestRemainingTimeFirst(RoundRobin):
+    name = SRTF
+    levels = 0
+
+    def key(self, task: Task, now: float) -> float:
+        return task.remaining_time
+
+
+class MultilevelFeedbackQueue(Scheduler):
+    """``levels`` FIFO queues; level i has a quantum of ``time_quantum * 2**i``.
+
+    The boost is lazy: it has no event of its own and is applied by the
+    first dispatch at or after each multiple of ``boost_interval``.  Queues
+    only change at events, so the same tasks are lifted as an exact boost
+    would lift, but a slice that spans the boost time keeps its length and
+    its task is lifted when the slice ends.  After an idle stretch the
+    missed boosts collapse into one.
+    """
+
+    name = MLFQ
+    levels = 3
+    preemptive = True
+
+    def __init__(self, time_quantum: float = 2.0, levels: int = 3,
+                 boost_interval: float = 0.0) -> None:
+        super().__init__(time_quantum)
+        if levels < 1:
+            raise ValueError('mlfq needs at least one level')
+        if boost_interval < 0:
+            raise ValueError('boost_interval must be non-negative')
+        self.levels = int(levels)
+        self.boost_interval = float(boost_interval)
+        self._next_boost = self.boost_interval
+        self._quanta: List[Exact] = [exact(self.time_quantum) * 2 ** i
+                                     for i in range(self.levels)]
+        self._level: Dict[int, int] = {}
+
+    def key(self, task: Task, now: float) -> float:
+        return now
+
+    def level(self, task: Task) -> int:
+        return self._level.get(id(task), 0)
+
+    def quantum(self, task: Task) -> Exact:
+        return self._quanta[self._level.get(id(task), 0)]
+
+    def preempted(self, task: Task) -> None:
+        key = id(task)
+        self._level[key] = min(self._level.get(key, 0) + 1, self.levels - 1)
+
+    def finished(self, task: Task) -> None:
+        self._level.pop(id(task), None)
+
+    def boost_due(self, now: float) -> bool:
+        if not self.boost_interval or now < self._next_boost:
+            return False
+        while self._next_boost <= now:
+            self._next_boost += self.boost_interval
+        self._level.clear()
+        return True
+
+    def options(self) -> Dict[str, Any]:
+        return {'levels': self.levels, 'boost_interval': self.boost_interval}
+
+    def state(self, positions: Dict[int, int]) -> Dict[str, Any]:
+        return {'next_boost': self._next_boost,
+                'levels': [[positions[key], level] for key, level in self._level.items()]}
+
+    def restore(self, state: Dict[str, Any], tasks: Sequence[Task]) -> None:
+        self._next_boost = state['next_boost']
+        self._level = {id(tasks[pos]): level for pos, level in state['levels']}
+
+
+POLICIES: Dict[str, type] = {
+    FCFS: FirstComeFirstServe,
+    PRIORITY: PriorityScheduler,
+    ROUND_ROBIN: RoundRobin,
+    SJF: ShortestJobFirst,
+    SRTF: ShortestRemainingTimeFirst,
+    EDF: EarliestDeadlineFirst,
+    AGING: AgingPriority,
+    MLFQ: MultilevelFeedbackQueue,
+    HEFT: UpwardRank,
+}
+SCHEDULERS = tuple(POLICIES)
+PREEMPTIVE = tuple(name for name, cls in POLICIES.items() if cls.preemptive)
+
+
+def make_scheduler(name: str, time_quantum: float = 2.0,
+                   options: Optional[Dict[str, Any]] = None) -> Scheduler:
+    """Build a policy by name; ``options`` go to its constructor
+    (``aging_rate`` for aging, ``levels`` and ``boost_interval`` for mlfq)."""
+    cls = POLICIES.get(name)
+    if cls is None:
+        raise ValueError('unknown scheduler %r (expected one of %s)'
+                         % (name, ', '.join(SCHEDULERS)))
+    try:
+        return cls(time_quantum, **(options or {}))
+    except TypeError as exc:
+        raise ValueError('invalid options for %s: %s' % (name, exc))
+
@@ -0,0 +1,545 @@
+"""Simulation service behind the Flask endpoints.
+
+Holds the VM fleet and submitted tasks for the interactive UI, and runs
+whole workloads headless for batch clients that post everything at once.
+Live runs are checkpointed under ``checkpoint_dir`` and can be resumed,
+or forked with different options, from any of their checkpoints.  With a
+``cache.ResultCache``, headless runs that were simulated before are
+answered from it.
+"""
+
+from __future__ import annotations
+
+import os
+import re
+import threading
+import time
+import uuid
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from . import checkpoint
+from .autoscale import Autoscaler, make_autoscaler
+from .cache import ResultCache, cache_key, decode_result, encode_result, workload_digest
+from .checkpoint import CheckpointError, Checkpointer
+from .engine import (DEFAULT_CPU_COST, DEFAULT_RAM_COST, FCFS, Simulation,
+                     SimulationResult)
+from .instrument import CACHE_LOOKUPS, Instrumentation, record_run
+from .models import COMPLETED, VM, Task, make_vms
+from .montecarlo import run_monte_carlo
+from .placement import FIRST_FIT
+from .pricing import Bill, Usage, reprice
+from .regions import DEFAULT_WINDOW, make_region, run_regions
+from .progress import LiveRun
+
+IDLE = 'idle'
+RUNNING = 'running'
+MAX_LIVE_RUNS = 8
+MAX_REPLICATIONS = 1000
+
+# checkpoints are named <live run id>-<n>
+_CHECKPOINT_ID = re.compile(r'^[0-9a-f]{32}-\d{6}$')
+# options a resumed checkpoint can be forked with, and how to read them
+_FORK_OPTIONS = {
+    'scheduler': str,
+    'time_quantum': float,
+    'scheduler_options': dict,
+    'placement': str,
+    'cpu_cost': float,
+    'ram_cost': float,
+    'batch_packing': bool,
+    'context_switch': float,
+    'record_events': bool,
+    'autoscale': dict,
+}
+
+
+class WorkloadError(ValueError):
+    """Raised when a request body does not describe a valid workload."""
+
+
+def parse_vms(spec: Any) -> List[VM]:
+    """Build VMs from ``{count, cores, ram, storage}`` or a list of VM dicts."""
+    if isinstance(spec, dict):
+        try:
+            count = int(spec.get('count', 3))
+            cores = int(spec.get('cores', 4))
+            ram = int(spec.get('ram', 8))
+            storage = int(spec.get('storage', 100))
+        except (TypeError, ValueError) as exc:
+            raise WorkloadError('invalid VM spec: %s' % exc)
+        if count < 1 or cores < 1 or ram < 1:
+            raise WorkloadError('VM count, cores and ram must be positive')
+        return make_vms(count, cores, ram, storage)
+    if isinstance(spec, list) and spec:
+        vms = []
+        for i, item in enumerate(spec):
+            try:
+                vms.append(VM(id=int(item.get('id', i + 1)),
+                              total_cores=int(item['total_cores']),
+                              total_ram=int(item['total_ram']),
+                              storage=int(item.get('storage', 100))))
+            except (AttributeError, KeyError, TypeError, ValueError) as exc:
+                raise WorkloadError('invalid VM at index %d: %s' % (i, exc))
+        return vms
+    raise WorkloadError('vms must be a spec object or a non-empty list')
+
+
+def parse_tasks(items: Any, taken: Iterable[int] = ()) -> List[Task]:
+    """Build tasks from dicts, rejecting ids that repeat or are in ``taken``.
+
+    Tasks without an ``id`` are numbered on from the largest id given or
+    taken.  Results are matched back to tasks by id, so ids must be
+    unique.
+    """
+    if not isinstance(items, list):
+        raise WorkloadError('tasks must be a list')
+    seen = set(taken)
+    given = []
+    for item in items:
+        try:
+            given.append(int(item['id']))
+        except (KeyError, TypeError, ValueError):
+            pass
+    next_id = max(seen.union(given), default=0) + 1
+    tasks = []
+    for i, item in enumerate(items):
+        try:
+            task = Task.from_dict(item, default_id=next_id)
+        except (AttributeError, TypeError, ValueError) as exc:
+            raise WorkloadError('invalid task at index %d: %s' % (i, exc))
+        if 'id' not in item:
+            next_id += 1
+        if task.id in seen:
+            raise WorkloadError('duplicate task id %d at index %d' % (task.id, i))
+        seen.add(task.id)
+        tasks.append(task)
+    return tasks
+
+
+class SimulationService:
+    """Thread-safe state for the Flask app."""
+
+    def __init__(self, instrument: bool = False, profile_dir: Optional[str] = None,
+                 checkpoint_dir: Optional[str] = None,
+                 checkpoint_interval: float = 60.0,
+                 cache: Optional[ResultCache] = None) -> None:
+        self._lock = threading.Lock()
+        self.instrument = instrument
+        self.profile_dir = profile_dir
+        self.checkpoint_dir = checkpoint_dir
+        self.checkpoint_interval = checkpoint_interval
+        self.cache = cache
+        self.vms: List[VM] = []
+        self.tasks: List[Task] = []
+        self._running = 0
+        self.last_result: Optional[SimulationResult] = None
+        self.last_vms: List[VM] = []
+        self.last_options: Dict[str, Any] = {}
+        self._live: Dict[str, LiveRun] = {}
+
+    def initialize_vms(self, spec: Any) -> List[VM]:
+        vms = parse_vms(spec)
+        with self._lock:
+            self.vms = vms
+        return vms
+
+    def submit_tasks(self, items: Iterable[Dict[str, Any]]) -> List[Task]:
+        with self._lock:
+            tasks = parse_tasks(list(items), taken=[task.id for task in self.tasks])
+            self.tasks.extend(tasks)
+        return tasks
+
+    def _workload(self, payload: Dict[str, Any]) -> Tuple[List[VM], List[Task]]:
+        """Fresh copies of the fleet and pending tasks a payload runs.
+
+        ``payload`` may carry its own ``vms`` and ``tasks``; otherwise the
+        fleet and tasks registered through the other endpoints are used.
+        """
+        with self._lock:
+            vms = (parse_vms(payload['vms']) if 'vms' in payload
+                   else [VM(id=vm.id, total_cores=vm.total_cores,
+                            total_ram=vm.total_ram, storage=vm.storage)
+                         for vm in self.vms])
+        if not vms:
+            raise WorkloadError('no VMs: initialize VMs or include them in the request')
+        return vms, self._tasks(payload)
+
+    def _tasks(self, payload: Dict[str, Any]) -> List[Task]:
+        """Fresh copies of the payload's tasks, or of the pending registered ones."""
+        with self._lock:
+            if 'tasks' in payload:
+                tasks = parse_tasks(payload['tasks'])
+            else:
+                tasks = [Task.from_dict(t.to_dict()) for t in self.tasks
+                         if t.status != COMPLETED]
+                # parents finished by an earlier run no longer hold anything back
+                done = {t.id for t in self.tasks if t.status == COMPLETED}
+                for task in tasks:
+                    task.dependencies = [parent for parent in task.dependencies
+                                         if parent not in done]
+        if not tasks:
+            raise WorkloadError('no pending tasks to simulate')
+        return tasks
+
+    def _options(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        """The scheduling and pricing options of a payload, as ``Simulation``
+        keyword arguments."""
+        options = payload.get('scheduler_options')
+        if options is not None and not isinstance(options, dict):
+            raise WorkloadError('scheduler_options must be an object')
+        try:
+            return {
+                'scheduler': payload.get('scheduler', FCFS),
+                'time_quantum': float(payload.get('time_quantum', 2.0)),
+                'scheduler_options': options,
+                'placement': payload.get('placement', FIRST_FIT),
+                'batch_packing': bool(payload.get('batch_packing', False)),
+                'context_switch': float(payload.get('context_switch', 0.0)),
+                'cpu_cost': float(payload.get('cpu_cost', DEFAULT_CPU_COST)),
+                'ram_cost': float(payload.get('ram_cost', DEFAULT_RAM_COST)),
+            }
+        except (TypeError, ValueError) as exc:
+            raise WorkloadError(str(exc))
+
+    def _prepare(self, payload: Dict[str, Any],
+                 workload: Optional[Tuple[List[VM], List[Task]]] = None
+                 ) -> Tuple[Simulation, int]:
+        """Build the simulation a ``run`` / ``start_live`` payload describes,
+        and return it with its task count.
+
+        See ``_workload`` for the fleet and tasks, unless they were parsed
+        already.  With an ``autoscale`` spec those VMs are only the initial
+        fleet.
+        """
+        vms, tasks = workload or self._workload(payload)
+        options = self._options(payload)
+        try:
+            simulation = Simulation(
+                vms, tasks,
+                autoscaler=self._autoscaler(payload),
+                instrument=self._instrumentation(payload),
+                record_events=bool(payload.get('record_events', False)),
+                **options)
+        except (TypeError, ValueError) as exc:
+            raise WorkloadError(str(exc))
+        return simulation, len(tasks)
+
+    def _autoscaler(self, payload: Dict[str, Any]) -> Optional[Autoscaler]:
+        """The payload's ``autoscale`` spec, priced at its ``storage_cost``
+        unless the spec sets its own."""
+        spec = payload.get('autoscale')
+        if spec is None:
+            return None
+        if not isinstance(spec, dict):
+            raise WorkloadError('autoscale must be an object')
+        if 'storage_cost' in payload:
+            spec = {'storage_cost': payload['storage_cost'], **spec}
+        try:
+            return make_autoscaler(spec)
+        except (TypeError, ValueError) as exc:
+            raise WorkloadError('invalid autoscale: %s' % exc)
+
+    def _instrumentation(self, payload: Dict[str, Any]) -> Optional[Instrumentation]:
+        """An ``Instrumentation`` if the payload (``instrument``, ``profile``)
+        or the service default asks for one."""
+        profile = bool(payload.get('profile', False))
+        if not (payload.get('instrument', self.instrument) or profile):
+            return None
+        profile_path = trace_path = None
+        if profile:
+            if not self.profile_dir:
+                raise WorkloadError('profiling is not enabled on this server')
+            os.makedirs(self.profile_dir, exist_ok=True)
+            stem = os.path.join(self.profile_dir, 'run_%s' % uuid.uuid4().hex[:12])
+            profile_path = stem + '.prof'
+            trace_path = stem + '.trace.json'
+        return Instrumentation(profile_path=profile_path, trace_path=trace_path)
+
+    def _finish(self, simulation: Simulation, result: SimulationResult,
+                update_tasks: bool) -> None:
+        self._remember(result, simulation.vms, simulation.placement,
+                       simulation.time_quantum, update_tasks)
+
+    def _remember(self, result: SimulationResult, vms: List[VM], placement: str,
+                  time_quantum: float, update_tasks: bool) -> None:
+        with self._lock:
+            self.last_result = result
+            self.last_vms = vms
+            self.last_options = {
+                'placement': placement,
+                'time_quantum': time_quantum,
+                'vm_count': len(vms),
+            }
+            if update_tasks:
+                by_id = {t.id: t for t in result.completed}
+                self.tasks = [by_id.get(t.id, t) for t in self.tasks]
+
+    def _cache_key(self, payload: Dict[str, Any], vms: List[VM],
+                   tasks: List[Task]) -> Optional[str]:
+        """The result-cache key of a run, or None if it is not cached.
+
+        Instrumented and profiled runs are always simulated, as is any
+        payload with ``"cache": false``.
+        """
+        if (self.cache is None or not payload.get('cache', True)
+                or payload.get('instrument', self.instrument) or payload.get('profile')):
+            return None
+        options = self._options(payload)
+        autoscaler = self._autoscaler(payload)
+        options['autoscale'] = autoscaler.spec() if autoscaler is not None else None
+        options['record_events'] = bool(payload.get('record_events', False))
+        return cache_key(workload_digest(tasks), vms, options)
+
+    def run(self, payload: Dict[str, Any]) -> SimulationResult:
+        """Run a workload headless (see ``_prepare`` for the payload).
+
+        A run of a workload, fleet and options simulated before comes back
+        from the result cache, if the service has one (see ``_cache_key``).
+        """
+        vms, tasks = workload = self._workload(payload)
+        key = self._cache_key(payload, vms, tasks)
+        if key is not None:
+            data = self.cache.get(key)
+            CACHE_LOOKUPS.inc(result='miss' if data is None else 'hit')
+            if data is not None:
+                result, fleet = decode_result(data)
+                result.cached = True
+                options = self._options(payload)
+                self._remember(result, fleet, options['placement'], options['time_quantum'],
+                               'tasks' not in payload)
+                return result
+        simulation, _ = self._prepare(payload, workload)
+
+        # Runs happen outside the lock so batch clients can run concurrently.
+        with self._lock:
+            self._running += 1
+        started = time.perf_counter()
+        try:
+            result = simulation.run()
+        finally:
+            with self._lock:
+                self._running -= 1
+        record_run(simulation.scheduler, time.perf_counter() - started, result.stats)
+        if key is not None:
+            self.cache.put(key, encode_result(result, simulation.vms))
+
+        self._finish(simulation, result, 'tasks' not in payload)
+        return result
+
+    def start_live(self, payload: Dict[str, Any]) -> LiveRun:
+        """Start a run in the background and return it for streaming.
+
+        ``fps`` (default 10) caps the frame rate and ``max_points`` the
+        utilization samples and completions sent per frame.  The run is
+        checkpointed every ``checkpoint_interval`` wall-clock seconds
+        (server default; 0 turns it off) and/or every ``checkpoint_every``
+        simulated seconds.
+        """
+        simulation, total = self._prepare(payload)
+        return self._launch(simulation, total, payload, 'tasks' not in payload)
+
+    def resume(self, payload: Dict[str, Any]) -> LiveRun:
+        """Resume a checkpoint as a new live run.
+
+        ``checkpoint`` names the checkpoint; ``run_id`` instead takes the
+        newest checkpoint of that live run, or returns the run itself while
+        it is still going, so a client that lost its stream can always
+        call this.  Any option in ``_FORK_OPTIONS`` forks a what-if branch
+        with that option changed; the checkpoint itself is left as it is.
+        """
+        run_id = payload.get('run_id')
+        if run_id is not None:
+            run = self.live_run(str(run_id))
+            if run is not None and not run.done:
+                return run
+            found = self.checkpoints(str(run_id))
+            if not found:
+                raise WorkloadError('no checkpoint of run %s' % run_id)
+            name = found[-1]['id']
+        else:
+            name = payload.get('checkpoint')
+        path = self._checkpoint_path(name)
+
+        overrides = {}
+        for key, cast in _FORK_OPTIONS.items():
+            if payload.get(key) is None:
+                continue
+            if cast is dict and not isinstance(payload[key], dict):
+                raise WorkloadError('%s must be an object' % key)
+            try:
+                overrides[key] = cast(payload[key])
+            except (TypeError, ValueError) as exc:
+                raise WorkloadError('invalid %s: %s' % (key, exc))
+        try:
+            total = checkpoint.info(path)['total_tasks']
+            simulation = checkpoint.load(path, instrument=self._instrumentation(payload),
+                                         **overrides)
+        except (CheckpointError, OSError) as exc:
+            raise WorkloadError('cannot resume %s: %s' % (name, exc))
+        return self._launch(simulation, total, payload, False)
+
+    def _launch(self, simulation: Simulation, total: Optional[int],
+                payload: Dict[str, Any], update_tasks: bool) -> LiveRun:
+        def finished(run: LiveRun) -> None:
+            if run.result is not None:
+                record_run(simulation.scheduler, run.finished_at - run.started_at,
+                           run.result.stats)
+                self._finish(simulation, run.result, update_tasks)
+            with self._lock:
+                self._running -= 1
+
+        try:
+            run = LiveRun(simulation, total=total,
+                          fps=float(payload.get('fps', 10.0)),
+                          max_points=int(payload.get('max_points', 100)),
+                          on_done=finished)
+            if self.checkpoint_dir:
+                interval = float(payload.get('checkpoint_interval', self.checkpoint_interval) or 0)
+                every = float(payload.get('checkpoint_every') or 0)
+                run.checkpointer = Checkpointer(self.checkpoint_dir, prefix=run.id,
+                                                every=every or None, interval=interval or None)
+        except (TypeError, ValueError) as exc:
+            raise WorkloadError(str(exc))
+        with self._lock:
+            self._running += 1
+            self._live[run.id] = run
+            while len(self._live) > MAX_LIVE_RUNS:
+                oldest = next(iter(self._live))
+                if not self._live[oldest].done:
+                    break
+                del self._live[oldest]
+        return run.start()
+
+    def live_run(self, run_id: str) -> Optional[LiveRun]:
+        with self._lock:
+            return self._live.get(run_id)
+
+    def request_checkpoint(self, run_id: str) -> LiveRun:
+        """Have a live run checkpoint itself at its next step boundary."""
+        run = self.live_run(run_id)
+        if run is None:
+            raise WorkloadError('live run %s not found' % run_id)
+        if run.done or run.checkpointer is None:
+            raise WorkloadError('live run %s cannot be checkpointed' % run_id)
+        run.checkpointer.request()
+        return run
+
+    def checkpoints(self, run_id: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Saved checkpoints, oldest first, optionally of one live run."""
+        if not self.checkpoint_dir:
+            return []
+        return checkpoint.list_checkpoints(self.checkpoint_dir,
+                                           prefix=run_id + '-' if run_id else '')
+
+    def _checkpoint_path(self, name: Any) -> str:
+        if not self.checkpoint_dir:
+            raise WorkloadError('checkpoints are not enabled on this server')
+        if not isinstance(name, str) or not _CHECKPOINT_ID.match(name):
+            raise WorkloadError('checkpoint must be a checkpoint id')
+        path = os.path.join(self.checkpoint_dir, name + checkpoint.SUFFIX)
+        if not os.path.exists(path):
+            raise WorkloadError('checkpoint %s not found' % name)
+        return path
+
+    def monte_carlo(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        """Replicate a workload with sampled durations and arrivals.
+
+        Takes a ``run`` payload plus ``replications``, ``durations`` and
+        ``arrivals`` distribution specs, ``seed`` and ``confidence``; see
+        ``montecarlo.run_monte_carlo`` for the report.
+        """
+        vms, tasks = self._workload(payload)
+        options = self._options(payload)
+        autoscaler = self._autoscaler(payload)
+        if autoscaler is not None:
+            options['autoscale'] = autoscaler.spec()
+        try:
+            replications = int(payload.get('replications', 30))
+            if not 1 <= replications <= MAX_REPLICATIONS:
+                raise ValueError('replications must be between 1 and %d' % MAX_REPLICATIONS)
+            workers = min(int(payload.get('workers', os.cpu_count() or 1)), os.cpu_count() or 1)
+            with self._lock:
+                self._running += 1
+            try:
+                return run_monte_carlo(
+                    tasks, vms, replications,
+                    durations=payload.get('durations'),
+                    arrivals=payload.get('arrivals'),
+                    seed=int(payload.get('seed', 0)),
+                    confidence=float(payload.get('confidence', 0.95)),
+                    workers=max(1, workers), **options)
+            finally:
+                with self._lock:
+                    self._running -= 1
+        except (TypeError, ValueError) as exc:
+            raise WorkloadError(str(exc))
+
+    def run_regions(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        """Route a workload over several regions and simulate each.
+
+        Takes ``regions`` (a list of ``regions.make_region`` specs), the
+        payload's ``tasks`` or the registered ones, a ``dispatcher``
+        policy, the sync ``window`` and ``workers``; returns per-region
+        and global statistics.
+        """
+        specs = payload.get('regions')
+        if not isinstance(specs, list) or not specs:
+            raise WorkloadError('regions must be a non-empty list')
+        tasks = self._tasks(payload)
+        try:
+            regions = [make_region(spec) for spec in specs]
+            workers = min(int(payload.get('workers', len(regions))), os.cpu_count() or 1)
+            with self._lock:
+                self._running += 1
+            try:
+                result = run_regions(tasks, regions, dispatcher=payload.get('dispatcher'),
+                                     window=float(payload.get('window', DEFAULT_WINDOW)),
+                                     workers=max(1, workers))
+            finally:
+                with self._lock:
+                    self._running -= 1
+        except (TypeError, ValueError) as exc:
+            raise WorkloadError(str(exc))
+        return result.to_dict()
+
+    def price(self, models: Any) -> List[Bill]:
+        """Re-price the last finished run under each pricing model spec."""
+        if not isinstance(models, list) or not models:
+            raise WorkloadError('models must be a non-empty list')
+        with self._lock:
+            result, vms = self.last_result, self.last_vms
+        if result is None:
+            raise WorkloadError('no finished simulation to price')
+        try:
+            return reprice(Usage.from_result(result, vms), models)
+        except (AttributeError, TypeError, ValueError) as exc:
+            raise WorkloadError('invalid pricing model: %s' % exc)
+
+    @property
+    def status(self) -> str:
+        return RUNNING if self._running else IDLE
+
+    def statistics(self) -> Dict[str, Any]:
+        with self._lock:
+            if self.last_result is None:
+                return {'total_tasks': len(self.tasks), 'completed_tasks': 0}
+            return dict(self.last_result.stats)
+
+    def reset(self) -> None:
+        with self._lock:
+            self.tasks = []
+            self.last_result = None
+            self.last_vms = []
+            self.last_options = {}
+            self.vms = [VM(id=vm.id, total_cores=vm.total_cores,
+                           total_ram=vm.total_ram, storage=vm.storage)
+                        for vm in self.vms]
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                'status': self.status,
+                'vm_count': len(self.vms),
+                'task_count': len(self.tasks),
+                'completed_count': sum(1 for t in self.tasks if t.status == COMPLETED),
+            }
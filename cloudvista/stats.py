@@ -0,0 +1,269 @@
+"""Incremental statistics for a running simulation.
+
+``updateStats`` and ``updateCharts`` used to re-reduce every completed task
+and every VM on each 100 ms tick.  ``StatsAccumulator`` is updated by the
+engine as events happen, in O(1) per event, and reading it does not depend
+on how many tasks have run:
+
+* counts, sums and Welford mean/variance for wait and turnaround times;
+* used-core and used-RAM counters maintained on allocate/release, plus
+  their integrals over simulated time for average utilization (measured
+  against the capacity integral, so a fleet that grows and shrinks is
+  averaged correctly);
+* a ``QuantileSketch`` of wait times for p50/p95/p99.
+"""
+
+from __future__ import annotations
+
+import math
+from typing import Any, Dict, Optional, Tuple
+
+from .models import Task
+
+
+class RunningStat:
+    """Count, mean, variance, min and max via Welford's algorithm."""
+
+    __slots__ = ('count', 'mean', 'm2', 'min', 'max')
+
+    def __init__(self) -> None:
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def add(self, value: float) -> None:
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (value - self.mean)
+        if value < self.min:
+            self.min = value
+        if value > self.max:
+            self.max = value
+
+    def merge(self, other: 'RunningStat') -> None:
+        """Fold ``other`` into this stat (Chan et al. parallel update)."""
+        if not other.count:
+            return
+        total = self.count + other.count
+        delta = other.mean - self.mean
+        self.m2 += other.m2 + delta * delta * self.count * other.count / total
+        self.mean += delta * other.count / total
+        self.count = total
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+
+    @property
+    def total(self) -> float:
+        return self.mean * self.count
+
+    @property
+    def variance(self) -> float:
+        return self.m2 / (self.count - 1) if self.count > 1 else 0.0
+
+    @property
+    def stddev(self) -> float:
+        return math.sqrt(self.variance)
+
+
+class QuantileSketch:
+    """Streaming quantiles with bounded relative error (DDSketch-style).
+
+    Positive values fall into logarithmic buckets ``gamma**(i-1) < x <=
+    gamma**i``, so any quantile is reported within ``relative_accuracy`` of
+    the true value.  Values at or below ``min_value`` (e.g. zero wait) are
+    counted separately.  The number of buckets grows with the log of the
+    value range, not with the number of samples.
+    """
+
+    def __init__(self, relative_accuracy: float = 0.01,
+                 min_value: float = 1e-9) -> None:
+        if not 0 < relative_accuracy < 1:
+            raise ValueError('relative_accuracy must be in (0, 1)')
+        self.relative_accuracy = relative_accuracy
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self._log_gamma = math.log(self.gamma)
+        self.min_value = min_value
+        self.zero_count = 0
+        self.count = 0
+        self.buckets: Dict[int, int] = {}
+
+    def add(self, value: float) -> None:
+        self.count += 1
+        if value <= self.min_value:
+            self.zero_count += 1
+            return
+        key = math.ceil(math.log(value) / self._log_gamma)
+        self.buckets[key] = self.buckets.get(key, 0) + 1
+
+    def merge(self, other: 'QuantileSketch') -> None:
+        if other.gamma != self.gamma:
+            raise ValueError('cannot merge sketches with different accuracy')
+        self.count += other.count
+        self.zero_count += other.zero_count
+        for key, n in other.buckets.items():
+            self.buckets[key] = self.buckets.get(key, 0) + n
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Value at quantile ``q`` in [0, 1], or None when empty."""
+        if not self.count:
+            return None
+        rank = q * (self.count - 1)
+        if rank < self.zero_count:
+            return 0.0
+        seen = self.zero_count
+        for key in sorted(self.buckets):
+            seen += self.buckets[key]
+            if seen > rank:
+                return 2 * self.gamma ** key / (self.gamma + 1)
+        return 2 * self.gamma ** max(self.buckets) / (self.gamma + 1)
+
+
+class StatsAccumulator:
+    """Running aggregates for one simulation, updated per event."""
+
+    def __init__(self, total_cores: int = 0, total_ram: int = 0,
+                 total_tasks: int = 0) -> None:
+        self.total_cores = total_cores
+        self.total_ram = total_ram
+        self.total_tasks = total_tasks
+        self.used_cores = 0
+        self.used_ram = 0
+        self.core_seconds = 0.0
+        self.ram_seconds = 0.0
+        self.now = 0.0
+        # capacity integrals up to ``capacity_since``, when the totals last
+        # changed; the rest is ``total * (now - capacity_since)``
+        self.core_capacity_seconds = 0.0
+        self.ram_capacity_seconds = 0.0
+        self.capacity_since = 0.0
+        self.total_cost = 0.0
+        self.wait = RunningStat()
+        self.turnaround = RunningStat()
+        self.wait_sketch = QuantileSketch()
+        self.preemptions = 0
+        self.switch_time = 0.0
+        self.deadline_misses = 0
+
+    # -- updates -------------------------------------------------------
+
+    def advance(self, time: float) -> None:
+        """Move the clock, integrating current usage over the elapsed time."""
+        elapsed = time - self.now
+        if elapsed > 0:
+            self.core_seconds += self.used_cores * elapsed
+            self.ram_seconds += self.used_ram * elapsed
+        self.now = time
+
+    def allocate(self, cpu: int, ram: int) -> None:
+        self.used_cores += cpu
+        self.used_ram += ram
+
+    def release(self, cpu: int, ram: int) -> None:
+        self.used_cores -= cpu
+        self.used_ram -= ram
+
+    def resize(self, cores: int, ram: int) -> None:
+        """Add capacity (or remove it, if negative) as of the current time."""
+        elapsed = self.now - self.capacity_since
+        self.core_capacity_seconds += self.total_cores * elapsed
+        self.ram_capacity_seconds += self.total_ram * elapsed
+        self.capacity_since = self.now
+        self.total_cores += cores
+        self.total_ram += ram
+
+    def merge(self, other: 'StatsAccumulator') -> None:
+        """Fold in another simulation's aggregates, e.g. one region of a
+        multi-region run.  The later of the two clocks wins; the other
+        fleet's capacity (and usage) is counted up to it."""
+        now = max(self.now, other.now)
+        self.advance(now)
+        self.resize(0, 0)
+        gap = now - other.now
+        cores, ram = other.capacity_seconds()
+        self.core_capacity_seconds += cores + other.total_cores * gap
+        self.ram_capacity_seconds += ram + other.total_ram * gap
+        self.core_seconds += other.core_seconds + other.used_cores * gap
+        self.ram_seconds += other.ram_seconds + other.used_ram * gap
+        self.total_cores += other.total_cores
+        self.total_ram += other.total_ram
+        self.used_cores += other.used_cores
+        self.used_ram += other.used_ram
+        self.total_tasks += other.total_tasks
+        self.total_cost += other.total_cost
+        self.wait.merge(other.wait)
+        self.turnaround.merge(other.turnaround)
+        self.wait_sketch.merge(other.wait_sketch)
+        self.preemptions += other.preemptions
+        self.switch_time += other.switch_time
+        self.deadline_misses += other.deadline_misses
+
+    def context_switch(self, overhead: float) -> None:
+        self.switch_time += overhead
+
+    def complete(self, task: Task) -> None:
+        wait = task.wait_time
+        self.wait.add(wait)
+        self.wait_sketch.add(wait)
+        self.turnaround.add(task.turnaround_time)
+        self.total_cost += task.cost
+        if task.missed_deadline:
+            self.deadline_misses += 1
+
+    # -- reads ---------------------------------------------------------
+
+    @property
+    def completed(self) -> int:
+        return self.wait.count
+
+    def cpu_utilization(self) -> float:
+        """Instantaneous CPU utilization (%), as the UI shows it."""
+        return self.used_cores / self.total_cores * 100 if self.total_cores else 0.0
+
+    def ram_utilization(self) -> float:
+        return self.used_ram / self.total_ram * 100 if self.total_ram else 0.0
+
+    def capacity_seconds(self) -> Tuple[float, float]:
+        """Core-seconds and GB-seconds of capacity up to now."""
+        elapsed = self.now - self.capacity_since
+        return (self.core_capacity_seconds + self.total_cores * elapsed,
+                self.ram_capacity_seconds + self.total_ram * elapsed)
+
+    def average_cpu_utilization(self) -> float:
+        """CPU utilization (%) averaged over the elapsed simulated time."""
+        capacity = self.capacity_seconds()[0]
+        if self.now <= 0 or capacity <= 0:
+            return 0.0
+        return self.core_seconds / capacity * 100
+
+    def average_ram_utilization(self) -> float:
+        capacity = self.capacity_seconds()[1]
+        if self.now <= 0 or capacity <= 0:
+            return 0.0
+        return self.ram_seconds / capacity * 100
+
+    def snapshot(self) -> Dict[str, Any]:
+        count = self.completed
+        return {
+            'total_tasks': self.total_tasks,
+            'completed_tasks': count,
+            'avg_wait_time': self.wait.mean,
+            'wait_time_stddev': self.wait.stddev,
+            'p50_wait_time': self.wait_sketch.quantile(0.50) or 0.0,
+            'p95_wait_time': self.wait_sketch.quantile(0.95) or 0.0,
+            'p99_wait_time': self.wait_sketch.quantile(0.99) or 0.0,
+            'avg_turnaround_time': self.turnaround.mean,
+            'turnaround_time_stddev': self.turnaround.stddev,
+            'cpu_utilization': self.average_cpu_utilization(),
+            'ram_utilization': self.average_ram_utilization(),
+            'current_cpu_utilization': self.cpu_utilization(),
+            'current_ram_utilization': self.ram_utilization(),
+            'total_cost': self.total_cost,
+            'avg_cost_per_task': self.total_cost / count if count else 0.0,
+            'makespan': self.now,
+            'preemptions': self.preemptions,
+            'context_switch_time': self.switch_time,
+            'deadline_misses': self.deadline_misses,
+        }
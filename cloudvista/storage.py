@@ -0,0 +1,382 @@
+"""SQLite persistence for finished simulations (``cloudvista.db``).
+
+Saving is built for large runs:
+
+* the database is in WAL mode, so readers are never blocked by a save;
+* a save is one transaction, and task rows go in through ``executemany``
+  fed by a generator, so rows stream from the request body (or the
+  engine's result) into SQLite without being collected first;
+* task rows are compact: integer keys, scheduler names normalised into
+  their own table, and default ``Task-<id>`` names stored as NULL.
+
+Per-run aggregates are written to ``simulation_summaries`` in the same
+transaction, so listing, filtering and comparing past runs only reads one
+summary row per run and never scans task rows.
+"""
+
+from __future__ import annotations
+
+import json
+import sqlite3
+import time
+from typing import Any, BinaryIO, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from .models import Task
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS schedulers (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE
+);
+CREATE TABLE IF NOT EXISTS simulations (
+    id INTEGER PRIMARY KEY,
+    created_at REAL NOT NULL,
+    scheduler_id INTEGER NOT NULL REFERENCES schedulers(id),
+    placement TEXT,
+    time_quantum REAL,
+    vm_count INTEGER,
+    task_count INTEGER NOT NULL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS tasks (
+    simulation_id INTEGER NOT NULL REFERENCES simulations(id) ON DELETE CASCADE,
+    task_id INTEGER NOT NULL,
+    name TEXT,
+    cpu INTEGER NOT NULL,
+    ram INTEGER NOT NULL,
+    priority INTEGER NOT NULL,
+    vm_id INTEGER,
+    execution_time REAL NOT NULL,
+    arrival_time REAL NOT NULL,
+    start_time REAL,
+    end_time REAL,
+    cost REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS simulation_summaries (
+    simulation_id INTEGER PRIMARY KEY REFERENCES simulations(id) ON DELETE CASCADE,
+    task_count INTEGER NOT NULL,
+    avg_wait_time REAL,
+    max_wait_time REAL,
+    avg_turnaround_time REAL,
+    total_cost REAL NOT NULL,
+    makespan REAL
+);
+CREATE INDEX IF NOT EXISTS idx_tasks_simulation ON tasks(simulation_id);
+CREATE INDEX IF NOT EXISTS idx_simulations_scheduler ON simulations(scheduler_id, created_at);
+CREATE INDEX IF NOT EXISTS idx_simulations_created ON simulations(created_at);
+CREATE INDEX IF NOT EXISTS idx_summaries_cost ON simulation_summaries(total_cost);
+"""
+
+INSERT_TASK = 'INSERT INTO tasks VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)'
+
+# aggregates of the task rows of the simulations matched by the WHERE clause
+SUMMARIZE = '''
+INSERT INTO simulation_summaries
+SELECT simulation_id, COUNT(*), AVG(start_time - arrival_time),
+       MAX(start_time - arrival_time), AVG(end_time - arrival_time),
+       TOTAL(cost), MAX(end_time)
+FROM tasks WHERE %s GROUP BY simulation_id
+'''
+
+SUMMARY_COLUMNS = ('id', 'created_at', 'scheduler', 'placement', 'time_quantum',
+                   'vm_count', 'task_count', 'avg_wait_time', 'max_wait_time',
+                   'avg_turnaround_time', 'total_cost', 'makespan')
+
+SELECT_SUMMARIES = '''
+SELECT s.id, s.created_at, sch.name, s.placement, s.time_quantum, s.vm_count,
+       COALESCE(m.task_count, 0), m.avg_wait_time, m.max_wait_time,
+       m.avg_turnaround_time, COALESCE(m.total_cost, 0), m.makespan
+FROM simulations s
+JOIN schedulers sch ON sch.id = s.scheduler_id
+LEFT JOIN simulation_summaries m ON m.simulation_id = s.id
+'''
+
+# metrics where lower is better, for ``compare``
+COMPARED_METRICS = ('avg_wait_time', 'max_wait_time', 'avg_turnaround_time',
+                    'total_cost', 'makespan')
+
+TaskRow = Tuple[Any, ...]
+
+
+class StorageError(ValueError):
+    """Raised when a saved task record is malformed."""
+
+
+def task_row(item: Dict[str, Any], index: int = 0) -> TaskRow:
+    """Turn a saved task dict into a row tuple (without the simulation id)."""
+    try:
+        task_id = int(item['id']) if item.get('id') is not None else index + 1
+        name = item.get('name')
+        vm_id = item.get('vm_id')
+        start = item.get('start_time')
+        end = item.get('end_time')
+        return (
+            task_id,
+            None if not name or name == 'Task-%d' % task_id else str(name),
+            int(item.get('cpu_required', 1)),
+            int(item.get('ram_required', 1)),
+            int(item.get('priority', 5)),
+            None if vm_id is None else int(vm_id),
+            float(item.get('execution_time', 0.0)),
+            float(item.get('arrival_time') or 0.0),
+            None if start is None else float(start),
+            None if end is None else float(end),
+            float(item.get('cost') or 0.0),
+        )
+    except (AttributeError, TypeError, ValueError) as exc:
+        raise StorageError('invalid task at index %d: %s' % (index, exc))
+
+
+def iter_lines(stream: BinaryIO, chunk_size: int = 1 << 20) -> Iterator[bytes]:
+    """Split a binary stream into lines, reading it in large chunks.
+
+    Iterating a WSGI input stream line by line costs several Python calls
+    per line; one ``read`` per megabyte is much cheaper.
+    """
+    tail = b''
+    while True:
+        chunk = stream.read(chunk_size)
+        if not chunk:
+            break
+        lines = (tail + chunk).split(b'\n')
+        tail = lines.pop()
+        yield from lines
+    if tail:
+        yield tail
+
+
+def read_ndjson(stream: BinaryIO) -> Tuple[Dict[str, Any], Iterator[TaskRow]]:
+    """Split an NDJSON save body into its header object and lazy task rows.
+
+    The first non-blank line holds the simulation metadata, every further
+    line one completed task.
+    """
+    records = (line for line in iter_lines(stream) if line.strip())
+    first = next(records, None)
+    if first is None:
+        raise StorageError('empty request body')
+    header = _parse_line(first, 0)
+
+    def rows() -> Iterator[TaskRow]:
+        for index, line in enumerate(records):
+            yield task_row(_parse_line(line, index + 1), index)
+
+    return header, rows()
+
+
+def _parse_line(line: bytes, lineno: int) -> Dict[str, Any]:
+    try:
+        item = json.loads(line)
+    except ValueError as exc:
+        raise StorageError('line %d: invalid JSON: %s' % (lineno + 1, exc))
+    if not isinstance(item, dict):
+        raise StorageError('line %d: expected a JSON object' % (lineno + 1))
+    return item
+
+
+# the ``TASK_DTYPE`` columns behind a ``TaskRow``
+_ROW_COLUMNS = ('id', 'name', 'cpu', 'ram', 'priority', 'vm', 'execution_time',
+                'arrival_time', 'start_time', 'end_time', 'cost')
+
+
+def result_rows(result: Any) -> Iterator[TaskRow]:
+    """Row tuples for the completed tasks of a ``SimulationResult``."""
+    table = result.table
+    if table is None:
+        for task in result.completed:
+            yield _task_tuple(task)
+        return
+    names = table.names
+    data = table.data[table.completed_mask()]
+    for lo in range(0, len(data), 8192):
+        chunk = data[lo:lo + 8192]
+        # by column name, so new TASK_DTYPE fields cannot shift the tuple
+        for (task_id, name, cpu, ram, priority, vm, execution_time, arrival_time,
+             start, end, cost) in zip(*(chunk[column].tolist() for column in _ROW_COLUMNS)):
+            yield (task_id, None if name < 0 else names.names[name], cpu, ram,
+                   priority, None if vm < 0 else vm, execution_time, arrival_time,
+                   start, end, cost)
+
+
+def _task_tuple(task: Task) -> TaskRow:
+    return (task.id, None if task.name == 'Task-%d' % task.id else task.name,
+            task.cpu_required, task.ram_required, task.priority, task.vm_id,
+            task.execution_time, task.arrival_time, task.start_time,
+            task.end_time, task.cost)
+
+
+class SimulationStore:
+    """Saved simulations in one SQLite file.
+
+    A connection is opened per operation, so the store can be shared by
+    Flask's request threads.
+    """
+
+    def __init__(self, path: str = 'cloudvista.db') -> None:
+        self.path = path
+        conn = self._connect()
+        try:
+            conn.executescript(SCHEMA)
+            with conn:
+                # runs saved before summaries existed
+                conn.execute(SUMMARIZE % 'simulation_id IN (SELECT id FROM simulations '
+                             'WHERE id NOT IN (SELECT simulation_id FROM simulation_summaries))')
+        finally:
+            conn.close()
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=30.0)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        conn.execute('PRAGMA foreign_keys=ON')
+        return conn
+
+    def _scheduler_id(self, conn: sqlite3.Connection, name: str) -> int:
+        conn.execute('INSERT OR IGNORE INTO schedulers (name) VALUES (?)', (name,))
+        return conn.execute('SELECT id FROM schedulers WHERE name = ?', (name,)).fetchone()[0]
+
+    def save(self, rows: Iterable[TaskRow], scheduler: str = 'unknown',
+             placement: Optional[str] = None, time_quantum: Optional[float] = None,
+             vm_count: Optional[int] = None) -> int:
+        """Insert a simulation and stream its task rows in one transaction.
+
+        Returns the new simulation id.  If ``rows`` raises part way, the
+        whole save is rolled back.
+        """
+        conn = self._connect()
+        try:
+            with conn:
+                cursor = conn.execute(
+                    'INSERT INTO simulations (created_at, scheduler_id, placement, '
+                    'time_quantum, vm_count) VALUES (?, ?, ?, ?, ?)',
+                    (time.time(), self._scheduler_id(conn, scheduler or 'unknown'),
+                     placement, time_quantum, vm_count))
+                simulation_id = cursor.lastrowid
+                count = [0]
+
+                def numbered() -> Iterator[TaskRow]:
+                    for row in rows:
+                        count[0] += 1
+                        yield (simulation_id,) + tuple(row)
+
+                conn.executemany(INSERT_TASK, numbered())
+                conn.execute('UPDATE simulations SET task_count = ? WHERE id = ?',
+                             (count[0], simulation_id))
+                conn.execute(SUMMARIZE % 'simulation_id = ?', (simulation_id,))
+            return simulation_id
+        finally:
+            conn.close()
+
+    def save_result(self, result: Any, **metadata: Any) -> int:
+        """Save a ``SimulationResult`` straight from the engine."""
+        return self.save(result_rows(result), scheduler=result.scheduler, **metadata)
+
+    # -- history ---------------------------------------------------------
+
+    def list_simulations(self, scheduler: Optional[str] = None,
+                         since: Optional[float] = None, until: Optional[float] = None,
+                         min_cost: Optional[float] = None, max_cost: Optional[float] = None,
+                         limit: int = 50, before: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Summaries of saved runs, newest first.
+
+        Pages with a keyset cursor: pass the last ``id`` of a page as
+        ``before`` to get the next one.
+        """
+        clauses: List[str] = []
+        params: List[Any] = []
+        if scheduler:
+            clauses.append('sch.name = ?')
+            params.append(scheduler)
+        if since is not None:
+            clauses.append('s.created_at >= ?')
+            params.append(since)
+        if until is not None:
+            clauses.append('s.created_at < ?')
+            params.append(until)
+        if min_cost is not None:
+            clauses.append('m.total_cost >= ?')
+            params.append(min_cost)
+        if max_cost is not None:
+            clauses.append('m.total_cost <= ?')
+            params.append(max_cost)
+        if before is not None:
+            clauses.append('s.id < ?')
+            params.append(before)
+        sql = SELECT_SUMMARIES
+        if clauses:
+            sql += 'WHERE ' + ' AND '.join(clauses)
+        sql += ' ORDER BY s.id DESC LIMIT ?'
+        params.append(max(1, min(int(limit), 1000)))
+        return self._summaries(sql, params)
+
+    def get_simulation(self, simulation_id: int) -> Optional[Dict[str, Any]]:
+        found = self._summaries(SELECT_SUMMARIES + 'WHERE s.id = ?', [simulation_id])
+        return found[0] if found else None
+
+    def compare(self, ids: Sequence[int]) -> Dict[str, Any]:
+        """Summaries of ``ids`` side by side, with the best run per metric."""
+        ids = list(dict.fromkeys(int(i) for i in ids))
+        if not ids:
+            return {'simulations': [], 'best': {}}
+        sql = SELECT_SUMMARIES + 'WHERE s.id IN (%s)' % ', '.join('?' * len(ids))
+        by_id = {row['id']: row for row in self._summaries(sql, ids)}
+        rows = [by_id[i] for i in ids if i in by_id]
+        best = {}
+        for metric in COMPARED_METRICS:
+            values = [row for row in rows if row[metric] is not None]
+            if values:
+                best[metric] = min(values, key=lambda row: row[metric])['id']
+        return {'simulations': rows, 'best': best}
+
+    def simulation_tasks(self, simulation_id: int, limit: int = 100,
+                         after: int = 0) -> List[Dict[str, Any]]:
+        """One page of a run's task rows; ``after`` is the last ``row`` seen."""
+        conn = self._connect()
+        try:
+            cursor = conn.execute(
+                'SELECT rowid, task_id, name, cpu, ram, priority, vm_id, execution_time, '
+                'arrival_time, start_time, end_time, cost FROM tasks '
+                'WHERE simulation_id = ? AND rowid > ? ORDER BY rowid LIMIT ?',
+                (simulation_id, after, max(1, min(int(limit), 10000))))
+            return [{
+                'row': rowid, 'id': task_id, 'name': name or 'Task-%d' % task_id,
+                'cpu_required': cpu, 'ram_required': ram, 'priority': priority,
+                'vm_id': vm_id, 'execution_time': execution_time,
+                'arrival_time': arrival_time, 'start_time': start, 'end_time': end,
+                'cost': cost,
+            } for (rowid, task_id, name, cpu, ram, priority, vm_id, execution_time,
+                   arrival_time, start, end, cost) in cursor]
+        finally:
+            conn.close()
+
+    def iter_task_rows(self, simulation_id: int, page_size: int = 10000) -> Iterator[TaskRow]:
+        """All task rows of a run as ``TaskRow`` tuples, read a page at a time."""
+        after = 0
+        while True:
+            conn = self._connect()
+            try:
+                page = conn.execute(
+                    'SELECT rowid, task_id, name, cpu, ram, priority, vm_id, execution_time, '
+                    'arrival_time, start_time, end_time, cost FROM tasks '
+                    'WHERE simulation_id = ? AND rowid > ? ORDER BY rowid LIMIT ?',
+                    (simulation_id, after, page_size)).fetchall()
+            finally:
+                conn.close()
+            for row in page:
+                yield row[1:]
+            if len(page) < page_size:
+                return
+            after = page[-1][0]
+
+    def _summaries(self, sql: str, params: Sequence[Any]) -> List[Dict[str, Any]]:
+        conn = self._connect()
+        try:
+            rows = conn.execute(sql, list(params)).fetchall()
+        finally:
+            conn.close()
+        summaries = []
+        for row in rows:
+            summary = dict(zip(SUMMARY_COLUMNS, row))
+            count = summary['task_count']
+            summary['avg_cost_per_task'] = summary['total_cost'] / count if count else 0.0
+            summaries.append(summary)
+        return summaries
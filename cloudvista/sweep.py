@@ -0,0 +1,258 @@
+"""Parallel parameter sweeps.
+
+Each scheduler / quantum / fleet combination used to be started by hand
+from the UI.  ``run_sweep`` runs a whole grid of configurations over one
+workload on a process pool and yields a comparison row per configuration
+as it finishes::
+
+    points = grid(schedulers=SCHEDULERS, quanta=[1, 2, 4], vm_counts=[4, 8])
+    for row in run_sweep(tasks, points, workers=32):
+        print(row['scheduler'], row['avg_wait_time'])
+
+The workload is converted to a ``TaskTable`` and shipped to each worker
+once, when the pool starts, together with its dependency graph if it has
+one; a run then only sends its small config dict and gets back one row,
+so throughput scales with the number of workers.
+
+Autoscaler specs (see ``autoscale``) are one more dimension; a point
+with one starts from its ``vm_count`` VMs and reports the fleet's uptime
+cost, so autoscaler settings can be compared on cost against p95 wait::
+
+    points = grid(vm_counts=[2], autoscalers=[
+        None, {'name': 'eager', 'policy': 'queue', 'scale_out_at': 0.2},
+        {'name': 'lazy', 'policy': 'queue', 'scale_out_at': 4}])
+
+With ``cache`` (the path of a ``cache.ResultCache`` file) each point's
+statistics are looked up by workload, fleet and options before it is
+simulated, so re-running a sweep with a few points added only simulates
+the new ones.  The workload is hashed once, in the parent; rows served
+from the cache have ``cached`` set.
+
+Run ``python -m cloudvista.sweep TRACE --scheduler fcfs roundrobin ...``
+to sweep a trace file and write the table as CSV.
+"""
+
+from __future__ import annotations
+
+import argparse
+import csv
+import itertools
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, TextIO, Union
+
+from .autoscale import make_autoscaler
+from .cache import STATS, ResultCache, cache_key, decode_json, encode_json, workload_digest
+from .dag import TaskGraph, graph_of
+from .engine import PREEMPTIVE, SCHEDULERS, Simulation
+from .models import Task, make_vms
+from .placement import FIRST_FIT, POLICIES
+from .taskstore import TaskTable
+
+PARAMETERS = ['point', 'scheduler', 'time_quantum', 'placement', 'vm_count', 'cores', 'ram',
+              'autoscale']
+METRICS = ['completed_tasks', 'avg_wait_time', 'p95_wait_time', 'avg_turnaround_time',
+           'cpu_utilization', 'ram_utilization', 'total_cost', 'fleet_cost', 'vm_hours',
+           'peak_vms', 'makespan', 'elapsed']
+COLUMNS = PARAMETERS + METRICS + ['cached']
+
+_workload: Optional[TaskTable] = None
+_graph: Optional[TaskGraph] = None
+_cache: Optional[ResultCache] = None
+_digest: Optional[str] = None
+
+
+def grid(schedulers: Sequence[str] = SCHEDULERS,
+         quanta: Sequence[float] = (2.0,),
+         vm_counts: Sequence[int] = (3,),
+         cores: Sequence[int] = (4,),
+         ram: Sequence[int] = (8,),
+         placements: Sequence[str] = (FIRST_FIT,),
+         autoscalers: Sequence[Optional[Dict[str, Any]]] = (None,)) -> List[Dict[str, Any]]:
+    """Cartesian product of the parameters, as config dicts.
+
+    The time quantum only matters to the preemptive schedulers, so the
+    others get one point per fleet rather than one per quantum.  An
+    autoscaler spec may carry a ``name`` for the ``autoscale`` column;
+    ``None`` keeps the fleet fixed.
+    """
+    for name in schedulers:
+        if name not in SCHEDULERS:
+            raise ValueError('unknown scheduler %r (expected one of %s)'
+                             % (name, ', '.join(SCHEDULERS)))
+    for name in placements:
+        if name not in POLICIES:
+            raise ValueError('unknown placement policy %r (expected one of %s)'
+                             % (name, ', '.join(POLICIES)))
+    for spec in autoscalers:
+        if spec is not None:
+            make_autoscaler(_scaler_options(spec))
+    points = []
+    for scheduler, placement, count, c, r, spec in itertools.product(
+            schedulers, placements, vm_counts, cores, ram, autoscalers):
+        for quantum in (quanta if scheduler in PREEMPTIVE else quanta[:1]):
+            points.append({
+                'point': len(points),
+                'scheduler': scheduler,
+                'time_quantum': float(quantum),
+                'placement': placement,
+                'vm_count': int(count),
+                'cores': int(c),
+                'ram': int(r),
+                'autoscale': spec,
+            })
+    return points
+
+
+def _scaler_options(spec: Dict[str, Any]) -> Dict[str, Any]:
+    return {key: value for key, value in spec.items() if key != 'name'}
+
+
+def _scaler_label(spec: Optional[Dict[str, Any]]) -> Optional[str]:
+    if spec is None:
+        return None
+    return spec.get('name') or json.dumps(_scaler_options(spec), sort_keys=True)
+
+
+def _init_worker(table: TaskTable, cache: Optional[str] = None,
+                 digest: Optional[str] = None, graph: Optional[TaskGraph] = None) -> None:
+    global _workload, _graph, _cache, _digest
+    _workload = table
+    _graph = graph
+    _cache = ResultCache(cache) if cache is not None else None
+    _digest = digest
+
+
+def run_point(table: TaskTable, config: Dict[str, Any],
+              cache: Optional[ResultCache] = None,
+              digest: Optional[str] = None,
+              graph: Optional[TaskGraph] = None) -> Dict[str, Any]:
+    """Simulate one configuration and return its comparison row.
+
+    With ``cache``, the statistics of a configuration simulated before
+    are reused; ``digest`` is the ``workload_digest`` of the table and
+    ``graph``, if known.
+    """
+    started = time.perf_counter()
+    spec = config.get('autoscale')
+    vms = make_vms(config['vm_count'], config['cores'], config['ram'])
+    autoscaler = make_autoscaler(_scaler_options(spec)) if spec else None
+    options = {
+        'scheduler': config['scheduler'],
+        'time_quantum': config['time_quantum'],
+        'placement': config['placement'],
+    }
+    key = stats = None
+    if cache is not None:
+        key = cache_key(digest or workload_digest(table, graph), vms,
+                        dict(options, autoscale=autoscaler.spec() if autoscaler else None),
+                        kind=STATS)
+        data = cache.get(key)
+        if data is not None:
+            stats = decode_json(data)
+    row = {name: config.get(name) for name in PARAMETERS}
+    row['cached'] = stats is not None
+    if stats is None:
+        stats = Simulation(vms, table.copy(), autoscaler=autoscaler, graph=graph,
+                           **options).run().stats
+        if key is not None:
+            cache.put(key, encode_json(stats))
+    row['autoscale'] = _scaler_label(spec)
+    row.update({name: stats.get(name) for name in METRICS if name in stats})
+    row['elapsed'] = time.perf_counter() - started
+    return row
+
+
+def _run_in_worker(config: Dict[str, Any]) -> Dict[str, Any]:
+    assert _workload is not None, 'worker was not initialised with a workload'
+    return run_point(_workload, config, _cache, _digest, _graph)
+
+
+def run_sweep(tasks: Union[TaskTable, Iterable[Task]], points: Sequence[Dict[str, Any]],
+              workers: Optional[int] = None,
+              cache: Optional[str] = None,
+              graph: Optional[TaskGraph] = None) -> Iterator[Dict[str, Any]]:
+    """Yield one row per point, in completion order.
+
+    A task list's dependencies are kept; a table's come from ``graph``.
+    ``workers=1`` runs in-process; otherwise a process pool of ``workers``
+    (default: CPU count) is used.  ``cache`` is the path of a result
+    cache shared by all workers.
+    """
+    if isinstance(tasks, TaskTable):
+        table = tasks
+    else:
+        tasks = list(tasks)
+        table = TaskTable.from_tasks(tasks)
+        if graph is None:
+            graph = graph_of(tasks)
+    workers = workers or os.cpu_count() or 1
+    digest = workload_digest(table, graph) if cache is not None else None
+    if workers == 1 or len(points) <= 1:
+        store = ResultCache(cache) if cache is not None else None
+        for config in points:
+            yield run_point(table, config, store, digest, graph)
+        return
+    with ProcessPoolExecutor(max_workers=min(workers, len(points)),
+                             initializer=_init_worker,
+                             initargs=(table, cache, digest, graph)) as pool:
+        futures = [pool.submit(_run_in_worker, config) for config in points]
+        for future in as_completed(futures):
+            yield future.result()
+
+
+def write_table(rows: Iterable[Dict[str, Any]], out: TextIO) -> List[Dict[str, Any]]:
+    """Write rows as CSV while they arrive; return them sorted by point."""
+    writer = csv.DictWriter(out, fieldnames=COLUMNS, extrasaction='ignore')
+    writer.writeheader()
+    done = []
+    for row in rows:
+        writer.writerow(row)
+        out.flush()
+        done.append(row)
+    done.sort(key=lambda row: row['point'])
+    return done
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    from .traces import read_trace
+
+    parser = argparse.ArgumentParser(description='Sweep scheduler and fleet parameters over a trace.')
+    parser.add_argument('trace')
+    parser.add_argument('--scheduler', nargs='+', choices=SCHEDULERS, default=list(SCHEDULERS))
+    parser.add_argument('--quantum', nargs='+', type=float, default=[2.0])
+    parser.add_argument('--vms', nargs='+', type=int, default=[3])
+    parser.add_argument('--cores', nargs='+', type=int, default=[4])
+    parser.add_argument('--ram', nargs='+', type=int, default=[8])
+    parser.add_argument('--placement', nargs='+', choices=POLICIES, default=[FIRST_FIT])
+    parser.add_argument('--autoscale', nargs='+', metavar='SPEC', default=['none'],
+                        help='autoscaler specs as JSON objects, or "none" for a fixed fleet')
+    parser.add_argument('--workers', type=int)
+    parser.add_argument('--cache', metavar='PATH',
+                        help='result cache file; points simulated before are not re-run')
+    parser.add_argument('--rebase', action='store_true')
+    parser.add_argument('--output', help='CSV file (default: stdout)')
+    args = parser.parse_args(argv)
+
+    table = TaskTable()
+    table.extend(read_trace(args.trace, rebase=args.rebase))
+    try:
+        autoscalers = [None if spec == 'none' else json.loads(spec) for spec in args.autoscale]
+        points = grid(args.scheduler, args.quantum, args.vms, args.cores, args.ram,
+                      args.placement, autoscalers)
+    except ValueError as exc:
+        parser.error(str(exc))
+    rows = run_sweep(table, points, workers=args.workers, cache=args.cache)
+    if args.output:
+        with open(args.output, 'w', newline='') as out:
+            write_table(rows, out)
+    else:
+        write_table(rows, sys.stdout)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
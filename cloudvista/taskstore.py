@@ -0,0 +1,307 @@
+"""Columnar, array-backed task storage.
+
+A ``Task`` object costs several hundred bytes, and ``saveSimulation`` copies
+every task once more into a dict.  ``TaskTable`` keeps one row per task in a
+NumPy structured array (about 80 bytes a row) with names interned
+separately, so a month-long trace with millions of jobs fits in memory.
+
+The engine reads a table lazily, materialising ``Task`` objects only while
+they are in flight, and writes start/end/cost/VM back into the row when a
+task completes.  Stats and cost are then vectorized column operations.
+"""
+
+from __future__ import annotations
+
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence
+
+import numpy as np
+
+from .models import COMPLETED, PENDING, RUNNING, Task
+
+TASK_DTYPE = np.dtype([
+    ('id', np.int64),
+    ('name', np.int32),
+    ('cpu', np.int32),
+    ('ram', np.int32),
+    ('priority', np.int64),
+    ('status', np.int8),
+    ('vm', np.int32),
+    ('execution_time', np.float64),
+    ('arrival_time', np.float64),
+    ('start_time', np.float64),
+    ('end_time', np.float64),
+    ('cost', np.float64),
+    ('deadline', np.float64),
+])
+
+STATUS_CODES = {PENDING: 0, RUNNING: 1, COMPLETED: 2}
+STATUS_NAMES = {code: name for name, code in STATUS_CODES.items()}
+
+_DEFAULT_NAME = -1
+_NO_VM = -1
+
+
+class NameTable:
+    """Interned task names; default ``Task-<id>`` names are not stored."""
+
+    def __init__(self) -> None:
+        self._index: Dict[str, int] = {}
+        self.names: List[str] = []
+
+    def intern(self, name: Optional[str], task_id: int) -> int:
+        if not name or name == 'Task-%d' % task_id:
+            return _DEFAULT_NAME
+        idx = self._index.get(name)
+        if idx is None:
+            idx = self._index[name] = len(self.names)
+            self.names.append(name)
+        return idx
+
+    def lookup(self, idx: int, task_id: int) -> str:
+        return 'Task-%d' % task_id if idx == _DEFAULT_NAME else self.names[idx]
+
+
+class TaskTable:
+    """Growable structured array of tasks."""
+
+    def __init__(self, capacity: int = 1024) -> None:
+        self._data = np.zeros(max(1, capacity), dtype=TASK_DTYPE)
+        self._size = 0
+        self.names = NameTable()
+
+    def __len__(self) -> int:
+        return self._size
+
+    @property
+    def data(self) -> np.ndarray:
+        """Structured view of the filled rows."""
+        return self._data[:self._size]
+
+    def column(self, name: str) -> np.ndarray:
+        return self._data[name][:self._size]
+
+    @property
+    def nbytes(self) -> int:
+        return self.data.nbytes + sum(len(n) for n in self.names.names)
+
+    def _reserve(self, extra: int) -> None:
+        needed = self._size + extra
+        if needed <= len(self._data):
+            return
+        capacity = len(self._data)
+        while capacity < needed:
+            capacity *= 2
+        grown = np.zeros(capacity, dtype=TASK_DTYPE)
+        grown[:self._size] = self._data[:self._size]
+        self._data = grown
+
+    # -- construction --------------------------------------------------
+
+    def append(self, task_id: int, name: Optional[str], cpu: int, ram: int,
+               execution_time: float, priority: int = 5,
+               arrival_time: float = 0.0, deadline: Optional[float] = None) -> int:
+        """Add a pending task and return its row."""
+        self._reserve(1)
+        row = self._size
+        self._data[row] = (task_id, self.names.intern(name, task_id), cpu, ram,
+                           priority, STATUS_CODES[PENDING], _NO_VM,
+                           execution_time, arrival_time, np.nan, np.nan, 0.0,
+                           np.nan if deadline is None else deadline)
+        self._size += 1
+        return row
+
+    def extend(self, tasks: Iterable[Task], outcomes: bool = False) -> None:
+        """Append tasks; with ``outcomes`` their status, start/end, cost and
+        VM are kept too rather than starting out pending."""
+        intern = self.names.intern
+        pending = STATUS_CODES[PENDING]
+        records = []
+        for task in tasks:
+            if outcomes:
+                status = STATUS_CODES[task.status]
+                vm = _NO_VM if task.vm_id is None else task.vm_id
+                start = np.nan if task.start_time is None else task.start_time
+                end = np.nan if task.end_time is None else task.end_time
+                cost = task.cost
+            else:
+                status, vm, start, end, cost = pending, _NO_VM, np.nan, np.nan, 0.0
+            records.append((task.id, intern(task.name, task.id), task.cpu_required,
+                            task.ram_required, task.priority, status, vm,
+                            task.execution_time, task.arrival_time, start, end, cost,
+                            np.nan if task.deadline is None else task.deadline))
+        self._reserve(len(records))
+        self._data[self._size:self._size + len(records)] = records
+        self._size += len(records)
+
+    def append_rows(self, data: np.ndarray) -> np.ndarray:
+        """Append rows of another table with the same names; return their
+        row numbers here."""
+        self._reserve(len(data))
+        rows = np.arange(self._size, self._size + len(data))
+        self._data[self._size:self._size + len(data)] = data
+        self._size += len(data)
+        return rows
+
+    @classmethod
+    def from_tasks(cls, tasks: Sequence[Task], outcomes: bool = False) -> 'TaskTable':
+        table = cls(capacity=len(tasks))
+        table.extend(tasks, outcomes)
+        return table
+
+    @classmethod
+    def from_columns(cls, cpu: Sequence[int], ram: Sequence[int],
+                     execution_time: Sequence[float],
+                     priority: Optional[Sequence[int]] = None,
+                     arrival_time: Optional[Sequence[float]] = None,
+                     ids: Optional[Sequence[int]] = None,
+                     deadline: Optional[Sequence[float]] = None) -> 'TaskTable':
+        """Build a table straight from column arrays, without Task objects."""
+        count = len(cpu)
+        table = cls(capacity=count)
+        data = table._data[:count]
+        data['id'] = np.arange(1, count + 1) if ids is None else ids
+        data['name'] = _DEFAULT_NAME
+        data['cpu'] = cpu
+        data['ram'] = ram
+        data['execution_time'] = execution_time
+        data['priority'] = 5 if priority is None else priority
+        data['arrival_time'] = 0.0 if arrival_time is None else arrival_time
+        data['status'] = STATUS_CODES[PENDING]
+        data['vm'] = _NO_VM
+        data['start_time'] = np.nan
+        data['end_time'] = np.nan
+        data['cost'] = 0.0
+        data['deadline'] = np.nan if deadline is None else deadline
+        table._size = count
+        return table
+
+    @classmethod
+    def from_data(cls, data: np.ndarray, names: Sequence[str] = ()) -> 'TaskTable':
+        """A table holding a copy of saved rows and their interned names."""
+        table = cls(capacity=len(data))
+        table._data[:len(data)] = data
+        table._size = len(data)
+        for name in names:
+            table.names._index[name] = len(table.names.names)
+            table.names.names.append(name)
+        return table
+
+    def copy(self) -> 'TaskTable':
+        """Independent copy (names are shared, they never change)."""
+        table = TaskTable.__new__(TaskTable)
+        table._data = self._data[:max(1, self._size)].copy()
+        table._size = self._size
+        table.names = self.names
+        return table
+
+    # -- rows <-> Task objects -----------------------------------------
+
+    def _make_task(self, row: int, rec: tuple) -> Task:
+        (task_id, name, cpu, ram, priority, status, vm,
+         execution_time, arrival_time, start, end, cost, deadline) = rec
+        return Task(
+            id=task_id,
+            name=self.names.lookup(name, task_id),
+            cpu_required=cpu,
+            ram_required=ram,
+            execution_time=execution_time,
+            priority=priority,
+            arrival_time=arrival_time,
+            start_time=None if start != start else start,
+            end_time=None if end != end else end,
+            status=STATUS_NAMES[status],
+            cost=cost,
+            vm_id=None if vm == _NO_VM else vm,
+            deadline=None if deadline != deadline else deadline,
+            row=row,
+        )
+
+    def task(self, row: int) -> Task:
+        return self._make_task(row, self._data[row].item())
+
+    def pending_order(self) -> np.ndarray:
+        """Rows of the pending tasks in arrival order (stable)."""
+        pending = np.flatnonzero(self.column('status') == STATUS_CODES[PENDING])
+        return pending[np.argsort(self.column('arrival_time')[pending], kind='stable')]
+
+    def iter_rows(self, rows: np.ndarray, chunk_size: int = 4096) -> Iterator[Task]:
+        """Yield the given rows as Task objects.
+
+        Rows are converted a chunk at a time, which is much cheaper than
+        reading NumPy scalars field by field.
+        """
+        for lo in range(0, len(rows), chunk_size):
+            chunk = rows[lo:lo + chunk_size]
+            for row, rec in zip(chunk.tolist(), self._data[chunk].tolist()):
+                yield self._make_task(row, rec)
+
+    def iter_tasks(self, chunk_size: int = 4096) -> Iterator[Task]:
+        """Yield pending rows as Task objects in arrival order."""
+        return self.iter_rows(self.pending_order(), chunk_size)
+
+    def record(self, task: Task) -> None:
+        """Write a task's outcome back into its row."""
+        self._write_outcome(task.row, task)
+
+    def _write_outcome(self, row: int, task: Task) -> None:
+        rec = self._data[row]
+        self._data[row] = (
+            rec['id'], rec['name'], rec['cpu'], rec['ram'], rec['priority'],
+            STATUS_CODES[task.status],
+            _NO_VM if task.vm_id is None else task.vm_id,
+            rec['execution_time'], rec['arrival_time'],
+            np.nan if task.start_time is None else task.start_time,
+            np.nan if task.end_time is None else task.end_time,
+            task.cost, rec['deadline'],
+        )
+
+    # -- vectorized queries --------------------------------------------
+
+    def completed_mask(self) -> np.ndarray:
+        return self.column('status') == STATUS_CODES[COMPLETED]
+
+    def wait_times(self) -> np.ndarray:
+        return self.column('start_time') - self.column('arrival_time')
+
+    def turnaround_times(self) -> np.ndarray:
+        return self.column('end_time') - self.column('arrival_time')
+
+    def apply_costs(self, cpu_cost: float, ram_cost: float) -> np.ndarray:
+        """Price every completed row at flat hourly rates, in one pass."""
+        hours = self.column('execution_time') / 3600.0
+        cost = (self.column('cpu') * cpu_cost + self.column('ram') * ram_cost) * hours
+        cost = np.where(self.completed_mask(), cost, 0.0)
+        self._data['cost'][:self._size] = cost
+        return cost
+
+    def statistics(self) -> Dict[str, Any]:
+        """Exact aggregates over the completed rows."""
+        done = self.completed_mask()
+        count = int(done.sum())
+        stats: Dict[str, Any] = {'total_tasks': self._size, 'completed_tasks': count}
+        if not count:
+            return stats
+        wait = self.wait_times()[done]
+        turnaround = self.turnaround_times()[done]
+        total_cost = float(self.column('cost')[done].sum())
+        p50, p95, p99 = np.percentile(wait, [50, 95, 99])
+        stats.update({
+            'avg_wait_time': float(wait.mean()),
+            'wait_time_stddev': float(wait.std(ddof=1)) if count > 1 else 0.0,
+            'p50_wait_time': float(p50),
+            'p95_wait_time': float(p95),
+            'p99_wait_time': float(p99),
+            'avg_turnaround_time': float(turnaround.mean()),
+            'turnaround_time_stddev': float(turnaround.std(ddof=1)) if count > 1 else 0.0,
+            'total_cost': total_cost,
+            'avg_cost_per_task': total_cost / count,
+            'makespan': float(self.column('end_time')[done].max()),
+            'deadline_misses': int((self.column('end_time')[done]
+                                    > self.column('deadline')[done]).sum()),
+        })
+        return stats
+
+    def to_dicts(self, rows: Optional[Iterable[int]] = None) -> Iterator[Dict[str, Any]]:
+        """Yield rows as the snake_case dicts used by the API."""
+        for row in (range(self._size) if rows is None else rows):
+            yield self.task(row).to_dict()
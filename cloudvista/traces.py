@@ -0,0 +1,223 @@
+"""Streaming import of job traces for workload replay.
+
+``read_trace`` turns a CSV or JSONL trace into a generator of ``Task``
+objects ordered by arrival time, reading one line at a time, so the engine
+can replay a multi-GB trace in constant memory::
+
+    tasks = read_trace('jobs.csv.gz', rebase=True)
+    result = Simulation(make_vms(100, 16, 64), tasks, on_complete=sink).run()
+
+Gzip-compressed files (``.gz`` or gzip magic bytes) are decompressed on
+the fly; plain files are memory-mapped.  Column names are matched against
+common aliases (``submit_time``, ``cores``, ``memory``, ``duration``, ...)
+or can be given explicitly with ``columns``.  Job ids are kept as they
+are; cluster traces often repeat them (resubmitted or multi-task jobs),
+and the engine does not need them to be unique.
+
+Run ``python -m cloudvista.traces TRACE`` to replay a trace from the shell.
+"""
+
+from __future__ import annotations
+
+import argparse
+import csv
+import gzip
+import heapq
+import io
+import json
+import math
+import mmap
+import os
+import sys
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence
+
+from .models import Task
+
+# canonical field -> accepted column names, in order of preference
+COLUMN_ALIASES: Dict[str, Sequence[str]] = {
+    'arrival_time': ('arrival_time', 'arrival', 'submit_time', 'submit', 'timestamp', 'time'),
+    'cpu_required': ('cpu_required', 'cpu', 'cores', 'cpus', 'vcpus'),
+    'ram_required': ('ram_required', 'ram', 'memory', 'mem', 'ram_gb'),
+    'execution_time': ('execution_time', 'duration', 'runtime', 'run_time', 'exec_time'),
+    'priority': ('priority', 'prio'),
+    'deadline': ('deadline', 'due', 'due_time'),
+    'id': ('id', 'task_id', 'job_id'),
+    'name': ('name', 'task_name', 'job_name'),
+}
+REQUIRED = ('arrival_time', 'cpu_required', 'ram_required', 'execution_time')
+
+CSV = 'csv'
+JSONL = 'jsonl'
+
+_GZIP_MAGIC = b'\x1f\x8b'
+
+
+class TraceError(ValueError):
+    """Raised for malformed or out-of-order trace records."""
+
+
+def _is_gzip(path: str) -> bool:
+    if path.endswith('.gz'):
+        return True
+    with open(path, 'rb') as fh:
+        return fh.read(2) == _GZIP_MAGIC
+
+
+def iter_lines(path: str, use_mmap: bool = True) -> Iterator[str]:
+    """Yield decoded lines of a (possibly gzip-compressed) text file."""
+    if _is_gzip(path):
+        with gzip.open(path, 'rt', encoding='utf-8', newline='') as fh:
+            yield from fh
+        return
+    if use_mmap and os.path.getsize(path) > 0:
+        with open(path, 'rb') as fh, mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            for raw in iter(mm.readline, b''):
+                yield raw.decode('utf-8')
+        return
+    with io.open(path, 'r', encoding='utf-8', newline='') as fh:
+        yield from fh
+
+
+def detect_format(path: str) -> str:
+    name = path[:-3] if path.endswith('.gz') else path
+    if name.endswith(('.jsonl', '.ndjson', '.json')):
+        return JSONL
+    return CSV
+
+
+def resolve_columns(available: Iterable[str],
+                    overrides: Optional[Dict[str, str]] = None) -> Dict[str, str]:
+    """Map canonical task fields to the trace's column names."""
+    present = {name.strip().lower(): name for name in available}
+    mapping: Dict[str, str] = {}
+    for field, aliases in COLUMN_ALIASES.items():
+        if overrides and field in overrides:
+            mapping[field] = overrides[field]
+            continue
+        for alias in aliases:
+            if alias in present:
+                mapping[field] = present[alias]
+                break
+    missing = [f for f in REQUIRED if f not in mapping]
+    if missing:
+        raise TraceError('trace has no column for %s (columns: %s)'
+                         % (', '.join(missing), ', '.join(sorted(present))))
+    return mapping
+
+
+def _records(path: str, fmt: str, use_mmap: bool) -> Iterator[Dict[str, Any]]:
+    lines = iter_lines(path, use_mmap=use_mmap)
+    if fmt == CSV:
+        yield from csv.DictReader(lines)
+        return
+    for lineno, line in enumerate(lines, 1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            yield json.loads(line)
+        except ValueError as exc:
+            raise TraceError('line %d: invalid JSON: %s' % (lineno, exc))
+
+
+def _to_task(record: Dict[str, Any], mapping: Dict[str, str], seq: int,
+             offset: float) -> Task:
+    try:
+        task_id = int(record[mapping['id']]) if 'id' in mapping else seq
+        return Task(
+            id=task_id,
+            name=str(record[mapping['name']]) if 'name' in mapping else 'Task-%d' % task_id,
+            # fractional cores or GB are rounded up: a VM must hold the whole request
+            cpu_required=int(math.ceil(float(record[mapping['cpu_required']]))),
+            ram_required=int(math.ceil(float(record[mapping['ram_required']]))),
+            execution_time=float(record[mapping['execution_time']]),
+            priority=(int(float(record[mapping['priority']]))
+                      if 'priority' in mapping and record.get(mapping['priority']) not in (None, '')
+                      else 5),
+            arrival_time=float(record[mapping['arrival_time']]) - offset,
+            # deadlines are absolute times, so they are rebased like arrivals
+            deadline=(float(record[mapping['deadline']]) - offset
+                      if 'deadline' in mapping and record.get(mapping['deadline']) not in (None, '')
+                      else None),
+        )
+    except (KeyError, TypeError, ValueError) as exc:
+        raise TraceError('record %d: %s' % (seq, exc))
+
+
+def read_trace(path: str, fmt: Optional[str] = None,
+               columns: Optional[Dict[str, str]] = None,
+               rebase: bool = False, reorder_window: float = 0.0,
+               use_mmap: bool = True, limit: Optional[int] = None) -> Iterator[Task]:
+    """Lazily yield the tasks of a trace in arrival order.
+
+    ``rebase`` shifts arrivals so the first record arrives at time 0 (for
+    traces stamped with epoch seconds).  Traces that are only roughly
+    sorted can be fixed up with ``reorder_window``: records are held in a
+    heap until they are that many seconds older than the newest one read,
+    so memory stays bounded by the window rather than the trace.  A record
+    that is still out of order raises ``TraceError``.
+    """
+    fmt = fmt or detect_format(path)
+    if fmt not in (CSV, JSONL):
+        raise TraceError('unknown trace format %r' % fmt)
+
+    mapping: Optional[Dict[str, str]] = None
+    offset: Optional[float] = None
+    buffer: List[Any] = []
+    last = -math.inf
+    for seq, record in enumerate(_records(path, fmt, use_mmap), 1):
+        if limit is not None and seq > limit:
+            break
+        if mapping is None:
+            mapping = resolve_columns(record.keys(), columns)
+        if offset is None:
+            offset = float(record[mapping['arrival_time']]) if rebase else 0.0
+        task = _to_task(record, mapping, seq, offset)
+        heapq.heappush(buffer, (task.arrival_time, seq, task))
+        while buffer and buffer[0][0] <= task.arrival_time - reorder_window:
+            ready = heapq.heappop(buffer)[2]
+            if ready.arrival_time < last:
+                raise TraceError('record %d arrives at %s, before a record at %s; '
+                                 'sort the trace or raise reorder_window'
+                                 % (seq, ready.arrival_time, last))
+            last = ready.arrival_time
+            yield ready
+    while buffer:
+        ready = heapq.heappop(buffer)[2]
+        if ready.arrival_time < last:
+            raise TraceError('trace is out of order beyond the reorder window')
+        last = ready.arrival_time
+        yield ready
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    from .engine import SCHEDULERS, Simulation
+    from .models import make_vms
+    from .placement import FIRST_FIT, POLICIES
+
+    parser = argparse.ArgumentParser(description='Replay a job trace through the simulator.')
+    parser.add_argument('trace')
+    parser.add_argument('--format', choices=(CSV, JSONL))
+    parser.add_argument('--scheduler', choices=SCHEDULERS, default=SCHEDULERS[0])
+    parser.add_argument('--placement', choices=POLICIES, default=FIRST_FIT)
+    parser.add_argument('--quantum', type=float, default=2.0)
+    parser.add_argument('--vms', type=int, default=3)
+    parser.add_argument('--cores', type=int, default=4)
+    parser.add_argument('--ram', type=int, default=8)
+    parser.add_argument('--rebase', action='store_true')
+    parser.add_argument('--reorder-window', type=float, default=0.0)
+    parser.add_argument('--limit', type=int)
+    args = parser.parse_args(argv)
+
+    tasks = read_trace(args.trace, fmt=args.format, rebase=args.rebase,
+                       reorder_window=args.reorder_window, limit=args.limit)
+    simulation = Simulation(make_vms(args.vms, args.cores, args.ram), tasks,
+                            scheduler=args.scheduler, time_quantum=args.quantum,
+                            placement=args.placement, on_complete=lambda task: None)
+    json.dump(simulation.run().stats, sys.stdout, indent=2)
+    sys.stdout.write('\n')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -12,12 +12,39 @@ var timelineChart = null;
 var costChart = null;
 var taskQueue = [];
 var timeQuantum = 2;
+var stats = newStats();
+/* runs with more pending tasks than this stream throttled progress frames
+   from /api/simulation/live instead of replaying a full event log */
+var LIVE_THRESHOLD = 5000;
+var liveSource = null;
+var lastRunLive = false;
+/* the live run being followed, kept across page reloads */
+var LIVE_RUN_KEY = 'cloudvista.liveRun';
+
+/* running aggregates, updated as events are applied, so that updateStats and
+   updateCharts never rescan completedTasks or vms */
+function newStats() {
+    return {
+        completed: 0,
+        waitSum: 0,
+        turnaroundSum: 0,
+        costSum: 0,
+        totalCores: vms.reduce(function(acc, vm) { return acc + vm.totalCores; }, 0),
+        totalRam: vms.reduce(function(acc, vm) { return acc + vm.totalRam; }, 0),
+        usedCores: 0,
+        usedRam: 0,
+        charted: 0
+    };
+}
 
 /* UI helpers */
+/* schedulers that run tasks in time slices and so take a quantum */
+var SLICED_SCHEDULERS = ['roundrobin', 'srtf', 'mlfq'];
+
 function toggleQuantum() {
     var scheduler = document.getElementById('scheduler').value;
     var quantumGroup = document.getElementById('quantumGroup');
-    quantumGroup.style.display = scheduler === 'roundrobin' ? 'block' : 'none';
+    quantumGroup.style.display = SLICED_SCHEDULERS.indexOf(scheduler) >= 0 ? 'block' : 'none';
 }
 
 /* Charts initialization */
@@ -121,9 +148,13 @@ function initializeVMs() {
             totalRam: ram,
             availableRam: ram,
             storage: storage,
-            currentTask: null
+            runningTasks: []
         });
     }
+    stats.totalCores = count * cores;
+    stats.totalRam = count * ram;
+    stats.usedCores = 0;
+    stats.usedRam = 0;
     alert('Initialized ' + count + ' VMs with ' + cores + ' cores and ' + ram + 'GB RAM each');
     updateStats();
 }
@@ -144,6 +175,10 @@ function submitTask() {
     var ram = parseInt(document.getElementById('taskRam').value) || 1;
     var time = parseInt(document.getElementById('taskTime').value) || 1;
     var priority = parseInt(document.getElementById('taskPriority').value) || 5;
+    var deadline = parseFloat(document.getElementById('taskDeadline').value);
+    var dependencies = document.getElementById('taskDependencies').value.split(',')
+        .map(function(id) { return parseInt(id); })
+        .filter(function(id) { return id > 0; });
 
     var task = {
         id: tasks.length + completedTasks.length + 1,
@@ -154,6 +189,8 @@ function submitTask() {
         remainingTime: time,
         priority: priority,
         arrivalTime: currentTime,
+        deadline: deadline > 0 ? currentTime + deadline : null,
+        dependencies: dependencies,
         startTime: null,
         endTime: null,
         status: 'pending',
@@ -165,6 +202,7 @@ function submitTask() {
     updateTaskList();
     updateStats();
     document.getElementById('taskName').value = '';
+    document.getElementById('taskDependencies').value = '';
 }
 
 /* render task list */
@@ -182,7 +220,8 @@ function updateTaskList() {
                           task.status === 'running' ? 'status-running' : 'status-pending';
         html += '<div class="task-item">' +
             '<div class="task-info">' +
-            '<strong>' + task.name + '</strong> - CPU: ' + task.cpuRequired + ' cores, RAM: ' + task.ramRequired + 'GB, Time: ' + task.executionTime + 's, Priority: ' + task.priority +
+            '<strong>#' + task.id + ' ' + task.name + '</strong> - CPU: ' + task.cpuRequired + ' cores, RAM: ' + task.ramRequired + 'GB, Time: ' + task.executionTime + 's, Priority: ' + task.priority +
+            (task.dependencies && task.dependencies.length ? ', After: ' + task.dependencies.join(', ') : '') +
             '</div>' +
             '<span class="task-status ' + statusClass + '">' + task.status + '</span>' +
             '</div>';
@@ -190,14 +229,16 @@ function updateTaskList() {
     listDiv.innerHTML = html;
 }
 
-/* simulation control */
+/* simulation control: the backend runs the workload headless and returns
+   its event log, which is replayed here to animate the run; large runs are
+   streamed live instead (startLive) */
 function startSimulation() {
     if (vms.length === 0) {
         alert('Please initialize VMs first!');
         return;
     }
-    var pendingCount = tasks.filter(function(t) { return t.status === 'pending'; }).length;
-    if (pendingCount === 0) {
+    var pendingTasks = tasks.filter(function(t) { return t.status === 'pending'; });
+    if (pendingTasks.length === 0) {
         alert('No pending tasks to simulate!');
         return;
     }
@@ -206,152 +247,273 @@ function startSimulation() {
     document.getElementById('simStatus').textContent = 'Running';
 
     var scheduler = document.getElementById('scheduler').value;
-    timeQuantum = scheduler === 'roundrobin' ? parseFloat(document.getElementById('timeQuantum').value) || 2 : 0;
+    timeQuantum = SLICED_SCHEDULERS.indexOf(scheduler) >= 0 ? parseFloat(document.getElementById('timeQuantum').value) || 2 : 0;
 
-    var pendingTasks = tasks.filter(function(t) { return t.status === 'pending'; });
+    // parents that already finished in an earlier run hold nothing back
+    var pendingIds = {};
+    pendingTasks.forEach(function(t) { pendingIds[t.id] = true; });
+
+    var payload = {
+        scheduler: scheduler,
+        time_quantum: timeQuantum || 2,
+        placement: document.getElementById('placement').value,
+        cpu_cost: parseFloat(document.getElementById('cpuCost').value) || 0,
+        ram_cost: parseFloat(document.getElementById('ramCost').value) || 0,
+        record_events: true,
+        vms: vms.map(function(vm) {
+            return { id: vm.id, total_cores: vm.totalCores, total_ram: vm.totalRam, storage: vm.storage };
+        }),
+        tasks: pendingTasks.map(function(t) {
+            return {
+                id: t.id,
+                name: t.name,
+                cpu_required: t.cpuRequired,
+                ram_required: t.ramRequired,
+                execution_time: t.executionTime,
+                priority: t.priority,
+                arrival_time: t.arrivalTime,
+                deadline: t.deadline,
+                dependencies: (t.dependencies || []).filter(function(id) { return pendingIds[id]; })
+            };
+        })
+    };
 
-    if (scheduler === 'fcfs') {
-        pendingTasks.sort(function(a, b) { return a.arrivalTime - b.arrivalTime; });
-    } else if (scheduler === 'priority') {
-        pendingTasks.sort(function(a, b) { return b.priority - a.priority; });
-    } else if (scheduler === 'roundrobin') {
-        taskQueue = pendingTasks.slice();
+    if (pendingTasks.length > LIVE_THRESHOLD) {
+        payload.record_events = false;
+        startLive(payload);
+        return;
     }
 
-    simulationInterval = setInterval(function() {
-        if (scheduler === 'roundrobin') {
-            simulateRoundRobin();
-        } else {
-            simulateStep(pendingTasks);
+    fetch('/api/simulation/start', {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json' },
+        body: JSON.stringify(payload)
+    }).then(function(res) {
+        return res.json();
+    }).then(function(js) {
+        if (!js.success) {
+            alert('Simulation failed: ' + (js.message || JSON.stringify(js)));
+            stopSimulation();
+            return;
         }
-    }, 100);
+        replayEvents(js);
+    }).catch(function(err) {
+        console.error('Simulation error:', err);
+        alert('Failed to run simulation. Is backend running?');
+        stopSimulation();
+    });
 }
 
-/* FCFS & Priority step simulation */
-function simulateStep(pendingTasks) {
-    currentTime += 0.1;
-
-    // finish tasks
-    for (var i = 0; i < vms.length; i++) {
-        var vm = vms[i];
-        if (vm.currentTask) {
-            var t = vm.currentTask;
-            if (currentTime >= t.endTime) {
-                t.status = 'completed';
-                t.cost = calculateTaskCost(t);
-                completedTasks.push(t);
-                vm.availableCores += t.cpuRequired;
-                vm.availableRam += t.ramRequired;
-                vm.currentTask = null;
-            }
+/* live mode: the backend runs the workload in the background and sends
+   at most ~10 frames per second over Server-Sent Events; each frame holds
+   the current stats plus downsampled utilization and completion samples */
+function startLive(payload) {
+    fetch('/api/simulation/live', {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json' },
+        body: JSON.stringify(payload)
+    }).then(function(res) {
+        return res.json();
+    }).then(function(js) {
+        if (!js.success) {
+            alert('Simulation failed: ' + (js.message || JSON.stringify(js)));
+            stopSimulation();
+            return;
         }
-    }
-
-    // schedule pending tasks onto available VMs
-    for (var j = 0; j < pendingTasks.length; j++) {
-        var task = pendingTasks[j];
-        if (task.status === 'pending') {
-            var availableVM = null;
-            for (var k = 0; k < vms.length; k++) {
-                var vm2 = vms[k];
-                if (vm2.currentTask === null &&
-                    vm2.availableCores >= task.cpuRequired &&
-                    vm2.availableRam >= task.ramRequired) {
-                    availableVM = vm2;
-                    break;
-                }
-            }
+        followLive(js.run.id);
+    }).catch(function(err) {
+        console.error('Simulation error:', err);
+        alert('Failed to run simulation. Is backend running?');
+        stopSimulation();
+    });
+}
 
-            if (availableVM) {
-                task.status = 'running';
-                task.startTime = task.startTime || currentTime;
-                task.endTime = currentTime + task.executionTime;
-                availableVM.currentTask = task;
-                availableVM.availableCores -= task.cpuRequired;
-                availableVM.availableRam -= task.ramRequired;
-            }
+/* stream a live run's frames.  The run id is remembered so a reloaded page
+   picks the stream up again; if the server no longer knows the run (it was
+   restarted), the run is resumed from its newest checkpoint */
+function followLive(runId) {
+    lastRunLive = true;
+    localStorage.setItem(LIVE_RUN_KEY, runId);
+    liveSource = new EventSource('/api/simulation/live/' + runId + '/events');
+    liveSource.addEventListener('snapshot', function(e) {
+        var snapshot = JSON.parse(e.data);
+        if (utilizationChart) {
+            utilizationChart.data.labels = [];
+            utilizationChart.data.datasets[0].data = [];
+            utilizationChart.data.datasets[1].data = [];
         }
-    }
-
-    updateTaskList();
-    updateStats();
-    updateCharts();
+        applyLiveFrame({ time: snapshot.time, stats: snapshot.stats, utilization: snapshot.utilization,
+                         completions: [], done: false });
+    });
+    liveSource.addEventListener('frame', function(e) {
+        applyLiveFrame(JSON.parse(e.data));
+    });
+    liveSource.addEventListener('error', function() {
+        // dropped connections reconnect by themselves; a closed stream
+        // means the server answered with an error, i.e. it lost the run
+        if (liveSource && liveSource.readyState === EventSource.CLOSED) {
+            liveSource = null;
+            resumeLive(runId);
+        }
+    });
+}
 
-    var allCompleted = tasks.every(function(x) { return x.status === 'completed'; });
-    if (allCompleted) {
+function resumeLive(runId) {
+    fetch('/api/simulation/resume', {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json' },
+        body: JSON.stringify({ run_id: runId })
+    }).then(function(res) {
+        return res.json();
+    }).then(function(js) {
+        if (!js.success) {
+            alert('Could not resume simulation: ' + (js.message || JSON.stringify(js)));
+            stopSimulation();
+            return;
+        }
+        followLive(js.run.id);
+    }).catch(function(err) {
+        console.error('Resume error:', err);
+        alert('Failed to resume simulation. Is backend running?');
         stopSimulation();
+    });
+}
+
+function pushLimited(chart, label, values, limit) {
+    chart.data.labels.push(label);
+    values.forEach(function(v, i) { chart.data.datasets[i].data.push(v); });
+    if (chart.data.labels.length > limit) {
+        chart.data.labels.shift();
+        chart.data.datasets.forEach(function(ds) { ds.data.shift(); });
     }
 }
 
-/* Round robin simulation */
-function simulateRoundRobin() {
-    currentTime += 0.1;
+function applyLiveFrame(frame) {
+    currentTime = frame.time;
+    var s = frame.stats;
+    if (s) {
+        stats.completed = s.completed_tasks;
+        stats.waitSum = s.avg_wait_time * s.completed_tasks;
+        stats.turnaroundSum = s.avg_turnaround_time * s.completed_tasks;
+        stats.costSum = s.total_cost;
+        stats.usedCores = s.current_cpu_utilization * stats.totalCores / 100;
+        stats.usedRam = s.current_ram_utilization * stats.totalRam / 100;
+    }
 
-    for (var i = 0; i < vms.length; i++) {
-        var vm = vms[i];
-        if (vm.currentTask) {
-            var t = vm.currentTask;
-            t.quantumUsed += 0.1;
-            t.remainingTime -= 0.1;
+    if (utilizationChart) {
+        frame.utilization.forEach(function(p) {
+            pushLimited(utilizationChart, p[0].toFixed(1) + 's', [p[1].toFixed(2), p[2].toFixed(2)], 300);
+        });
+        utilizationChart.update('none');
+    }
+    // completions: [id, name, wait, execution time, cost]
+    if (frame.completions.length > 0) {
+        if (timelineChart) {
+            frame.completions.forEach(function(c) {
+                pushLimited(timelineChart, c[1], [c[2].toFixed(2), c[3].toFixed(2)], 100);
+            });
+            timelineChart.update('none');
+        }
+        if (costChart) {
+            frame.completions.forEach(function(c) {
+                pushLimited(costChart, c[1], [c[4].toFixed(2)], 100);
+            });
+            costChart.update('none');
+        }
+    }
+    updateStats();
 
-            if (t.remainingTime <= 0.01) {
+    if (frame.done) {
+        liveSource.close();
+        liveSource = null;
+        localStorage.removeItem(LIVE_RUN_KEY);
+        if (frame.error) {
+            alert('Simulation failed: ' + frame.error);
+        }
+        var unscheduled = {};
+        (frame.unscheduled || []).forEach(function(id) { unscheduled[id] = true; });
+        tasks.forEach(function(t) {
+            if (t.status === 'pending' && !unscheduled[t.id] && !frame.error) {
                 t.status = 'completed';
-                t.endTime = currentTime;
-                t.remainingTime = 0;
-                t.cost = calculateTaskCost(t);
-                completedTasks.push(t);
-                vm.availableCores += t.cpuRequired;
-                vm.availableRam += t.ramRequired;
-                vm.currentTask = null;
-            } else if (t.quantumUsed >= timeQuantum) {
-                t.status = 'pending';
-                t.quantumUsed = 0;
-                vm.availableCores += t.cpuRequired;
-                vm.availableRam += t.ramRequired;
-                vm.currentTask = null;
-                taskQueue.push(t);
             }
-        }
+        });
+        updateTaskList();
+        isSimulating = false;
+        document.getElementById('simStatus').textContent = 'Completed';
     }
+}
 
-    while (taskQueue.length > 0) {
-        var qtask = taskQueue[0];
-        if (qtask.status === 'completed') {
-            taskQueue.shift();
-            continue;
-        }
+/* replay the [time, kind, taskId, vmId] event log returned by the backend */
+function replayEvents(result) {
+    var taskById = {};
+    var vmById = {};
+    var costById = {};
+    tasks.forEach(function(t) { taskById[t.id] = t; });
+    vms.forEach(function(vm) { vmById[vm.id] = vm; });
+    result.completed_tasks.forEach(function(r) { costById[r.id] = r.cost; });
+
+    var events = result.events;
+    var index = 0;
+    var endTime = events.length > 0 ? events[events.length - 1][0] : currentTime;
+    // advance at least one 0.1s tick per frame, but keep long runs under ~30s of animation
+    var step = Math.max(0.1, (endTime - currentTime) / 300);
 
-        var avail = null;
-        for (var j = 0; j < vms.length; j++) {
-            var v = vms[j];
-            if (v.currentTask === null &&
-                v.availableCores >= qtask.cpuRequired &&
-                v.availableRam >= qtask.ramRequired) {
-                avail = v;
-                break;
-            }
+    simulationInterval = setInterval(function() {
+        currentTime = Math.min(currentTime + step, endTime);
+        while (index < events.length && events[index][0] <= currentTime) {
+            applyEvent(events[index], taskById, vmById, costById);
+            index++;
         }
 
-        if (avail) {
-            taskQueue.shift();
-            qtask.status = 'running';
-            qtask.startTime = qtask.startTime || currentTime;
-            qtask.quantumUsed = 0;
-            avail.currentTask = qtask;
-            avail.availableCores -= qtask.cpuRequired;
-            avail.availableRam -= qtask.ramRequired;
-        } else {
-            break;
+        updateTaskList();
+        updateStats();
+        updateCharts();
+
+        if (index >= events.length) {
+            stopSimulation();
         }
-    }
+    }, 100);
+}
 
-    updateTaskList();
-    updateStats();
-    updateCharts();
+function applyEvent(ev, taskById, vmById, costById) {
+    var time = ev[0];
+    var kind = ev[1];
+    var task = taskById[ev[2]];
+    var vm = ev[3] !== null ? vmById[ev[3]] : null;
+    if (!task) {
+        return;
+    }
 
-    var allCompleted = tasks.every(function(x) { return x.status === 'completed'; });
-    if (allCompleted && taskQueue.length === 0) {
-        stopSimulation();
+    if (kind === 'start') {
+        task.status = 'running';
+        if (task.startTime === null) {
+            task.startTime = time;
+        }
+        vm.runningTasks.push(task.id);
+        vm.availableCores -= task.cpuRequired;
+        vm.availableRam -= task.ramRequired;
+        stats.usedCores += task.cpuRequired;
+        stats.usedRam += task.ramRequired;
+    } else if (kind === 'finish' || kind === 'preempt') {
+        vm.runningTasks.splice(vm.runningTasks.indexOf(task.id), 1);
+        vm.availableCores += task.cpuRequired;
+        vm.availableRam += task.ramRequired;
+        stats.usedCores -= task.cpuRequired;
+        stats.usedRam -= task.ramRequired;
+        if (kind === 'finish') {
+            task.status = 'completed';
+            task.endTime = time;
+            task.remainingTime = 0;
+            task.vmId = vm.id;
+            task.cost = costById[task.id] || 0;
+            completedTasks.push(task);
+            stats.completed++;
+            stats.waitSum += task.startTime - task.arrivalTime;
+            stats.turnaroundSum += task.endTime - task.arrivalTime;
+            stats.costSum += task.cost;
+        } else {
+            task.status = 'pending';
+        }
     }
 }
 
@@ -359,6 +521,11 @@ function simulateRoundRobin() {
 function stopSimulation() {
     isSimulating = false;
     clearInterval(simulationInterval);
+    if (liveSource) {
+        liveSource.close();
+        liveSource = null;
+    }
+    localStorage.removeItem(LIVE_RUN_KEY);
     document.getElementById('simStatus').textContent = 'Completed';
     // ensure final stats & charts updated
     updateStats();
@@ -372,11 +539,13 @@ function resetSimulation() {
     completedTasks = [];
     currentTime = 0;
     taskQueue = [];
+    lastRunLive = false;
     for (var i = 0; i < vms.length; i++) {
         vms[i].availableCores = vms[i].totalCores;
         vms[i].availableRam = vms[i].totalRam;
-        vms[i].currentTask = null;
+        vms[i].runningTasks = [];
     }
+    stats = newStats();
     document.getElementById('simStatus').textContent = 'Idle';
     updateTaskList();
     updateStats();
@@ -400,44 +569,16 @@ function resetSimulation() {
     }
 }
 
-/* update stats shown in UI */
+/* update stats shown in UI (O(1): reads the running aggregates) */
 function updateStats() {
-    // total tasks includes pending + completed
-    var totalTasks = tasks.length;
-    var completed = completedTasks.length;
-
-    var avgWait = 0;
-    var avgTurnaround = 0;
-    var totalCost = 0;
-
-    if (completedTasks.length > 0) {
-        avgWait = completedTasks.reduce(function(acc, t) {
-            return acc + ((t.startTime || 0) - (t.arrivalTime || 0));
-        }, 0) / completedTasks.length;
-
-        avgTurnaround = completedTasks.reduce(function(acc, t) {
-            return acc + ((t.endTime || t.startTime || 0) - (t.arrivalTime || 0));
-        }, 0) / completedTasks.length;
-
-        totalCost = completedTasks.reduce(function(acc, t) {
-            return acc + (t.cost || 0);
-        }, 0);
-    }
-
-    // CPU & RAM utilization
-    var cpuUtil = 0;
-    var ramUtil = 0;
-    if (vms.length > 0) {
-        var totalCpu = vms.reduce(function(acc, vm) { return acc + vm.totalCores; }, 0);
-        var usedCpu = vms.reduce(function(acc, vm) { return acc + (vm.totalCores - vm.availableCores); }, 0);
-        var totalRam = vms.reduce(function(acc, vm) { return acc + vm.totalRam; }, 0);
-        var usedRam = vms.reduce(function(acc, vm) { return acc + (vm.totalRam - vm.availableRam); }, 0);
-
-        cpuUtil = totalCpu > 0 ? (usedCpu / totalCpu) * 100 : 0;
-        ramUtil = totalRam > 0 ? (usedRam / totalRam) * 100 : 0;
-    }
-
-    document.getElementById('totalTasks').textContent = totalTasks;
+    var completed = stats.completed;
+    var avgWait = completed > 0 ? stats.waitSum / completed : 0;
+    var avgTurnaround = completed > 0 ? stats.turnaroundSum / completed : 0;
+    var totalCost = stats.costSum;
+    var cpuUtil = stats.totalCores > 0 ? (stats.usedCores / stats.totalCores) * 100 : 0;
+    var ramUtil = stats.totalRam > 0 ? (stats.usedRam / stats.totalRam) * 100 : 0;
+
+    document.getElementById('totalTasks').textContent = tasks.length;
     document.getElementById('completedTasks').textContent = completed;
     document.getElementById('avgWaitTime').textContent = (avgWait).toFixed(1) + 's';
     document.getElementById('avgTurnaround').textContent = (avgTurnaround).toFixed(1) + 's';
@@ -447,18 +588,13 @@ function updateStats() {
     document.getElementById('avgCostPerTask').textContent = completed > 0 ? '₹' + (totalCost / completed).toFixed(2) : '₹0.00';
 }
 
-/* update charts (utilization, timeline, cost) */
+/* update charts (utilization, timeline, cost); only newly completed tasks are appended */
 function updateCharts() {
     // add a utilization sample
     if (utilizationChart) {
         var label = (currentTime).toFixed(1) + 's';
-        var totalCpu = vms.reduce(function(acc, vm) { return acc + vm.totalCores; }, 0);
-        var usedCpu = vms.reduce(function(acc, vm) { return acc + (vm.totalCores - vm.availableCores); }, 0);
-        var totalRam = vms.reduce(function(acc, vm) { return acc + vm.totalRam; }, 0);
-        var usedRam = vms.reduce(function(acc, vm) { return acc + (vm.totalRam - vm.availableRam); }, 0);
-
-        var cpuPct = totalCpu > 0 ? (usedCpu / totalCpu) * 100 : 0;
-        var ramPct = totalRam > 0 ? (usedRam / totalRam) * 100 : 0;
+        var cpuPct = stats.totalCores > 0 ? (stats.usedCores / stats.totalCores) * 100 : 0;
+        var ramPct = stats.totalRam > 0 ? (stats.usedRam / stats.totalRam) * 100 : 0;
 
         // push samples (keep last 60)
         utilizationChart.data.labels.push(label);
@@ -472,99 +608,133 @@ function updateCharts() {
         utilizationChart.update();
     }
 
+    var fresh = completedTasks.slice(stats.charted);
+    stats.charted = completedTasks.length;
+    if (fresh.length === 0) {
+        return;
+    }
+
     // timeline: for completed tasks, show wait vs exec
     if (timelineChart) {
-        var names = completedTasks.map(function(t) { return t.name; });
-        var waits = completedTasks.map(function(t) { return ((t.startTime || 0) - (t.arrivalTime || 0)).toFixed(2); });
-        var execs = completedTasks.map(function(t) { return (t.executionTime || 0).toFixed(2); });
-
-        timelineChart.data.labels = names;
-        timelineChart.data.datasets[0].data = waits;
-        timelineChart.data.datasets[1].data = execs;
+        fresh.forEach(function(t) {
+            timelineChart.data.labels.push(t.name);
+            timelineChart.data.datasets[0].data.push(((t.startTime || 0) - (t.arrivalTime || 0)).toFixed(2));
+            timelineChart.data.datasets[1].data.push((t.executionTime || 0).toFixed(2));
+        });
         timelineChart.update();
     }
 
     // cost chart
     if (costChart) {
-        var labels = completedTasks.map(function(t) { return t.name; });
-        var costs = completedTasks.map(function(t) { return (t.cost || 0).toFixed(2); });
-
-        costChart.data.labels = labels;
-        costChart.data.datasets[0].data = costs;
+        fresh.forEach(function(t) {
+            costChart.data.labels.push(t.name);
+            costChart.data.datasets[0].data.push((t.cost || 0).toFixed(2));
+        });
         costChart.update();
     }
 }
 
-/* client-side PDF generation using html2canvas + jsPDF
-   NOTE: index.html must include:
-   <script src="https://cdnjs.cloudflare.com/ajax/libs/html2canvas/1.4.1/html2canvas.min.js"></script>
-   <script src="https://cdnjs.cloudflare.com/ajax/libs/jspdf/2.5.1/jspdf.umd.min.js"></script>
-*/
+/* PDF report: built server-side from the last run by ReportLab, in a
+   background job that is polled until the file can be downloaded */
 function generatePDF() {
-    if (completedTasks.length === 0) {
+    if (completedTasks.length === 0 && !lastRunLive) {
         alert('No completed tasks to report.');
         return;
     }
 
-    var reportArea = document.querySelector('.container');
-    if (!reportArea) {
-        alert('Report area not found.');
-        return;
-    }
-
-    // show a quick status
     document.getElementById('simStatus').textContent = 'Generating PDF...';
 
-    html2canvas(reportArea, { scale: 2 }).then(function(canvas) {
-        var imgData = canvas.toDataURL('image/png');
-        var pdf = new jspdf.jsPDF('p', 'mm', 'a4');
-        var imgProps = pdf.getImageProperties(imgData);
-        var pdfWidth = pdf.internal.pageSize.getWidth();
-        var pdfHeight = (imgProps.height * pdfWidth) / imgProps.width;
-        pdf.addImage(imgData, 'PNG', 0, 0, pdfWidth, pdfHeight);
-        var filename = 'cloudvista_report_' + (new Date()).toISOString().replace(/[:.]/g, '-') + '.pdf';
-        pdf.save(filename);
+    function done() {
         document.getElementById('simStatus').textContent = 'Completed';
+    }
+
+    function poll(jobId) {
+        fetch('/api/report/status/' + jobId).then(function(res) {
+            return res.json();
+        }).then(function(js) {
+            if (!js.success) {
+                throw new Error(js.message);
+            }
+            if (js.job.status === 'done') {
+                window.location = '/api/report/download/' + jobId;
+                done();
+            } else if (js.job.status === 'failed') {
+                throw new Error(js.job.error);
+            } else {
+                setTimeout(function() { poll(jobId); }, 500);
+            }
+        }).catch(function(err) {
+            console.error(err);
+            alert('Failed to generate PDF: ' + err.message);
+            done();
+        });
+    }
+
+    fetch('/api/report/generate', {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json' },
+        body: JSON.stringify({ last_run: true, format: 'pdf' })
+    }).then(function(res) {
+        return res.json();
+    }).then(function(js) {
+        if (!js.success) {
+            throw new Error(js.message);
+        }
+        poll(js.job.id);
     }).catch(function(err) {
         console.error(err);
-        alert('Failed to generate PDF: ' + err);
-        document.getElementById('simStatus').textContent = 'Completed';
+        alert('Failed to generate PDF: ' + err.message);
+        done();
     });
 }
 
 /* save simulation to backend (POST to /api/simulation/save)
-   Backend expects completed tasks & scheduler info; minimal payload below.
+   Sent as NDJSON: a header line with the run settings, then one completed
+   task per line, which the backend streams into SQLite.
 */
 function saveSimulation() {
-    if (completedTasks.length === 0) {
+    if (completedTasks.length === 0 && !lastRunLive) {
         alert('No completed tasks to save.');
         return;
     }
 
-    var scheduler = document.getElementById('scheduler').value || 'unknown';
+    // a live run's tasks only exist server-side; save them from there
+    if (completedTasks.length === 0) {
+        postSave('application/json', JSON.stringify({ last_run: true }));
+        return;
+    }
 
-    // build payload
-    var payload = {
+    var scheduler = document.getElementById('scheduler').value || 'unknown';
+    var lines = [JSON.stringify({
         scheduler: scheduler,
-        completedTasks: completedTasks.map(function(t) {
-            return {
-                id: t.id,
-                name: t.name,
-                cpu_required: t.cpuRequired,
-                ram_required: t.ramRequired,
-                execution_time: t.executionTime,
-                priority: t.priority,
-                start_time: t.startTime,
-                end_time: t.endTime,
-                cost: t.cost
-            };
-        })
-    };
+        placement: document.getElementById('placement').value,
+        time_quantum: timeQuantum || null,
+        vm_count: vms.length
+    })];
+    completedTasks.forEach(function(t) {
+        lines.push(JSON.stringify({
+            id: t.id,
+            name: t.name,
+            cpu_required: t.cpuRequired,
+            ram_required: t.ramRequired,
+            execution_time: t.executionTime,
+            priority: t.priority,
+            arrival_time: t.arrivalTime,
+            start_time: t.startTime,
+            end_time: t.endTime,
+            vm_id: t.vmId,
+            cost: t.cost
+        }));
+    });
+
+    postSave('application/x-ndjson', lines.join('\n') + '\n');
+}
 
+function postSave(contentType, body) {
     fetch('/api/simulation/save', {
         method: 'POST',
-        headers: { 'Content-Type': 'application/json' },
-        body: JSON.stringify(payload)
+        headers: { 'Content-Type': contentType },
+        body: body
     }).then(function(res) {
         return res.json();
     }).then(function(js) {
@@ -584,4 +754,16 @@ window.addEventListener('load', function() {
     initCharts();
     updateTaskList();
     updateStats();
+
+    // a live run was in progress before the page was reloaded
+    var runId = localStorage.getItem(LIVE_RUN_KEY);
+    if (runId) {
+        isSimulating = true;
+        document.getElementById('simStatus').textContent = 'Running';
+        // the fleet is gone with the page; count capacity in percent so the
+        // frames' utilization still shows
+        stats.totalCores = 100;
+        stats.totalRam = 100;
+        followLive(runId);
+    }
 });
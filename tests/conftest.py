@@ -0,0 +1,28 @@
+import importlib
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture(scope='session')
+def client(tmp_path_factory):
+    """Flask test client with the store and cache in a scratch directory."""
+    directory = tmp_path_factory.mktemp('api')
+    saved = {name: os.environ.get(name) for name in ('CLOUDVISTA_DB', 'CLOUDVISTA_CACHE')}
+    os.environ['CLOUDVISTA_DB'] = str(directory / 'cloudvista.db')
+    os.environ['CLOUDVISTA_CACHE'] = str(directory / 'cache.db')
+    try:
+        app = importlib.import_module('app')
+        app.reports.directory = str(directory / 'reports')
+        app.service.checkpoint_dir = str(directory / 'checkpoints')
+        app.service.profile_dir = str(directory / 'profiles')
+        yield app.app.test_client()
+    finally:
+        for name, value in saved.items():
+            if value is None:
+                os.environ.pop(name, None)
+            else:
+                os.environ[name] = value
@@ -0,0 +1,79 @@
+"""``/api/simulation/start`` through Flask's test client."""
+
+import math
+
+import pytest
+
+VMS = {'count': 2, 'cores': 4, 'ram': 16}
+
+
+def make_task(task_id, **fields):
+    task = {'id': task_id, 'cpu_required': 2, 'ram_required': 4,
+            'execution_time': 3, 'arrival_time': 0, 'priority': 1}
+    task.update(fields)
+    return task
+
+
+def start(client, tasks, **body):
+    body.setdefault('vms', VMS)
+    body['tasks'] = tasks
+    return client.post('/api/simulation/start', json=body)
+
+
+def test_round_trip(client):
+    tasks = [make_task(1), make_task(2, execution_time=1), make_task(3, arrival_time=1),
+             make_task(4)]
+    response = start(client, tasks, scheduler='fcfs')
+    assert response.status_code == 200
+    body = response.get_json()
+    assert body['success'] is True
+    assert body['scheduler'] == 'fcfs'
+    completed = {task['id']: task for task in body['completed_tasks']}
+    assert sorted(completed) == [1, 2, 3, 4]
+    # two tasks per VM at once: 1, 2 and 4 start straight away, 3 when 2 ends
+    assert [completed[i]['start_time'] for i in (1, 2, 3, 4)] == [0, 0, 1, 0]
+    assert completed[3]['name'] == 'Task-3'
+    assert body['statistics']['completed_tasks'] == 4
+    assert body['statistics']['makespan'] == 4
+
+
+@pytest.mark.parametrize('tasks', [
+    [make_task(1, execution_time=math.nan)],
+    [make_task(1, execution_time=math.inf)],
+    [make_task(1, execution_time=-1)],
+    [make_task(1, arrival_time=-0.5)],
+    [make_task(1, cpu_required=0)],
+    [make_task(1, ram_required=0)],
+    [make_task(1, execution_time='soon')],
+    'not a list',
+], ids=['nan', 'inf', 'negative-time', 'negative-arrival', 'no-cpu', 'no-ram',
+        'not-a-number', 'not-a-list'])
+def test_malformed_tasks_are_rejected(client, tasks):
+    response = start(client, tasks)
+    assert response.status_code == 400
+    body = response.get_json()
+    assert body['success'] is False
+    assert body['message']
+
+
+def test_body_must_be_an_object(client):
+    response = client.post('/api/simulation/start', data='[1, 2]',
+                           content_type='application/json')
+    assert response.status_code == 400
+    assert response.get_json()['success'] is False
+
+
+def test_unknown_scheduler_is_rejected(client):
+    response = start(client, [make_task(1)], scheduler='lottery')
+    assert response.status_code == 400
+
+
+def test_explicit_id_zero_is_kept(client):
+    body = start(client, [make_task(0), {'execution_time': 2}]).get_json()
+    assert sorted(task['id'] for task in body['completed_tasks']) == [0, 1]
+
+
+def test_duplicate_ids_are_rejected(client):
+    response = start(client, [make_task(1), make_task(1)])
+    assert response.status_code == 400
+    assert 'duplicate task id 1' in response.get_json()['message']
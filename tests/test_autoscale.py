@@ -0,0 +1,114 @@
+"""Scaling decisions, fleet bounds and instance choice."""
+
+import pytest
+
+from cloudvista.autoscale import (
+    Autoscaler, InstanceType, QueueDepthPolicy, UtilizationPolicy, make_autoscaler)
+from cloudvista.engine import Simulation
+from cloudvista.models import Task, make_vms
+
+
+@pytest.mark.parametrize('vms, pending, expected', [
+    (2, 5, 1),    # 2.5 tasks wait per VM, above scale_out_at
+    (2, 2, 0),    # exactly at scale_out_at holds
+    (2, 1, 0),
+    (2, 0, -1),   # nothing waits: shrink
+])
+def test_queue_depth_decisions(vms, pending, expected):
+    assert QueueDepthPolicy(scale_out_at=1.0).decide(vms, pending, 0.0, 0.0) == expected
+
+
+def test_queue_depth_step():
+    policy = QueueDepthPolicy(scale_out_at=1.0, step=3)
+    assert policy.decide(1, 4, 0.0, 0.0) == 3
+    assert policy.decide(1, 0, 0.0, 0.0) == -3
+
+
+@pytest.mark.parametrize('vms, pending, cpu, ram, expected', [
+    (2, 0, 0.9, 0.1, 1),    # the busier resource decides
+    (2, 0, 0.1, 0.8, 1),
+    (0, 3, 0.0, 0.0, 1),    # work waits and nothing is ready
+    (2, 0, 0.5, 0.5, 0),
+    (2, 0, 0.2, 0.3, -1),
+    (2, 1, 0.2, 0.1, 0),    # never shrink while tasks wait
+])
+def test_utilization_decisions(vms, pending, cpu, ram, expected):
+    assert UtilizationPolicy(0.8, 0.3).decide(vms, pending, cpu, ram) == expected
+
+
+@pytest.mark.parametrize('spec', [
+    {'policy': 'random'},
+    {'policy': 'queue', 'step': 0},
+    {'policy': 'queue', 'scale_in_at': 2, 'scale_out_at': 1},
+    {'policy': 'utilization', 'scale_out_at': 1.5},
+    {'min_vms': 5, 'max_vms': 2},
+    {'interval': 0},
+    {'types': [{'name': 'a', 'cores': 2, 'ram': 4}, {'name': 'a', 'cores': 4, 'ram': 8}]},
+    {'types': 'small'},
+    {'bogus': 1},
+])
+def test_invalid_specs(spec):
+    with pytest.raises(ValueError):
+        make_autoscaler(spec)
+
+
+def _burst(count, cpu=2, execution_time=100.0):
+    return [Task(id=i, name='Task-%d' % i, cpu_required=cpu, ram_required=1,
+                 execution_time=execution_time, priority=1, arrival_time=0.0)
+            for i in range(1, count + 1)]
+
+
+def _types(delay=0.0):
+    return [InstanceType('small', cores=2, ram=8, provisioning_delay=delay),
+            InstanceType('large', cores=8, ram=32, provisioning_delay=delay)]
+
+
+def test_burst_scales_out_within_max_vms():
+    scaler = Autoscaler(QueueDepthPolicy(scale_out_at=0.0, step=2), types=_types(),
+                        max_vms=4, interval=10, scale_out_cooldown=0)
+    result = Simulation(make_vms(1, 2, 8), _burst(8), autoscaler=scaler).run()
+    stats = result.stats
+    assert stats['peak_vms'] == 4
+    assert stats['vms_launched'] == 3
+    # two scale-outs: +2 at t=0, then +1 (clipped to max_vms) at t=10
+    assert stats['scale_outs'] == 2
+    assert stats['completed_tasks'] == 8
+    assert stats['makespan'] < 8 * 100.0
+
+
+def test_cooldown_holds_scale_out():
+    scaler = Autoscaler(QueueDepthPolicy(scale_out_at=0.0), types=_types(),
+                        max_vms=10, interval=10, scale_out_cooldown=1000)
+    result = Simulation(make_vms(1, 2, 8), _burst(6), autoscaler=scaler).run()
+    # the t=0 scale-out starts the cooldown, which outlasts the burst
+    assert result.stats['scale_outs'] == 1
+
+
+def test_new_vm_fits_biggest_waiting_task():
+    scaler = Autoscaler(QueueDepthPolicy(scale_out_at=0.0), types=_types(), max_vms=2)
+    tasks = _burst(1) + [Task(id=2, name='Task-2', cpu_required=6, ram_required=16,
+                              execution_time=50.0, priority=1, arrival_time=0.0)]
+    result = Simulation(make_vms(1, 2, 8), tasks, autoscaler=scaler).run()
+    launched = [vm for vm in scaler.simulation.vms if vm.instance_type]
+    assert [vm.instance_type for vm in launched] == ['large']
+    assert not result.unscheduled
+
+
+def test_drained_run_ends_with_last_task():
+    # long evaluation intervals and provisioning leave fleet events queued
+    # after the burst; they must not stretch the run
+    scaler = Autoscaler(QueueDepthPolicy(scale_out_at=0.0), types=_types(delay=500),
+                        max_vms=3, interval=1000)
+    simulation = Simulation(make_vms(1, 2, 8), _burst(2, execution_time=10.0),
+                            autoscaler=scaler)
+    result = simulation.run()
+    assert result.stats['makespan'] == 20.0
+    assert simulation.queue_length() == 0
+
+
+def test_drop_fleet_events_keeps_task_events():
+    simulation = Simulation(make_vms(1, 2, 8), _burst(2))
+    simulation.schedule_scaling(50.0)
+    assert simulation.queue_length() == 2  # the first arrival and the scaling
+    assert not simulation.drop_fleet_events()
+    assert simulation.queue_length() == 2
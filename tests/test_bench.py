@@ -0,0 +1,91 @@
+"""Synthetic workloads and the benchmark harness."""
+
+import json
+
+import numpy as np
+import pytest
+
+from cloudvista import bench
+from cloudvista.bench import WORKLOADS, cases, compare, make_workload, run_case, run_suite
+
+
+@pytest.mark.parametrize('kind', WORKLOADS)
+def test_workloads_are_seeded_and_sized(kind):
+    first = make_workload(kind, 2000, 10, cores=8, ram=32, seed=4)
+    again = make_workload(kind, 2000, 10, cores=8, ram=32, seed=4)
+    other = make_workload(kind, 2000, 10, cores=8, ram=32, seed=5)
+    assert first.data.tobytes() == again.data.tobytes()
+    assert first.data.tobytes() != other.data.tobytes()
+    data = first.data
+    assert len(first) == 2000
+    assert data['cpu'].min() >= 1 and data['cpu'].max() <= 4
+    assert data['ram'].min() >= 1 and data['ram'].max() <= 16
+    assert data['arrival_time'][0] == 0 and np.all(np.diff(data['arrival_time']) >= 0)
+    assert np.all(data['deadline'] >= data['arrival_time'] + 2 * data['execution_time'] - 1e-3)
+
+
+@pytest.mark.parametrize('kind', WORKLOADS)
+def test_offered_load_scales_with_the_fleet(kind):
+    for vms in (10, 100):
+        data = make_workload(kind, 20000, vms, cores=8, ram=32, load=0.9, seed=1).data
+        offered = (data['cpu'] * data['execution_time']).sum() / data['arrival_time'][-1]
+        assert offered / (vms * 8) == pytest.approx(0.9, rel=0.2)
+
+
+def test_unknown_workload_and_suite():
+    with pytest.raises(ValueError):
+        make_workload('spiky', 10, 1)
+    with pytest.raises(ValueError):
+        cases('huge')
+
+
+def test_case_matrix():
+    matrix = cases('quick', workloads=['uniform'], schedulers=['fcfs', 'sjf'], vms=[5])
+    assert [(c['tasks'], c['vms'], c['scheduler']) for c in matrix] == [
+        (1000, 5, 'fcfs'), (1000, 5, 'sjf')]
+
+
+def test_run_case_reports_throughput():
+    row = run_case({'workload': 'uniform', 'tasks': 500, 'vms': 5, 'scheduler': 'roundrobin',
+                    'placement': 'firstfit'}, repeat=2)
+    assert row['completed_tasks'] == 500
+    assert row['time_quantum'] == 2.0
+    # one event per arrival, completion and preemption
+    assert row['events'] > 1000
+    assert row['events_per_sec'] == pytest.approx(row['events'] / row['seconds'], rel=0.01)
+    assert row['peak_rss_mb'] > 0
+
+
+def test_isolated_case_matches_in_process():
+    case = cases('quick', workloads=['pareto'], schedulers=['srtf'], tasks=[300], vms=[3])
+    isolated, = run_suite(case, isolate=True)
+    local, = run_suite(case, isolate=False)
+    for key in ('events', 'completed_tasks', 'makespan', 'avg_wait_time'):
+        assert isolated[key] == local[key]
+
+
+def test_compare_flags_regressions():
+    key = {'workload': 'uniform', 'tasks': 1000, 'vms': 10, 'placement': 'firstfit'}
+    baseline = [dict(key, scheduler='fcfs', events_per_sec=1000.0),
+                dict(key, scheduler='sjf', events_per_sec=1000.0)]
+    results = [dict(key, scheduler='fcfs', events_per_sec=850.0),
+               dict(key, scheduler='sjf', events_per_sec=700.0),
+               dict(key, scheduler='edf', events_per_sec=10.0)]
+    regressions = compare(results, baseline, tolerance=0.2)
+    assert [(row['scheduler'], row['ratio']) for row in regressions] == [('sjf', 0.7)]
+
+
+def test_command_line_baseline(tmp_path, capsys):
+    output = tmp_path / 'bench.json'
+    argv = ['--workload', 'uniform', '--scheduler', 'fcfs', '--tasks', '200', '--vms', '2',
+            '--no-isolate', '--output', str(output)]
+    assert bench.main(argv) == 0
+    report = json.loads(output.read_text())
+    assert report['version'] == bench.FORMAT_VERSION
+    assert [row['scheduler'] for row in report['results']] == ['fcfs']
+
+    # a baseline a thousand times faster makes this run a regression
+    report['results'][0]['events_per_sec'] *= 1000
+    output.write_text(json.dumps(report))
+    assert bench.main(argv[:-2] + ['--baseline', str(output)]) == 1
+    assert len(json.loads(capsys.readouterr().out)['regressions']) == 1
@@ -0,0 +1,103 @@
+"""Cache keys, the LRU store and cached API runs."""
+
+import itertools
+
+import pytest
+
+from cloudvista import cache as cache_module
+from cloudvista.bench import make_workload
+from cloudvista.cache import (
+    ResultCache, cache_key, decode_result, encode_result, workload_digest)
+from cloudvista.engine import Simulation
+from cloudvista.models import make_vms
+from test_api import make_task, start
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    # a strictly increasing clock, so the LRU order never depends on ties
+    ticks = itertools.count(1000)
+    monkeypatch.setattr(cache_module.time, 'time', lambda: float(next(ticks)))
+
+
+def test_get_and_put(tmp_path):
+    store = ResultCache(str(tmp_path / 'c.db'))
+    assert store.get('a') is None
+    assert store.put('a', b'value')
+    assert store.get('a') == b'value'
+    stats = store.statistics()
+    assert (stats['entries'], stats['bytes'], stats['hits'], stats['misses']) == (1, 5, 1, 1)
+    store.clear()
+    assert store.get('a') is None
+
+
+def test_evicts_least_recently_used(tmp_path, clock):
+    store = ResultCache(str(tmp_path / 'c.db'), max_bytes=30)
+    for key in 'abc':
+        store.put(key, b'x' * 10)
+    store.get('a')               # b is now the oldest
+    store.put('d', b'x' * 10)
+    assert store.get('b') is None
+    assert [store.get(key) is not None for key in 'acd'] == [True, True, True]
+    assert store.statistics()['bytes'] == 30
+
+
+def test_large_value_evicts_several(tmp_path, clock):
+    store = ResultCache(str(tmp_path / 'c.db'), max_bytes=30)
+    for key in 'abc':
+        store.put(key, b'x' * 10)
+    store.put('d', b'x' * 25)
+    assert store.statistics()['entries'] == 1
+    assert store.get('d') is not None
+
+
+def test_value_bigger_than_the_cache_is_refused(tmp_path):
+    store = ResultCache(str(tmp_path / 'c.db'), max_bytes=10)
+    store.put('a', b'x' * 5)
+    assert not store.put('b', b'x' * 11)
+    assert store.get('a') is not None
+
+
+def test_equivalent_options_share_a_key():
+    tasks = make_workload('uniform', 50, 2, cores=4, ram=8, seed=1)
+    digest = workload_digest(tasks)
+    vms = make_vms(2, 4, 8)
+    # fcfs never slices, so the quantum does not matter
+    assert (cache_key(digest, vms, {'scheduler': 'fcfs', 'time_quantum': 1})
+            == cache_key(digest, vms, {'scheduler': 'fcfs', 'time_quantum': 3}))
+    assert (cache_key(digest, vms, {'scheduler': 'roundrobin', 'time_quantum': 1})
+            != cache_key(digest, vms, {'scheduler': 'roundrobin', 'time_quantum': 3}))
+    assert cache_key(digest, vms, {}) == cache_key(digest, vms, {'scheduler': 'fcfs'})
+    assert cache_key(digest, vms, {}) != cache_key(digest, make_vms(3, 4, 8), {})
+    with pytest.raises(ValueError):
+        cache_key(digest, vms, {'speed': 2})
+
+
+def test_digest_follows_the_workload():
+    tasks = list(make_workload('uniform', 50, 2, cores=4, ram=8, seed=1).iter_tasks())
+    digest = workload_digest(tasks)
+    assert workload_digest(list(reversed(tasks))) == digest   # taken by arrival
+    tasks[7].execution_time += 1
+    assert workload_digest(tasks) != digest
+
+
+def test_result_round_trip():
+    vms = make_vms(2, 4, 8)
+    tasks = make_workload('pareto', 80, 2, cores=4, ram=8, seed=2)
+    result = Simulation(vms, tasks, scheduler='srtf', record_events=True).run()
+    decoded, fleet = decode_result(encode_result(result, vms))
+    assert decoded.stats == result.stats
+    assert decoded.events == result.events
+    assert len(decoded.completed) == result.stats['completed_tasks']
+    assert [vm.to_dict() for vm in fleet] == [vm.to_dict() for vm in vms]
+
+
+def test_same_request_is_cached(client):
+    tasks = [make_task(1), make_task(2, execution_time=5)]
+    first = start(client, tasks, scheduler='sjf').get_json()
+    second = start(client, tasks, scheduler='sjf').get_json()
+    assert first['cached'] is False
+    assert second['cached'] is True
+    assert second['completed_tasks'] == first['completed_tasks']
+    third = start(client, tasks, scheduler='sjf', cache=False).get_json()
+    assert third['cached'] is False
@@ -0,0 +1,50 @@
+"""A run resumed from a checkpoint finishes as the uninterrupted run does."""
+
+import pytest
+
+from cloudvista import checkpoint
+from cloudvista.bench import make_workload
+from cloudvista.engine import Simulation
+from cloudvista.models import make_vms
+
+
+def _simulation(scheduler, **options):
+    tasks = make_workload('pareto', 400, 4, cores=8, ram=32, load=1.1, seed=3)
+    return Simulation(make_vms(4, 8, 32), tasks, scheduler=scheduler,
+                      time_quantum=0.7, record_events=True, **options)
+
+
+def _outcome(result):
+    data = result.table.data
+    rows = sorted(zip(data['id'].tolist(), data['start_time'].tolist(),
+                      data['end_time'].tolist(), data['vm'].tolist(), data['cost'].tolist()))
+    return rows, result.stats, [task.id for task in result.unscheduled], result.events
+
+
+@pytest.mark.parametrize('scheduler, options', [
+    ('fcfs', {}),
+    ('roundrobin', {}),
+    ('srtf', {}),
+    ('mlfq', {}),
+    # the pending boost time is part of the saved state
+    ('mlfq', {'scheduler_options': {'boost_interval': 3.0}}),
+])
+def test_resume_matches_uninterrupted_run(tmp_path, scheduler, options):
+    expected = _outcome(_simulation(scheduler, **options).run())
+
+    simulation = _simulation(scheduler, **options)
+    for cut in (5.0, 40.0):
+        while simulation.now < cut:
+            simulation.step()
+        path = checkpoint.save(simulation, str(tmp_path / ('%s-%g.npz' % (scheduler, cut))))
+        simulation = checkpoint.load(path)
+    assert _outcome(simulation.run()) == expected
+
+
+def test_fork_overrides_scheduler():
+    simulation = _simulation('fcfs')
+    while simulation.now < 20.0:
+        simulation.step()
+    branch = checkpoint.fork(simulation, scheduler='sjf')
+    assert branch.scheduler == 'sjf'
+    assert _outcome(simulation.run()) != _outcome(branch.run())
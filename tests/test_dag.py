@@ -0,0 +1,97 @@
+"""Dependency graphs, HEFT, and dependencies in Monte Carlo and sweeps."""
+
+import pytest
+
+from cloudvista.cache import workload_digest
+from cloudvista.dag import DependencyError, TaskGraph
+from cloudvista.engine import Simulation
+from cloudvista.models import Task, make_vms
+from cloudvista.montecarlo import run_monte_carlo
+from cloudvista.sweep import grid, run_sweep
+from cloudvista.taskstore import TaskTable
+from test_engine import STAGGERED, make_tasks, schedule
+
+
+def _task(task_id, execution_time, *parents):
+    return Task(id=task_id, name='Task-%d' % task_id, cpu_required=2, ram_required=1,
+                execution_time=execution_time, priority=1, arrival_time=0.0,
+                dependencies=list(parents))
+
+
+def _chain():
+    return [_task(1, 10.0), _task(2, 10.0, 1), _task(3, 10.0, 2)]
+
+
+def test_upward_rank_and_critical_path():
+    #   1 (2) -> 2 (3) -> 4 (1)
+    #   1     -> 3 (5)
+    graph = TaskGraph([1, 2, 3, 4], [1, 1, 2], [2, 3, 4], [2, 3, 5, 1])
+    assert graph.upward_rank() == [7, 4, 5, 1]
+    assert graph.critical_path == 7
+    assert graph.statistics() == {'dag_tasks': 4, 'dag_edges': 3, 'critical_path': 7}
+
+
+@pytest.mark.parametrize('ids, parents, children', [
+    ([1, 2], [1], [3]),             # unknown task
+    ([1, 2, 3], [1, 2, 3], [2, 3, 1]),   # cycle
+    ([1, 1], [], []),               # repeated id
+])
+def test_invalid_graphs(ids, parents, children):
+    with pytest.raises(DependencyError):
+        TaskGraph(ids, parents, children, [1.0] * len(ids))
+
+
+def test_heft_matches_reference_schedule():
+    # without dependencies the rank is the task's own duration
+    result = Simulation(make_vms(1, 2, 8), make_tasks(STAGGERED), scheduler='heft').run()
+    assert schedule(result) == {1: (0, 4), 2: (4, 7), 4: (7, 9), 3: (9, 10)}
+
+
+def test_heft_runs_the_critical_path_first():
+    # 1 -> 3 is the longer chain; 2 is the longer single task
+    tasks = [_task(1, 1.0), _task(2, 5.0), _task(3, 10.0, 1)]
+    heft = Simulation(make_vms(1, 2, 8), tasks, scheduler='heft').run()
+    assert schedule(heft) == {1: (0, 1), 3: (1, 11), 2: (11, 16)}
+    tasks = [_task(1, 1.0), _task(2, 5.0), _task(3, 10.0, 1)]
+    sjf = Simulation(make_vms(1, 2, 8), tasks, scheduler='sjf').run()
+    assert schedule(sjf) == {1: (0, 1), 2: (1, 6), 3: (6, 16)}
+
+
+def test_chain_runs_in_order_on_a_wide_fleet():
+    result = Simulation(make_vms(3, 8, 32), _chain()).run()
+    assert schedule(result) == {1: (0, 10), 2: (10, 20), 3: (20, 30)}
+    assert result.stats['critical_path'] == 30
+
+
+@pytest.mark.parametrize('workers', [1, 2])
+def test_monte_carlo_keeps_dependencies(workers):
+    report = run_monte_carlo(_chain(), make_vms(3, 8, 32), replications=2, workers=workers)
+    assert [row['makespan'] for row in report['runs']] == [30.0, 30.0]
+
+
+def test_monte_carlo_table_takes_a_graph():
+    graph = TaskGraph([1, 2, 3], [1, 2], [2, 3], [10.0] * 3)
+    table = TaskTable.from_tasks([_task(i, 10.0) for i in (1, 2, 3)])
+    report = run_monte_carlo(table, make_vms(3, 8, 32), replications=3, workers=1,
+                             durations={'kind': 'lognormal', 'sigma': 0.3}, graph=graph)
+    for row in report['runs']:
+        # no two tasks overlap, so the makespan is well above any one duration
+        assert row['makespan'] > 15
+
+
+@pytest.mark.parametrize('workers', [1, 2])
+def test_sweep_keeps_dependencies(workers):
+    points = grid(schedulers=['fcfs', 'heft'], vm_counts=[3], cores=[8], ram=[32])
+    rows = list(run_sweep(_chain(), points, workers=workers))
+    assert [row['makespan'] for row in rows] == [30.0, 30.0]
+
+
+def test_sweep_cache_tells_dependent_workloads_apart(tmp_path):
+    cache = str(tmp_path / 'cache.db')
+    points = grid(schedulers=['fcfs'], vm_counts=[3], cores=[8], ram=[32])
+    free = [_task(i, 10.0) for i in (1, 2, 3)]
+    assert [row['makespan'] for row in run_sweep(free, points, workers=1, cache=cache)] == [10.0]
+    rows = list(run_sweep(_chain(), points, workers=1, cache=cache))
+    assert rows[0]['cached'] is False
+    assert rows[0]['makespan'] == 30.0
+    assert workload_digest(free) != workload_digest(_chain())
@@ -0,0 +1,71 @@
+"""Engine schedules against hand-worked reference schedules."""
+
+import pytest
+
+from cloudvista.engine import Simulation
+from cloudvista.models import Task, make_vms
+
+
+def make_tasks(spec):
+    # every task takes the VM's two cores, so tasks run one at a time
+    return [Task(id=task_id, name=None, cpu_required=2, ram_required=1,
+                 execution_time=execution_time, priority=priority,
+                 arrival_time=arrival_time, deadline=deadline)
+            for task_id, execution_time, priority, arrival_time, deadline in spec]
+
+
+def schedule(result):
+    return {task.id: (task.start_time, task.end_time) for task in result.completed}
+
+
+# (id, execution_time, priority, arrival_time, deadline)
+STAGGERED = [
+    (1, 4, 5, 0, 100),
+    (2, 3, 1, 1, 9),
+    (3, 1, 3, 1, 50),
+    (4, 2, 9, 2, 20),
+]
+
+# {id: (start_time, end_time)}, worked out by hand with a quantum of 1
+REFERENCE = [
+    ('fcfs', {1: (0, 4), 2: (4, 7), 3: (7, 8), 4: (8, 10)}),
+    ('priority', {1: (0, 4), 4: (4, 6), 3: (6, 7), 2: (7, 10)}),
+    # a slice ending as tasks arrive goes back in the queue ahead of them
+    ('roundrobin', {1: (0, 8), 2: (2, 10), 3: (3, 4), 4: (5, 9)}),
+]
+
+
+@pytest.mark.parametrize('scheduler, expected', REFERENCE, ids=[case[0] for case in REFERENCE])
+def test_matches_reference_schedule(scheduler, expected):
+    result = Simulation(make_vms(1, 2, 8), make_tasks(STAGGERED), scheduler=scheduler,
+                        time_quantum=1).run()
+    assert schedule(result) == expected
+    assert result.unscheduled == []
+    assert result.stats['makespan'] == 10
+
+
+@pytest.mark.parametrize('scheduler, expected', [
+    ('fcfs', {1: (0, 3), 2: (3, 5)}),
+    ('roundrobin', {1: (0, 5), 2: (1, 4)}),
+])
+def test_simultaneous_arrivals(scheduler, expected):
+    tasks = make_tasks([(1, 3, 1, 0, None), (2, 2, 1, 0, None)])
+    result = Simulation(make_vms(1, 2, 8), tasks, scheduler=scheduler, time_quantum=1).run()
+    assert schedule(result) == expected
+
+
+def test_event_log_records_preemptions():
+    tasks = make_tasks([(1, 3, 1, 0, None), (2, 2, 1, 0, None)])
+    result = Simulation(make_vms(1, 2, 8), tasks, scheduler='roundrobin', time_quantum=1,
+                        record_events=True).run()
+    kinds = [(kind, task_id) for _, kind, task_id, _ in result.events if kind != 'arrive']
+    assert kinds[:4] == [('start', 1), ('preempt', 1), ('start', 2), ('preempt', 2)]
+    assert kinds[-1] == ('finish', 1)
+
+
+def test_task_too_large_for_any_vm_is_unscheduled():
+    tasks = make_tasks([(1, 1, 1, 0, None)])
+    tasks.append(Task(id=2, name=None, cpu_required=16, ram_required=1, execution_time=1))
+    result = Simulation(make_vms(1, 2, 8), tasks).run()
+    assert [task.id for task in result.completed] == [1]
+    assert [task.id for task in result.unscheduled] == [2]
@@ -0,0 +1,63 @@
+"""Listing and comparing saved runs through the history endpoints."""
+
+import pytest
+
+
+def save(client, scheduler, waits, cost):
+    # one task per wait, each 10 s long on VM 1
+    tasks = [{'id': i + 1, 'cpu_required': 1, 'ram_required': 1, 'execution_time': 10,
+              'arrival_time': 0, 'start_time': wait, 'end_time': wait + 10, 'vm_id': 1,
+              'cost': cost / len(waits)} for i, wait in enumerate(waits)]
+    response = client.post('/api/simulation/save',
+                           json={'scheduler': scheduler, 'completedTasks': tasks})
+    return response.get_json()['simulation_id']
+
+
+@pytest.fixture(scope='module')
+def saved(client):
+    return [save(client, 'history-a', [0, 10], 4.0),
+            save(client, 'history-b', [0, 0, 30], 9.0),
+            save(client, 'history-a', [6], 1.0)]
+
+
+def test_summaries(client, saved):
+    body = client.get('/api/simulations/%d' % saved[1]).get_json()['simulation']
+    assert (body['scheduler'], body['task_count']) == ('history-b', 3)
+    assert body['avg_wait_time'] == pytest.approx(10.0)
+    assert body['max_wait_time'] == 30
+    assert body['avg_turnaround_time'] == pytest.approx(20.0)
+    assert body['total_cost'] == pytest.approx(9.0)
+    assert body['avg_cost_per_task'] == pytest.approx(3.0)
+    assert body['makespan'] == 40
+    assert client.get('/api/simulations/999999').status_code == 404
+
+
+def test_list_filters_newest_first(client, saved):
+    def ids(query):
+        body = client.get('/api/simulations?' + query).get_json()
+        return [row['id'] for row in body['simulations']]
+
+    assert ids('scheduler=history-a') == [saved[2], saved[0]]
+    assert ids('scheduler=history-a&min_cost=2') == [saved[0]]
+    assert ids('scheduler=history-b&max_cost=5') == []
+    assert saved[1] in ids('since=2000-01-01')
+    assert ids('scheduler=history-a&until=2000-01-01') == []
+    assert client.get('/api/simulations?since=yesterday').status_code == 400
+
+
+def test_list_pages_with_a_cursor(client, saved):
+    first = client.get('/api/simulations?scheduler=history-a&limit=1').get_json()
+    assert [row['id'] for row in first['simulations']] == [saved[2]]
+    second = client.get('/api/simulations?scheduler=history-a&limit=1&before=%d'
+                        % first['next_before']).get_json()
+    assert [row['id'] for row in second['simulations']] == [saved[0]]
+
+
+def test_compare(client, saved):
+    body = client.get('/api/simulations/compare?ids=%d,%d,%d,999999' % tuple(saved)).get_json()
+    assert [row['id'] for row in body['simulations']] == saved
+    assert body['best']['total_cost'] == saved[2]
+    assert body['best']['avg_wait_time'] == saved[0]
+    assert body['best']['makespan'] == saved[2]
+    for query in ('', 'ids=1,x'):
+        assert client.get('/api/simulations/compare?' + query).status_code == 400
@@ -0,0 +1,88 @@
+"""Per-phase instrumentation and the /metrics endpoint."""
+
+import json
+import re
+
+import pytest
+
+from cloudvista.bench import make_workload
+from cloudvista.engine import Simulation
+from cloudvista.instrument import Counter, Histogram, Instrumentation
+from cloudvista.models import make_vms
+
+
+def simulation(**options):
+    tasks = make_workload('pareto', 400, 3, cores=8, ram=32, load=1.2, seed=2)
+    return Simulation(make_vms(3, 8, 32), tasks, scheduler='roundrobin', time_quantum=1,
+                      **options)
+
+
+def test_counter_and_histogram_render():
+    counter = Counter('jobs_total', 'Jobs.', ['kind'])
+    counter.inc(kind='a')
+    counter.inc(2, kind='a"b')
+    assert counter.render() == ['jobs_total{kind="a"} 1', 'jobs_total{kind="a\\"b"} 2']
+    histogram = Histogram('wait_seconds', 'Wait.', [1, 10])
+    for value in (0.5, 1, 3, 50):
+        histogram.observe(value)
+    assert histogram.render() == [
+        'wait_seconds_bucket{le="1.0"} 2', 'wait_seconds_bucket{le="10.0"} 3',
+        'wait_seconds_bucket{le="+Inf"} 4', 'wait_seconds_sum 54.5', 'wait_seconds_count 4']
+
+
+def test_instrumented_run_is_unchanged_and_counted():
+    plain = simulation().run()
+    instrument = Instrumentation(metrics=False)
+    instrumented = simulation(instrument=instrument)
+    result = instrumented.run()
+    assert result.stats == plain.stats
+    counts = instrument.event_counts(instrumented)
+    assert counts == {'arrive': 400, 'finish': 400, 'preempt': plain.stats['preemptions']}
+    summary = result.instrumentation
+    assert set(summary['phases']) == {'advance', 'events', 'dispatch'}
+    assert summary['placement_attempts'] >= 400 + plain.stats['preemptions']
+    assert summary['max_event_queue'] > 0
+    assert instrument.steps == sum(instrument.phases['advance'].counts)
+
+
+def test_trace_file(tmp_path):
+    path = str(tmp_path / 'run.trace.json')
+    instrument = Instrumentation(metrics=False, trace_path=path, trace_limit=10)
+    simulation(instrument=instrument).run()
+    with open(path) as fh:
+        events = json.load(fh)['traceEvents']
+    assert [event['name'] for event in events[:3]] == ['advance', 'events', 'dispatch']
+    assert len(events) == 30
+
+
+def metric(text, name, **labels):
+    wanted = ','.join('%s="%s"' % item for item in sorted(labels.items()))
+    for line in text.splitlines():
+        match = re.match(r'(\w+)(?:\{(.*)\})? (\S+)$', line)
+        if match and match.group(1) == name:
+            got = ','.join(sorted((match.group(2) or '').split(',')))
+            if got == wanted:
+                return float(match.group(3))
+    return 0.0
+
+
+def test_metrics_endpoint_counts_runs(client):
+    before = client.get('/metrics').get_data(as_text=True)
+    tasks = [{'id': i + 1, 'execution_time': 2, 'arrival_time': i} for i in range(5)]
+    body = {'vms': {'count': 1, 'cores': 1, 'ram': 4}, 'tasks': tasks, 'scheduler': 'aging',
+            'instrument': True}
+    assert client.post('/api/simulation/start', json=body).status_code == 200
+    response = client.get('/metrics')
+    assert response.mimetype == 'text/plain'
+    after = response.get_data(as_text=True)
+    assert '# TYPE cloudvista_simulations_total counter' in after
+
+    def delta(name, **labels):
+        return metric(after, name, **labels) - metric(before, name, **labels)
+
+    assert delta('cloudvista_simulations_total', scheduler='aging') == 1
+    assert delta('cloudvista_tasks_completed_total', scheduler='aging') == 5
+    assert delta('cloudvista_events_total', scheduler='aging', kind='arrive') == 5
+    assert delta('cloudvista_events_total', scheduler='aging', kind='finish') == 5
+    assert delta('cloudvista_placement_attempts_total', scheduler='aging', result='placed') == 5
+    assert delta('cloudvista_simulation_seconds_count', scheduler='aging') == 1
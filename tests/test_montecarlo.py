@@ -0,0 +1,107 @@
+"""t quantiles, confidence intervals and replication."""
+
+import math
+import statistics
+
+import numpy as np
+import pytest
+
+from cloudvista.bench import make_workload
+from cloudvista.models import make_vms
+from cloudvista.montecarlo import make_distribution, run_monte_carlo, summarize, t_quantile
+
+# two-sided critical values from a printed t table
+T_TABLE = [
+    (0.975, 1, 12.706),
+    (0.975, 2, 4.303),
+    (0.975, 3, 3.182),
+    (0.975, 5, 2.571),
+    (0.975, 10, 2.228),
+    (0.975, 30, 2.042),
+    (0.95, 4, 2.132),
+    (0.95, 20, 1.725),
+    (0.995, 9, 3.250),
+    (0.995, 60, 2.660),
+]
+
+
+@pytest.mark.parametrize('p, df, expected', T_TABLE)
+def test_t_quantile_matches_table(p, df, expected):
+    assert t_quantile(p, df) == pytest.approx(expected, abs=0.01)
+    assert t_quantile(1 - p, df) == pytest.approx(-expected, abs=0.01)
+
+
+def test_t_quantile_tends_to_normal():
+    assert t_quantile(0.975, 10000) == pytest.approx(1.960, abs=0.001)
+    assert t_quantile(0.5, 7) == 0
+
+
+def test_t_quantile_needs_a_degree_of_freedom():
+    with pytest.raises(ValueError):
+        t_quantile(0.975, 0)
+
+
+def test_summarize_interval():
+    values = [1.0, 2.0, 3.0, 4.0, 5.0]
+    summary = summarize([{'avg_wait_time': v} for v in values])['avg_wait_time']
+    half = 2.776 * statistics.stdev(values) / math.sqrt(5)
+    assert summary['mean'] == 3.0
+    assert summary['stddev'] == pytest.approx(statistics.stdev(values))
+    assert summary['half_width'] == pytest.approx(half, rel=1e-3)
+    assert (summary['ci_low'], summary['ci_high']) == pytest.approx((3 - half, 3 + half), rel=1e-3)
+    assert (summary['min'], summary['max']) == (1.0, 5.0)
+
+
+def test_summarize_single_row_has_no_interval():
+    summary = summarize([{'avg_wait_time': 4.0}])['avg_wait_time']
+    assert summary['half_width'] is None and summary['ci_low'] is None
+
+
+@pytest.mark.parametrize('confidence', [0.9, 0.95])
+def test_interval_coverage(confidence):
+    # small samples are where the t interval differs from the normal one
+    rng = np.random.default_rng(5)
+    trials = 2000
+    covered = 0
+    for _ in range(trials):
+        rows = [{'avg_wait_time': v} for v in rng.normal(10.0, 3.0, size=6)]
+        summary = summarize(rows, confidence)['avg_wait_time']
+        covered += summary['ci_low'] <= 10.0 <= summary['ci_high']
+    assert covered / trials == pytest.approx(confidence, abs=0.02)
+
+
+def test_interval_narrows_with_replications():
+    rng = np.random.default_rng(8)
+    widths = [summarize([{'avg_wait_time': v} for v in rng.normal(0, 1, size=n)])
+              ['avg_wait_time']['half_width'] for n in (10, 40, 160)]
+    assert widths[0] > widths[1] > widths[2]
+    # about 1/sqrt(n): a quarter of the replications' width each time around
+    assert widths[2] == pytest.approx(widths[0] / 4, rel=0.35)
+
+
+def _report(**options):
+    tasks = make_workload('pareto', 150, 2, cores=8, ram=32, load=1.0, seed=4)
+    return run_monte_carlo(tasks, make_vms(2, 8, 32), **options)
+
+
+def test_fixed_distributions_repeat_the_workload():
+    report = _report(replications=3, workers=1)
+    rows = [{k: v for k, v in row.items() if k != 'replication'} for row in report['runs']]
+    assert rows[0] == rows[1] == rows[2]
+    assert report['metrics']['avg_wait_time']['half_width'] == 0
+
+
+def test_results_do_not_depend_on_workers():
+    options = dict(replications=4, durations={'kind': 'lognormal', 'sigma': 0.4},
+                   arrivals='exponential', seed=11)
+    serial = _report(workers=1, **options)
+    pooled = _report(workers=2, **options)
+    assert serial['runs'] == pooled['runs']
+    assert len({row['avg_wait_time'] for row in serial['runs']}) == 4
+
+
+@pytest.mark.parametrize('spec', ['normal', {'kind': 'lognormal', 'sigma': -1},
+                                  {'kind': 'fixed', 'scale': 2}])
+def test_invalid_distributions(spec):
+    with pytest.raises(ValueError):
+        make_distribution(spec)
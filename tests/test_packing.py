@@ -0,0 +1,70 @@
+"""Several tasks per VM, and batch packing of simultaneous arrivals."""
+
+import numpy as np
+import pytest
+
+from cloudvista.bench import make_workload
+from cloudvista.engine import Simulation
+from cloudvista.models import Task, make_vms
+from cloudvista.packing import pack_batch
+from cloudvista.service import WorkloadError, parse_tasks
+
+
+@pytest.mark.parametrize('policy, expected, cores_left', [
+    # the 4-core task is packed first, then the three 2-core tasks
+    ('firstfit', [1, 1, 1, 0], [0, 2, 2]),
+    ('bestfit', [2, 1, 1, 0], [0, 4, 0]),
+    ('worstfit', [0, 0, 1, 1], [0, 2, 2]),
+])
+def test_pack_batch(policy, expected, cores_left):
+    free_cores, free_ram = np.array([4, 8, 2]), np.array([16, 16, 16])
+    assignment = pack_batch(free_cores, free_ram, [2, 2, 2, 4], [1, 1, 1, 1], policy)
+    assert assignment.tolist() == expected
+    assert free_cores.tolist() == cores_left
+
+
+def test_pack_batch_leaves_unplaceable_tasks():
+    free_cores, free_ram = np.array([4]), np.array([4])
+    assignment = pack_batch(free_cores, free_ram, [2, 2, 2], [1, 1, 1])
+    assert assignment.tolist() == [0, 0, -1]
+    assert pack_batch(np.array([4]), np.array([4]), [1], [8]).tolist() == [-1]
+
+
+def test_vm_runs_tasks_side_by_side():
+    tasks = [Task(id=i, name=None, cpu_required=1, ram_required=2, execution_time=5)
+             for i in range(1, 5)]
+    result = Simulation(make_vms(1, 4, 8), tasks).run()
+    assert {task.start_time for task in result.completed} == {0}
+    assert result.stats['makespan'] == 5
+
+
+@pytest.mark.parametrize('policy', ['firstfit', 'bestfit', 'worstfit'])
+def test_batch_packing_never_oversubscribes(policy):
+    tasks = make_workload('bursty', 600, 4, cores=8, ram=32, load=1.3, seed=11)
+    simulation = Simulation(make_vms(4, 8, 32), list(tasks.iter_tasks()), placement=policy,
+                            batch_packing=True, record_events=True)
+    result = simulation.run()
+    assert len(result.completed) == 600
+    in_use = {vm.id: [0, 0] for vm in simulation.vms}
+    sizes = {task.id: (task.cpu_required, task.ram_required) for task in result.completed}
+    for _, kind, task_id, vm_id in sorted(result.events, key=lambda e: (e[0], e[1] != 'finish')):
+        if kind in ('start', 'finish'):
+            sign = 1 if kind == 'start' else -1
+            in_use[vm_id][0] += sign * sizes[task_id][0]
+            in_use[vm_id][1] += sign * sizes[task_id][1]
+            assert in_use[vm_id][0] <= 8 and in_use[vm_id][1] <= 32
+
+
+def test_parse_tasks_keeps_id_zero_and_numbers_on():
+    tasks = parse_tasks([{'id': 0}, {}, {'id': 5}, {}])
+    assert [task.id for task in tasks] == [0, 6, 5, 7]
+    assert [task.id for task in parse_tasks([{}], taken=[3])] == [4]
+
+
+@pytest.mark.parametrize('items, taken', [
+    ([{'id': 1}, {'id': 1}], ()),
+    ([{'id': 2}], [2]),
+])
+def test_parse_tasks_rejects_duplicate_ids(items, taken):
+    with pytest.raises(WorkloadError, match='duplicate task id'):
+        parse_tasks(items, taken=taken)
@@ -0,0 +1,96 @@
+"""Placement indexes against a linear scan of the fleet."""
+
+import random
+
+import pytest
+
+from cloudvista.engine import Simulation
+from cloudvista.models import VM, Task, make_vms
+from cloudvista.placement import BEST_FIT, FIRST_FIT, POLICIES, WORST_FIT, make_index
+
+
+def linear_scan(policy, vms, cpu, ram):
+    fits = [vm for vm in vms if vm.available_cores >= cpu and vm.available_ram >= ram]
+    if not fits:
+        return None
+    if policy == FIRST_FIT:
+        return fits[0]
+    if policy == BEST_FIT:
+        return min(fits, key=lambda vm: (vm.available_cores, vm.available_ram))
+    return min(fits, key=lambda vm: (-vm.available_cores, -vm.available_ram))
+
+
+def fleet():
+    # free (cores, ram): (2, 8), (8, 4), (4, 16), (4, 6), (8, 32)
+    sizes = [(2, 8), (8, 4), (4, 16), (4, 6), (8, 32)]
+    return [VM(id=i + 1, total_cores=cores, total_ram=ram)
+            for i, (cores, ram) in enumerate(sizes)]
+
+
+@pytest.mark.parametrize('policy, request_, expected', [
+    (FIRST_FIT, (2, 6), 1),
+    (FIRST_FIT, (4, 8), 3),
+    (BEST_FIT, (2, 6), 1),
+    (BEST_FIT, (3, 6), 4),
+    (BEST_FIT, (4, 10), 3),
+    (WORST_FIT, (1, 1), 5),
+    (WORST_FIT, (4, 10), 5),
+    (WORST_FIT, (1, 20), 5),
+    (BEST_FIT, (9, 1), None),
+    (WORST_FIT, (1, 40), None),
+])
+def test_find(policy, request_, expected):
+    vm = make_index(policy, fleet()).find(*request_)
+    assert (vm.id if vm else None) == expected
+
+
+def test_worst_fit_prefers_more_ram_among_equal_cores():
+    vms = fleet()
+    index = make_index(WORST_FIT, vms)
+    vms[4].available_ram = 2
+    index.update(vms[4])
+    assert index.find(1, 1).id == 2
+
+
+@pytest.mark.parametrize('policy', POLICIES)
+def test_matches_linear_scan_through_updates(policy):
+    rng = random.Random(7)
+    vms = make_vms(12, 16, 64)
+    index = make_index(policy, vms)
+    removed = set()
+    for step in range(2000):
+        vm = rng.choice(vms)
+        action = rng.random()
+        if action < 0.1:
+            index.remove(vm)
+            removed.add(vm.id)
+        else:
+            vm.available_cores = rng.randint(0, vm.total_cores)
+            vm.available_ram = rng.randint(0, vm.total_ram)
+            index.update(vm)
+            removed.discard(vm.id)
+        if step == 1000:
+            extra = VM(id=len(vms) + 1, total_cores=32, total_ram=128)
+            vms.append(extra)
+            index.add(extra)
+        cpu, ram = rng.randint(1, 16), rng.randint(1, 64)
+        offered = [vm for vm in vms if vm.id not in removed]
+        expected = linear_scan(policy, offered, cpu, ram)
+        found = index.find(cpu, ram)
+        assert (found and found.id) == (expected and expected.id)
+
+
+def test_unknown_policy():
+    with pytest.raises(ValueError):
+        make_index('nextfit', fleet())
+
+
+@pytest.mark.parametrize('policy, vm_ids', [
+    (FIRST_FIT, [1, 1, 2]),
+    (WORST_FIT, [1, 2, 1]),
+])
+def test_engine_places_with_the_chosen_policy(policy, vm_ids):
+    tasks = [Task(id=i + 1, name=None, cpu_required=2, ram_required=2, execution_time=10)
+             for i in range(3)]
+    result = Simulation(make_vms(2, 4, 8), tasks, placement=policy).run()
+    assert [task.vm_id for task in sorted(result.completed, key=lambda t: t.id)] == vm_ids
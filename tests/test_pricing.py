@@ -0,0 +1,95 @@
+"""Pricing models on a small hand-priced run."""
+
+import numpy as np
+import pytest
+
+from cloudvista.bench import make_workload
+from cloudvista.engine import Simulation
+from cloudvista.models import make_vms
+from cloudvista.pricing import (FlatPricing, ReservedPricing, SpotPricing, TieredPricing,
+                                Usage, make_pricing, reprice)
+
+HOUR = 3600.0
+
+
+@pytest.fixture
+def usage():
+    # three tasks on two 4-core/8 GB VMs over three hours:
+    # 2 cores/4 GB for 1 h on VM 1, 1 core/2 GB for 0.5 h on VM 2,
+    # then 2 cores/2 GB for 2 h on VM 1
+    return Usage.from_columns(cpu=[2, 1, 2], ram=[4, 2, 2],
+                              execution_time=[HOUR, HOUR / 2, 2 * HOUR],
+                              start=[0, 0, HOUR], end=[HOUR, HOUR / 2, 3 * HOUR],
+                              vm_ids=[1, 2, 1], vms=make_vms(2, 4, 8))
+
+
+def costs(model, usage):
+    return model.task_costs(usage).tolist()
+
+
+def test_flat(usage):
+    # 4 per core-hour, 0.8 per GB-hour
+    assert costs(FlatPricing(), usage) == pytest.approx([11.2, 2.8, 19.2])
+
+
+def test_spot_discount(usage):
+    assert costs(SpotPricing(discount=0.6), usage) == pytest.approx([4.48, 1.12, 7.68])
+
+
+def test_spot_trace_is_averaged_over_each_run(usage):
+    model = SpotPricing(price_times=[0, HOUR / 2], multipliers=[1.0, 0.5])
+    # the first task runs half its hour at each price
+    assert costs(model, usage) == pytest.approx([11.2 * 0.75, 2.8, 19.2 * 0.5])
+
+
+def test_tiered_accrues_in_completion_order(usage):
+    model = TieredPricing(cpu_tiers=[(0, 4.0), (4, 2.0)], ram_tiers=[(0, 0.8)])
+    # core-hours accrue 0.5 (task 2), 2 (task 1), then 4 (task 3), which
+    # crosses the 4 core-hour tier: 1.5 at 4 plus 2.5 at 2
+    assert costs(model, usage) == pytest.approx([8 + 3.2, 2 + 0.8, 6 + 5 + 3.2])
+
+
+def test_reserved_commits_the_first_vms(usage):
+    model = ReservedPricing(reserved_vms=1, storage_rate=0)
+    bill = model.bill(usage)
+    # tasks on VM 1 pay the reserved rates (60% of on demand)
+    assert bill.task_costs.tolist() == pytest.approx([6.72, 2.8, 11.52])
+    # VM 1 is billed its whole capacity for the whole run, busy or not
+    assert bill.compute_costs.tolist() == pytest.approx([(4 * 2.4 + 8 * 0.48) * 3, 2.8])
+    assert bill.total == pytest.approx(40.32 + 2.8)
+
+
+def test_storage_is_prorated_over_uptime(usage):
+    bill = FlatPricing(storage_rate=8.0).bill(usage)
+    # 100 GB at 8 per GB-month for 3 of 730 hours, on each VM
+    assert bill.storage_costs.tolist() == pytest.approx([100 * 8 * 3 / 730.0] * 2)
+    assert bill.to_dict()['vm_costs'][1] == pytest.approx(11.2 + 19.2 + 100 * 8 * 3 / 730.0)
+
+
+def test_billing_increment_and_minimum():
+    usage = Usage.from_columns(cpu=[1, 1], ram=[0, 0], execution_time=[3600.2, 10],
+                               start=[0, 0], end=[3600.2, 10], vm_ids=[1, 1],
+                               vms=make_vms(1, 4, 8))
+    model = FlatPricing(cpu_rate=3600.0, increment_seconds=60, minimum_seconds=60)
+    assert costs(model, usage) == pytest.approx([3660, 60])
+
+
+def test_flat_matches_engine_costs():
+    vms = make_vms(3, 8, 32)
+    tasks = make_workload('uniform', 300, 3, cores=8, ram=32, seed=2)
+    result = Simulation(vms, tasks).run()
+    bill, = reprice(Usage.from_result(result, vms), [{'model': 'flat', 'increment_seconds': 0}])
+    assert bill.task_costs.sum() == pytest.approx(result.stats['total_cost'])
+    assert np.array_equal(bill.vm_ids, [1, 2, 3])
+
+
+@pytest.mark.parametrize('spec', [
+    {'model': 'auction'},
+    {'model': 'spot', 'discount': 1.5},
+    {'model': 'spot', 'price_times': [0, 10]},
+    {'model': 'tiered', 'cpu_tiers': [[5, 1.0]]},
+    {'model': 'flat', 'surge': 2},
+])
+def test_invalid_specs(spec):
+    with pytest.raises(ValueError):
+        make_pricing(spec)
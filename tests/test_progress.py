@@ -0,0 +1,121 @@
+"""LTTB downsampling and live progress streamed as Server-Sent Events."""
+
+import json
+import random
+
+import numpy as np
+import pytest
+
+from cloudvista.bench import make_workload
+from cloudvista.engine import Simulation
+from cloudvista.models import make_vms
+from cloudvista.progress import LiveRun, format_event, lttb
+
+
+def reference_lttb(x, y, threshold):
+    """Textbook LTTB, one bucket at a time."""
+    n = len(x)
+    every = (n - 2) / (threshold - 2)
+    picked, a = [0], 0
+    for i in range(threshold - 2):
+        start = int(i * every) + 1
+        end = int((i + 1) * every) + 1
+        after = min(int((i + 2) * every) + 1, n)
+        if i == threshold - 3:
+            end, after = n - 1, n
+        avg_x = sum(x[end:after]) / (after - end)
+        avg_y = sum(y[end:after]) / (after - end)
+        areas = [abs((x[a] - avg_x) * (y[j] - y[a]) - (x[a] - x[j]) * (avg_y - y[a]))
+                 for j in range(start, end)]
+        a = start + areas.index(max(areas))
+        picked.append(a)
+    return picked + [n - 1]
+
+
+@pytest.mark.parametrize('n, threshold', [(1000, 50), (101, 10), (5000, 3), (37, 36)])
+def test_lttb_matches_reference(n, threshold):
+    rng = random.Random(n)
+    x = sorted(rng.uniform(0, 100) for _ in range(n))
+    y = [rng.gauss(0, 1) for _ in range(n)]
+    assert lttb(x, y, threshold).tolist() == reference_lttb(x, y, threshold)
+
+
+def test_lttb_keeps_spikes_and_short_series():
+    x = list(range(1000))
+    y = [0.0] * 1000
+    y[613] = 50.0
+    picked = lttb(x, y, 20).tolist()
+    assert len(picked) == 20 and picked[0] == 0 and picked[-1] == 999
+    assert 613 in picked
+    assert lttb(x[:10], y[:10], 20).tolist() == list(range(10))
+    assert lttb(x, y, 2).tolist() == [0, 999]
+
+
+def test_format_event():
+    assert format_event({'a': 1}, 'frame', 7) == 'id: 7\nevent: frame\ndata: {"a":1}\n\n'
+    assert format_event({'a': [1, 2]}) == 'data: {"a":[1,2]}\n\n'
+
+
+def simulation():
+    tasks = list(make_workload('uniform', 3000, 4, cores=8, ram=32, seed=8).iter_tasks())
+    return Simulation(make_vms(4, 8, 32), tasks, scheduler='roundrobin', time_quantum=0.5)
+
+
+def test_frames_add_up_to_the_run():
+    run = LiveRun(simulation(), total=3000, fps=1000, max_points=40).start()
+    frames = [frame for frame in run.frames(keepalive=5) if frame is not None]
+    assert [frame['seq'] for frame in frames] == list(range(1, len(frames) + 1))
+    last = frames[-1]
+    assert last['done'] and last['error'] is None
+    assert sum(frame['new_completions'] for frame in frames) == 3000
+    assert last['stats']['completed_tasks'] == 3000
+    assert all(len(frame['utilization']) <= 40 and len(frame['completions']) <= 40
+               for frame in frames)
+    times = [point[0] for frame in frames for point in frame['utilization']]
+    assert times == sorted(times)
+    assert run.result.stats == simulation().run().stats
+
+
+def test_late_client_gets_a_snapshot():
+    run = LiveRun(simulation(), fps=1000, backlog=2).start()
+    list(run.frames(keepalive=5))
+    frames = list(run.frames(after=0, keepalive=5))
+    assert frames[0]['event'] == 'snapshot'
+    assert frames[0]['done'] is True
+    assert len(frames[0]['utilization']) <= run.history_points
+    assert frames[-1]['done'] is True
+
+
+def events(text):
+    parsed = []
+    for block in text.strip().split('\n\n'):
+        fields = dict(line.split(': ', 1) for line in block.split('\n') if ': ' in line)
+        if 'data' in fields:
+            parsed.append((int(fields['id']), fields['event'], json.loads(fields['data'])))
+    return parsed
+
+
+def test_sse_endpoint(client):
+    tasks = [{'id': i + 1, 'cpu_required': 1, 'ram_required': 1, 'execution_time': 1 + i % 5,
+              'arrival_time': i * 0.1} for i in range(400)]
+    response = client.post('/api/simulation/live', json={
+        'vms': {'count': 2, 'cores': 4, 'ram': 8}, 'tasks': tasks, 'fps': 1000,
+        'checkpoint_interval': 0})
+    assert response.status_code == 202
+    url = response.get_json()['run']['events_url']
+
+    stream = client.get(url)
+    assert stream.mimetype == 'text/event-stream'
+    text = stream.get_data(as_text=True)
+    assert text.startswith('retry: 2000\n\n')
+    frames = events(text)
+    assert frames[-1][1] == 'frame' and frames[-1][2]['done'] is True
+    assert frames[-1][2]['stats']['completed_tasks'] == 400
+    assert sum(frame['new_completions'] for _, _, frame in frames) == 400
+
+    # resuming after the last id only yields what is still to come: nothing
+    last_id = frames[-1][0]
+    again = client.get(url, headers={'Last-Event-ID': str(last_id)})
+    assert events(again.get_data(as_text=True)) == []
+    assert client.get(url, headers={'Last-Event-ID': 'soon'}).status_code == 400
+    assert client.get('/api/simulation/live/nope/events').status_code == 404
@@ -0,0 +1,120 @@
+"""Dispatcher routing and multi-region runs."""
+
+import pytest
+
+from cloudvista.bench import make_workload
+from cloudvista.engine import Simulation
+from cloudvista.models import Task, make_vms
+from cloudvista.regions import make_dispatcher, make_region, run_regions
+from cloudvista.taskstore import TaskTable
+
+
+def _task(task_id, cpu=2, ram=4, arrival_time=0.0, execution_time=5.0, **fields):
+    return Task(id=task_id, name='Task-%d' % task_id, cpu_required=cpu, ram_required=ram,
+                execution_time=execution_time, priority=1, arrival_time=arrival_time,
+                **fields)
+
+
+def _region(name, count=2, cores=4, ram=16, **options):
+    return make_region(dict({'name': name, 'vms': {'count': count, 'cores': cores, 'ram': ram}},
+                            **options))
+
+
+def _routed(result):
+    return {region.name: region.routed for region in result.regions}
+
+
+def _rows(table):
+    data = table.data
+    return sorted(zip(data['id'].tolist(), data['start_time'].tolist(),
+                      data['end_time'].tolist(), data['vm'].tolist()))
+
+
+@pytest.mark.parametrize('scheduler', ['fcfs', 'sjf', 'roundrobin'])
+def test_single_region_matches_plain_run(scheduler):
+    workload = make_workload('bursty', 500, 4, cores=8, ram=32, load=1.1, seed=6)
+    plain = Simulation(make_vms(4, 8, 32), workload.copy(), scheduler=scheduler,
+                       time_quantum=1.5).run()
+    region = _region('only', count=4, cores=8, ram=32, scheduler=scheduler, time_quantum=1.5)
+    result = run_regions(workload, [region], window=7.0, workers=1)
+    assert _rows(result.regions[0].table) == _rows(plain.table)
+    for name in ('completed_tasks', 'avg_wait_time', 'p95_wait_time', 'makespan',
+                 'total_cost', 'cpu_utilization'):
+        assert result.stats[name] == pytest.approx(plain.stats[name], rel=1e-9)
+
+
+def test_nearest_adds_latency_to_arrival():
+    tasks = [_task(i, arrival_time=float(i)) for i in range(1, 5)]
+    result = run_regions(tasks, [_region('far', latency=0.5), _region('near', latency=0.25)],
+                         dispatcher='nearest', workers=1)
+    assert _routed(result) == {'far': 0, 'near': 4}
+    near = result.regions[1].table
+    assert near.column('arrival_time').tolist() == [1.25, 2.25, 3.25, 4.25]
+    assert result.stats['avg_transfer_time'] == 0.25
+
+
+def test_cheapest_prices_cores_and_ram():
+    regions = [_region('cpu-cheap', cpu_cost=1.0, ram_cost=1.0, latency=0.1),
+               _region('ram-cheap', cpu_cost=3.0, ram_cost=0.1),
+               _region('tied', cpu_cost=1.0, ram_cost=1.0, latency=0.2)]
+    tasks = [_task(1, cpu=1, ram=1),    # 2.0 vs 3.1: cores dominate
+             _task(2, cpu=1, ram=12)]   # 13.0 vs 4.2: RAM dominates
+    result = run_regions(tasks, regions, dispatcher='cheapest', workers=1)
+    # cpu-cheap and tied cost the same; the nearer one wins
+    assert _routed(result) == {'cpu-cheap': 1, 'ram-cheap': 1, 'tied': 0}
+
+
+def test_roundrobin_skips_regions_a_task_does_not_fit():
+    regions = [_region('a'), _region('b', cores=16, ram=64), _region('c')]
+    tasks = [_task(1), _task(2), _task(3, cpu=8), _task(4), _task(5)]
+    result = run_regions(tasks, regions, dispatcher='roundrobin', workers=1)
+    by_region = {region.name: sorted(region.table.column('id').tolist())
+                 for region in result.regions}
+    # 1 -> a, 2 -> b, 3 fits only b (and the turn moves past b), 4 -> c, 5 -> a
+    assert by_region == {'a': [1, 5], 'b': [2, 3], 'c': [4]}
+
+
+def test_least_loaded_spreads_work_and_weighs_latency():
+    tasks = [_task(i, execution_time=10.0) for i in range(1, 9)]
+    even = run_regions(tasks, [_region('a'), _region('b')], workers=1)
+    assert _routed(even) == {'a': 4, 'b': 4}
+    # a region 100 s away only gets work once the near one is that busy
+    skewed = run_regions(tasks, [_region('a'), _region('b', latency=100.0)], workers=1)
+    assert _routed(skewed) == {'a': 8, 'b': 0}
+
+
+def test_tasks_that_fit_nowhere_are_unroutable():
+    tasks = [_task(1), _task(2, cpu=32)]
+    result = run_regions(tasks, [_region('a'), _region('b')], workers=1)
+    assert result.unroutable.column('id').tolist() == [2]
+    assert result.stats['unroutable_tasks'] == 1
+    assert result.stats['completed_tasks'] == 1
+
+
+def test_workers_do_not_change_the_result():
+    workload = make_workload('pareto', 400, 4, cores=8, ram=32, load=1.0, seed=9)
+    regions = [_region('a', count=2, cores=8, ram=32),
+               _region('b', count=2, cores=8, ram=32, latency=0.3, scheduler='sjf')]
+    serial = run_regions(workload, regions, window=3.0, workers=1)
+    pooled = run_regions(workload, regions, window=3.0, workers=2)
+    assert serial.stats == pooled.stats
+    assert [_rows(r.table) for r in serial.regions] == [_rows(r.table) for r in pooled.regions]
+
+
+def test_dependencies_are_rejected():
+    tasks = [_task(1), _task(2, dependencies=[1])]
+    with pytest.raises(ValueError, match='dependencies'):
+        run_regions(tasks, [_region('a')], workers=1)
+
+
+@pytest.mark.parametrize('call', [
+    lambda: make_dispatcher('random'),
+    lambda: make_region({'vms': {'count': 1}}),
+    lambda: make_region({'name': 'a', 'latency': -1}),
+    lambda: make_region({'name': 'a', 'speed': 2}),
+    lambda: run_regions(TaskTable(), [_region('a'), _region('a')]),
+    lambda: run_regions(TaskTable(), [_region('a')], window=0),
+])
+def test_invalid_setups(call):
+    with pytest.raises(ValueError):
+        call()
@@ -0,0 +1,104 @@
+"""Report generation from results and saved runs."""
+
+import csv
+import importlib.util
+import io
+
+import pytest
+
+from cloudvista.bench import make_workload
+from cloudvista.engine import Simulation
+from cloudvista.models import make_vms
+from cloudvista.reports import DONE, ReportError, ReportJobs, ReportSource, generate, write_csv
+from cloudvista.storage import SimulationStore
+
+HAVE_PYARROW = importlib.util.find_spec('pyarrow') is not None
+
+
+@pytest.fixture(scope='module')
+def result():
+    tasks = make_workload('uniform', 500, 3, cores=8, ram=32, seed=6)
+    return Simulation(make_vms(3, 8, 32), tasks).run()
+
+
+def read_csv(path):
+    with open(path, newline='') as fh:
+        return list(csv.DictReader(fh))
+
+
+def test_csv_names_default_tasks(result, tmp_path):
+    path = str(tmp_path / 'report.csv')
+    count = write_csv(ReportSource.from_result(result), path)
+    rows = read_csv(path)
+    assert count == len(rows) == 500
+    assert all(row['name'] == 'Task-%s' % row['id'] for row in rows)
+
+
+def test_csv_from_store_matches_result(result, tmp_path):
+    store = SimulationStore(str(tmp_path / 'cloudvista.db'))
+    simulation_id = store.save_result(result)
+    stored, direct = str(tmp_path / 'stored.csv'), str(tmp_path / 'direct.csv')
+    write_csv(ReportSource.from_store(store, simulation_id), stored)
+    write_csv(ReportSource.from_result(result), direct)
+    assert read_csv(stored) == read_csv(direct)
+    with pytest.raises(ReportError, match='not found'):
+        ReportSource.from_store(store, simulation_id + 1)
+
+
+def test_pdf_paginates_every_task(result, tmp_path):
+    path = str(tmp_path / 'report.pdf')
+    assert generate(ReportSource.from_result(result), 'pdf', path) == 500
+    with open(path, 'rb') as fh:
+        data = fh.read()
+    assert data.startswith(b'%PDF')
+    # summary and charts, then 500 task rows at roughly 65 a page
+    assert data.count(b'/Type /Page\n') >= 9
+
+
+def test_jobs_run_in_the_background(result, tmp_path):
+    jobs = ReportJobs(str(tmp_path / 'reports'))
+    job = jobs.submit(ReportSource.from_result(result), 'csv')
+    assert job['status'] in ('queued', 'running', 'done')
+    job = jobs.wait(job['id'], timeout=30)
+    assert job['status'] == DONE and job['rows'] == 500
+    assert len(read_csv(job['path'])) == 500
+    with pytest.raises(ReportError, match='unknown report format'):
+        jobs.submit(ReportSource.from_result(result), 'xlsx')
+
+
+@pytest.mark.skipif(HAVE_PYARROW, reason='pyarrow is installed')
+def test_parquet_without_pyarrow_is_rejected_up_front(result, tmp_path):
+    jobs = ReportJobs(str(tmp_path / 'reports'))
+    with pytest.raises(ReportError, match='pip install pyarrow'):
+        jobs.submit(ReportSource.from_result(result), 'parquet')
+
+
+@pytest.mark.skipif(not HAVE_PYARROW, reason='needs pyarrow')
+def test_parquet(result, tmp_path):
+    import pyarrow.parquet as pq
+    path = str(tmp_path / 'report.parquet')
+    assert generate(ReportSource.from_result(result), 'parquet', path) == 500
+    table = pq.read_table(path)
+    assert table.num_rows == 500
+    assert table.column('name')[0].as_py().startswith('Task-')
+
+
+def test_generate_endpoint(client):
+    tasks = [{'id': 1, 'cpu_required': 1, 'ram_required': 1, 'execution_time': 2,
+              'start_time': 0, 'end_time': 2, 'vm_id': 1}]
+    saved = client.post('/api/simulation/save', json={'scheduler': 'fcfs', 'completedTasks': tasks})
+    simulation_id = saved.get_json()['simulation_id']
+    response = client.post('/api/report/generate',
+                           json={'simulation_id': simulation_id, 'format': 'csv', 'wait': True})
+    assert response.status_code == 200
+    rows = list(csv.DictReader(io.StringIO(response.get_data(as_text=True))))
+    assert [(row['id'], row['name']) for row in rows] == [('1', 'Task-1')]
+
+    response = client.post('/api/report/generate', json={'simulation_id': simulation_id,
+                                                         'format': 'xlsx'})
+    assert response.status_code == 400
+    if not HAVE_PYARROW:
+        response = client.post('/api/report/generate',
+                               json={'simulation_id': simulation_id, 'format': 'parquet'})
+        assert response.status_code == 400
+        assert 'pyarrow' in response.get_json()['message']
@@ -0,0 +1,38 @@
+"""Round Robin slicing with exact time accounting."""
+
+import pytest
+
+from cloudvista.engine import Simulation
+from cloudvista.models import Task, make_vms
+
+
+def one_core_task(task_id, execution_time, arrival_time=0.0):
+    return Task(id=task_id, name=None, cpu_required=1, ram_required=1,
+                execution_time=execution_time, arrival_time=arrival_time)
+
+
+def test_decimal_quanta_do_not_drift():
+    result = Simulation(make_vms(1, 1, 4), [one_core_task(1, 0.3)], scheduler='roundrobin',
+                        time_quantum=0.1).run()
+    task, = result.completed
+    assert task.end_time == 0.3
+    assert result.stats['preemptions'] == 2
+
+
+def test_long_run_of_small_slices_ends_exactly():
+    tasks = [one_core_task(1, 100.0), one_core_task(2, 0.7)]
+    result = Simulation(make_vms(1, 1, 4), tasks, scheduler='roundrobin',
+                        time_quantum=0.1).run()
+    ends = {task.id: task.end_time for task in result.completed}
+    # task 2 shares the core slice for slice until it is done
+    assert ends == {2: 1.4, 1: 100.7}
+
+
+@pytest.mark.parametrize('switch', [0.0, 0.5])
+def test_context_switch_occupies_the_vm(switch):
+    tasks = [one_core_task(1, 2.0), one_core_task(2, 2.0)]
+    result = Simulation(make_vms(1, 1, 4), tasks, scheduler='roundrobin', time_quantum=1,
+                        context_switch=switch).run()
+    # four slices, each preceded by a switch
+    assert result.stats['makespan'] == pytest.approx(4 + 4 * switch)
+    assert result.stats['context_switch_time'] == pytest.approx(4 * switch)
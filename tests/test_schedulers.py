@@ -0,0 +1,102 @@
+"""SJF, SRTF, EDF, aging priority and MLFQ against hand-worked schedules."""
+
+import pytest
+
+from cloudvista.bench import make_workload
+from cloudvista.engine import Simulation
+from cloudvista.models import make_vms
+from cloudvista.schedulers import SCHEDULERS, make_scheduler
+from cloudvista.storage import result_rows
+from test_engine import STAGGERED, make_tasks, schedule
+
+# {id: (start_time, end_time)} for the engine tests' staggered workload,
+# worked out by hand with a quantum of 1
+REFERENCE = [
+    ('sjf', {}, {1: (0, 4), 3: (4, 5), 4: (5, 7), 2: (7, 10)}),
+    ('edf', {}, {1: (0, 4), 2: (4, 7), 4: (7, 9), 3: (9, 10)}),
+    # a high aging rate turns priority into arrival order, priority breaking ties
+    ('aging', {'aging_rate': 100}, {1: (0, 4), 3: (4, 5), 2: (5, 8), 4: (8, 10)}),
+    ('srtf', {}, {1: (0, 7), 3: (1, 2), 4: (2, 4), 2: (7, 10)}),
+    # quanta of 1, 2, 4, ... by level
+    ('mlfq', {}, {1: (0, 10), 2: (1, 8), 3: (2, 3), 4: (3, 9)}),
+]
+
+
+@pytest.mark.parametrize('scheduler, options, expected', REFERENCE,
+                         ids=[case[0] for case in REFERENCE])
+def test_matches_reference_schedule(scheduler, options, expected):
+    result = Simulation(make_vms(1, 2, 8), make_tasks(STAGGERED), scheduler=scheduler,
+                        time_quantum=1, scheduler_options=options).run()
+    assert schedule(result) == expected
+    assert result.stats['makespan'] == 10
+
+
+@pytest.mark.parametrize('scheduler, expected', [
+    ('sjf', {2: (0, 2), 1: (2, 5)}),
+    ('srtf', {2: (0, 2), 1: (2, 5)}),
+    ('mlfq', {1: (0, 4), 2: (1, 5)}),
+])
+def test_simultaneous_arrivals(scheduler, expected):
+    tasks = make_tasks([(1, 3, 1, 0, None), (2, 2, 1, 0, None)])
+    result = Simulation(make_vms(1, 2, 8), tasks, scheduler=scheduler, time_quantum=1).run()
+    assert schedule(result) == expected
+
+
+def test_edf_counts_deadline_misses():
+    tasks = make_tasks([(1, 4, 1, 0, 4), (2, 2, 1, 0, 5), (3, 2, 1, 0, 6)])
+    result = Simulation(make_vms(1, 2, 8), tasks, scheduler='edf').run()
+    # 1 runs 0-4, 2 runs 4-6 (late), 3 runs 6-8 (late)
+    assert result.stats['deadline_misses'] == 2
+
+
+@pytest.mark.parametrize('scheduler', SCHEDULERS)
+def test_table_and_list_runs_agree(scheduler):
+    table = make_workload('pareto', 600, 3, cores=8, ram=32, load=1.2, seed=12)
+    tasks = list(make_workload('pareto', 600, 3, cores=8, ram=32, load=1.2,
+                               seed=12).iter_tasks())
+    from_table = Simulation(make_vms(3, 8, 32), table, scheduler=scheduler,
+                            time_quantum=0.7).run()
+    from_list = Simulation(make_vms(3, 8, 32), tasks, scheduler=scheduler,
+                           time_quantum=0.7).run()
+    assert sorted(result_rows(from_table)) == sorted(result_rows(from_list))
+    assert from_table.stats == from_list.stats
+
+
+@pytest.mark.parametrize('name, options', [
+    ('lottery', {}),
+    ('aging', {'aging_rate': -1}),
+    ('mlfq', {'levels': 0}),
+    ('mlfq', {'boost_interval': -5}),
+])
+def test_invalid_schedulers(name, options):
+    with pytest.raises(ValueError):
+        make_scheduler(name, options=options)
+
+
+def test_mlfq_boost_catches_up_after_idle_stretch():
+    policy = make_scheduler('mlfq', 1, {'boost_interval': 5})
+    assert not policy.boost_due(4.9)
+    assert policy.boost_due(31)
+    # the boosts due at 5, 10, ..., 30 collapse into one; the next is at 35
+    assert not policy.boost_due(34.9)
+    assert policy.boost_due(35)
+
+
+def _slice_starts(result, task_id):
+    return [time for time, kind, tid, _ in result.events if kind == 'start' and tid == task_id]
+
+
+@pytest.mark.parametrize('boost_interval, starts', [
+    (0, [21, 24, 26]),
+    # the boost due at 25 lands inside 4's 24-26 slice and takes effect at
+    # 26, so 4 restarts at the top level with a 1-second quantum
+    (5, [21, 24, 26, 27]),
+])
+def test_mlfq_boost_applies_at_next_dispatch(boost_interval, starts):
+    tasks = make_tasks([(1, 8, 1, 0, None), (2, 2, 1, 0, None),
+                        (3, 3, 1, 20, None), (4, 6, 1, 20, None)])
+    result = Simulation(make_vms(1, 2, 8), tasks, scheduler='mlfq', time_quantum=1,
+                        scheduler_options={'boost_interval': boost_interval},
+                        record_events=True).run()
+    assert schedule(result) == {1: (0, 10), 2: (1, 5), 3: (20, 24), 4: (21, 29)}
+    assert _slice_starts(result, 4) == starts
@@ -0,0 +1,92 @@
+"""Incremental statistics against values recomputed from scratch."""
+
+import math
+import random
+
+import pytest
+
+from cloudvista.bench import make_workload
+from cloudvista.engine import Simulation
+from cloudvista.models import make_vms
+from cloudvista.stats import QuantileSketch, RunningStat
+
+
+def exact_quantile(values, q):
+    # the sketch reports the sample at rank floor(q * (n - 1))
+    ordered = sorted(values)
+    return ordered[int(math.floor(q * (len(ordered) - 1)))]
+
+
+@pytest.mark.parametrize('accuracy', [0.01, 0.05])
+def test_quantiles_within_relative_accuracy(accuracy):
+    rng = random.Random(1)
+    values = [rng.lognormvariate(0, 2.5) for _ in range(20000)]
+    sketch = QuantileSketch(relative_accuracy=accuracy)
+    for value in values:
+        sketch.add(value)
+    for q in (0.0, 0.01, 0.25, 0.5, 0.9, 0.95, 0.99, 0.999, 1.0):
+        expected = exact_quantile(values, q)
+        assert abs(sketch.quantile(q) - expected) <= accuracy * expected
+
+
+def test_zeros_are_counted_apart():
+    sketch = QuantileSketch()
+    for value in [0.0] * 60 + [5.0] * 40:
+        sketch.add(value)
+    assert sketch.quantile(0.5) == 0.0
+    assert sketch.quantile(0.99) == pytest.approx(5.0, rel=0.01)
+    assert QuantileSketch().quantile(0.5) is None
+
+
+def test_bucket_count_grows_with_log_of_range():
+    sketch = QuantileSketch()
+    for i in range(100000):
+        sketch.add(1.0 + i % 1000)
+    # 1..1000 spans log(1000)/log(gamma) ~ 346 buckets at 1% accuracy
+    assert len(sketch.buckets) < 400
+
+
+def test_merged_sketch_equals_one_sketch():
+    rng = random.Random(2)
+    values = [rng.expovariate(0.1) for _ in range(5000)]
+    whole, left, right = QuantileSketch(), QuantileSketch(), QuantileSketch()
+    for i, value in enumerate(values):
+        whole.add(value)
+        (left if i % 3 else right).add(value)
+    left.merge(right)
+    assert left.buckets == whole.buckets and left.count == whole.count
+    with pytest.raises(ValueError):
+        left.merge(QuantileSketch(relative_accuracy=0.05))
+
+
+def test_running_stat_and_merge():
+    rng = random.Random(3)
+    values = [rng.gauss(10, 4) for _ in range(1000)]
+    whole, left, right = RunningStat(), RunningStat(), RunningStat()
+    for i, value in enumerate(values):
+        whole.add(value)
+        (left if i < 300 else right).add(value)
+    left.merge(right)
+    mean = sum(values) / len(values)
+    variance = sum((v - mean) ** 2 for v in values) / (len(values) - 1)
+    for stat in (whole, left):
+        assert stat.mean == pytest.approx(mean)
+        assert stat.variance == pytest.approx(variance)
+        assert (stat.min, stat.max) == (min(values), max(values))
+
+
+def test_engine_statistics_match_completed_tasks():
+    tasks = make_workload('pareto', 500, 3, cores=8, ram=32, load=1.2, seed=4)
+    result = Simulation(make_vms(3, 8, 32), list(tasks.iter_tasks()), scheduler='sjf').run()
+    stats, done = result.stats, result.completed
+    waits = [task.start_time - task.arrival_time for task in done]
+    turnarounds = [task.end_time - task.arrival_time for task in done]
+    assert stats['completed_tasks'] == len(done) == 500
+    assert stats['avg_wait_time'] == pytest.approx(sum(waits) / len(waits))
+    assert stats['avg_turnaround_time'] == pytest.approx(sum(turnarounds) / len(done))
+    assert stats['makespan'] == max(task.end_time for task in done)
+    assert stats['total_cost'] == pytest.approx(sum(task.cost for task in done))
+    busy = sum(task.cpu_required * task.execution_time for task in done)
+    assert stats['cpu_utilization'] == pytest.approx(busy / (24 * stats['makespan']) * 100)
+    p95 = exact_quantile(waits, 0.95)
+    assert abs(stats['p95_wait_time'] - p95) <= 0.01 * p95 + 1e-9
@@ -0,0 +1,91 @@
+"""Saving runs to the SQLite store and reading them back."""
+
+import json
+
+import pytest
+
+from cloudvista.bench import make_workload
+from cloudvista.engine import Simulation
+from cloudvista.models import make_vms
+from cloudvista.storage import SimulationStore, StorageError, result_rows, task_row
+
+
+@pytest.fixture
+def store(tmp_path):
+    return SimulationStore(str(tmp_path / 'cloudvista.db'))
+
+
+def run(tasks, scheduler='sjf'):
+    return Simulation(make_vms(3, 8, 32), tasks, scheduler=scheduler).run()
+
+
+def workload():
+    return make_workload('uniform', 300, 3, cores=8, ram=32, load=1.2, seed=5)
+
+
+def test_table_backed_result_round_trip(store):
+    result = run(workload())
+    assert result.table is not None
+
+    simulation_id = store.save_result(result, placement='firstfit', vm_count=3)
+    summary = store.get_simulation(simulation_id)
+    assert summary['scheduler'] == 'sjf'
+    assert summary['task_count'] == result.stats['completed_tasks']
+    assert summary['makespan'] == pytest.approx(result.stats['makespan'])
+
+    # the same workload as Task objects gives the rows to expect
+    expected = list(result_rows(run(list(workload().iter_tasks()))))
+    assert sorted(store.iter_task_rows(simulation_id)) == sorted(expected)
+
+
+def test_saved_rows_keep_default_names_null(store):
+    simulation_id = store.save_result(run(workload()))
+    rows = list(store.iter_task_rows(simulation_id, page_size=7))
+    assert len(rows) == 300 and all(row[1] is None for row in rows)
+    page = store.simulation_tasks(simulation_id, limit=1)
+    assert page[0]['name'] == 'Task-%d' % page[0]['id']
+    assert store.simulation_tasks(simulation_id, limit=5, after=page[0]['row'])[0]['row'] == \
+        page[0]['row'] + 1
+
+
+def test_task_row_keeps_id_zero():
+    assert task_row({'id': 0}, 0)[0] == 0
+    assert task_row({'id': None}, 4)[0] == 5
+    assert task_row({}, 4)[0] == 5
+    assert task_row({'id': 3, 'name': 'Task-3'})[1] is None
+    with pytest.raises(StorageError, match='index 2'):
+        task_row({'cpu_required': 'many'}, 2)
+
+
+def test_failed_save_is_rolled_back(store):
+    def rows():
+        yield task_row({'id': 1}, 0)
+        raise StorageError('broken upload')
+
+    with pytest.raises(StorageError):
+        store.save(rows(), scheduler='fcfs')
+    assert store.list_simulations() == []
+
+
+def test_save_endpoint_json_and_ndjson(client):
+    tasks = [{'id': 0, 'cpu_required': 1, 'ram_required': 2, 'execution_time': 3,
+              'start_time': 0, 'end_time': 3, 'vm_id': 1},
+             {'cpu_required': 1, 'ram_required': 2, 'execution_time': 1,
+              'start_time': 0, 'end_time': 1, 'vm_id': 1}]
+    response = client.post('/api/simulation/save',
+                           json={'scheduler': 'fcfs', 'completedTasks': tasks})
+    first = response.get_json()['simulation_id']
+    body = '\n'.join(json.dumps(line) for line in [{'scheduler': 'sjf', 'vm_count': 1}] + tasks)
+    response = client.post('/api/simulation/save', data=body + '\n',
+                           content_type='application/x-ndjson')
+    second = response.get_json()['simulation_id']
+    for simulation_id in (first, second):
+        rows = client.get('/api/simulations/%d/tasks' % simulation_id).get_json()['tasks']
+        assert [row['id'] for row in rows] == [0, 2]
+
+
+def test_save_endpoint_rejects_bad_lines(client):
+    response = client.post('/api/simulation/save', data='{"scheduler": "fcfs"}\n[1]\n',
+                           content_type='application/x-ndjson')
+    assert response.status_code == 400
+    assert 'line 2' in response.get_json()['message']
@@ -0,0 +1,76 @@
+"""Parameter sweeps, in-process and on a process pool."""
+
+import csv
+import io
+
+import pytest
+
+from cloudvista.bench import make_workload
+from cloudvista.engine import Simulation
+from cloudvista.models import make_vms
+from cloudvista.sweep import METRICS, grid, main, run_sweep, write_table
+
+
+def workload():
+    return make_workload('pareto', 300, 3, cores=4, ram=8, load=1.2, seed=9)
+
+
+def without_timing(rows):
+    return sorted(({k: v for k, v in row.items() if k != 'elapsed'} for row in rows),
+                  key=lambda row: row['point'])
+
+
+def test_grid_only_varies_the_quantum_for_preemptive_schedulers():
+    points = grid(schedulers=['fcfs', 'roundrobin'], quanta=[1, 2, 4], vm_counts=[2, 3])
+    assert [(p['scheduler'], p['vm_count'], p['time_quantum']) for p in points] == [
+        ('fcfs', 2, 1.0), ('fcfs', 3, 1.0),
+        ('roundrobin', 2, 1.0), ('roundrobin', 2, 2.0), ('roundrobin', 2, 4.0),
+        ('roundrobin', 3, 1.0), ('roundrobin', 3, 2.0), ('roundrobin', 3, 4.0)]
+    assert [p['point'] for p in points] == list(range(8))
+
+
+@pytest.mark.parametrize('options', [
+    {'schedulers': ['lottery']},
+    {'placements': ['nextfit']},
+    {'autoscalers': [{'policy': 'psychic'}]},
+])
+def test_grid_rejects_unknown_options(options):
+    with pytest.raises(ValueError):
+        grid(**options)
+
+
+def test_rows_match_direct_runs():
+    points = grid(schedulers=['sjf', 'roundrobin'], quanta=[0.5], vm_counts=[2])
+    for row in run_sweep(workload(), points, workers=1):
+        stats = Simulation(make_vms(2, 4, 8), workload(), scheduler=row['scheduler'],
+                           time_quantum=0.5).run().stats
+        assert {name: row[name] for name in METRICS if name in stats} == {
+            name: stats[name] for name in METRICS if name in stats}
+        assert row['cached'] is False
+
+
+def test_process_pool_matches_in_process():
+    points = grid(schedulers=['fcfs', 'srtf', 'mlfq'], quanta=[1, 3], vm_counts=[2, 4])
+    serial = without_timing(run_sweep(workload(), points, workers=1))
+    pooled = without_timing(run_sweep(workload(), points, workers=3))
+    assert len(pooled) == len(points)
+    assert pooled == serial
+
+
+def test_write_table_returns_rows_by_point():
+    rows = [{'point': 2, 'scheduler': 'b'}, {'point': 0, 'scheduler': 'a'}]
+    out = io.StringIO()
+    assert [row['point'] for row in write_table(rows, out)] == [0, 2]
+    assert [row['scheduler'] for row in csv.DictReader(io.StringIO(out.getvalue()))] == ['b', 'a']
+
+
+def test_command_line(tmp_path):
+    trace = tmp_path / 'jobs.csv'
+    trace.write_text('arrival,cpu,ram,runtime\n0,1,1,4\n1,2,2,3\n1,1,1,2\n')
+    output = tmp_path / 'sweep.csv'
+    assert main([str(trace), '--scheduler', 'fcfs', 'sjf', '--vms', '1', '2',
+                 '--workers', '2', '--output', str(output)]) == 0
+    with open(str(output), newline='') as fh:
+        rows = list(csv.DictReader(fh))
+    assert len(rows) == 4
+    assert all(row['completed_tasks'] == '3' for row in rows)
@@ -0,0 +1,82 @@
+"""TaskTable rows, round trips to Task objects and vectorized queries."""
+
+import numpy as np
+import pytest
+
+from cloudvista.cache import workload_digest
+from cloudvista.engine import Simulation
+from cloudvista.models import Task, make_vms
+from cloudvista.taskstore import TaskTable
+
+
+def make_tasks():
+    return [
+        Task(id=1, name='Task-1', cpu_required=2, ram_required=4, execution_time=3.5,
+             priority=40000, arrival_time=0.0),
+        Task(id=2, name='backup', cpu_required=1, ram_required=2, execution_time=1.0,
+             priority=-70000, arrival_time=2.0, deadline=4.0),
+        Task(id=3, name='backup', cpu_required=4, ram_required=8, execution_time=2.0,
+             arrival_time=1.0),
+    ]
+
+
+def fields(task):
+    return (task.id, task.name, task.cpu_required, task.ram_required, task.execution_time,
+            task.priority, task.arrival_time, task.deadline)
+
+
+def test_round_trip_keeps_every_field():
+    tasks = make_tasks()
+    table = TaskTable.from_tasks(tasks)
+    # iter_tasks yields pending rows in arrival order
+    assert [fields(task) for task in table.iter_tasks()] == [
+        fields(tasks[i]) for i in (0, 2, 1)]
+    assert table.task(0).name == 'Task-1'
+    assert table.names.names == ['backup']
+
+
+def test_priorities_beyond_int16_do_not_wrap():
+    low, high = make_tasks(), make_tasks()
+    high[0].priority = 40000 + 65536
+    assert TaskTable.from_tasks(low).column('priority').tolist() == [40000, -70000, 5]
+    assert workload_digest(low) != workload_digest(high)
+
+
+def test_grows_past_capacity():
+    table = TaskTable(capacity=1)
+    for i in range(100):
+        table.append(i + 1, None, 1, 1, 1.0, arrival_time=float(i))
+    assert len(table) == 100
+    assert table.column('id').tolist() == list(range(1, 101))
+
+
+def test_from_columns_defaults():
+    table = TaskTable.from_columns([1, 2], [1, 2], [5.0, 6.0])
+    assert table.column('id').tolist() == [1, 2]
+    assert table.column('priority').tolist() == [5, 5]
+    assert [task.status for task in table.iter_tasks()] == ['pending', 'pending']
+
+
+def test_engine_writes_outcomes_back():
+    table = TaskTable.from_tasks(make_tasks())
+    result = Simulation(make_vms(1, 4, 8), table).run()
+    assert result.table is table and result.completed == []
+    assert table.completed_mask().all()
+    expected = Simulation(make_vms(1, 4, 8), make_tasks()).run()
+    by_id = {task.id: task for task in expected.completed}
+    for task in table.iter_rows(np.arange(len(table))):
+        assert (task.start_time, task.end_time, task.vm_id) == (
+            by_id[task.id].start_time, by_id[task.id].end_time, by_id[task.id].vm_id)
+        assert task.cost == pytest.approx(by_id[task.id].cost)
+    stats = table.statistics()
+    assert stats['completed_tasks'] == 3
+    assert stats['makespan'] == expected.stats['makespan']
+    assert stats['avg_wait_time'] == pytest.approx(expected.stats['avg_wait_time'])
+
+
+def test_copy_is_independent():
+    table = TaskTable.from_tasks(make_tasks())
+    copy = table.copy()
+    Simulation(make_vms(1, 4, 8), copy).run()
+    assert not table.completed_mask().any()
+    assert copy.completed_mask().all()
@@ -0,0 +1,104 @@
+"""Streaming trace import and replay."""
+
+import gzip
+import json
+
+import pytest
+
+from cloudvista import traces
+from cloudvista.engine import Simulation
+from cloudvista.models import make_vms
+from cloudvista.traces import TraceError, read_trace
+
+CSV_TRACE = (
+    'job_id,job_name,submit_time,cores,memory,duration,prio\n'
+    '11,etl,1000,2,4,30,7\n'
+    '12,,1002,0.5,1.5,10,\n'
+    '13,report,1005,1,2,5,1\n'
+)
+
+
+def write(path, text, compress=False):
+    if compress:
+        with gzip.open(str(path), 'wt', encoding='utf-8') as fh:
+            fh.write(text)
+    else:
+        path.write_text(text)
+    return str(path)
+
+
+def summary(tasks):
+    return [(t.id, t.name, t.cpu_required, t.ram_required, t.execution_time, t.priority,
+             t.arrival_time) for t in tasks]
+
+
+EXPECTED = [
+    (11, 'etl', 2, 4, 30.0, 7, 0.0),
+    # fractional cores and RAM round up; a blank priority is the default
+    (12, '', 1, 2, 10.0, 5, 2.0),
+    (13, 'report', 1, 2, 5.0, 1, 5.0),
+]
+
+
+@pytest.mark.parametrize('name, compress, use_mmap', [
+    ('jobs.csv', False, True),
+    ('jobs.csv', False, False),
+    ('jobs.csv.gz', True, True),
+    # gzip is recognised by its magic bytes, not only the extension
+    ('jobs.csv', True, True),
+])
+def test_csv_aliases_and_sources(tmp_path, name, compress, use_mmap):
+    path = write(tmp_path / name, CSV_TRACE, compress)
+    assert summary(read_trace(path, rebase=True, use_mmap=use_mmap)) == EXPECTED
+
+
+def test_jsonl_with_explicit_columns(tmp_path):
+    lines = [{'t': 3, 'c': 1, 'm': 2, 'len': 4, 'deadline': 10},
+             {'t': 5, 'c': 2, 'm': 2, 'len': 1}]
+    path = write(tmp_path / 'jobs.jsonl', '\n'.join(json.dumps(r) for r in lines) + '\n\n')
+    tasks = list(read_trace(path, columns={'arrival_time': 't', 'cpu_required': 'c',
+                                           'ram_required': 'm', 'execution_time': 'len'}))
+    assert [(t.id, t.name, t.arrival_time, t.deadline) for t in tasks] == [
+        (1, 'Task-1', 3.0, 10.0), (2, 'Task-2', 5.0, None)]
+
+
+def test_reads_lazily(tmp_path):
+    path = write(tmp_path / 'jobs.csv', CSV_TRACE + 'bad,row\n')
+    tasks = read_trace(path)
+    assert next(tasks).id == 11
+
+
+def test_reorder_window(tmp_path):
+    text = 'arrival,cpu,ram,runtime\n0,1,1,1\n5,1,1,1\n7,1,1,1\n3,1,1,1\n9,1,1,1\n'
+    path = write(tmp_path / 'jobs.csv', text)
+    assert [t.arrival_time for t in read_trace(path, reorder_window=5)] == [0, 3, 5, 7, 9]
+    # 5 has been released by the time 3 is read
+    with pytest.raises(TraceError, match='reorder_window'):
+        list(read_trace(path, reorder_window=1))
+
+
+@pytest.mark.parametrize('text, message', [
+    ('arrival,cpu,runtime\n0,1,1\n', 'no column for ram_required'),
+    ('arrival,cpu,ram,runtime\n0,1,1,soon\n', 'record 1'),
+])
+def test_malformed_traces(tmp_path, text, message):
+    path = write(tmp_path / 'jobs.csv', text)
+    with pytest.raises(TraceError, match=message):
+        list(read_trace(path))
+
+
+def test_invalid_jsonl_line(tmp_path):
+    path = write(tmp_path / 'jobs.jsonl', '{"arrival": 0}\n{oops\n')
+    with pytest.raises(TraceError, match='line 2'):
+        list(read_trace(path, columns={'arrival_time': 'arrival', 'cpu_required': 'arrival',
+                                       'ram_required': 'arrival', 'execution_time': 'arrival'}))
+
+
+def test_repeated_job_ids_replay(tmp_path, capsys):
+    text = 'job_id,submit_time,cores,memory,duration\n7,0,1,1,5\n7,1,1,1,5\n7,1,1,1,2\n'
+    path = write(tmp_path / 'jobs.csv', text)
+    result = Simulation(make_vms(1, 4, 8), read_trace(path)).run()
+    assert [(t.id, t.start_time, t.end_time) for t in result.completed] == [
+        (7, 1.0, 3.0), (7, 0.0, 5.0), (7, 1.0, 6.0)]
+    assert traces.main([path, '--vms', '1']) == 0
+    assert json.loads(capsys.readouterr().out)['completed_tasks'] == 3